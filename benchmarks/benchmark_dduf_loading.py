@@ -0,0 +1,60 @@
+import argparse
+import gc
+import os
+import tempfile
+import time
+import zipfile
+
+import torch
+from huggingface_hub import hf_hub_download
+
+from diffusers import DiffusionPipeline
+
+
+def load_time(load_fn, num_runs):
+    """Returns the mean time, in seconds, of `num_runs` loads after a warmup load, which fills the page cache."""
+    load_fn()
+    times = []
+    for _ in range(num_runs):
+        gc.collect()
+        start = time.perf_counter()
+        pipeline = load_fn()
+        # Touch every weight, so that lazily memory-mapped weights are actually read.
+        for component in pipeline.components.values():
+            if isinstance(component, torch.nn.Module):
+                for param in component.parameters():
+                    param.data.sum()
+        times.append(time.perf_counter() - start)
+        del pipeline
+    return sum(times) / len(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ckpt", type=str, default="DDUF/tiny-flux-dev-pipe-dduf")
+    parser.add_argument("--dduf_file", type=str, default="fluxpipeline.dduf")
+    parser.add_argument("--torch_dtype", type=str, default="bfloat16", choices=["float32", "float16", "bfloat16"])
+    parser.add_argument("--num_runs", type=int, default=3)
+    args = parser.parse_args()
+
+    torch_dtype = getattr(torch, args.torch_dtype)
+    dduf_path = hf_hub_download(args.ckpt, args.dduf_file)
+
+    with tempfile.TemporaryDirectory() as unpacked_dir:
+        # DDUF archives are uncompressed zip files, so the unpacked directory holds the same files.
+        with zipfile.ZipFile(dduf_path) as archive:
+            archive.extractall(unpacked_dir)
+
+        dduf_time = load_time(
+            lambda: DiffusionPipeline.from_pretrained(
+                os.path.dirname(dduf_path), dduf_file=args.dduf_file, torch_dtype=torch_dtype
+            ),
+            args.num_runs,
+        )
+        unpacked_time = load_time(
+            lambda: DiffusionPipeline.from_pretrained(unpacked_dir, torch_dtype=torch_dtype), args.num_runs
+        )
+
+    print(f"DDUF archive: {dduf_time:.3f} secs")
+    print(f"Unpacked directory: {unpacked_time:.3f} secs")
+    print(f"Speedup: {unpacked_time / dduf_time:.2f}x")
@@ -40,7 +40,7 @@ def main():
         print(f"****** Running file: {file} ******")
 
         # Run with canonical settings.
-        if file != "benchmark_text_to_image.py" and file != "benchmark_ip_adapters.py":
+        if file not in ["benchmark_text_to_image.py", "benchmark_ip_adapters.py", "benchmark_dduf_loading.py"]:
             command = f"python {file}"
             run_command(command.split())
 
@@ -1,9 +1,7 @@
 import asyncio
 import logging
 import os
-import random
 import tempfile
-import traceback
 import uuid
 
 import aiohttp
@@ -13,7 +11,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
-from diffusers.pipelines.stable_diffusion_3 import StableDiffusion3Pipeline
+from diffusers import DiffusionPipeline
+from diffusers.pipelines.serving_utils import PipelineServer
 
 
 logger = logging.getLogger(__name__)
@@ -24,6 +23,8 @@ class TextToImageInput(BaseModel):
     prompt: str
     size: str | None = None
     n: int | None = None
+    num_inference_steps: int | None = None
+    seed: int | None = None
 
 
 class HttpClient:
@@ -42,28 +43,42 @@ class HttpClient:
 
 
 class TextToImagePipeline:
-    pipeline: StableDiffusion3Pipeline = None
+    pipeline: DiffusionPipeline = None
+    server: PipelineServer = None
     device: str = None
 
-    def start(self):
+    async def start(self):
         if torch.cuda.is_available():
             model_path = os.getenv("MODEL_PATH", "stabilityai/stable-diffusion-3.5-large")
             logger.info("Loading CUDA")
             self.device = "cuda"
-            self.pipeline = StableDiffusion3Pipeline.from_pretrained(
-                model_path,
-                torch_dtype=torch.bfloat16,
-            ).to(device=self.device)
+            torch_dtype = torch.bfloat16
         elif torch.backends.mps.is_available():
             model_path = os.getenv("MODEL_PATH", "stabilityai/stable-diffusion-3.5-medium")
             logger.info("Loading MPS for Mac M Series")
             self.device = "mps"
-            self.pipeline = StableDiffusion3Pipeline.from_pretrained(
-                model_path,
-                torch_dtype=torch.bfloat16,
-            ).to(device=self.device)
+            torch_dtype = torch.bfloat16
+        elif os.getenv("MODEL_PATH") is not None:
+            # Useful to exercise the server locally with a tiny pipeline.
+            model_path = os.getenv("MODEL_PATH")
+            logger.info("Loading CPU")
+            self.device = "cpu"
+            torch_dtype = torch.float32
         else:
-            raise Exception("No CUDA or MPS device available")
+            raise Exception("No CUDA or MPS device available, set `MODEL_PATH` to serve a small model on CPU")
+
+        self.pipeline = DiffusionPipeline.from_pretrained(model_path, torch_dtype=torch_dtype).to(device=self.device)
+        self.server = PipelineServer(
+            self.pipeline,
+            max_queue_size=int(os.getenv("MAX_QUEUE_SIZE", 64)),
+            max_batch_size=int(os.getenv("MAX_BATCH_SIZE", 4)),
+            batch_timeout=float(os.getenv("BATCH_TIMEOUT", 0.05)),
+            request_timeout=float(os.getenv("REQUEST_TIMEOUT", 300)),
+        )
+        await self.server.start()
+
+    async def stop(self):
+        await self.server.stop()
 
 
 app = FastAPI()
@@ -86,9 +101,15 @@ app.add_middleware(
 
 
 @app.on_event("startup")
-def startup():
+async def startup():
     http_client.start()
-    shared_pipeline.start()
+    await shared_pipeline.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await shared_pipeline.stop()
+    await http_client.stop()
 
 
 def save_image(image):
@@ -107,24 +128,34 @@ async def base():
     return "Welcome to Diffusers! Where you can use diffusion models to generate images"
 
 
+@app.get("/metrics")
+async def metrics():
+    return shared_pipeline.server.get_metrics()
+
+
 @app.post("/v1/images/generations")
 async def generate_image(image_input: TextToImageInput):
+    kwargs = {}
+    if image_input.size is not None:
+        width, height = (int(x) for x in image_input.size.split("x"))
+        kwargs.update(width=width, height=height)
+    if image_input.n is not None:
+        kwargs["num_images_per_prompt"] = image_input.n
+    if image_input.num_inference_steps is not None:
+        kwargs["num_inference_steps"] = image_input.num_inference_steps
+
     try:
-        loop = asyncio.get_event_loop()
-        scheduler = shared_pipeline.pipeline.scheduler.from_config(shared_pipeline.pipeline.scheduler.config)
-        pipeline = StableDiffusion3Pipeline.from_pipe(shared_pipeline.pipeline, scheduler=scheduler)
-        generator = torch.Generator(device=shared_pipeline.device)
-        generator.manual_seed(random.randint(0, 10000000))
-        output = await loop.run_in_executor(None, lambda: pipeline(image_input.prompt, generator=generator))
-        logger.info(f"output: {output}")
-        image_url = save_image(output.images[0])
-        return {"data": [{"url": image_url}]}
+        images = await shared_pipeline.server.submit(image_input.prompt, seed=image_input.seed, **kwargs)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Too many requests are queued, please retry later.")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="The request timed out.")
     except Exception as e:
-        if isinstance(e, HTTPException):
-            raise e
-        elif hasattr(e, "message"):
-            raise HTTPException(status_code=500, detail=e.message + traceback.format_exc())
-        raise HTTPException(status_code=500, detail=str(e) + traceback.format_exc())
+        logger.exception("Generation failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    image_urls = await asyncio.get_running_loop().run_in_executor(None, lambda: [save_image(i) for i in images])
+    return {"data": [{"url": image_url} for image_url in image_urls]}
 
 
 if __name__ == "__main__":
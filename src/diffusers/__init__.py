@@ -78,8 +78,15 @@ except OptionalDependencyNotAvailable:
 else:
     _import_structure["hooks"].extend(
         [
+            "ContextParallelConfig",
+            "ControlNetCacheConfig",
+            "DeepCacheConfig",
             "HookRegistry",
+            "ModelResidencyManager",
             "PyramidAttentionBroadcastConfig",
+            "apply_context_parallel",
+            "apply_controlnet_cache",
+            "apply_deep_cache",
             "apply_pyramid_attention_broadcast",
         ]
     )
@@ -87,6 +94,7 @@ else:
         [
             "AllegroTransformer3DModel",
             "AsymmetricAutoencoderKL",
+            "AttentionBackendName",
             "AuraFlowTransformer2DModel",
             "AutoencoderDC",
             "AutoencoderKL",
@@ -150,6 +158,8 @@ else:
             "UVit2DModel",
             "VQModel",
             "WanTransformer3DModel",
+            "attention_backend",
+            "set_attention_backend",
         ]
     )
     _import_structure["optimization"] = [
@@ -609,10 +619,22 @@ if TYPE_CHECKING or DIFFUSERS_SLOW_IMPORT:
     except OptionalDependencyNotAvailable:
         from .utils.dummy_pt_objects import *  # noqa F403
     else:
-        from .hooks import HookRegistry, PyramidAttentionBroadcastConfig, apply_pyramid_attention_broadcast
+        from .hooks import (
+            ContextParallelConfig,
+            ControlNetCacheConfig,
+            DeepCacheConfig,
+            HookRegistry,
+            ModelResidencyManager,
+            PyramidAttentionBroadcastConfig,
+            apply_context_parallel,
+            apply_controlnet_cache,
+            apply_deep_cache,
+            apply_pyramid_attention_broadcast,
+        )
         from .models import (
             AllegroTransformer3DModel,
             AsymmetricAutoencoderKL,
+            AttentionBackendName,
             AuraFlowTransformer2DModel,
             AutoencoderDC,
             AutoencoderKL,
@@ -675,6 +697,8 @@ if TYPE_CHECKING or DIFFUSERS_SLOW_IMPORT:
             UVit2DModel,
             VQModel,
             WanTransformer3DModel,
+            attention_backend,
+            set_attention_backend,
         )
         from .optimization import (
             get_constant_schedule,
@@ -1,7 +1,16 @@
-from typing import Any, Dict, List
+import itertools
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import torch
+import torch.nn.functional as F
 
 from .configuration_utils import ConfigMixin, register_to_config
-from .utils import CONFIG_NAME
+from .utils import CONFIG_NAME, logging
+
+
+logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
 
 
 class PipelineCallback(ConfigMixin):
@@ -207,3 +216,183 @@ class IPAdapterScaleCutoffCallback(PipelineCallback):
         if step_index == cutoff_step:
             pipeline.set_ip_adapter_scale(0.0)
         return callback_kwargs
+
+
+class LatentRGBProjection(torch.nn.Module):
+    """
+    A linear projection from latent channels to RGB, used as a very cheap preview decoder. The output has the spatial
+    resolution of the latents and is in `[-1, 1]`, like the output of a VAE decoder.
+
+    Args:
+        weight (`torch.Tensor`):
+            Projection matrix of shape `(3, latent_channels)`.
+        bias (`torch.Tensor`, *optional*):
+            Bias of shape `(3,)`.
+    """
+
+    def __init__(self, weight: torch.Tensor, bias: Optional[torch.Tensor] = None):
+        super().__init__()
+        weight = torch.as_tensor(weight, dtype=torch.float32)
+        bias = torch.zeros(weight.shape[0]) if bias is None else torch.as_tensor(bias, dtype=torch.float32)
+        self.register_buffer("weight", weight)
+        self.register_buffer("bias", bias)
+
+    @classmethod
+    def fit(cls, latents: torch.Tensor, images: torch.Tensor) -> "LatentRGBProjection":
+        """
+        Fits the projection with least squares.
+
+        Args:
+            latents (`torch.Tensor`):
+                Latents of shape `(batch_size, latent_channels, height, width)`, as passed to the VAE decoder.
+            images (`torch.Tensor`):
+                The corresponding decoded images of shape `(batch_size, 3, image_height, image_width)` in `[-1, 1]`.
+        """
+        images = F.interpolate(images.float(), size=latents.shape[-2:], mode="area")
+        x = latents.float().movedim(1, -1).reshape(-1, latents.shape[1])
+        x = torch.cat([x, torch.ones_like(x[:, :1])], dim=1)
+        y = images.movedim(1, -1).reshape(-1, images.shape[1])
+        solution = torch.linalg.lstsq(x.cpu(), y.cpu()).solution
+        return cls(solution[:-1].T.contiguous(), solution[-1])
+
+    def forward(self, latents: torch.Tensor) -> torch.Tensor:
+        weight = self.weight.to(latents.device, latents.dtype)
+        bias = self.bias.to(latents.device, latents.dtype)
+        return torch.einsum("rc,bc...->br...", weight, latents) + bias.view(1, -1, *([1] * (latents.ndim - 2)))
+
+
+class LatentPreviewCallback(PipelineCallback):
+    """
+    Callback that decodes low-resolution previews of the latents every `every_n_steps` steps with a cheap decoder, such
+    as [`AutoencoderTiny`] (TAESD) or a [`LatentRGBProjection`].
+
+    Previews are decoded on a background thread, and on a side stream for CUDA latents, so that the denoising loop
+    doesn't wait for them. If the previous preview is still being decoded, the preview of the current step is skipped.
+    Previews are delivered to `on_preview` and can also be consumed from another thread with
+    [`~LatentPreviewCallback.previews`].
+
+    Note: The decoder receives the latents as passed to `callback_on_step_end`, so it needs to match the pipeline's
+    latent space. Packed latents, for example those of Flux, are not supported.
+
+    Args:
+        decoder (`torch.nn.Module`):
+            The preview decoder. Models with a `decode` method, such as [`AutoencoderTiny`], are called through it.
+        every_n_steps (`int`, defaults to `1`):
+            Decode a preview every `every_n_steps` steps.
+        on_preview (`Callable[[int, Any], None]`, *optional*):
+            Called from the background thread with the step index and the previews of each decoded step.
+        output_type (`str`, defaults to `"pil"`):
+            The output format of the previews. Choose between `"pil"`, `"np"` and `"pt"`.
+        max_queued_previews (`int`, defaults to `4`):
+            The maximum number of previews kept for [`~LatentPreviewCallback.previews`]. The oldest previews are
+            dropped when they aren't consumed fast enough.
+    """
+
+    tensor_inputs = ["latents"]
+
+    def __init__(
+        self,
+        decoder: torch.nn.Module,
+        every_n_steps: int = 1,
+        on_preview: Optional[Callable[[int, Any], None]] = None,
+        output_type: str = "pil",
+        max_queued_previews: int = 4,
+    ):
+        if every_n_steps < 1:
+            raise ValueError(f"`every_n_steps` must be at least 1, but got {every_n_steps}.")
+        if output_type not in ("pil", "np", "pt"):
+            raise ValueError(f"`output_type` must be one of 'pil', 'np' or 'pt', but got {output_type}.")
+        self.register_to_config(every_n_steps=every_n_steps, output_type=output_type)
+
+        self.decoder = decoder
+        self.on_preview = on_preview
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="diffusers-latent-preview")
+        self._pending: Optional[Future] = None
+        self._previews = queue.Queue(maxsize=max_queued_previews)
+        self._stream = None
+
+    def callback_fn(self, pipeline, step_index, timestep, callback_kwargs) -> Dict[str, Any]:
+        num_steps = getattr(pipeline, "num_timesteps", None)
+        is_last_step = num_steps is not None and step_index == num_steps - 1
+
+        latents = callback_kwargs[self.tensor_inputs[0]]
+        if step_index % self.config.every_n_steps == 0 and (self._pending is None or self._pending.done()):
+            # The latents may be updated in place by the next step, so the background thread works on a copy.
+            latents = latents.detach().clone()
+            event = None
+            if latents.device.type == "cuda":
+                event = torch.cuda.Event()
+                event.record()
+            self._pending = self._executor.submit(self._decode, step_index, latents, event)
+
+        if is_last_step:
+            self.close()
+        return callback_kwargs
+
+    def previews(self, timeout: Optional[float] = None) -> Iterator[Tuple[int, Any]]:
+        """
+        Yields `(step_index, previews)` tuples until the pipeline reaches its last step or [`~LatentPreviewCallback.close`]
+        is called. Meant to be consumed from a different thread than the one running the pipeline.
+
+        Args:
+            timeout (`float`, *optional*):
+                The maximum time, in seconds, to wait for the next preview.
+        """
+        while True:
+            item = self._previews.get(timeout=timeout)
+            if item is None:
+                return
+            yield item
+
+    def close(self) -> None:
+        """Ends the current iteration of [`~LatentPreviewCallback.previews`] once all pending previews are delivered."""
+        self._executor.submit(self._put, None)
+
+    @torch.no_grad()
+    def _decode(self, step_index: int, latents: torch.Tensor, event: Optional["torch.cuda.Event"]) -> None:
+        from .image_processor import VaeImageProcessor
+
+        try:
+            if event is not None:
+                if self._stream is None:
+                    self._stream = torch.cuda.Stream(latents.device)
+                with torch.cuda.stream(self._stream):
+                    self._stream.wait_event(event)
+                    latents.record_stream(self._stream)
+                    images = self._run_decoder(latents).float().cpu()
+            else:
+                images = self._run_decoder(latents).float().cpu()
+
+            images = (images / 2 + 0.5).clamp(0, 1)
+            if self.config.output_type != "pt":
+                images = VaeImageProcessor.pt_to_numpy(images)
+                if self.config.output_type == "pil":
+                    images = VaeImageProcessor.numpy_to_pil(images)
+        except Exception as e:
+            logger.warning(f"Failed to decode the preview of step {step_index}: {e}")
+            return
+
+        if self.on_preview is not None:
+            self.on_preview(step_index, images)
+        self._put((step_index, images))
+
+    def _put(self, item: Optional[Tuple[int, Any]]) -> None:
+        # Only called from the background thread, so there is no other producer between dropping and adding.
+        while True:
+            try:
+                self._previews.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._previews.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _run_decoder(self, latents: torch.Tensor) -> torch.Tensor:
+        parameter = next(itertools.chain(self.decoder.parameters(), self.decoder.buffers()), None)
+        if parameter is not None:
+            latents = latents.to(parameter.device, parameter.dtype)
+        if hasattr(self.decoder, "decode"):
+            output = self.decoder.decode(latents)
+            return output.sample if hasattr(output, "sample") else output[0]
+        return self.decoder(latents)
@@ -17,6 +17,8 @@ from argparse import ArgumentParser
 
 from .env import EnvironmentCommand
 from .fp16_safetensors import FP16SafetensorsCommand
+from .generate import GenerateCommand
+from .optimize import OptimizeCommand
 
 
 def main():
@@ -26,6 +28,8 @@ def main():
     # Register commands
     EnvironmentCommand.register_subcommand(commands_parser)
     FP16SafetensorsCommand.register_subcommand(commands_parser)
+    GenerateCommand.register_subcommand(commands_parser)
+    OptimizeCommand.register_subcommand(commands_parser)
 
     # Let's go
     args = parser.parse_args()
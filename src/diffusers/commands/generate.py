@@ -0,0 +1,267 @@
+# Copyright 2025 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Usage example:
+    diffusers-cli generate --pipeline stabilityai/stable-diffusion-xl-base-1.0 --requests prompts.jsonl
+        --output_dir outputs --batch_size 4 --devices cuda:0,cuda:1
+
+Every line of `prompts.jsonl` is a request like `{"id": "cat", "prompt": "a cat", "seed": 0, "num_inference_steps": 30}`.
+Outputs are written to `--output_dir` along with one `manifest-*.jsonl` per shard. Requests that are already in a
+manifest are skipped, so an interrupted run is resumed by running the same command again.
+"""
+
+import glob
+import json
+import multiprocessing
+import os
+from argparse import ArgumentParser, Namespace
+from importlib import import_module
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from ..utils import logging
+from . import BaseDiffusersCLICommand
+
+
+logger = logging.get_logger("diffusers-cli/generate")
+
+# Request fields that are handled by the command instead of being passed to the pipeline.
+_REQUEST_FIELDS = ("id", "prompt", "seed")
+_MANIFEST_PATTERN = "manifest-*.jsonl"
+
+
+def generate_command_factory(args: Namespace):
+    return GenerateCommand(args)
+
+
+def load_requests(path: str) -> List[Dict[str, Any]]:
+    """Loads a JSONL file of requests. Requests without an `id` use their line index as id."""
+    requests = []
+    with open(path, "r", encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            request = json.loads(line)
+            if isinstance(request, str):
+                request = {"prompt": request}
+            request.setdefault("id", str(index))
+            request["id"] = str(request["id"])
+            request["_index"] = index
+            requests.append(request)
+    return requests
+
+
+def load_completed_ids(output_dir: str) -> Set[str]:
+    """Returns the ids of all requests recorded in the manifests of `output_dir`."""
+    completed = set()
+    for manifest in glob.glob(os.path.join(output_dir, _MANIFEST_PATTERN)):
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    completed.add(str(json.loads(line)["id"]))
+                except (json.JSONDecodeError, KeyError):
+                    # The last line may be truncated if a previous run was killed while writing it.
+                    continue
+    return completed
+
+
+def batch_requests(requests: List[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Groups consecutive requests that only differ in their prompt and seed into batches of up to `batch_size`."""
+    batch, batch_key = [], None
+    for request in requests:
+        key = json.dumps(
+            {k: v for k, v in request.items() if k not in _REQUEST_FIELDS and k != "_index"}, sort_keys=True
+        )
+        if batch and (key != batch_key or len(batch) == batch_size):
+            yield batch
+            batch = []
+        batch.append(request)
+        batch_key = key
+    if batch:
+        yield batch
+
+
+class GenerateCommand(BaseDiffusersCLICommand):
+    @staticmethod
+    def register_subcommand(parser: ArgumentParser):
+        generate_parser = parser.add_parser("generate")
+        generate_parser.add_argument(
+            "--pipeline", type=str, required=True, help="Repo id or local path of the pipeline to generate with."
+        )
+        generate_parser.add_argument(
+            "--pipeline_class",
+            type=str,
+            default="DiffusionPipeline",
+            help="Name of the Diffusers pipeline class used to load `--pipeline`.",
+        )
+        generate_parser.add_argument(
+            "--requests",
+            type=str,
+            required=True,
+            help="JSONL file with one request per line. Each request has a `prompt` and optionally an `id`, a `seed`"
+            " and any other pipeline argument.",
+        )
+        generate_parser.add_argument("--output_dir", type=str, required=True, help="Directory to write outputs to.")
+        generate_parser.add_argument(
+            "--torch_dtype", type=str, default="float16", choices=["float32", "float16", "bfloat16"]
+        )
+        generate_parser.add_argument("--variant", type=str, default=None, help="Variant of the pipeline weights.")
+        generate_parser.add_argument(
+            "--pipeline_kwargs",
+            type=str,
+            default="{}",
+            help="JSON dictionary of default pipeline arguments, overridden by the arguments of each request.",
+        )
+        generate_parser.add_argument("--batch_size", type=int, default=1, help="Number of prompts per pipeline call.")
+        generate_parser.add_argument(
+            "--seed", type=int, default=0, help="Base seed. Requests without a `seed` use the base seed + line index."
+        )
+        generate_parser.add_argument(
+            "--devices",
+            type=str,
+            default=None,
+            help="Comma-separated devices, e.g. `cuda:0,cuda:1`. One process is started per device.",
+        )
+        generate_parser.add_argument(
+            "--num_shards", type=int, default=1, help="Total number of shards, e.g. across machines."
+        )
+        generate_parser.add_argument(
+            "--shard_index", type=int, default=0, help="Index of the first shard handled by this invocation."
+        )
+        generate_parser.add_argument("--image_format", type=str, default="png", choices=["png", "jpeg", "webp"])
+        generate_parser.add_argument("--fps", type=int, default=8, help="Frame rate of generated videos.")
+        generate_parser.set_defaults(func=generate_command_factory)
+
+    def __init__(self, args: Namespace):
+        self.args = args
+        if args.batch_size < 1:
+            raise ValueError(f"`--batch_size` must be at least 1, but got {args.batch_size}.")
+
+    def run(self):
+        import torch
+
+        args = self.args
+        if args.devices is not None:
+            devices = [device.strip() for device in args.devices.split(",") if device.strip()]
+        elif torch.cuda.is_available():
+            devices = [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+        else:
+            devices = ["cpu"]
+
+        # Each local device handles one shard, so `--num_shards` must account for the devices of all machines.
+        num_shards = max(args.num_shards, len(devices))
+        shards = [(args.shard_index + i, device) for i, device in enumerate(devices)]
+        os.makedirs(args.output_dir, exist_ok=True)
+
+        if len(shards) == 1:
+            _run_shard(args, *shards[0], num_shards)
+            return
+
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=_run_shard, args=(args, shard_index, device, num_shards))
+            for shard_index, device in shards
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        failed = [shard for shard, process in zip(shards, processes) if process.exitcode != 0]
+        if failed:
+            raise RuntimeError(f"Shards {failed} failed. Rerun the command to resume them.")
+
+
+def _run_shard(args: Namespace, shard_index: int, device: str, num_shards: int) -> None:
+    import torch
+
+    from ..image_processor import ImageOutputStage
+    from ..utils import export_to_video
+
+    requests = [r for r in load_requests(args.requests) if r["_index"] % num_shards == shard_index]
+    completed = load_completed_ids(args.output_dir)
+    pending = [r for r in requests if r["id"] not in completed]
+    logger.info(
+        f"Shard {shard_index}/{num_shards} on {device}: {len(requests)} requests, {len(requests) - len(pending)} already"
+        " completed."
+    )
+    if not pending:
+        return
+
+    pipeline_class = getattr(import_module("diffusers"), args.pipeline_class)
+    pipeline = pipeline_class.from_pretrained(
+        args.pipeline, torch_dtype=getattr(torch, args.torch_dtype), variant=args.variant
+    ).to(device)
+    pipeline.set_progress_bar_config(disable=True)
+    default_kwargs = json.loads(args.pipeline_kwargs)
+
+    manifest_path = os.path.join(args.output_dir, f"manifest-{shard_index:05d}-of-{num_shards:05d}.jsonl")
+    stage = ImageOutputStage(format=args.image_format)
+    in_flight: Optional[Tuple[List[Dict[str, Any]], List[Any], int]] = None
+
+    def finish(batch, outputs, num_outputs_per_request):
+        # Outputs are written before their manifest entries so that a restart never skips missing files.
+        entries = []
+        for i, request in enumerate(batch):
+            paths = []
+            for k in range(num_outputs_per_request):
+                output = outputs[i * num_outputs_per_request + k]
+                suffix = "" if num_outputs_per_request == 1 else f"_{k}"
+                if isinstance(output, torch.Tensor):
+                    path = os.path.join(args.output_dir, f"{request['id']}{suffix}.mp4")
+                    export_to_video(output, path, fps=args.fps)
+                else:
+                    path = os.path.join(args.output_dir, f"{request['id']}{suffix}.{args.image_format}")
+                    with open(path, "wb") as f:
+                        f.write(output.result())
+                paths.append(os.path.basename(path))
+            entries.append(
+                {"id": request["id"], "prompt": request["prompt"], "seed": request["seed"], "outputs": paths}
+            )
+
+        with open(manifest_path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    try:
+        for batch in batch_requests(pending, args.batch_size):
+            kwargs = {**default_kwargs, **{k: v for k, v in batch[0].items() if k not in _REQUEST_FIELDS}}
+            kwargs.pop("_index")
+            num_images_per_prompt = kwargs.get("num_images_per_prompt") or kwargs.get("num_videos_per_prompt") or 1
+            generators = []
+            for request in batch:
+                request["seed"] = request.get("seed", args.seed + request["_index"])
+                generators.append(torch.Generator("cpu").manual_seed(request["seed"]))
+                generators.extend(generators[-1] for _ in range(num_images_per_prompt - 1))
+
+            output = pipeline(
+                prompt=[request["prompt"] for request in batch], generator=generators, output_type="pt", **kwargs
+            )[0]
+            if output.ndim == 5:
+                outputs = list(output.cpu())
+            else:
+                # Images are encoded in the background while the next batch is generated.
+                outputs = stage.submit(output)
+
+            if in_flight is not None:
+                finish(*in_flight)
+            in_flight = (batch, outputs, num_images_per_prompt)
+
+        if in_flight is not None:
+            finish(*in_flight)
+    finally:
+        stage.shutdown(wait=True)
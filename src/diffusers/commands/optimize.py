@@ -0,0 +1,248 @@
+# Copyright 2025 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Usage example:
+    diffusers-cli optimize --single_file model.safetensors --pipeline_class StableDiffusionXLPipeline
+        --lora my-lora.safetensors --torch_dtype bfloat16 --quantization torchao:int8wo --fuse_qkv_projections
+        --output_dir optimized
+"""
+
+import glob
+import json
+import os
+import tempfile
+from argparse import ArgumentParser, Namespace
+from importlib import import_module
+from typing import Any, Dict, List, Optional
+
+from .. import __version__
+from ..utils import CONFIG_NAME, logging
+from . import BaseDiffusersCLICommand
+
+
+logger = logging.get_logger("diffusers-cli/optimize")
+
+# Components that are quantized when `--quantize_components` isn't passed.
+_DEFAULT_QUANTIZED_COMPONENTS = ("transformer", "unet")
+
+
+def optimize_command_factory(args: Namespace):
+    return OptimizeCommand(
+        pretrained_model_name_or_path=args.pipeline,
+        single_file=args.single_file,
+        pipeline_class=args.pipeline_class,
+        output_dir=args.output_dir,
+        torch_dtype=args.torch_dtype,
+        variant=args.variant,
+        loras=args.lora,
+        lora_scale=args.lora_scale,
+        fuse_qkv_projections=args.fuse_qkv_projections,
+        quantization=args.quantization,
+        quantize_components=args.quantize_components,
+    )
+
+
+def get_quantization_config(quantization: str):
+    """
+    Creates a quantization config from a `--quantization` specification: `torchao:<quant_type>`, `bnb_8bit` or
+    `bnb_4bit`.
+    """
+    from ..quantizers.quantization_config import BitsAndBytesConfig, TorchAoConfig
+
+    if quantization.startswith("torchao:"):
+        return TorchAoConfig(quantization[len("torchao:") :])
+    if quantization == "bnb_8bit":
+        return BitsAndBytesConfig(load_in_8bit=True)
+    if quantization == "bnb_4bit":
+        return BitsAndBytesConfig(load_in_4bit=True)
+    raise ValueError(
+        f"Unsupported quantization {quantization}. Please use one of `torchao:<quant_type>`, `bnb_8bit` or `bnb_4bit`."
+    )
+
+
+class OptimizeCommand(BaseDiffusersCLICommand):
+    @staticmethod
+    def register_subcommand(parser: ArgumentParser):
+        optimize_parser = parser.add_parser("optimize")
+        optimize_parser.add_argument("--pipeline", type=str, default=None, help="Repo id or path of the pipeline.")
+        optimize_parser.add_argument(
+            "--single_file",
+            type=str,
+            default=None,
+            help="Path or URL of an original single file checkpoint. Requires `--pipeline_class`.",
+        )
+        optimize_parser.add_argument(
+            "--pipeline_class",
+            type=str,
+            default="DiffusionPipeline",
+            help="Name of the Diffusers pipeline class used to load the checkpoint.",
+        )
+        optimize_parser.add_argument("--output_dir", type=str, required=True, help="Where to save the checkpoint.")
+        optimize_parser.add_argument(
+            "--torch_dtype", type=str, default=None, choices=["float32", "float16", "bfloat16"]
+        )
+        optimize_parser.add_argument("--variant", type=str, default=None, help="Variant of the weights to load.")
+        optimize_parser.add_argument(
+            "--lora", type=str, action="append", default=None, help="LoRA to fuse. Can be passed multiple times."
+        )
+        optimize_parser.add_argument("--lora_scale", type=float, default=1.0, help="Scale of the fused LoRAs.")
+        optimize_parser.add_argument(
+            "--fuse_qkv_projections",
+            action="store_true",
+            help="Fuse the QKV projections of the components that support it when the checkpoint is loaded.",
+        )
+        optimize_parser.add_argument(
+            "--quantization",
+            type=str,
+            default=None,
+            help="Quantization to apply: `torchao:<quant_type>` (e.g. `torchao:int8wo`), `bnb_8bit` or `bnb_4bit`.",
+        )
+        optimize_parser.add_argument(
+            "--quantize_components",
+            type=str,
+            default=None,
+            help="Comma-separated components to quantize. Defaults to the `transformer` or `unet`.",
+        )
+        optimize_parser.set_defaults(func=optimize_command_factory)
+
+    def __init__(
+        self,
+        pretrained_model_name_or_path: Optional[str],
+        single_file: Optional[str],
+        pipeline_class: str,
+        output_dir: str,
+        torch_dtype: Optional[str] = None,
+        variant: Optional[str] = None,
+        loras: Optional[List[str]] = None,
+        lora_scale: float = 1.0,
+        fuse_qkv_projections: bool = False,
+        quantization: Optional[str] = None,
+        quantize_components: Optional[str] = None,
+    ):
+        if (pretrained_model_name_or_path is None) == (single_file is None):
+            raise ValueError("Exactly one of `--pipeline` and `--single_file` must be passed.")
+        if single_file is not None and pipeline_class == "DiffusionPipeline":
+            raise ValueError("`--single_file` requires the `--pipeline_class` of the checkpoint.")
+        if quantization is not None:
+            # Fail early for unsupported specifications.
+            get_quantization_config(quantization)
+
+        self.pretrained_model_name_or_path = pretrained_model_name_or_path
+        self.single_file = single_file
+        self.pipeline_class = pipeline_class
+        self.output_dir = output_dir
+        self.torch_dtype = torch_dtype
+        self.variant = variant
+        self.loras = loras or []
+        self.lora_scale = lora_scale
+        self.fuse_qkv_projections = fuse_qkv_projections
+        self.quantization = quantization
+        self.quantize_components = quantize_components.split(",") if quantize_components else None
+
+    def run(self):
+        import torch
+
+        pipeline_class = getattr(import_module("diffusers"), self.pipeline_class)
+        load_kwargs = {}
+        if self.torch_dtype is not None:
+            load_kwargs["torch_dtype"] = getattr(torch, self.torch_dtype)
+
+        # 1. Load the pipeline. Original single file checkpoints are converted to the Diffusers format here.
+        if self.single_file is not None:
+            pipeline = pipeline_class.from_single_file(self.single_file, **load_kwargs)
+        else:
+            pipeline = pipeline_class.from_pretrained(
+                self.pretrained_model_name_or_path, variant=self.variant, **load_kwargs
+            )
+
+        # 2. Fuse the LoRAs into the weights and remove the LoRA layers.
+        if self.loras:
+            adapter_names = []
+            for i, lora in enumerate(self.loras):
+                adapter_name = f"optimize_lora_{i}"
+                pipeline.load_lora_weights(lora, adapter_name=adapter_name)
+                adapter_names.append(adapter_name)
+            pipeline.fuse_lora(lora_scale=self.lora_scale, adapter_names=adapter_names)
+            pipeline.unload_lora_weights()
+            logger.info(f"Fused {len(self.loras)} LoRA(s) with scale {self.lora_scale}.")
+
+        # Fused QKV projections are not part of the model configs, so they are recorded and applied by
+        # `DiffusionPipeline.from_pretrained`. Fusing only concatenates already converted weights.
+        fused_components = []
+        if self.fuse_qkv_projections:
+            fused_components = [
+                name
+                for name, component in pipeline.components.items()
+                if isinstance(component, torch.nn.Module) and hasattr(component, "fuse_qkv_projections")
+            ]
+
+        quantized_components = self._get_quantized_components(pipeline)
+        pipeline.register_to_config(
+            _optimization={
+                "source": self.single_file or self.pretrained_model_name_or_path,
+                "torch_dtype": self.torch_dtype,
+                "loras": self.loras,
+                "lora_scale": self.lora_scale if self.loras else None,
+                "fuse_qkv_projections": fused_components,
+                "quantization": self.quantization,
+                "quantized_components": quantized_components,
+                "diffusers_version": __version__,
+            }
+        )
+
+        # 3. Save the converted pipeline as safetensors, which are memory-mapped when loaded.
+        pipeline.save_pretrained(self.output_dir, safe_serialization=True)
+        logger.info(f"Pipeline saved to {self.output_dir}.")
+
+        # 4. Quantize from the saved weights, so that LoRAs and dtype conversion are baked in before quantizing.
+        if quantized_components:
+            del pipeline
+            quantization_config = get_quantization_config(self.quantization)
+            for name in quantized_components:
+                self._quantize_component(name, quantization_config, load_kwargs)
+
+    def _get_quantized_components(self, pipeline) -> List[str]:
+        if self.quantization is None:
+            return []
+        if self.quantize_components is not None:
+            missing = [name for name in self.quantize_components if getattr(pipeline, name, None) is None]
+            if missing:
+                raise ValueError(f"The pipeline has no components {missing} to quantize.")
+            return self.quantize_components
+        components = [name for name in _DEFAULT_QUANTIZED_COMPONENTS if getattr(pipeline, name, None) is not None]
+        if not components:
+            raise ValueError("Please pass the components to quantize with `--quantize_components`.")
+        return components
+
+    def _quantize_component(self, name: str, quantization_config, load_kwargs: Dict[str, Any]) -> None:
+        component_dir = os.path.join(self.output_dir, name)
+        with open(os.path.join(component_dir, CONFIG_NAME), "r", encoding="utf-8") as f:
+            model_class_name = json.load(f)["_class_name"]
+        model_class = getattr(import_module("diffusers"), model_class_name)
+        model = model_class.from_pretrained(component_dir, quantization_config=quantization_config, **load_kwargs)
+
+        # Save next to the component first, so that the unquantized weights are kept if saving fails.
+        with tempfile.TemporaryDirectory(dir=self.output_dir) as tmp_dir:
+            model.save_pretrained(tmp_dir, safe_serialization=True)
+            del model
+
+            # Remove the unquantized weights, whose file names may differ from the quantized ones, e.g. when sharded.
+            for path in glob.glob(os.path.join(component_dir, "*.safetensors")) + glob.glob(
+                os.path.join(component_dir, "*.safetensors.index.json")
+            ):
+                os.remove(path)
+            for file_name in os.listdir(tmp_dir):
+                os.replace(os.path.join(tmp_dir, file_name), os.path.join(component_dir, file_name))
+        logger.info(f"Quantized `{name}` with {self.quantization}.")
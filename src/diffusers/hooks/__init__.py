@@ -2,7 +2,16 @@ from ..utils import is_torch_available
 
 
 if is_torch_available():
+    from .context_parallel import (
+        ContextParallelConfig,
+        ContextParallelInput,
+        ContextParallelOutput,
+        apply_context_parallel,
+    )
+    from .controlnet_cache import ControlNetCacheConfig, apply_controlnet_cache
+    from .deep_cache import DeepCacheConfig, apply_deep_cache
     from .group_offloading import apply_group_offloading
     from .hooks import HookRegistry, ModelHook
     from .layerwise_casting import apply_layerwise_casting, apply_layerwise_casting_hook
+    from .model_residency import ModelResidencyManager
     from .pyramid_attention_broadcast import PyramidAttentionBroadcastConfig, apply_pyramid_attention_broadcast
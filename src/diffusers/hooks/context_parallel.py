@@ -0,0 +1,281 @@
+# Copyright 2025 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import inspect
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple, Union
+
+import torch
+import torch.distributed as dist
+
+from ..models.attention_dispatch import _all_gather
+from ..utils import logging
+from .hooks import HookRegistry, ModelHook
+
+
+logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
+
+
+_CONTEXT_PARALLEL_SPLIT_HOOK = "context_parallel_split"
+_CONTEXT_PARALLEL_GATHER_HOOK = "context_parallel_gather"
+
+
+@dataclass
+class ContextParallelConfig:
+    r"""
+    Configuration for context parallelism, which splits the token sequence of every sample across the ranks of a
+    `torch.distributed` process group. Every rank runs the transformer blocks on its own shard of the tokens, and the
+    ranks only communicate inside attention and when the output is gathered.
+
+    The process group must be initialized, with `torch.distributed.init_process_group`, before the config is created.
+
+    Args:
+        mode (`str`, defaults to `"ulysses"`):
+            How attention is computed across ranks. With `"ulysses"`, the query, key and value shards are exchanged
+            with all-to-all communication so that every rank attends over the full sequence for a subset of the heads.
+            This requires the number of attention heads to be divisible by the number of ranks. With `"ring"`, the key
+            and value shards are passed around the ranks, which works for any number of heads and never holds the full
+            sequence on one rank.
+        process_group (`torch.distributed.ProcessGroup`, *optional*):
+            The ranks to split the sequence across. Defaults to the default process group.
+    """
+
+    mode: str = "ulysses"
+    process_group: Optional[Any] = None
+
+    rank: int = field(init=False)
+    world_size: int = field(init=False)
+
+    def __post_init__(self):
+        if self.mode not in ("ulysses", "ring"):
+            raise ValueError(f"`mode` must be one of `'ulysses'` or `'ring'`, but is {self.mode}.")
+        if not dist.is_available() or not dist.is_initialized():
+            raise ValueError("Context parallelism requires an initialized `torch.distributed` process group.")
+        self.rank = dist.get_rank(self.process_group)
+        self.world_size = dist.get_world_size(self.process_group)
+
+
+@dataclass(frozen=True)
+class ContextParallelInput:
+    r"""
+    Describes a tensor of a context parallel plan that is split across ranks.
+
+    Args:
+        split_dim (`int`):
+            The sequence dimension to split along.
+        expected_dims (`int`, *optional*):
+            The number of dimensions the tensor must have. Used to catch plans that don't match the inputs.
+        split_output (`bool`, defaults to `False`):
+            Whether the tensor is an output of the module, in which case it is split after the forward pass. Outputs
+            are identified by their index in the output tuple, and a module that returns a single tensor has index 0.
+    """
+
+    split_dim: int
+    expected_dims: Optional[int] = None
+    split_output: bool = False
+
+
+@dataclass(frozen=True)
+class ContextParallelOutput:
+    r"""
+    Describes an output of a context parallel plan whose shards are gathered from all ranks.
+
+    Args:
+        gather_dim (`int`):
+            The sequence dimension to gather along.
+        expected_dims (`int`, *optional*):
+            The number of dimensions the tensor must have.
+    """
+
+    gather_dim: int
+    expected_dims: Optional[int] = None
+
+
+ContextParallelModelPlan = Dict[
+    str,
+    Union[
+        Dict[Union[str, int], ContextParallelInput], ContextParallelOutput, Tuple[Optional[ContextParallelOutput], ...]
+    ],
+]
+
+
+def _check_expected_dims(tensor: torch.Tensor, expected_dims: Optional[int], name: Union[str, int]) -> None:
+    if expected_dims is not None and tensor.ndim != expected_dims:
+        raise ValueError(
+            f"Expected `{name}` to have {expected_dims} dimensions for context parallelism, but it has {tensor.ndim}."
+        )
+
+
+def _split_tensor(value: Any, spec: ContextParallelInput, config: ContextParallelConfig, name: Union[str, int]) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, (tuple, list)):
+        # E.g. the cosine and sine parts of rotary embeddings.
+        return type(value)(_split_tensor(item, spec, config, name) for item in value)
+
+    _check_expected_dims(value, spec.expected_dims, name)
+    size = value.shape[spec.split_dim]
+    if size % config.world_size != 0:
+        raise ValueError(
+            f"The sequence length {size} of `{name}` is not divisible by the number of context parallel ranks "
+            f"({config.world_size})."
+        )
+    return value.chunk(config.world_size, dim=spec.split_dim)[config.rank]
+
+
+class ContextParallelSplitHook(ModelHook):
+    r"""A hook that splits inputs or outputs of a module along their sequence dimension and keeps the local shard."""
+
+    def __init__(self, metadata: Dict[Union[str, int], ContextParallelInput], config: ContextParallelConfig) -> None:
+        super().__init__()
+        self.config = config
+        self.input_metadata = {name: spec for name, spec in metadata.items() if not spec.split_output}
+        self.output_metadata = {index: spec for index, spec in metadata.items() if spec.split_output}
+        self.parameter_indices = {}
+
+    def initialize_hook(self, module: torch.nn.Module) -> torch.nn.Module:
+        parameters = list(inspect.signature(module.forward).parameters)
+        for name in self.input_metadata:
+            if name not in parameters:
+                raise ValueError(f"{module.__class__.__name__}.forward has no input `{name}` to split.")
+            self.parameter_indices[name] = parameters.index(name)
+        return module
+
+    def pre_forward(self, module: torch.nn.Module, *args, **kwargs):
+        args = list(args)
+        for name, spec in self.input_metadata.items():
+            if name in kwargs:
+                kwargs[name] = _split_tensor(kwargs[name], spec, self.config, name)
+            elif self.parameter_indices[name] < len(args):
+                index = self.parameter_indices[name]
+                args[index] = _split_tensor(args[index], spec, self.config, name)
+        return tuple(args), kwargs
+
+    def post_forward(self, module: torch.nn.Module, output: Any) -> Any:
+        if len(self.output_metadata) == 0:
+            return output
+        if isinstance(output, torch.Tensor):
+            return _split_tensor(output, self.output_metadata[0], self.config, 0)
+
+        output = list(output)
+        for index, spec in self.output_metadata.items():
+            output[index] = _split_tensor(output[index], spec, self.config, index)
+        return tuple(output)
+
+
+class ContextParallelGatherHook(ModelHook):
+    r"""A hook that gathers the outputs of a module from all ranks along their sequence dimension."""
+
+    def __init__(
+        self,
+        metadata: Union[ContextParallelOutput, Tuple[Optional[ContextParallelOutput], ...]],
+        config: ContextParallelConfig,
+    ) -> None:
+        super().__init__()
+        # Outputs are identified by their index in the output tuple, like for `ContextParallelInput`.
+        self.metadata = metadata if isinstance(metadata, tuple) else (metadata,)
+        self.config = config
+
+    def _gather(self, tensor: torch.Tensor, spec: ContextParallelOutput, index: int) -> torch.Tensor:
+        _check_expected_dims(tensor, spec.expected_dims, index)
+        return _all_gather(tensor, spec.gather_dim, self.config.process_group, self.config.world_size)
+
+    def post_forward(self, module: torch.nn.Module, output: Any) -> Any:
+        if isinstance(output, torch.Tensor):
+            return self._gather(output, self.metadata[0], 0)
+
+        output = list(output)
+        for index, spec in enumerate(self.metadata):
+            if spec is not None and output[index] is not None:
+                output[index] = self._gather(output[index], spec, index)
+        return tuple(output)
+
+
+def _get_plan_modules(module: torch.nn.Module, name: str):
+    # `blocks.*` refers to every child of `blocks`, e.g. for inputs that the model passes to all of its blocks.
+    if name.endswith(".*"):
+        return list(module.get_submodule(name[:-2]).children())
+    return [module.get_submodule(name)]
+
+
+def apply_context_parallel(
+    module: torch.nn.Module, config: ContextParallelConfig, plan: Optional[ContextParallelModelPlan] = None
+) -> None:
+    r"""
+    Apply context parallelism to a transformer such as [`FluxTransformer2DModel`], [`HunyuanVideoTransformer3DModel`],
+    [`WanTransformer3DModel`] or [`CogVideoXTransformer3DModel`].
+
+    The plan maps the names of submodules (`""` for the model itself) to the tensors that are split when entering or
+    leaving them, as [`~hooks.context_parallel.ContextParallelInput`], or to the outputs that are gathered from all
+    ranks, as [`~hooks.context_parallel.ContextParallelOutput`]. Tokens are split once, right after they are embedded,
+    and only gathered after the output projection. In between, the attention processors exchange query, key and value
+    shards as set by `config.mode`.
+
+    Every rank must call the model with the same inputs. Only inference is supported, since the communication isn't
+    differentiable.
+
+    Args:
+        module (`torch.nn.Module`):
+            The transformer to apply context parallelism to.
+        config (`ContextParallelConfig`):
+            The configuration to use for context parallelism.
+        plan (`Dict[str, Any]`, *optional*):
+            The context parallel plan. Defaults to the `_cp_plan` of the model class.
+
+    Example:
+
+    ```python
+    >>> # torchrun --nproc_per_node=2 generate.py
+    >>> import torch
+    >>> import torch.distributed as dist
+    >>> from diffusers import ContextParallelConfig, WanPipeline
+
+    >>> dist.init_process_group("nccl")
+    >>> rank = dist.get_rank()
+    >>> torch.cuda.set_device(rank)
+
+    >>> pipe = WanPipeline.from_pretrained("Wan-AI/Wan2.1-T2V-1.3B-Diffusers", torch_dtype=torch.bfloat16).to("cuda")
+    >>> pipe.transformer.enable_context_parallel(ContextParallelConfig(mode="ulysses"))
+    >>> video = pipe("A cat walks on the grass", generator=torch.Generator().manual_seed(0)).frames[0]
+    ```
+    """
+    plan = plan if plan is not None else getattr(module, "_cp_plan", None)
+    if plan is None:
+        raise ValueError(f"{module.__class__.__name__} does not define a context parallel plan. Please pass `plan`.")
+
+    attention_modules = []
+    for submodule in module.modules():
+        processor = getattr(submodule, "processor", None)
+        if processor is not None and getattr(processor, "_supports_context_parallel", False):
+            attention_modules.append(submodule)
+    if len(attention_modules) == 0:
+        raise ValueError(f"{module.__class__.__name__} has no attention processors that support context parallelism.")
+
+    for name, metadata in plan.items():
+        for submodule in _get_plan_modules(module, name):
+            registry = HookRegistry.check_if_exists_or_initialize(submodule)
+            if isinstance(metadata, dict):
+                registry.register_hook(ContextParallelSplitHook(metadata, config), _CONTEXT_PARALLEL_SPLIT_HOOK)
+            else:
+                registry.register_hook(ContextParallelGatherHook(metadata, config), _CONTEXT_PARALLEL_GATHER_HOOK)
+
+    # The config is stored on the attention modules, so that it is kept when the processors are replaced, e.g. by
+    # `fuse_qkv_projections`. Replacing them with a processor that doesn't support context parallelism raises.
+    for submodule in attention_modules:
+        submodule._context_parallel_config = config
+
+    logger.debug(
+        f"Enabled {config.mode} context parallelism across {config.world_size} ranks on {len(attention_modules)} "
+        f"attention layers."
+    )
@@ -0,0 +1,242 @@
+# Copyright 2025 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import inspect
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+
+from ..utils import logging
+from .hooks import HookRegistry, ModelHook
+
+
+logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
+
+
+_CONTROLNET_CACHE_HOOK = "controlnet_cache"
+
+
+@dataclass
+class ControlNetCacheConfig:
+    r"""
+    Configuration for caching the residuals of a ControlNet across denoising steps.
+
+    The ControlNet residuals of consecutive denoising steps are very similar, especially after the first few steps. On
+    a computed step, the unscaled down and mid block residuals are cached. On the other steps, the cached residuals
+    are scaled with the current `conditioning_scale` and returned without running the ControlNet.
+
+    Args:
+        cache_interval (`int`, defaults to `2`):
+            Run the ControlNet every `cache_interval` denoising steps, and re-use the cached residuals in between.
+        residual_change_threshold (`float`, *optional*):
+            If set, the relative change between the residuals of two consecutive computed steps is measured. Once it
+            falls below this threshold, the cached residuals are re-used for the remaining steps of the generation.
+    """
+
+    cache_interval: int = 2
+    residual_change_threshold: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"ControlNetCacheConfig(\n"
+            f"  cache_interval={self.cache_interval},\n"
+            f"  residual_change_threshold={self.residual_change_threshold}\n"
+            ")"
+        )
+
+
+class ControlNetCacheState:
+    r"""
+    State of a ControlNet cache hook.
+
+    Attributes:
+        step_index (`int`):
+            The index of the current denoising step. A new step starts whenever the ControlNet is called with a new
+            timestep.
+        call_index (`int`):
+            The index of the ControlNet call within the current step. Separate conditional and unconditional calls are
+            cached separately.
+        last_timestep (`float`, *optional*):
+            The timestep of the previous ControlNet call.
+        cache (`Dict[int, Tuple]`):
+            The unscaled `(down_block_res_samples, mid_block_res_sample)` of the last computed step, per call index.
+        computed_step (`Dict[int, int]`):
+            The index of the step in which the cached residuals were computed, per call index.
+        converged (`Dict[int, bool]`):
+            Whether the residuals changed less than `residual_change_threshold`, per call index.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self):
+        self.step_index = -1
+        self.call_index = 0
+        self.last_timestep = None
+        self.cache: Dict[int, Tuple[Tuple[torch.Tensor, ...], torch.Tensor]] = {}
+        self.input_shapes: Dict[int, Tuple[torch.Size, ...]] = {}
+        self.computed_step: Dict[int, int] = {}
+        self.converged: Dict[int, bool] = {}
+
+    def __repr__(self):
+        return f"ControlNetCacheState(step_index={self.step_index}, num_cached={len(self.cache)})"
+
+
+class ControlNetCacheHook(ModelHook):
+    r"""A hook on a ControlNet that returns its cached residuals, re-scaled, on steps that are not computed."""
+
+    _is_stateful = True
+
+    def __init__(self, config: ControlNetCacheConfig) -> None:
+        super().__init__()
+        self.config = config
+        self.state = ControlNetCacheState()
+        self._signature = None
+
+    def initialize_hook(self, module: torch.nn.Module) -> torch.nn.Module:
+        signature = inspect.signature(module.__class__.forward)
+        self._signature = signature.replace(parameters=list(signature.parameters.values())[1:])
+        return module
+
+    def new_forward(self, module: torch.nn.Module, *args, **kwargs) -> Any:
+        bound = self._signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = bound.arguments
+
+        self._update_step(arguments["timestep"])
+        call_index = self.state.call_index
+        self.state.call_index += 1
+
+        conditioning_scale = arguments["conditioning_scale"]
+        return_dict = arguments["return_dict"]
+        input_shapes = (arguments["sample"].shape, arguments["controlnet_cond"].shape)
+
+        if self._should_compute(call_index, input_shapes):
+            arguments["conditioning_scale"] = 1.0
+            arguments["return_dict"] = False
+            down_block_res_samples, mid_block_res_sample = self.fn_ref.original_forward(**arguments)
+            self._update_cache(call_index, input_shapes, tuple(down_block_res_samples), mid_block_res_sample)
+
+        down_block_res_samples, mid_block_res_sample = self.state.cache[call_index]
+        down_block_res_samples = [sample * conditioning_scale for sample in down_block_res_samples]
+        mid_block_res_sample = mid_block_res_sample * conditioning_scale
+
+        if not return_dict:
+            return (down_block_res_samples, mid_block_res_sample)
+
+        from ..models.controlnets.controlnet import ControlNetOutput
+
+        return ControlNetOutput(
+            down_block_res_samples=down_block_res_samples, mid_block_res_sample=mid_block_res_sample
+        )
+
+    def _update_step(self, timestep) -> None:
+        if torch.is_tensor(timestep):
+            timestep = timestep.flatten()[0].item()
+        timestep = float(timestep)
+
+        if self.state.last_timestep is not None and timestep > self.state.last_timestep:
+            # Timesteps decrease during sampling, so a larger timestep means a new generation has started.
+            self.state.reset()
+        if timestep != self.state.last_timestep:
+            self.state.step_index += 1
+            self.state.call_index = 0
+            self.state.last_timestep = timestep
+
+    def _should_compute(self, call_index: int, input_shapes: Tuple[torch.Size, ...]) -> bool:
+        if call_index not in self.state.cache or self.state.input_shapes[call_index] != input_shapes:
+            return True
+        if self.state.converged[call_index]:
+            return False
+        return self.state.step_index - self.state.computed_step[call_index] >= self.config.cache_interval
+
+    def _update_cache(
+        self,
+        call_index: int,
+        input_shapes: Tuple[torch.Size, ...],
+        down_block_res_samples: Tuple[torch.Tensor, ...],
+        mid_block_res_sample: torch.Tensor,
+    ) -> None:
+        converged = False
+        previous = self.state.cache.get(call_index)
+        if (
+            self.config.residual_change_threshold is not None
+            and previous is not None
+            and self.state.input_shapes[call_index] == input_shapes
+        ):
+            change = _relative_change([*previous[0], previous[1]], [*down_block_res_samples, mid_block_res_sample])
+            converged = change < self.config.residual_change_threshold
+            if converged:
+                logger.debug(
+                    f"ControlNet residuals changed by {change:.4f} at step {self.state.step_index}, re-using them for "
+                    f"the remaining steps."
+                )
+
+        self.state.cache[call_index] = (down_block_res_samples, mid_block_res_sample)
+        self.state.input_shapes[call_index] = input_shapes
+        self.state.computed_step[call_index] = self.state.step_index
+        self.state.converged[call_index] = converged
+
+    def reset_state(self, module: torch.nn.Module) -> torch.nn.Module:
+        self.state.reset()
+        return module
+
+
+def _relative_change(previous: List[torch.Tensor], current: List[torch.Tensor]) -> float:
+    difference = sum((c.float() - p.float()).pow(2).sum() for p, c in zip(previous, current))
+    norm = sum(p.float().pow(2).sum() for p in previous)
+    return (difference.sqrt() / norm.sqrt().clamp_min(1e-8)).item()
+
+
+def apply_controlnet_cache(module: torch.nn.Module, config: ControlNetCacheConfig) -> None:
+    r"""
+    Cache the residuals of a [`ControlNetModel`] across denoising steps.
+
+    The residuals are always computed with a `conditioning_scale` of `1.0` and scaled on the way out, so that the cache
+    stays valid when `control_guidance_start`/`control_guidance_end` change the scale between steps. If the module is a
+    [`MultiControlNetModel`], every ControlNet gets its own cache.
+
+    Args:
+        module (`torch.nn.Module`):
+            The [`ControlNetModel`] or [`MultiControlNetModel`] to apply the cache to.
+        config (`ControlNetCacheConfig`):
+            The configuration to use for caching.
+
+    Example:
+
+    ```python
+    >>> import torch
+    >>> from diffusers import ControlNetCacheConfig, ControlNetModel, StableDiffusionControlNetPipeline
+
+    >>> controlnet = ControlNetModel.from_pretrained("lllyasviel/sd-controlnet-canny", torch_dtype=torch.float16)
+    >>> pipe = StableDiffusionControlNetPipeline.from_pretrained(
+    ...     "stable-diffusion-v1-5/stable-diffusion-v1-5", controlnet=controlnet, torch_dtype=torch.float16
+    ... ).to("cuda")
+    >>> pipe.controlnet.enable_cache(ControlNetCacheConfig(cache_interval=3, residual_change_threshold=0.05))
+    ```
+    """
+    if config.cache_interval < 1:
+        raise ValueError(f"`cache_interval` must be a positive integer, but is {config.cache_interval}.")
+
+    from ..models.controlnets.controlnet import ControlNetModel
+
+    controlnets = list(module.nets) if hasattr(module, "nets") else [module]
+    for controlnet in controlnets:
+        if not isinstance(controlnet, ControlNetModel):
+            raise ValueError(f"The ControlNet cache does not support {controlnet.__class__.__name__}.")
+        registry = HookRegistry.check_if_exists_or_initialize(controlnet)
+        registry.register_hook(ControlNetCacheHook(config), _CONTROLNET_CACHE_HOOK)
+
+    logger.debug(f"Enabled the ControlNet cache on {len(controlnets)} ControlNet(s).")
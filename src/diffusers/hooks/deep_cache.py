@@ -0,0 +1,251 @@
+# Copyright 2025 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import torch
+
+from ..utils import logging
+from .hooks import HookRegistry, ModelHook
+
+
+logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
+
+
+_DEEP_CACHE_HOOK = "deep_cache"
+
+
+@dataclass
+class DeepCacheConfig:
+    r"""
+    Configuration for [DeepCache](https://huggingface.co/papers/2312.00858).
+
+    DeepCache exploits the temporal redundancy of the high-level features computed by the deep part of a UNet. On a
+    full step, the whole UNet is evaluated and the outputs of the deep blocks are cached. On the other steps, only the
+    shallow down and up blocks are evaluated, and the cached deep features are re-used in place of the skipped blocks.
+
+    Args:
+        cache_interval (`int`, defaults to `3`):
+            Run a full step every `cache_interval` denoising steps, and re-use the cached deep features in between.
+            Ignored if `full_step_indices` is set.
+        cache_block_id (`int`, defaults to `0`):
+            The index of the deepest down block (and the matching up block) that is still evaluated on cached steps.
+            With `0`, only `down_blocks[0]` and `up_blocks[-1]` are evaluated. Larger values evaluate more blocks,
+            trading speed for quality.
+        full_step_indices (`List[int]`, *optional*):
+            Explicit indices of the denoising steps on which the full UNet is evaluated, for example a non-uniform
+            schedule created with [`~hooks.deep_cache.get_deep_cache_non_uniform_full_steps`]. The first step is
+            always a full step.
+    """
+
+    cache_interval: int = 3
+    cache_block_id: int = 0
+    full_step_indices: Optional[List[int]] = None
+
+    def __repr__(self) -> str:
+        return (
+            f"DeepCacheConfig(\n"
+            f"  cache_interval={self.cache_interval},\n"
+            f"  cache_block_id={self.cache_block_id},\n"
+            f"  full_step_indices={self.full_step_indices}\n"
+            ")"
+        )
+
+
+class DeepCacheState:
+    r"""
+    State shared by all DeepCache hooks of a model.
+
+    Attributes:
+        step_index (`int`):
+            The index of the current denoising step. A new step starts whenever the UNet is called with a new
+            timestep, so that classifier-free guidance with separate conditional and unconditional calls counts as a
+            single step.
+        call_index (`int`):
+            The index of the UNet call within the current step, e.g. `0` for the conditional and `1` for the
+            unconditional call of classifier-free guidance.
+        is_full_step (`bool`):
+            Whether the deep blocks are evaluated in the current step.
+        last_timestep (`float`, *optional*):
+            The timestep of the previous UNet call.
+    """
+
+    def __init__(self) -> None:
+        self.step_index = -1
+        self.call_index = 0
+        self.is_full_step = True
+        self.last_timestep = None
+
+    def reset(self):
+        self.step_index = -1
+        self.call_index = 0
+        self.is_full_step = True
+        self.last_timestep = None
+
+    def __repr__(self):
+        return f"DeepCacheState(step_index={self.step_index}, is_full_step={self.is_full_step})"
+
+
+class DeepCacheStepHook(ModelHook):
+    r"""A hook on the UNet that keeps track of denoising steps and decides which steps are full steps."""
+
+    _is_stateful = True
+
+    def __init__(self, state: DeepCacheState, config: DeepCacheConfig) -> None:
+        super().__init__()
+        self.state = state
+        self.config = config
+
+    def pre_forward(self, module: torch.nn.Module, *args, **kwargs):
+        timestep = kwargs["timestep"] if "timestep" in kwargs else args[1]
+        if torch.is_tensor(timestep):
+            timestep = timestep.flatten()[0].item()
+        timestep = float(timestep)
+
+        if self.state.last_timestep is not None and timestep > self.state.last_timestep:
+            # Timesteps decrease during sampling, so a larger timestep means a new generation has started.
+            self.state.reset()
+        if timestep != self.state.last_timestep:
+            self.state.step_index += 1
+            self.state.call_index = 0
+            self.state.last_timestep = timestep
+            self.state.is_full_step = self._is_full_step(self.state.step_index)
+        else:
+            self.state.call_index += 1
+
+        return args, kwargs
+
+    def _is_full_step(self, step_index: int) -> bool:
+        if step_index == 0:
+            return True
+        if self.config.full_step_indices is not None:
+            return step_index in self.config.full_step_indices
+        return step_index % self.config.cache_interval == 0
+
+    def reset_state(self, module: torch.nn.Module) -> torch.nn.Module:
+        self.state.reset()
+        return module
+
+
+class DeepCacheBlockHook(ModelHook):
+    r"""
+    A hook on a deep UNet block that returns its cached output on steps that are not full steps. Outputs are cached
+    per call within a step, so that separate conditional and unconditional calls each re-use their own features.
+    """
+
+    _is_stateful = True
+
+    def __init__(self, state: DeepCacheState) -> None:
+        super().__init__()
+        self.state = state
+        self.cache: Dict[int, Any] = {}
+
+    def new_forward(self, module: torch.nn.Module, *args, **kwargs) -> Any:
+        call_index = self.state.call_index
+        if self.state.is_full_step or call_index not in self.cache:
+            self.cache[call_index] = self.fn_ref.original_forward(*args, **kwargs)
+        return self.cache[call_index]
+
+    def reset_state(self, module: torch.nn.Module) -> torch.nn.Module:
+        self.cache = {}
+        return module
+
+
+def apply_deep_cache(module: torch.nn.Module, config: DeepCacheConfig) -> None:
+    r"""
+    Apply [DeepCache](https://huggingface.co/papers/2312.00858) to a UNet such as [`UNet2DConditionModel`].
+
+    The down blocks after `config.cache_block_id`, the mid block and the up blocks before the matching shallow up
+    block are wrapped with hooks that return their output from the last full step on all other steps. Because every
+    skipped down block returns its cached residuals as well, the skip connections consumed by the evaluated shallow up
+    blocks always come from the current step.
+
+    Args:
+        module (`torch.nn.Module`):
+            The UNet to apply DeepCache to. It must have `down_blocks`, `mid_block` and `up_blocks` attributes.
+        config (`DeepCacheConfig`):
+            The configuration to use for DeepCache.
+
+    Example:
+
+    ```python
+    >>> import torch
+    >>> from diffusers import DeepCacheConfig, StableDiffusionXLPipeline
+
+    >>> pipe = StableDiffusionXLPipeline.from_pretrained(
+    ...     "stabilityai/stable-diffusion-xl-base-1.0", torch_dtype=torch.float16
+    ... ).to("cuda")
+    >>> pipe.unet.enable_cache(DeepCacheConfig(cache_interval=3, cache_block_id=0))
+    >>> image = pipe("a photo of an astronaut riding a horse on mars").images[0]
+    ```
+    """
+    for name in ("down_blocks", "mid_block", "up_blocks"):
+        if not hasattr(module, name):
+            raise ValueError(f"DeepCache requires the module to have a `{name}` attribute.")
+
+    num_blocks = len(module.down_blocks)
+    if len(module.up_blocks) != num_blocks:
+        raise ValueError("DeepCache requires the same number of down and up blocks.")
+    if not 0 <= config.cache_block_id < num_blocks:
+        raise ValueError(
+            f"`cache_block_id` must be in the range [0, {num_blocks - 1}], but is {config.cache_block_id}."
+        )
+    if config.full_step_indices is None and config.cache_interval < 1:
+        raise ValueError(f"`cache_interval` must be a positive integer, but is {config.cache_interval}.")
+
+    deep_blocks = [*module.down_blocks[config.cache_block_id + 1 :]]
+    if module.mid_block is not None:
+        deep_blocks.append(module.mid_block)
+    deep_blocks.extend(module.up_blocks[: num_blocks - 1 - config.cache_block_id])
+
+    state = DeepCacheState()
+    registry = HookRegistry.check_if_exists_or_initialize(module)
+    registry.register_hook(DeepCacheStepHook(state, config), _DEEP_CACHE_HOOK)
+
+    for block in deep_blocks:
+        registry = HookRegistry.check_if_exists_or_initialize(block)
+        registry.register_hook(DeepCacheBlockHook(state), _DEEP_CACHE_HOOK)
+
+    logger.debug(f"Enabled DeepCache on {len(deep_blocks)} blocks.")
+
+
+def get_deep_cache_non_uniform_full_steps(
+    num_inference_steps: int, cache_interval: int = 3, center: Optional[int] = None, power: float = 1.4
+) -> List[int]:
+    r"""
+    Returns a non-uniform schedule of full steps for [`DeepCacheConfig`], in which the full steps are spaced more
+    densely around `center` than at the start and the end of sampling. The total number of full steps is the same as
+    with a uniform schedule of the same `cache_interval`.
+
+    Args:
+        num_inference_steps (`int`):
+            The number of denoising steps.
+        cache_interval (`int`, defaults to `3`):
+            The average interval between two full steps.
+        center (`int`, *optional*):
+            The step index around which full steps are concentrated. Defaults to the middle of sampling.
+        power (`float`, defaults to `1.4`):
+            The exponent controlling how strongly full steps are concentrated around `center`. `1.0` is uniform.
+    """
+    center = center if center is not None else num_inference_steps // 2
+    num_full_steps = max(1, -(-num_inference_steps // cache_interval))
+
+    positions = torch.linspace(-1, 1, num_full_steps)
+    positions = positions.sign() * positions.abs() ** power
+    before, after = center, num_inference_steps - 1 - center
+    indices = torch.where(positions < 0, center + positions * before, center + positions * after)
+
+    full_steps = sorted({0, *(int(round(i)) for i in indices.tolist())})
+    return full_steps
@@ -13,11 +13,12 @@
 # limitations under the License.
 
 import functools
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import torch
 
 from ..utils.logging import get_logger
+from ..utils.torch_utils import invalidate_placement_cache
 
 
 logger = get_logger(__name__)  # pylint: disable=invalid-name
@@ -102,20 +103,18 @@ class ModelHook:
 
 class HookFunctionReference:
     def __init__(self) -> None:
-        """A container class that maintains mutable references to forward pass functions in a hook chain.
+        """A container class that maintains references to forward pass functions in a hook chain.
 
-        Its mutable nature allows the hook system to modify the execution chain dynamically without rebuilding the
-        entire forward pass structure.
+        The references are updated by the [`HookRegistry`] whenever its hooks change, so that hooks providing a custom
+        `new_forward` can always call into the rest of the chain through `original_forward`.
 
         Attributes:
             pre_forward: A callable that processes inputs before the main forward pass.
             post_forward: A callable that processes outputs after the main forward pass.
-            forward: The current forward function in the hook chain.
-            original_forward: The original forward function, stored when a hook provides a custom new_forward.
-
-        The class enables hook removal by allowing updates to the forward chain through reference modification rather
-        than requiring reconstruction of the entire chain. When a hook is removed, only the relevant references need to
-        be updated, preserving the execution order of the remaining hooks.
+            forward: The forward function wrapped by this hook, i.e. the hooks registered before it and the module's
+                original forward.
+            original_forward: The forward function wrapped by this hook, stored when a hook provides a custom
+                new_forward.
         """
         self.pre_forward = None
         self.post_forward = None
@@ -123,6 +122,23 @@ class HookFunctionReference:
         self.original_forward = None
 
 
+class _ForwardSegment:
+    r"""
+    A run of consecutive hooks of a [`HookRegistry`] that is dispatched by a single function on top of `base_forward`.
+
+    The dispatch function reads the compiled hooks from the segment on every call, so that it stays valid when hooks
+    are added or removed even if another library has wrapped it in the meantime.
+    """
+
+    def __init__(self, base_forward: Callable) -> None:
+        self.base_forward = base_forward
+        self.hook_names: List[str] = []
+        self.forward = base_forward
+        self.pre_forwards: Tuple[Callable, ...] = ()
+        self.post_forwards: Tuple[Callable, ...] = ()
+        self.dispatch_forward: Optional[Callable] = None
+
+
 class HookRegistry:
     def __init__(self, module_ref: torch.nn.Module) -> None:
         super().__init__()
@@ -132,6 +148,7 @@ class HookRegistry:
         self._module_ref = module_ref
         self._hook_order = []
         self._fn_refs = []
+        self._segments: List[_ForwardSegment] = []
 
     def register_hook(self, hook: ModelHook, name: str) -> None:
         if name in self.hooks.keys():
@@ -140,62 +157,40 @@ class HookRegistry:
                 f"first remove the existing hook and then add a new one."
             )
 
-        self._module_ref = hook.initialize_hook(self._module_ref)
-
-        def create_new_forward(function_reference: HookFunctionReference):
-            def new_forward(module, *args, **kwargs):
-                args, kwargs = function_reference.pre_forward(module, *args, **kwargs)
-                output = function_reference.forward(*args, **kwargs)
-                return function_reference.post_forward(module, output)
-
-            return new_forward
+        self._sync_segments()
+        if len(self._segments) == 0:
+            self._segments.append(_ForwardSegment(self._module_ref.forward))
 
-        forward = self._module_ref.forward
+        self._module_ref = hook.initialize_hook(self._module_ref)
 
         fn_ref = HookFunctionReference()
-        fn_ref.pre_forward = hook.pre_forward
-        fn_ref.post_forward = hook.post_forward
-        fn_ref.forward = forward
-
-        if hasattr(hook, "new_forward"):
-            fn_ref.original_forward = forward
-            fn_ref.forward = functools.update_wrapper(
-                functools.partial(hook.new_forward, self._module_ref), hook.new_forward
-            )
-
-        rewritten_forward = create_new_forward(fn_ref)
-        self._module_ref.forward = functools.update_wrapper(
-            functools.partial(rewritten_forward, self._module_ref), rewritten_forward
-        )
-
         hook.fn_ref = fn_ref
         self.hooks[name] = hook
         self._hook_order.append(name)
         self._fn_refs.append(fn_ref)
+        self._segments[-1].hook_names.append(name)
+        self._rebuild_forward()
+        # Hooks such as group offloading or layerwise casting change the reported device or dtype of models.
+        invalidate_placement_cache()
 
     def get_hook(self, name: str) -> Optional[ModelHook]:
         return self.hooks.get(name, None)
 
     def remove_hook(self, name: str, recurse: bool = True) -> None:
         if name in self.hooks.keys():
-            num_hooks = len(self._hook_order)
             hook = self.hooks[name]
             index = self._hook_order.index(name)
-            fn_ref = self._fn_refs[index]
-
-            old_forward = fn_ref.forward
-            if fn_ref.original_forward is not None:
-                old_forward = fn_ref.original_forward
-
-            if index == num_hooks - 1:
-                self._module_ref.forward = old_forward
-            else:
-                self._fn_refs[index + 1].forward = old_forward
 
+            self._sync_segments()
             self._module_ref = hook.deinitalize_hook(self._module_ref)
             del self.hooks[name]
             self._hook_order.pop(index)
             self._fn_refs.pop(index)
+            for segment in self._segments:
+                if name in segment.hook_names:
+                    segment.hook_names.remove(name)
+            self._rebuild_forward()
+            invalidate_placement_cache()
 
         if recurse:
             for module_name, module in self._module_ref.named_modules():
@@ -204,6 +199,71 @@ class HookRegistry:
                 if hasattr(module, "_diffusers_hook"):
                     module._diffusers_hook.remove_hook(name, recurse=False)
 
+    def _sync_segments(self) -> None:
+        # Other libraries, such as accelerate with `add_hook_to_module`, may wrap the module's forward after hooks were
+        # registered. Hooks registered from then on start a new segment on top of the wrapper instead of discarding it.
+        if len(self._segments) == 0:
+            return
+
+        forward = self._module_ref.forward
+        for index in reversed(range(len(self._segments))):
+            if forward is self._segments[index].dispatch_forward:
+                break
+        else:
+            self._segments.append(_ForwardSegment(forward))
+            return
+
+        # The forward was restored to the dispatch function of an inner segment, i.e. the wrappers above it were
+        # removed. The hooks of the segments above are still registered, so they move into that segment.
+        for segment in self._segments[index + 1 :]:
+            self._segments[index].hook_names.extend(segment.hook_names)
+        del self._segments[index + 1 :]
+
+    def _rebuild_forward(self) -> None:
+        # Instead of wrapping the module's forward once per hook, the ordered hooks are compiled into as few flat
+        # dispatch functions as possible. Hooks that don't override `pre_forward` or `post_forward` don't add any
+        # calls, and a new dispatch function is only started below hooks that replace the forward with `new_forward`.
+        module = self._module_ref
+        for segment in self._segments:
+            self._compile_segment(segment)
+
+        # Segments without hooks on top fall back to what they wrap. Empty segments below a wrapper from another
+        # library are kept, since the wrapper still calls their dispatch function.
+        while len(self._segments) > 0 and len(self._segments[-1].hook_names) == 0:
+            module.forward = self._segments.pop().base_forward
+        if len(self._segments) > 0:
+            module.forward = self._segments[-1].dispatch_forward
+
+    def _compile_segment(self, segment: _ForwardSegment) -> None:
+        module = self._module_ref
+        forward = segment.base_forward
+        pre_forwards, post_forwards = [], []
+        for name in segment.hook_names:
+            hook = self.hooks[name]
+            fn_ref = hook.fn_ref
+            fn_ref.pre_forward = hook.pre_forward
+            fn_ref.post_forward = hook.post_forward
+            fn_ref.original_forward = None
+
+            if hasattr(hook, "new_forward"):
+                forward = _create_flat_forward(module, forward, pre_forwards, post_forwards)
+                pre_forwards, post_forwards = [], []
+                fn_ref.forward = fn_ref.original_forward = forward
+                forward = functools.update_wrapper(functools.partial(hook.new_forward, module), hook.new_forward)
+            else:
+                fn_ref.forward = _create_flat_forward(module, forward, pre_forwards, post_forwards)
+
+            if type(hook).pre_forward is not ModelHook.pre_forward:
+                pre_forwards.insert(0, hook.pre_forward)
+            if type(hook).post_forward is not ModelHook.post_forward:
+                post_forwards.append(hook.post_forward)
+
+        segment.forward = forward
+        segment.pre_forwards = tuple(pre_forwards)
+        segment.post_forwards = tuple(post_forwards)
+        if segment.dispatch_forward is None:
+            segment.dispatch_forward = _create_segment_forward(module, segment)
+
     def reset_stateful_hooks(self, recurse: bool = True) -> None:
         for hook_name in reversed(self._hook_order):
             hook = self.hooks[hook_name]
@@ -234,3 +294,44 @@ class HookRegistry:
             if i < len(self._hook_order) - 1:
                 registry_repr += "\n"
         return f"HookRegistry(\n{registry_repr}\n)"
+
+
+def _create_flat_forward(
+    module: torch.nn.Module, forward: Callable, pre_forwards: List[Callable], post_forwards: List[Callable]
+) -> Callable:
+    r"""
+    Creates a single function that runs `pre_forwards` (outermost first), `forward` and `post_forwards` (innermost
+    first). The hook callables are captured as tuples so that `torch.compile` can unroll the loops.
+    """
+    if len(pre_forwards) == 0 and len(post_forwards) == 0:
+        return forward
+
+    pre_forwards = tuple(pre_forwards)
+    post_forwards = tuple(post_forwards)
+
+    def flat_forward(*args, **kwargs):
+        for pre_forward in pre_forwards:
+            args, kwargs = pre_forward(module, *args, **kwargs)
+        output = forward(*args, **kwargs)
+        for post_forward in post_forwards:
+            output = post_forward(module, output)
+        return output
+
+    return flat_forward
+
+
+def _create_segment_forward(module: torch.nn.Module, segment: _ForwardSegment) -> Callable:
+    r"""
+    Creates the function that is installed as the module's forward for `segment`. It behaves like the function of
+    [`_create_flat_forward`], but reads the hooks from the segment, which is updated in place when hooks change.
+    """
+
+    def segment_forward(*args, **kwargs):
+        for pre_forward in segment.pre_forwards:
+            args, kwargs = pre_forward(module, *args, **kwargs)
+        output = segment.forward(*args, **kwargs)
+        for post_forward in segment.post_forwards:
+            output = post_forward(module, output)
+        return output
+
+    return functools.update_wrapper(segment_forward, segment.base_forward)
@@ -34,6 +34,7 @@ SUPPORTED_PYTORCH_LAYERS = (
 )
 
 DEFAULT_SKIP_MODULES_PATTERN = ("pos_embed", "patch_embed", "norm", "^proj_in$", "^proj_out$")
+SUPPORTED_SCALING_TYPES = ("per_channel", "per_block")
 # fmt: on
 
 _SHOULD_DISABLE_PEFT_INPUT_AUTOCAST = is_peft_available() and is_peft_version(">", "0.14.0")
@@ -77,6 +78,52 @@ class LayerwiseCastingHook(ModelHook):
         return output
 
 
+class ScaledLayerwiseCastingHook(LayerwiseCastingHook):
+    r"""
+    A hook that stores the weight of a module in a low precision dtype together with per-channel or per-block scales,
+    and dequantizes it to a high precision dtype for computation. Scaling each channel or block to the range of the
+    storage dtype makes it possible to store weights as `torch.int8`, and loses less precision than a plain cast to an
+    fp8 dtype for layers whose weights have a large range. Other parameters of the module, such as the bias, are kept
+    in the compute dtype.
+    """
+
+    _is_stateful = False
+
+    def __init__(
+        self,
+        storage_dtype: torch.dtype,
+        compute_dtype: torch.dtype,
+        non_blocking: bool,
+        scaling: str = "per_channel",
+        block_size: int = 64,
+    ) -> None:
+        super().__init__(storage_dtype, compute_dtype, non_blocking)
+        self.scaling = scaling
+        self.block_size = block_size
+
+    def initialize_hook(self, module: torch.nn.Module):
+        module.to(dtype=self.compute_dtype, non_blocking=self.non_blocking)
+        weight, scale = _quantize_weight(module.weight.data, self.storage_dtype, self.scaling, self.block_size)
+        module.weight.requires_grad_(False)
+        module.weight.data = weight
+        module.register_buffer("weight_scale", scale, persistent=False)
+        return module
+
+    # The weight is swapped in `new_forward`, so that it is restored even if the forward raises.
+    pre_forward = ModelHook.pre_forward
+    post_forward = ModelHook.post_forward
+
+    def new_forward(self, module: torch.nn.Module, *args, **kwargs):
+        stored_weight = module.weight.data
+        module.weight.data = _dequantize_weight(
+            stored_weight, module.weight_scale, self.compute_dtype, self.non_blocking
+        )
+        try:
+            return self.fn_ref.original_forward(*args, **kwargs)
+        finally:
+            module.weight.data = stored_weight
+
+
 class PeftInputAutocastDisableHook(ModelHook):
     r"""
     A hook that disables the casting of inputs to the module weight dtype during the forward pass. By default, PEFT
@@ -110,6 +157,9 @@ def apply_layerwise_casting(
     skip_modules_pattern: Union[str, Tuple[str, ...]] = "auto",
     skip_modules_classes: Optional[Tuple[Type[torch.nn.Module], ...]] = None,
     non_blocking: bool = False,
+    scaling: Optional[str] = None,
+    block_size: int = 64,
+    max_relative_error: Optional[float] = None,
 ) -> None:
     r"""
     Applies layerwise casting to a given module. The module expected here is a Diffusers ModelMixin but it can be any
@@ -132,6 +182,17 @@ def apply_layerwise_casting(
     ...     skip_modules_pattern=["patch_embed", "norm", "proj_out"],
     ...     non_blocking=True,
     ... )
+
+    >>> # Store the weights as int8 with one scale per block of 64 values, and keep layers that would lose too much
+    >>> # precision in the compute dtype.
+    >>> apply_layerwise_casting(
+    ...     transformer,
+    ...     storage_dtype=torch.int8,
+    ...     compute_dtype=torch.bfloat16,
+    ...     scaling="per_block",
+    ...     block_size=64,
+    ...     max_relative_error=0.02,
+    ... )
     ```
 
     Args:
@@ -151,11 +212,29 @@ def apply_layerwise_casting(
             A list of module classes to skip during the layerwise casting process.
         non_blocking (`bool`, defaults to `False`):
             If `True`, the weight casting operations are non-blocking.
+        scaling (`str`, *optional*):
+            If set, the weights are scaled to the range of `storage_dtype` before they are cast, and the scales are
+            kept in `float32` to dequantize the weights in the forward pass. Use `"per_channel"` for one scale per
+            output channel, or `"per_block"` for one scale per `block_size` consecutive values of an output channel.
+            Required if `storage_dtype` is an integer dtype such as `torch.int8`.
+        block_size (`int`, defaults to `64`):
+            The number of values that share a scale with `scaling="per_block"`. Layers whose number of values per
+            output channel is not divisible by `block_size` use per-channel scales.
+        max_relative_error (`float`, *optional*):
+            If set together with `scaling`, the relative error `||W - dequantize(quantize(W))|| / ||W||` of the weight
+            of every layer is measured, and layers with a larger error are skipped.
     """
     if skip_modules_pattern == "auto":
         skip_modules_pattern = DEFAULT_SKIP_MODULES_PATTERN
 
-    if skip_modules_classes is None and skip_modules_pattern is None:
+    if scaling is not None and scaling not in SUPPORTED_SCALING_TYPES:
+        raise ValueError(f"`scaling` must be one of {SUPPORTED_SCALING_TYPES}, but is {scaling!r}.")
+    if scaling is None and not storage_dtype.is_floating_point:
+        raise ValueError(f"Storing weights as {storage_dtype} requires `scaling` to be set.")
+    if scaling == "per_block" and block_size < 1:
+        raise ValueError(f"`block_size` must be a positive integer, but is {block_size}.")
+
+    if scaling is None and skip_modules_classes is None and skip_modules_pattern is None:
         apply_layerwise_casting_hook(module, storage_dtype, compute_dtype, non_blocking)
         return
 
@@ -166,6 +245,9 @@ def apply_layerwise_casting(
         skip_modules_pattern,
         skip_modules_classes,
         non_blocking,
+        scaling=scaling,
+        block_size=block_size,
+        max_relative_error=max_relative_error,
     )
     _disable_peft_input_autocast(module)
 
@@ -177,6 +259,9 @@ def _apply_layerwise_casting(
     skip_modules_pattern: Optional[Tuple[str, ...]] = None,
     skip_modules_classes: Optional[Tuple[Type[torch.nn.Module], ...]] = None,
     non_blocking: bool = False,
+    scaling: Optional[str] = None,
+    block_size: int = 64,
+    max_relative_error: Optional[float] = None,
     _prefix: str = "",
 ) -> None:
     should_skip = (skip_modules_classes is not None and isinstance(module, skip_modules_classes)) or (
@@ -187,8 +272,15 @@ def _apply_layerwise_casting(
         return
 
     if isinstance(module, SUPPORTED_PYTORCH_LAYERS):
+        if scaling is not None and max_relative_error is not None:
+            error = _quantization_error(module.weight.data, storage_dtype, scaling, block_size)
+            if error > max_relative_error:
+                logger.debug(f'Skipping layerwise casting for layer "{_prefix}" with a relative error of {error:.4f}')
+                return
         logger.debug(f'Applying layerwise casting to layer "{_prefix}"')
-        apply_layerwise_casting_hook(module, storage_dtype, compute_dtype, non_blocking)
+        apply_layerwise_casting_hook(
+            module, storage_dtype, compute_dtype, non_blocking, scaling=scaling, block_size=block_size
+        )
         return
 
     for name, submodule in module.named_children():
@@ -200,12 +292,20 @@ def _apply_layerwise_casting(
             skip_modules_pattern,
             skip_modules_classes,
             non_blocking,
+            scaling=scaling,
+            block_size=block_size,
+            max_relative_error=max_relative_error,
             _prefix=layer_name,
         )
 
 
 def apply_layerwise_casting_hook(
-    module: torch.nn.Module, storage_dtype: torch.dtype, compute_dtype: torch.dtype, non_blocking: bool
+    module: torch.nn.Module,
+    storage_dtype: torch.dtype,
+    compute_dtype: torch.dtype,
+    non_blocking: bool,
+    scaling: Optional[str] = None,
+    block_size: int = 64,
 ) -> None:
     r"""
     Applies a `LayerwiseCastingHook` to a given module.
@@ -219,12 +319,56 @@ def apply_layerwise_casting_hook(
             The dtype to cast the module to during the forward pass.
         non_blocking (`bool`):
             If `True`, the weight casting operations are non-blocking.
+        scaling (`str`, *optional*):
+            If set, a `ScaledLayerwiseCastingHook` with `"per_channel"` or `"per_block"` scales is applied instead.
+        block_size (`int`, defaults to `64`):
+            The number of values that share a scale with `scaling="per_block"`.
     """
     registry = HookRegistry.check_if_exists_or_initialize(module)
-    hook = LayerwiseCastingHook(storage_dtype, compute_dtype, non_blocking)
+    if scaling is None:
+        hook = LayerwiseCastingHook(storage_dtype, compute_dtype, non_blocking)
+    else:
+        hook = ScaledLayerwiseCastingHook(storage_dtype, compute_dtype, non_blocking, scaling, block_size)
     registry.register_hook(hook, _LAYERWISE_CASTING_HOOK)
 
 
+def _quantize_weight(
+    weight: torch.Tensor, storage_dtype: torch.dtype, scaling: str, block_size: int
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    num_channels = weight.shape[0]
+    values = weight.detach().float().reshape(num_channels, -1)
+    if scaling == "per_block" and values.shape[1] % block_size == 0:
+        values = values.reshape(num_channels, -1, block_size)
+    else:
+        values = values.unsqueeze(1)
+
+    if storage_dtype.is_floating_point:
+        max_value = torch.finfo(storage_dtype).max
+    else:
+        max_value = torch.iinfo(storage_dtype).max
+    scale = values.abs().amax(dim=-1, keepdim=True) / max_value
+    scale = scale.clamp_min(torch.finfo(torch.float32).tiny)
+
+    values = values / scale
+    if not storage_dtype.is_floating_point:
+        values = values.round().clamp(-max_value, max_value)
+    return values.to(storage_dtype).reshape(weight.shape), scale
+
+
+def _dequantize_weight(
+    weight: torch.Tensor, scale: torch.Tensor, dtype: torch.dtype, non_blocking: bool = False
+) -> torch.Tensor:
+    values = weight.to(dtype=scale.dtype, non_blocking=non_blocking).reshape(*scale.shape[:2], -1)
+    return (values * scale).reshape(weight.shape).to(dtype=dtype, non_blocking=non_blocking)
+
+
+def _quantization_error(weight: torch.Tensor, storage_dtype: torch.dtype, scaling: str, block_size: int) -> float:
+    quantized, scale = _quantize_weight(weight, storage_dtype, scaling, block_size)
+    reference = weight.detach().float()
+    difference = _dequantize_weight(quantized, scale, torch.float32) - reference
+    return (difference.norm() / reference.norm().clamp_min(1e-12)).item()
+
+
 def _is_layerwise_casting_active(module: torch.nn.Module) -> bool:
     for submodule in module.modules():
         if (
@@ -0,0 +1,308 @@
+# Copyright 2025 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Union
+
+import torch
+
+from ..utils import get_logger, is_accelerate_available
+from .hooks import HookRegistry, ModelHook
+
+
+if is_accelerate_available():
+    from accelerate.utils import send_to_device
+
+
+logger = get_logger(__name__)  # pylint: disable=invalid-name
+
+
+_MODEL_RESIDENCY_HOOK = "model_residency"
+
+
+class ModelResidencyManager:
+    r"""
+    Keeps the most recently used models of any number of pipelines on an accelerator, within a fixed memory budget.
+
+    Models registered with the manager are stored on `offload_device` and moved to `device` when they are called. If
+    moving a model would exceed `max_memory`, the least recently used models that are not currently running are moved
+    back to `offload_device` first. Unlike [`~DiffusionPipeline.enable_model_cpu_offload`], which always offloads a
+    model once the next model of the same pipeline runs, frequently used models stay on the accelerator across calls
+    and across pipelines, so that only rarely used models are moved.
+
+    The manager also records which model is called after which. With `prefetch=True`, the model most often called
+    after the one that just finished is moved to `device` ahead of time, on a separate CUDA stream if possible.
+
+    The manager is thread-safe and is meant to be shared by all pipelines of a process, for example with
+    [`~DiffusionPipeline.enable_model_residency`].
+
+    Args:
+        device (`torch.device` or `str`):
+            The accelerator on which models are executed.
+        max_memory (`int`):
+            The maximum number of bytes of model weights kept on `device`.
+        offload_device (`torch.device` or `str`, defaults to `"cpu"`):
+            The device on which evicted models are stored.
+        prefetch (`bool`, defaults to `True`):
+            Whether to move the model that is predicted to be called next to `device` ahead of time.
+
+    Example:
+
+    ```python
+    >>> import torch
+    >>> from diffusers import DiffusionPipeline, ModelResidencyManager
+
+    >>> manager = ModelResidencyManager("cuda", max_memory=20 * 1024**3)
+    >>> sdxl = DiffusionPipeline.from_pretrained(
+    ...     "stabilityai/stable-diffusion-xl-base-1.0", torch_dtype=torch.float16
+    ... )
+    >>> sd3 = DiffusionPipeline.from_pretrained(
+    ...     "stabilityai/stable-diffusion-3-medium-diffusers", torch_dtype=torch.float16
+    ... )
+    >>> sdxl.enable_model_residency(manager)
+    >>> sd3.enable_model_residency(manager)
+    ```
+    """
+
+    def __init__(
+        self,
+        device: Union[torch.device, str],
+        max_memory: int,
+        offload_device: Union[torch.device, str] = "cpu",
+        prefetch: bool = True,
+    ) -> None:
+        if not is_accelerate_available():
+            raise ImportError(
+                "`ModelResidencyManager` requires `accelerate`. Please install it with `pip install accelerate`."
+            )
+        if max_memory <= 0:
+            raise ValueError(f"`max_memory` must be a positive number of bytes, but is {max_memory}.")
+
+        self.device = torch.device(device)
+        self.offload_device = torch.device(offload_device)
+        self.max_memory = max_memory
+        self.prefetch = prefetch
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Condition(threading.RLock())
+        self._names: Dict[torch.nn.Module, str] = {}
+        self._sizes: Dict[torch.nn.Module, int] = {}
+        self._resident: "OrderedDict[torch.nn.Module, None]" = OrderedDict()
+        self._num_users: Counter = Counter()
+        self._successors: Dict[torch.nn.Module, Counter] = {}
+        self._last_used: Optional[torch.nn.Module] = None
+        self._transfer_events: Dict[torch.nn.Module, Any] = {}
+        self._stream = None
+        if self.prefetch and self.device.type == "cuda" and torch.cuda.is_available():
+            self._stream = torch.cuda.Stream(device=self.device)
+
+    def __repr__(self) -> str:
+        return (
+            f"ModelResidencyManager(device={self.device}, max_memory={self.max_memory}, "
+            f"resident_memory={self.resident_memory}, num_models={len(self._sizes)}, "
+            f"num_resident={len(self._resident)})"
+        )
+
+    @property
+    def resident_memory(self) -> int:
+        r"""The number of bytes of model weights currently on `device`."""
+        return sum(self._sizes[module] for module in self._resident)
+
+    def get_resident_models(self) -> List[str]:
+        r"""Returns the names of the models on `device`, from least to most recently used."""
+        with self._lock:
+            return [self._names[module] for module in self._resident]
+
+    def register(self, module: torch.nn.Module, name: Optional[str] = None) -> None:
+        r"""
+        Registers a model with the manager and moves it to `offload_device`. The model is moved to `device` the next
+        time its `forward` (or a method decorated with `apply_forward_hook`, such as `decode`) is called.
+
+        Registering a model that is already managed by this manager is a no-op, so that pipelines sharing components
+        can all be registered.
+
+        Args:
+            module (`torch.nn.Module`):
+                The model to manage.
+            name (`str`, *optional*):
+                A name for the model, used in logs and by [`~ModelResidencyManager.get_resident_models`].
+        """
+        with self._lock:
+            registry = HookRegistry.check_if_exists_or_initialize(module)
+            hook = registry.get_hook(_MODEL_RESIDENCY_HOOK)
+            if hook is not None:
+                if hook.manager is not self:
+                    raise ValueError(
+                        f"{module.__class__.__name__} is already managed by another `ModelResidencyManager`."
+                    )
+                return
+
+            size = _get_module_size(module)
+            if size > self.max_memory:
+                raise ValueError(
+                    f"{module.__class__.__name__} requires {size} bytes, which is more than the `max_memory` of "
+                    f"{self.max_memory} bytes."
+                )
+
+            self._names[module] = name or module.__class__.__name__
+            self._sizes[module] = size
+            module.to(self.offload_device)
+            registry.register_hook(ModelResidencyHook(self), _MODEL_RESIDENCY_HOOK)
+
+    def unregister(self, module: torch.nn.Module) -> None:
+        r"""Removes a model from the manager. The model stays on the device it is currently on."""
+        with self._lock:
+            if module not in self._sizes:
+                return
+            # Wait until the last call using the model has finished.
+            self._lock.wait_for(lambda: self._num_users[module] == 0)
+
+            module._diffusers_hook.remove_hook(_MODEL_RESIDENCY_HOOK, recurse=False)
+            self._resident.pop(module, None)
+            self._transfer_events.pop(module, None)
+            self._successors.pop(module, None)
+            for successors in self._successors.values():
+                successors.pop(module, None)
+            del self._names[module], self._sizes[module], self._num_users[module]
+            if self._last_used is module:
+                self._last_used = None
+
+    def offload_all(self) -> None:
+        r"""Moves all models that are not currently running to `offload_device`."""
+        with self._lock:
+            for module in list(self._resident):
+                if self._num_users[module] == 0:
+                    self._evict(module)
+
+    @contextmanager
+    def use(self, module: torch.nn.Module):
+        r"""
+        Context manager that keeps `module` on `device` while it is used. Models are used automatically when they are
+        called, so this is only needed to run other methods of a registered model.
+        """
+        with self._lock:
+            self._onload(module)
+            self._num_users[module] += 1
+        try:
+            yield module
+        finally:
+            with self._lock:
+                self._num_users[module] -= 1
+                self._lock.notify_all()
+                if self.prefetch:
+                    self._prefetch_successor(module)
+
+    def _onload(self, module: torch.nn.Module) -> None:
+        if self._last_used is not None and self._last_used is not module:
+            self._successors.setdefault(self._last_used, Counter())[module] += 1
+        self._last_used = module
+
+        if module in self._resident:
+            self.hits += 1
+            self._resident.move_to_end(module)
+            event = self._transfer_events.pop(module, None)
+            if event is not None:
+                torch.cuda.current_stream(self.device).wait_event(event)
+            return
+
+        self.misses += 1
+        self._make_room(self._sizes[module])
+        module.to(self.device)
+        self._resident[module] = None
+        logger.debug(f"Moved {self._names[module]} to {self.device}.")
+
+    def _prefetch_successor(self, module: torch.nn.Module) -> None:
+        successors = self._successors.get(module)
+        if not successors:
+            return
+        successor, _ = successors.most_common(1)[0]
+        if successor in self._resident or successor not in self._sizes:
+            return
+        if not self._make_room(self._sizes[successor], exclude=(module,), raise_error=False):
+            return
+
+        if self._stream is not None:
+            with torch.cuda.stream(self._stream):
+                successor.to(self.device, non_blocking=True)
+                event = torch.cuda.Event()
+                event.record(self._stream)
+            self._transfer_events[successor] = event
+        else:
+            successor.to(self.device)
+        # Prefetched models are inserted as least recently used, so that they are evicted first if the prediction
+        # turns out to be wrong.
+        self._resident[successor] = None
+        self._resident.move_to_end(successor, last=False)
+        logger.debug(f"Prefetched {self._names[successor]} to {self.device}.")
+
+    def _make_room(self, size: int, exclude=(), raise_error: bool = True) -> bool:
+        resident_memory = self.resident_memory
+        candidates = [m for m in self._resident if self._num_users[m] == 0 and m not in exclude]
+        freeable = sum(self._sizes[m] for m in candidates)
+        if resident_memory - freeable + size > self.max_memory:
+            if raise_error:
+                raise RuntimeError(
+                    f"Cannot fit {size} bytes within `max_memory` of {self.max_memory} bytes because the models "
+                    f"{[self._names[m] for m in self._resident if m not in candidates]} are in use."
+                )
+            return False
+
+        for candidate in candidates:
+            if resident_memory + size <= self.max_memory:
+                break
+            self._evict(candidate)
+            resident_memory -= self._sizes[candidate]
+        return True
+
+    def _evict(self, module: torch.nn.Module) -> None:
+        event = self._transfer_events.pop(module, None)
+        if event is not None:
+            event.synchronize()
+        module.to(self.offload_device)
+        del self._resident[module]
+        self.evictions += 1
+        logger.debug(f"Moved {self._names[module]} to {self.offload_device}.")
+
+
+class ModelResidencyHook(ModelHook):
+    r"""A hook that moves a model managed by a [`ModelResidencyManager`] to the accelerator when it is called."""
+
+    _is_stateful = False
+
+    def __init__(self, manager: ModelResidencyManager) -> None:
+        super().__init__()
+        self.manager = manager
+
+    def new_forward(self, module: torch.nn.Module, *args, **kwargs) -> Any:
+        with self.manager.use(module):
+            args = send_to_device(args, self.manager.device)
+            kwargs = send_to_device(kwargs, self.manager.device)
+            return self.fn_ref.original_forward(*args, **kwargs)
+
+
+def _get_module_size(module: torch.nn.Module) -> int:
+    tensors = {id(t): t for t in (*module.parameters(), *module.buffers())}
+    return sum(t.numel() * t.element_size() for t in tensors.values())
+
+
+def _get_model_residency_hook(module: torch.nn.Module) -> Optional[ModelResidencyHook]:
+    registry = getattr(module, "_diffusers_hook", None)
+    if registry is None:
+        return None
+    return registry.get_hook(_MODEL_RESIDENCY_HOOK)
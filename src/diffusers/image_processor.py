@@ -12,9 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
+import io
 import math
 import warnings
-from typing import List, Optional, Tuple, Union
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import PIL.Image
@@ -85,6 +88,20 @@ def is_valid_image_imagelist(images):
     return False
 
 
+def _pt_to_host_uint8(images: torch.Tensor) -> Tuple[torch.Tensor, Optional["torch.cuda.Event"]]:
+    # Quantizing on the device makes the copy to the host 4x smaller than `float32`. The copy of CUDA tensors is
+    # asynchronous and is only complete once the returned event is.
+    images = (images.float() * 255).round_().clamp_(0, 255).to(torch.uint8).permute(0, 2, 3, 1).contiguous()
+    if images.device.type != "cuda":
+        return images.cpu(), None
+
+    host_images = torch.empty(images.shape, dtype=torch.uint8, pin_memory=True)
+    host_images.copy_(images, non_blocking=True)
+    event = torch.cuda.Event()
+    event.record()
+    return host_images, event
+
+
 class VaeImageProcessor(ConfigMixin):
     """
     Image processor for VAE.
@@ -136,7 +153,7 @@ class VaeImageProcessor(ConfigMixin):
 
         Args:
             images (`np.ndarray`):
-                The image array to convert to PIL format.
+                The image array to convert to PIL format, either in `[0, 1]` or already quantized to `uint8`.
 
         Returns:
             `List[PIL.Image.Image]`:
@@ -144,7 +161,8 @@ class VaeImageProcessor(ConfigMixin):
         """
         if images.ndim == 3:
             images = images[None, ...]
-        images = (images * 255).round().astype("uint8")
+        if images.dtype != np.uint8:
+            images = (images * 255).round().astype("uint8")
         if images.shape[-1] == 1:
             # special case for grayscale (single channel) images
             pil_images = [Image.fromarray(image.squeeze(), mode="L") for image in images]
@@ -208,6 +226,28 @@ class VaeImageProcessor(ConfigMixin):
         images = images.cpu().permute(0, 2, 3, 1).float().numpy()
         return images
 
+    @staticmethod
+    def pt_to_numpy_uint8(images: torch.Tensor) -> np.ndarray:
+        r"""
+        Convert a PyTorch tensor in `[0, 1]` to a `uint8` NumPy image.
+
+        The images are scaled, rounded and converted to `uint8` channels-last on their device, so only a quarter of the
+        bytes of a `float32` image are copied to the host. CUDA tensors are copied into a pinned buffer that backs the
+        returned array.
+
+        Args:
+            images (`torch.Tensor`):
+                The PyTorch tensor to convert to NumPy format.
+
+        Returns:
+            `np.ndarray`:
+                A `uint8` NumPy array representation of the images.
+        """
+        images, event = _pt_to_host_uint8(images)
+        if event is not None:
+            event.synchronize()
+        return images.numpy()
+
     @staticmethod
     def normalize(images: Union[np.ndarray, torch.Tensor]) -> Union[np.ndarray, torch.Tensor]:
         r"""
@@ -777,14 +817,14 @@ class VaeImageProcessor(ConfigMixin):
         if output_type == "pt":
             return image
 
+        if output_type == "pil":
+            return self.numpy_to_pil(self.pt_to_numpy_uint8(image))
+
         image = self.pt_to_numpy(image)
 
         if output_type == "np":
             return image
 
-        if output_type == "pil":
-            return self.numpy_to_pil(image)
-
     def apply_overlay(
         self,
         mask: PIL.Image.Image,
@@ -833,6 +873,134 @@ class VaeImageProcessor(ConfigMixin):
         return image
 
 
+def _encode_image(
+    image: np.ndarray, format: Optional[str], save_kwargs: Dict[str, Any]
+) -> Union[bytes, PIL.Image.Image]:
+    # Module-level so that it can be run in a `ProcessPoolExecutor`.
+    pil_image = Image.fromarray(image.squeeze(-1), mode="L") if image.shape[-1] == 1 else Image.fromarray(image)
+    if format is None:
+        return pil_image
+    buffer = io.BytesIO()
+    pil_image.save(buffer, format=format, **save_kwargs)
+    return buffer.getvalue()
+
+
+class ImageOutputStage:
+    """
+    Converts and encodes pipeline outputs in the background so that the next pipeline call can start right away.
+
+    Images are quantized to `uint8` on their device and copied to the CPU without blocking. The conversion to PIL and
+    the encoding to `format` then run on `executor`, which can be a thread or a process pool. [`~ImageOutputStage.submit`]
+    returns one future per image.
+
+    ```py
+    >>> stage = ImageOutputStage(format="jpeg", quality=90)
+    >>> futures = []
+    >>> for prompt in prompts:
+    ...     images = pipe(prompt, output_type="pt").images
+    ...     futures.extend(stage.submit(images))
+    >>> encoded = [future.result() for future in futures]
+    ```
+
+    Args:
+        format (`str`, *optional*, defaults to `"png"`):
+            The format passed to `PIL.Image.Image.save`, for example `"png"`, `"jpeg"` or `"webp"`. If `None`, the
+            futures return `PIL.Image.Image`s instead of bytes.
+        max_workers (`int`, *optional*):
+            The number of threads of the default executor. Ignored if `executor` is passed.
+        executor (`concurrent.futures.Executor`, *optional*):
+            The executor used for conversion and encoding. Defaults to a `ThreadPoolExecutor`.
+        save_kwargs:
+            Additional arguments passed to `PIL.Image.Image.save`, for example `quality` or `optimize`.
+    """
+
+    def __init__(
+        self,
+        format: Optional[str] = "png",
+        max_workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        **save_kwargs,
+    ):
+        self.format = format
+        self.save_kwargs = save_kwargs
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="diffusers-output")
+        # Waits for device-to-host copies in submission order before handing images to the executor.
+        self._transfer_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="diffusers-output-transfer")
+
+    def submit(self, images: Union[torch.Tensor, np.ndarray, PIL.Image.Image, List[PIL.Image.Image]]) -> List[Future]:
+        """
+        Schedules the conversion and encoding of `images`.
+
+        Args:
+            images (`torch.Tensor`, `np.ndarray` or `PIL.Image.Image`):
+                Images as returned by a pipeline with `output_type="pt"` (`B x C x H x W` in `[0, 1]`),
+                `output_type="np"` (`B x H x W x C` in `[0, 1]`) or `output_type="pil"`.
+
+        Returns:
+            `List[concurrent.futures.Future]`: One future per image, resolving to the encoded bytes or a PIL image.
+        """
+        if isinstance(images, PIL.Image.Image):
+            images = [images]
+
+        if isinstance(images, list):
+            # PIL images only need to be encoded.
+            images = [np.asarray(image) for image in images]
+            images = [image[..., None] if image.ndim == 2 else image for image in images]
+            return [self._executor.submit(_encode_image, image, self.format, self.save_kwargs) for image in images]
+
+        if isinstance(images, np.ndarray):
+            if images.ndim == 3:
+                images = images[None, ...]
+            images = (images * 255).round().clip(0, 255).astype("uint8")
+            return [self._executor.submit(_encode_image, image, self.format, self.save_kwargs) for image in images]
+
+        if not isinstance(images, torch.Tensor):
+            raise ValueError(f"Input for the output stage is in incorrect format: {type(images)}.")
+
+        if images.ndim == 3:
+            images = images[None, ...]
+        images, event = _pt_to_host_uint8(images)
+        futures = [Future() for _ in range(images.shape[0])]
+        self._transfer_executor.submit(self._dispatch, images, event, futures)
+        return futures
+
+    def _dispatch(self, images: torch.Tensor, event: Optional["torch.cuda.Event"], futures: List[Future]) -> None:
+        try:
+            if event is not None:
+                event.synchronize()
+            arrays = images.numpy()
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        for array, future in zip(arrays, futures):
+            encoded = self._executor.submit(_encode_image, array, self.format, self.save_kwargs)
+            encoded.add_done_callback(functools.partial(_copy_future_state, destination=future))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Waits for all submitted images, if `wait` is `True`, and releases the workers."""
+        self._transfer_executor.shutdown(wait=wait)
+        if self._owns_executor:
+            self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "ImageOutputStage":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown(wait=True)
+
+
+def _copy_future_state(source: Future, destination: Future) -> None:
+    if source.cancelled():
+        destination.cancel()
+    elif source.exception() is not None:
+        destination.set_exception(source.exception())
+    else:
+        destination.set_result(source.result())
+
+
 class VaeImageProcessorLDM3D(VaeImageProcessor):
     """
     Image processor for VAE LDM3D.
@@ -875,7 +1043,8 @@ class VaeImageProcessorLDM3D(VaeImageProcessor):
         """
         if images.ndim == 3:
             images = images[None, ...]
-        images = (images * 255).round().astype("uint8")
+        if images.dtype != np.uint8:
+            images = (images * 255).round().astype("uint8")
         if images.shape[-1] == 1:
             # special case for grayscale (single channel) images
             pil_images = [Image.fromarray(image.squeeze(), mode="L") for image in images]
@@ -12,9 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import os
+import weakref
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
+import numpy as np
+import PIL.Image
+import safetensors.torch
 import torch
 import torch.nn.functional as F
 from huggingface_hub.utils import validate_hf_hub_args
@@ -53,7 +60,263 @@ from ..models.attention_processor import (
 logger = logging.get_logger(__name__)
 
 
-class IPAdapterMixin:
+class IPAdapterEmbeddingCache:
+    r"""
+    A least-recently-used cache of IP-Adapter image embeddings, keyed by the content of the reference image and the
+    identity of the image encoder and feature extractor that produced them.
+
+    Args:
+        max_entries (`int`, defaults to `128`):
+            The maximum number of reference images whose embeddings are kept in memory.
+        cache_dir (`str` or `os.PathLike`, *optional*):
+            If set, embeddings are also written to this directory as safetensors files, and looked up there when they
+            are not in memory. The directory can be shared between processes and runs.
+    """
+
+    def __init__(self, max_entries: int = 128, cache_dir: Optional[Union[str, os.PathLike]] = None):
+        if max_entries < 1:
+            raise ValueError(f"`max_entries` must be a positive integer, but is {max_entries}.")
+
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, torch.Tensor]]" = OrderedDict()
+        self._fingerprints = weakref.WeakKeyDictionary()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, names: List[str]) -> Optional[Dict[str, torch.Tensor]]:
+        r"""Returns the cached tensors for `key` if all of `names` are cached, moving the entry to the front."""
+        entry = self._entries.get(key)
+        if entry is None and self.cache_dir is not None:
+            path = self.cache_dir / f"{key}.safetensors"
+            if path.is_file():
+                entry = safetensors.torch.load_file(str(path))
+                self._insert(key, entry)
+
+        if entry is None or any(name not in entry for name in names):
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, tensors: Dict[str, torch.Tensor]) -> None:
+        r"""Adds `tensors` to the entry of `key`, and writes the entry to `cache_dir` if it is set."""
+        entry = {**self._entries.get(key, {}), **{name: tensor.detach() for name, tensor in tensors.items()}}
+        self._insert(key, entry)
+
+        if self.cache_dir is not None:
+            path = self.cache_dir / f"{key}.safetensors"
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            safetensors.torch.save_file({name: t.contiguous().cpu() for name, t in entry.items()}, str(tmp_path))
+            os.replace(tmp_path, path)
+
+    def clear(self) -> None:
+        r"""Removes all in-memory entries. Files in `cache_dir` are kept."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _insert(self, key: str, entry: Dict[str, torch.Tensor]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def fingerprint(self, image_encoder: torch.nn.Module, feature_extractor=None) -> str:
+        r"""Returns a hash identifying `image_encoder` and `feature_extractor`, computed once per encoder."""
+        if image_encoder not in self._fingerprints:
+            parameter = next(image_encoder.parameters())
+            sha = hashlib.sha256()
+            sha.update(image_encoder.__class__.__name__.encode())
+            sha.update(str(getattr(image_encoder.config, "_name_or_path", "")).encode())
+            sha.update(str(parameter.dtype).encode())
+            sha.update(_tensor_to_bytes(parameter))
+            self._fingerprints[image_encoder] = sha.hexdigest()
+
+        sha = hashlib.sha256(self._fingerprints[image_encoder].encode())
+        if feature_extractor is not None:
+            sha.update(feature_extractor.to_json_string().encode())
+        return sha.hexdigest()
+
+
+def _tensor_to_bytes(tensor: torch.Tensor) -> bytes:
+    tensor = tensor.detach().cpu().contiguous().reshape(-1)
+    return tensor.view(torch.uint8).numpy().tobytes()
+
+
+def _hash_image(image, prefix: str) -> str:
+    sha = hashlib.sha256(prefix.encode())
+    if isinstance(image, PIL.Image.Image):
+        sha.update(f"pil-{image.mode}-{image.size}".encode())
+        sha.update(image.tobytes())
+    elif isinstance(image, torch.Tensor):
+        sha.update(f"pt-{image.dtype}-{tuple(image.shape)}".encode())
+        sha.update(_tensor_to_bytes(image))
+    else:
+        image = np.ascontiguousarray(image)
+        sha.update(f"np-{image.dtype}-{image.shape}".encode())
+        sha.update(image.tobytes())
+    return sha.hexdigest()
+
+
+class IPAdapterImageEncoderMixin:
+    r"""
+    Encodes the reference images of all loaded IP-Adapters with a single image encoder forward, optionally re-using
+    cached embeddings.
+    """
+
+    _ip_adapter_embedding_cache: Optional[IPAdapterEmbeddingCache] = None
+
+    def enable_ip_adapter_embedding_cache(
+        self, max_entries: int = 128, cache_dir: Optional[Union[str, os.PathLike]] = None
+    ) -> IPAdapterEmbeddingCache:
+        r"""
+        Cache the image encoder outputs of IP-Adapter reference images, so that re-using a reference image in later
+        calls skips the image encoder.
+
+        Args:
+            max_entries (`int`, defaults to `128`):
+                The maximum number of reference images whose embeddings are kept in memory.
+            cache_dir (`str` or `os.PathLike`, *optional*):
+                A directory to additionally persist the embeddings to.
+
+        Returns:
+            [`~loaders.ip_adapter.IPAdapterEmbeddingCache`]: The cache, which also reports its `hits` and `misses`.
+
+        Examples:
+
+        ```python
+        >>> # Assuming `pipeline` is already loaded with the IP Adapter weights.
+        >>> pipeline.enable_ip_adapter_embedding_cache(max_entries=64, cache_dir="./ip_adapter_cache")
+        >>> image = pipeline(prompt, ip_adapter_image=style_image).images[0]
+        ```
+        """
+        self._ip_adapter_embedding_cache = IPAdapterEmbeddingCache(max_entries=max_entries, cache_dir=cache_dir)
+        return self._ip_adapter_embedding_cache
+
+    def disable_ip_adapter_embedding_cache(self) -> None:
+        r"""Disables the cache enabled with [`~IPAdapterImageEncoderMixin.enable_ip_adapter_embedding_cache`]."""
+        self._ip_adapter_embedding_cache = None
+
+    @torch.no_grad()
+    def encode_ip_adapter_images(
+        self,
+        ip_adapter_image: List,
+        device: torch.device,
+        output_hidden_states: List[bool],
+    ) -> List[Tuple[torch.Tensor, torch.Tensor]]:
+        r"""
+        Encodes the reference images of all IP-Adapters with `image_encoder`. All images that are not cached are
+        encoded together, in a single forward pass per pixel shape.
+
+        Args:
+            ip_adapter_image (`List`):
+                The reference image(s) of each IP-Adapter. Tensors are used as preprocessed pixel values, all other
+                images are preprocessed with `feature_extractor`.
+            device (`torch.device`):
+                The device to return the embeddings on.
+            output_hidden_states (`List[bool]`):
+                Whether each IP-Adapter uses the penultimate hidden states of the image encoder instead of its image
+                embeddings.
+
+        Returns:
+            `List[Tuple[torch.Tensor, torch.Tensor]]`: The image embeddings and the negative image embeddings of each
+            IP-Adapter, with one row per reference image.
+        """
+        cache = self._ip_adapter_embedding_cache
+        dtype = next(self.image_encoder.parameters()).dtype
+        prefix = cache.fingerprint(self.image_encoder, self.feature_extractor) if cache is not None else ""
+
+        def get_key(image, zeros=False):
+            if zeros:
+                # The negative hidden states only depend on the shape of the pixel values.
+                source = tuple(image.shape) if isinstance(image, torch.Tensor) else "feature_extractor"
+                return hashlib.sha256(f"{prefix}-zeros-{source}".encode()).hexdigest()
+            return _hash_image(image, prefix) if cache is not None else f"id-{id(image)}"
+
+        # 1. Look up the embeddings of all reference images, and of the zero image used for negative hidden states.
+        # `adapters` also keeps the images alive, so that their ids stay unique when there is no cache.
+        adapters = []
+        entries = {}
+        pending = {}
+        for images, hidden_states in zip(ip_adapter_image, output_hidden_states):
+            if isinstance(images, torch.Tensor):
+                images = list(images) if images.ndim == 4 else [images]
+            elif not isinstance(images, list):
+                images = [images]
+
+            name = "hidden_states" if hidden_states else "image_embeds"
+            keys = [get_key(image) for image in images]
+            zeros_key = get_key(images[0], zeros=True) if hidden_states else None
+            adapters.append((images, keys, name, zeros_key))
+
+            requests = [(key, image, False) for key, image in zip(keys, images)]
+            if zeros_key is not None:
+                requests.append((zeros_key, images[0], True))
+            for key, image, zeros in requests:
+                if name in entries.get(key, {}) or name in pending.get(key, (None, None, set()))[2]:
+                    continue
+                entry = cache.get(key, [name]) if cache is not None else None
+                if entry is not None:
+                    entries[key] = entry
+                else:
+                    pending.setdefault(key, (image, zeros, set()))[2].add(name)
+
+        # 2. Encode everything that is not cached, preprocessing all images with a single feature extractor call.
+        if len(pending) > 0:
+            keys = list(pending.keys())
+            pixel_values = {key: pending[key][0] for key in keys if isinstance(pending[key][0], torch.Tensor)}
+            to_process = [key for key in keys if key not in pixel_values]
+            if len(to_process) > 0:
+                processed = self.feature_extractor(
+                    [pending[key][0] for key in to_process], return_tensors="pt"
+                ).pixel_values
+                pixel_values.update(zip(to_process, processed))
+
+            groups = {}
+            for key in keys:
+                if pending[key][1]:
+                    pixel_values[key] = torch.zeros_like(pixel_values[key])
+                groups.setdefault(tuple(pixel_values[key].shape), []).append(key)
+
+            for group in groups.values():
+                needs_hidden_states = any("hidden_states" in pending[key][2] for key in group)
+                batch = torch.stack([pixel_values[key] for key in group]).to(device=device, dtype=dtype)
+                output = self.image_encoder(batch, output_hidden_states=needs_hidden_states)
+
+                for i, key in enumerate(group):
+                    entry = {}
+                    if needs_hidden_states:
+                        entry["hidden_states"] = output.hidden_states[-2][i]
+                    if getattr(output, "image_embeds", None) is not None:
+                        entry["image_embeds"] = output.image_embeds[i]
+                    entries[key] = {**entries.get(key, {}), **entry}
+                    if cache is not None:
+                        cache.put(key, entry)
+
+        # 3. Gather the embeddings of each adapter.
+        ip_adapter_image_embeds = []
+        for _, keys, name, zeros_key in adapters:
+            image_embeds = torch.stack([entries[key][name] for key in keys]).to(device=device, dtype=dtype)
+            if zeros_key is not None:
+                negative_image_embeds = entries[zeros_key][name].to(device=device, dtype=dtype)
+                negative_image_embeds = negative_image_embeds[None].repeat(len(keys), *[1] * image_embeds[0].ndim)
+            else:
+                negative_image_embeds = torch.zeros_like(image_embeds)
+            ip_adapter_image_embeds.append((image_embeds, negative_image_embeds))
+
+        return ip_adapter_image_embeds
+
+
+class IPAdapterMixin(IPAdapterImageEncoderMixin):
     """Mixin for handling IP Adapters."""
 
     @validate_hf_hub_args
@@ -357,7 +620,7 @@ class IPAdapterMixin:
         self.unet.set_attn_processor(attn_procs)
 
 
-class FluxIPAdapterMixin:
+class FluxIPAdapterMixin(IPAdapterImageEncoderMixin):
     """Mixin for handling Flux IP Adapters."""
 
     @validate_hf_hub_args
@@ -22,6 +22,7 @@ from packaging import version
 from typing_extensions import Self
 
 from ..utils import deprecate, is_transformers_available, logging
+from ..utils.constants import USE_SINGLE_FILE_CONVERSION_CACHE
 from .single_file_utils import (
     SingleFileComponentError,
     _is_legacy_scheduler_kwargs,
@@ -29,10 +30,12 @@ from .single_file_utils import (
     _legacy_load_clip_tokenizer,
     _legacy_load_safety_checker,
     _legacy_load_scheduler,
+    _resolve_single_file_checkpoint_path,
     create_diffusers_clip_model_from_ldm,
     create_diffusers_t5_model_from_checkpoint,
     fetch_diffusers_config,
     fetch_original_config,
+    get_single_file_checkpoint_hash,
     is_clip_model_in_single_file,
     is_t5_in_single_file,
     load_single_file_checkpoint,
@@ -62,6 +65,8 @@ def load_single_file_sub_model(
     torch_dtype=None,
     is_legacy_loading=False,
     disable_mmap=False,
+    use_conversion_cache=False,
+    checkpoint_hash=None,
     **kwargs,
 ):
     if is_pipeline_module:
@@ -109,6 +114,8 @@ def load_single_file_sub_model(
             torch_dtype=torch_dtype,
             local_files_only=local_files_only,
             disable_mmap=disable_mmap,
+            use_conversion_cache=use_conversion_cache,
+            _single_file_checkpoint_hash=checkpoint_hash,
             **kwargs,
         )
 
@@ -314,6 +321,12 @@ class FromSingleFileMixin:
             disable_mmap ('bool', *optional*, defaults to 'False'):
                 Whether to disable mmap when loading a Safetensors model. This option can perform better when the model
                 is on a network mount or hard drive.
+            use_conversion_cache (`bool`, *optional*):
+                Whether to cache the converted weights of the Diffusers models of the pipeline, so that later loads of
+                the same checkpoint memory-map them instead of converting the checkpoint again. See
+                [`~loaders.FromOriginalModelMixin.from_single_file`]. The original checkpoint is still loaded to infer
+                the pipeline config, and text encoders aren't cached. Defaults to the value of the
+                `DIFFUSERS_USE_SINGLE_FILE_CONVERSION_CACHE` environment variable.
             kwargs (remaining dictionary of keyword arguments, *optional*):
                 Can be used to overwrite load and saveable variables (the pipeline components of the specific pipeline
                 class). The overwritten components are passed directly to the pipelines `__init__` method. See example
@@ -362,6 +375,7 @@ class FromSingleFileMixin:
         revision = kwargs.pop("revision", None)
         torch_dtype = kwargs.pop("torch_dtype", torch.float32)
         disable_mmap = kwargs.pop("disable_mmap", False)
+        use_conversion_cache = kwargs.pop("use_conversion_cache", USE_SINGLE_FILE_CONVERSION_CACHE)
 
         is_legacy_loading = False
 
@@ -388,7 +402,7 @@ class FromSingleFileMixin:
 
         pipeline_class = _get_pipeline_class(cls, config=None)
 
-        checkpoint = load_single_file_checkpoint(
+        pretrained_model_link_or_path = _resolve_single_file_checkpoint_path(
             pretrained_model_link_or_path,
             force_download=force_download,
             proxies=proxies,
@@ -396,8 +410,15 @@ class FromSingleFileMixin:
             cache_dir=cache_dir,
             local_files_only=local_files_only,
             revision=revision,
-            disable_mmap=disable_mmap,
         )
+        checkpoint = load_single_file_checkpoint(pretrained_model_link_or_path, disable_mmap=disable_mmap)
+
+        # The checkpoint is needed to infer the config and to load the text encoders, which aren't cached. The
+        # Diffusers models are loaded from the checkpoint dict, so its hash is passed along to find their cached
+        # weights.
+        checkpoint_hash = None
+        if use_conversion_cache and not pretrained_model_link_or_path.endswith(".gguf"):
+            checkpoint_hash = get_single_file_checkpoint_hash(pretrained_model_link_or_path)
 
         if config is None:
             config = fetch_diffusers_config(checkpoint)
@@ -519,6 +540,8 @@ class FromSingleFileMixin:
                         local_files_only=local_files_only,
                         is_legacy_loading=is_legacy_loading,
                         disable_mmap=disable_mmap,
+                        use_conversion_cache=use_conversion_cache,
+                        checkpoint_hash=checkpoint_hash,
                         **kwargs,
                     )
                 except SingleFileComponentError as e:
@@ -23,8 +23,11 @@ from typing_extensions import Self
 
 from ..quantizers import DiffusersAutoQuantizer
 from ..utils import deprecate, is_accelerate_available, logging
+from ..utils.constants import USE_SINGLE_FILE_CONVERSION_CACHE
+from ..utils.torch_utils import invalidate_placement_cache
 from .single_file_utils import (
     SingleFileComponentError,
+    _resolve_single_file_checkpoint_path,
     convert_animatediff_checkpoint_to_diffusers,
     convert_auraflow_transformer_checkpoint_to_diffusers,
     convert_autoencoder_dc_checkpoint_to_diffusers,
@@ -44,7 +47,11 @@ from .single_file_utils import (
     create_vae_diffusers_config_from_ldm,
     fetch_diffusers_config,
     fetch_original_config,
+    get_single_file_checkpoint_hash,
+    get_single_file_conversion_cache_path,
+    load_converted_checkpoint_from_cache,
     load_single_file_checkpoint,
+    save_converted_checkpoint_to_cache,
 )
 
 
@@ -142,6 +149,20 @@ def _get_mapping_function_kwargs(mapping_fn, **kwargs):
     return mapping_kwargs
 
 
+def _get_conversion_kwargs(cls, mapping_functions, **kwargs):
+    # The kwargs that can change the converted config or weights, i.e. model config overrides and mapping arguments.
+    expected_kwargs, optional_kwargs = cls._get_signature_keys(cls)
+    legacy_kwargs = mapping_functions.get("legacy_kwargs", {})
+    conversion_kwargs = {
+        k: v for k, v in kwargs.items() if k in expected_kwargs or k in optional_kwargs or k in legacy_kwargs
+    }
+    for mapping_fn in (mapping_functions["checkpoint_mapping_fn"], mapping_functions.get("config_mapping_fn")):
+        if mapping_fn is not None:
+            conversion_kwargs.update(_get_mapping_function_kwargs(mapping_fn, **kwargs))
+
+    return conversion_kwargs
+
+
 class FromOriginalModelMixin:
     """
     Load pretrained weights saved in the `.ckpt` or `.safetensors` format into a model.
@@ -196,6 +217,12 @@ class FromOriginalModelMixin:
             disable_mmap ('bool', *optional*, defaults to 'False'):
                 Whether to disable mmap when loading a Safetensors model. This option can perform better when the model
                 is on a network mount or hard drive, which may not handle the seeky-ness of mmap very well.
+            use_conversion_cache (`bool`, *optional*):
+                Whether to store the converted Diffusers format weights in a local cache keyed by the checkpoint hash,
+                so that later loads of the same checkpoint memory-map them instead of converting the checkpoint again.
+                The cache is located in `DIFFUSERS_SINGLE_FILE_CONVERSION_CACHE` (defaults to
+                `~/.cache/huggingface/diffusers/single_file_conversions`). Defaults to the value of the
+                `DIFFUSERS_USE_SINGLE_FILE_CONVERSION_CACHE` environment variable, which is disabled if unset.
             kwargs (remaining dictionary of keyword arguments, *optional*):
                 Can be used to overwrite load and saveable variables (for example the pipeline components of the
                 specific pipeline class). The overwritten components are directly passed to the pipelines `__init__`
@@ -244,6 +271,9 @@ class FromOriginalModelMixin:
         quantization_config = kwargs.pop("quantization_config", None)
         device = kwargs.pop("device", None)
         disable_mmap = kwargs.pop("disable_mmap", False)
+        use_conversion_cache = kwargs.pop("use_conversion_cache", USE_SINGLE_FILE_CONVERSION_CACHE)
+        # Passed by `FromSingleFileMixin.from_single_file` along with the already loaded checkpoint dict.
+        checkpoint_hash = kwargs.pop("_single_file_checkpoint_hash", None)
 
         if not isinstance(torch_dtype, torch.dtype):
             torch_dtype = torch.float32
@@ -251,19 +281,6 @@ class FromOriginalModelMixin:
                 f"Passed `torch_dtype` {torch_dtype} is not a `torch.dtype`. Defaulting to `torch.float32`."
             )
 
-        if isinstance(pretrained_model_link_or_path_or_dict, dict):
-            checkpoint = pretrained_model_link_or_path_or_dict
-        else:
-            checkpoint = load_single_file_checkpoint(
-                pretrained_model_link_or_path_or_dict,
-                force_download=force_download,
-                proxies=proxies,
-                token=token,
-                cache_dir=cache_dir,
-                local_files_only=local_files_only,
-                revision=revision,
-                disable_mmap=disable_mmap,
-            )
         if quantization_config is not None:
             hf_quantizer = DiffusersAutoQuantizer.from_config(quantization_config)
             hf_quantizer.validate_environment()
@@ -274,79 +291,133 @@ class FromOriginalModelMixin:
         mapping_functions = SINGLE_FILE_LOADABLE_CLASSES[mapping_class_name]
 
         checkpoint_mapping_fn = mapping_functions["checkpoint_mapping_fn"]
-        if original_config is not None:
-            if "config_mapping_fn" in mapping_functions:
-                config_mapping_fn = mapping_functions["config_mapping_fn"]
-            else:
-                config_mapping_fn = None
-
-            if config_mapping_fn is None:
-                raise ValueError(
-                    (
-                        f"`original_config` has been provided for {mapping_class_name} but no mapping function"
-                        "was found to convert the original config to a Diffusers config in"
-                        "`diffusers.loaders.single_file_utils`"
-                    )
+
+        conversion_cache_path = None
+        if use_conversion_cache:
+            if not isinstance(pretrained_model_link_or_path_or_dict, dict):
+                pretrained_model_link_or_path_or_dict = _resolve_single_file_checkpoint_path(
+                    pretrained_model_link_or_path_or_dict,
+                    force_download=force_download,
+                    proxies=proxies,
+                    token=token,
+                    cache_dir=cache_dir,
+                    local_files_only=local_files_only,
+                    revision=revision,
+                )
+                # GGUF tensors keep their quantization type in a tensor subclass, which isn't stored in safetensors.
+                if not pretrained_model_link_or_path_or_dict.endswith(".gguf"):
+                    checkpoint_hash = get_single_file_checkpoint_hash(pretrained_model_link_or_path_or_dict)
+
+            if checkpoint_hash is not None:
+                conversion_cache_path = get_single_file_conversion_cache_path(
+                    checkpoint_hash,
+                    mapping_class_name,
+                    checkpoint_mapping_fn,
+                    config=config,
+                    config_revision=config_revision,
+                    original_config=original_config,
+                    subfolder=subfolder,
+                    kwargs=_get_conversion_kwargs(cls, mapping_functions, **kwargs),
                 )
 
-            if isinstance(original_config, str):
-                # If original_config is a URL or filepath fetch the original_config dict
-                original_config = fetch_original_config(original_config, local_files_only=local_files_only)
+        cached_checkpoint = None
+        if conversion_cache_path is not None:
+            cached_checkpoint = load_converted_checkpoint_from_cache(conversion_cache_path, disable_mmap=disable_mmap)
 
-            config_mapping_kwargs = _get_mapping_function_kwargs(config_mapping_fn, **kwargs)
-            diffusers_model_config = config_mapping_fn(
-                original_config=original_config, checkpoint=checkpoint, **config_mapping_kwargs
-            )
+        if cached_checkpoint is not None:
+            diffusers_model_config, diffusers_format_checkpoint = cached_checkpoint
         else:
-            if config is not None:
-                if isinstance(config, str):
-                    default_pretrained_model_config_name = config
+            if isinstance(pretrained_model_link_or_path_or_dict, dict):
+                checkpoint = pretrained_model_link_or_path_or_dict
+            else:
+                checkpoint = load_single_file_checkpoint(
+                    pretrained_model_link_or_path_or_dict,
+                    force_download=force_download,
+                    proxies=proxies,
+                    token=token,
+                    cache_dir=cache_dir,
+                    local_files_only=local_files_only,
+                    revision=revision,
+                    disable_mmap=disable_mmap,
+                )
+            if original_config is not None:
+                if "config_mapping_fn" in mapping_functions:
+                    config_mapping_fn = mapping_functions["config_mapping_fn"]
                 else:
+                    config_mapping_fn = None
+
+                if config_mapping_fn is None:
                     raise ValueError(
                         (
-                            "Invalid `config` argument. Please provide a string representing a repo id"
-                            "or path to a local Diffusers model repo."
+                            f"`original_config` has been provided for {mapping_class_name} but no mapping function"
+                            "was found to convert the original config to a Diffusers config in"
+                            "`diffusers.loaders.single_file_utils`"
                         )
                     )
 
+                if isinstance(original_config, str):
+                    # If original_config is a URL or filepath fetch the original_config dict
+                    original_config = fetch_original_config(original_config, local_files_only=local_files_only)
+
+                config_mapping_kwargs = _get_mapping_function_kwargs(config_mapping_fn, **kwargs)
+                diffusers_model_config = config_mapping_fn(
+                    original_config=original_config, checkpoint=checkpoint, **config_mapping_kwargs
+                )
             else:
-                config = fetch_diffusers_config(checkpoint)
-                default_pretrained_model_config_name = config["pretrained_model_name_or_path"]
-
-                if "default_subfolder" in mapping_functions:
-                    subfolder = mapping_functions["default_subfolder"]
-
-                subfolder = subfolder or config.pop(
-                    "subfolder", None
-                )  # some configs contain a subfolder key, e.g. StableCascadeUNet
-
-            diffusers_model_config = cls.load_config(
-                pretrained_model_name_or_path=default_pretrained_model_config_name,
-                subfolder=subfolder,
-                local_files_only=local_files_only,
-                token=token,
-                revision=config_revision,
-            )
-            expected_kwargs, optional_kwargs = cls._get_signature_keys(cls)
+                if config is not None:
+                    if isinstance(config, str):
+                        default_pretrained_model_config_name = config
+                    else:
+                        raise ValueError(
+                            (
+                                "Invalid `config` argument. Please provide a string representing a repo id"
+                                "or path to a local Diffusers model repo."
+                            )
+                        )
+
+                else:
+                    config = fetch_diffusers_config(checkpoint)
+                    default_pretrained_model_config_name = config["pretrained_model_name_or_path"]
+
+                    if "default_subfolder" in mapping_functions:
+                        subfolder = mapping_functions["default_subfolder"]
+
+                    subfolder = subfolder or config.pop(
+                        "subfolder", None
+                    )  # some configs contain a subfolder key, e.g. StableCascadeUNet
+
+                diffusers_model_config = cls.load_config(
+                    pretrained_model_name_or_path=default_pretrained_model_config_name,
+                    subfolder=subfolder,
+                    local_files_only=local_files_only,
+                    token=token,
+                    revision=config_revision,
+                )
+                expected_kwargs, optional_kwargs = cls._get_signature_keys(cls)
 
-            # Map legacy kwargs to new kwargs
-            if "legacy_kwargs" in mapping_functions:
-                legacy_kwargs = mapping_functions["legacy_kwargs"]
-                for legacy_key, new_key in legacy_kwargs.items():
-                    if legacy_key in kwargs:
-                        kwargs[new_key] = kwargs.pop(legacy_key)
+                # Map legacy kwargs to new kwargs
+                if "legacy_kwargs" in mapping_functions:
+                    legacy_kwargs = mapping_functions["legacy_kwargs"]
+                    for legacy_key, new_key in legacy_kwargs.items():
+                        if legacy_key in kwargs:
+                            kwargs[new_key] = kwargs.pop(legacy_key)
 
-            model_kwargs = {k: kwargs.get(k) for k in kwargs if k in expected_kwargs or k in optional_kwargs}
-            diffusers_model_config.update(model_kwargs)
+                model_kwargs = {k: kwargs.get(k) for k in kwargs if k in expected_kwargs or k in optional_kwargs}
+                diffusers_model_config.update(model_kwargs)
 
-        checkpoint_mapping_kwargs = _get_mapping_function_kwargs(checkpoint_mapping_fn, **kwargs)
-        diffusers_format_checkpoint = checkpoint_mapping_fn(
-            config=diffusers_model_config, checkpoint=checkpoint, **checkpoint_mapping_kwargs
-        )
-        if not diffusers_format_checkpoint:
-            raise SingleFileComponentError(
-                f"Failed to load {mapping_class_name}. Weights for this component appear to be missing in the checkpoint."
+            checkpoint_mapping_kwargs = _get_mapping_function_kwargs(checkpoint_mapping_fn, **kwargs)
+            diffusers_format_checkpoint = checkpoint_mapping_fn(
+                config=diffusers_model_config, checkpoint=checkpoint, **checkpoint_mapping_kwargs
             )
+            if not diffusers_format_checkpoint:
+                raise SingleFileComponentError(
+                    f"Failed to load {mapping_class_name}. Weights for this component appear to be missing in the checkpoint."
+                )
+
+            if conversion_cache_path is not None:
+                save_converted_checkpoint_to_cache(
+                    conversion_cache_path, diffusers_model_config, diffusers_format_checkpoint
+                )
 
         ctx = init_empty_weights if is_accelerate_available() else nullcontext
         with ctx():
@@ -409,6 +480,8 @@ class FromOriginalModelMixin:
             model.to(torch_dtype)
 
         model.eval()
+        # Weights loaded into the model directly don't go through `.to()`.
+        invalidate_placement_cache()
 
         if device_map is not None:
             device_map_kwargs = {"device_map": device_map}
@@ -15,8 +15,12 @@
 """Conversion script for the Stable Diffusion checkpoints."""
 
 import copy
+import hashlib
+import json
 import os
 import re
+import shutil
+import uuid
 from contextlib import nullcontext
 from io import BytesIO
 from urllib.parse import urlparse
@@ -37,6 +41,7 @@ from ..schedulers import (
     PNDMScheduler,
 )
 from ..utils import (
+    CONFIG_NAME,
     SAFETENSORS_WEIGHTS_NAME,
     WEIGHTS_NAME,
     deprecate,
@@ -44,6 +49,7 @@ from ..utils import (
     is_transformers_available,
     logging,
 )
+from ..utils.constants import DIFFUSERS_SINGLE_FILE_CONVERSION_CACHE
 from ..utils.hub_utils import _get_model_file
 
 
@@ -382,7 +388,7 @@ def _is_legacy_scheduler_kwargs(kwargs):
     return any(k in SCHEDULER_LEGACY_KWARGS for k in kwargs.keys())
 
 
-def load_single_file_checkpoint(
+def _resolve_single_file_checkpoint_path(
     pretrained_model_link_or_path,
     force_download=False,
     proxies=None,
@@ -390,23 +396,42 @@ def load_single_file_checkpoint(
     cache_dir=None,
     local_files_only=None,
     revision=None,
-    disable_mmap=False,
 ):
     if os.path.isfile(pretrained_model_link_or_path):
-        pretrained_model_link_or_path = pretrained_model_link_or_path
+        return pretrained_model_link_or_path
+
+    repo_id, weights_name = _extract_repo_id_and_weights_name(pretrained_model_link_or_path)
+    return _get_model_file(
+        repo_id,
+        weights_name=weights_name,
+        force_download=force_download,
+        cache_dir=cache_dir,
+        proxies=proxies,
+        local_files_only=local_files_only,
+        token=token,
+        revision=revision,
+    )
 
-    else:
-        repo_id, weights_name = _extract_repo_id_and_weights_name(pretrained_model_link_or_path)
-        pretrained_model_link_or_path = _get_model_file(
-            repo_id,
-            weights_name=weights_name,
-            force_download=force_download,
-            cache_dir=cache_dir,
-            proxies=proxies,
-            local_files_only=local_files_only,
-            token=token,
-            revision=revision,
-        )
+
+def load_single_file_checkpoint(
+    pretrained_model_link_or_path,
+    force_download=False,
+    proxies=None,
+    token=None,
+    cache_dir=None,
+    local_files_only=None,
+    revision=None,
+    disable_mmap=False,
+):
+    pretrained_model_link_or_path = _resolve_single_file_checkpoint_path(
+        pretrained_model_link_or_path,
+        force_download=force_download,
+        proxies=proxies,
+        token=token,
+        cache_dir=cache_dir,
+        local_files_only=local_files_only,
+        revision=revision,
+    )
 
     checkpoint = load_state_dict(pretrained_model_link_or_path, disable_mmap=disable_mmap)
 
@@ -417,6 +442,122 @@ def load_single_file_checkpoint(
     return checkpoint
 
 
+# Bump when the stored format of converted checkpoints changes. Conversion cache entries are also keyed by the
+# Diffusers version, so that fixes to the conversion functions invalidate them.
+_SINGLE_FILE_CONVERSION_CACHE_VERSION = "1"
+
+
+def get_single_file_checkpoint_hash(checkpoint_path, cache_dir=None):
+    """
+    Returns the SHA-256 of a single file checkpoint. Files from the Hugging Face cache are stored under their SHA-256,
+    so they are never read. The hashes of other files are computed once and memoized by path, size and modification
+    time.
+    """
+    checkpoint_path = os.path.realpath(checkpoint_path)
+    file_name = os.path.basename(checkpoint_path)
+    if re.fullmatch(r"[0-9a-f]{64}", file_name):
+        return file_name
+
+    stat = os.stat(checkpoint_path)
+    file_id = f"{checkpoint_path}:{stat.st_size}:{stat.st_mtime_ns}"
+    cache_dir = cache_dir or DIFFUSERS_SINGLE_FILE_CONVERSION_CACHE
+    memo_path = os.path.join(cache_dir, "file_hashes", hashlib.sha256(file_id.encode()).hexdigest())
+    if os.path.isfile(memo_path):
+        with open(memo_path, "r") as f:
+            return f.read().strip()
+
+    sha256 = hashlib.sha256()
+    with open(checkpoint_path, "rb") as f:
+        for chunk in iter(lambda: f.read(16 * 1024 * 1024), b""):
+            sha256.update(chunk)
+    checkpoint_hash = sha256.hexdigest()
+
+    try:
+        os.makedirs(os.path.dirname(memo_path), exist_ok=True)
+        with open(memo_path, "w") as f:
+            f.write(checkpoint_hash)
+    except OSError as e:
+        logger.warning(f"Could not memoize the hash of {checkpoint_path}: {e}")
+    return checkpoint_hash
+
+
+def get_single_file_conversion_cache_path(
+    checkpoint_hash, mapping_class_name, checkpoint_mapping_fn, cache_dir=None, **conversion_kwargs
+):
+    """
+    Returns the directory of the conversion cache entry of a checkpoint. Entries are keyed by the checkpoint hash, the
+    conversion function, the Diffusers version and every argument that can change the converted config or weights.
+    """
+    from .. import __version__
+
+    key = json.dumps(
+        {
+            "cache_version": _SINGLE_FILE_CONVERSION_CACHE_VERSION,
+            "diffusers_version": __version__,
+            "mapping_class_name": mapping_class_name,
+            "checkpoint_mapping_fn": f"{checkpoint_mapping_fn.__module__}.{checkpoint_mapping_fn.__qualname__}",
+            **conversion_kwargs,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    cache_dir = cache_dir or DIFFUSERS_SINGLE_FILE_CONVERSION_CACHE
+    return os.path.join(cache_dir, checkpoint_hash, hashlib.sha256(key.encode()).hexdigest()[:32])
+
+
+def load_converted_checkpoint_from_cache(cache_path, disable_mmap=False):
+    """
+    Returns the Diffusers config and the memory-mapped Diffusers format state dict stored in a conversion cache entry,
+    or `None` if the entry doesn't exist.
+    """
+    config_path = os.path.join(cache_path, CONFIG_NAME)
+    weights_path = os.path.join(cache_path, SAFETENSORS_WEIGHTS_NAME)
+    if not (os.path.isfile(config_path) and os.path.isfile(weights_path)):
+        return None
+
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        checkpoint = load_state_dict(weights_path, disable_mmap=disable_mmap)
+    except Exception as e:
+        logger.warning(f"Ignoring the corrupted conversion cache entry {cache_path}: {e}")
+        return None
+
+    logger.info(f"Loading the converted checkpoint from {cache_path}.")
+    return config, checkpoint
+
+
+def save_converted_checkpoint_to_cache(cache_path, config, checkpoint):
+    """
+    Stores a Diffusers config and a Diffusers format state dict in a conversion cache entry. The entry is written to a
+    temporary directory first and then renamed, so concurrent loads never see a partially written entry. Failures are
+    logged and otherwise ignored, since the cache is only an optimization.
+    """
+    import safetensors.torch
+
+    if os.path.isdir(cache_path):
+        return
+
+    tmp_path = f"{cache_path}.tmp-{uuid.uuid4().hex}"
+    try:
+        os.makedirs(tmp_path)
+        with open(os.path.join(tmp_path, CONFIG_NAME), "w", encoding="utf-8") as f:
+            json.dump(dict(config), f, indent=2, sort_keys=True, default=str)
+        safetensors.torch.save_file(
+            {k: v.contiguous() for k, v in checkpoint.items()},
+            os.path.join(tmp_path, SAFETENSORS_WEIGHTS_NAME),
+            metadata={"format": "pt"},
+        )
+        os.rename(tmp_path, cache_path)
+        logger.info(f"Stored the converted checkpoint in {cache_path}.")
+    except Exception as e:
+        # Another process may have stored the same entry in the meantime.
+        if not os.path.isdir(cache_path):
+            logger.warning(f"Could not store the converted checkpoint in {cache_path}: {e}")
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
 def fetch_original_config(original_config_file, local_files_only=False):
     if os.path.isfile(original_config_file):
         with open(original_config_file, "r") as fp:
@@ -0,0 +1,773 @@
+# Copyright 2025 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import contextlib
+import math
+import time
+from enum import Enum
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple, Union
+
+import torch
+import torch.distributed as dist
+import torch.nn.functional as F
+
+from ..utils import is_torch_version, logging
+from ..utils.import_utils import is_xformers_available
+
+
+logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
+
+if is_xformers_available():
+    import xformers
+    import xformers.ops
+else:
+    xformers = None
+
+if is_torch_version(">=", "2.3.0"):
+    from torch.nn.attention import SDPBackend, sdpa_kernel
+else:
+    SDPBackend = None
+    sdpa_kernel = None
+
+if TYPE_CHECKING:
+    from ..hooks.context_parallel import ContextParallelConfig
+
+
+class AttentionBackendName(str, Enum):
+    r"""
+    Names of the attention backends that can be selected through [`set_attention_backend`] or
+    [`attention_backend`].
+    """
+
+    # Let PyTorch's `scaled_dot_product_attention` pick a kernel. This is the default.
+    NATIVE = "native"
+    # Force a specific `scaled_dot_product_attention` kernel.
+    NATIVE_MATH = "_native_math"
+    NATIVE_EFFICIENT = "_native_efficient"
+    NATIVE_FLASH = "_native_flash"
+    # Memory-efficient attention from xFormers.
+    XFORMERS = "xformers"
+    # Pure PyTorch attention that tiles the query and key sequences (with an online softmax over key tiles) so that its
+    # working memory stays within a configurable budget.
+    NATIVE_CHUNKED = "_native_chunked"
+    # Select a backend per call from the tensor shapes, dtype, device and mask.
+    AUTO = "auto"
+
+
+# Default upper bound, in bytes, of the working memory used by a single tile of the chunked backend. With the `auto`
+# backend, inputs on CPU whose full score matrix exceeds the budget are routed to the chunked backend.
+_CHUNKED_ATTENTION_MEMORY_BUDGET = 512 * 1024**2
+
+
+class _AttentionBackendRegistry:
+    _backends: Dict[AttentionBackendName, Callable] = {}
+    _constraints: Dict[AttentionBackendName, List[Callable]] = {}
+    _active_backend: AttentionBackendName = AttentionBackendName.NATIVE
+    _autotune: bool = False
+    _autotune_cache: Dict[Tuple, AttentionBackendName] = {}
+    _memory_budget: Optional[int] = None
+
+    @classmethod
+    def register(cls, backend: AttentionBackendName, constraints: Optional[List[Callable]] = None):
+        def decorator(func):
+            cls._backends[backend] = func
+            cls._constraints[backend] = constraints or []
+            return func
+
+        return decorator
+
+    @classmethod
+    def get_active_backend(cls) -> AttentionBackendName:
+        return cls._active_backend
+
+    @classmethod
+    def list_backends(cls) -> List[AttentionBackendName]:
+        return list(cls._backends.keys())
+
+    @classmethod
+    def is_supported(cls, backend: AttentionBackendName, **kwargs) -> bool:
+        return all(constraint(**kwargs) for constraint in cls._constraints[backend])
+
+
+def set_attention_backend(
+    backend: Union[str, AttentionBackendName] = AttentionBackendName.NATIVE,
+    autotune: bool = False,
+    memory_budget: Optional[int] = None,
+) -> None:
+    r"""
+    Sets the attention backend used by the attention processors that route through [`dispatch_attention_fn`].
+
+    Args:
+        backend (`str` or [`AttentionBackendName`], defaults to `"native"`):
+            The backend to use. With `"auto"`, a backend is selected for every call based on the head dimension,
+            sequence lengths, dtype, device and presence of an attention mask.
+        autotune (`bool`, defaults to `False`):
+            Only used with `"auto"`. When enabled, the first call for every new input signature benchmarks all
+            eligible backends and caches the fastest one for subsequent calls with the same signature.
+        memory_budget (`int`, *optional*):
+            The maximum number of bytes of working memory the `"_native_chunked"` backend may use per tile. Query and
+            key chunk sizes are derived from it, which allows attention over sequences whose full score matrix does
+            not fit in memory. With `"auto"`, CPU inputs whose score matrix exceeds the budget use the chunked
+            backend. Defaults to 512 MiB.
+    """
+    backend = AttentionBackendName(backend)
+    if memory_budget is not None and memory_budget <= 0:
+        raise ValueError(f"`memory_budget` must be a positive number of bytes, but got {memory_budget}.")
+    if backend == AttentionBackendName.XFORMERS and not is_xformers_available():
+        raise ValueError("The `xformers` attention backend requires `xformers` to be installed.")
+    if backend in (
+        AttentionBackendName.NATIVE_MATH,
+        AttentionBackendName.NATIVE_EFFICIENT,
+        AttentionBackendName.NATIVE_FLASH,
+    ) and not is_torch_version(">=", "2.3.0"):
+        raise ValueError(f"The `{backend.value}` attention backend requires PyTorch 2.3 or higher.")
+
+    _AttentionBackendRegistry._active_backend = backend
+    _AttentionBackendRegistry._autotune = autotune
+    _AttentionBackendRegistry._autotune_cache.clear()
+    _AttentionBackendRegistry._memory_budget = memory_budget
+
+
+def get_attention_backend() -> AttentionBackendName:
+    r"""Returns the currently active attention backend."""
+    return _AttentionBackendRegistry.get_active_backend()
+
+
+def _get_memory_budget() -> int:
+    if _AttentionBackendRegistry._memory_budget is not None:
+        return _AttentionBackendRegistry._memory_budget
+    return _CHUNKED_ATTENTION_MEMORY_BUDGET
+
+
+@contextlib.contextmanager
+def attention_backend(
+    backend: Union[str, AttentionBackendName] = AttentionBackendName.NATIVE,
+    autotune: bool = False,
+    memory_budget: Optional[int] = None,
+):
+    r"""
+    Context manager to temporarily set the attention backend. Accepts the same arguments as
+    [`set_attention_backend`].
+
+    Example:
+
+    ```python
+    >>> from diffusers import attention_backend
+
+    >>> with attention_backend("auto"):
+    ...     image = pipe(prompt).images[0]
+    ```
+    """
+    old_backend = _AttentionBackendRegistry._active_backend
+    old_autotune = _AttentionBackendRegistry._autotune
+    old_cache = dict(_AttentionBackendRegistry._autotune_cache)
+    old_memory_budget = _AttentionBackendRegistry._memory_budget
+    set_attention_backend(backend, autotune=autotune, memory_budget=memory_budget)
+    try:
+        yield
+    finally:
+        _AttentionBackendRegistry._active_backend = old_backend
+        _AttentionBackendRegistry._autotune = old_autotune
+        _AttentionBackendRegistry._autotune_cache = old_cache
+        _AttentionBackendRegistry._memory_budget = old_memory_budget
+
+
+def dispatch_attention_fn(
+    query: torch.Tensor,
+    key: torch.Tensor,
+    value: torch.Tensor,
+    attn_mask: Optional[torch.Tensor] = None,
+    dropout_p: float = 0.0,
+    is_causal: bool = False,
+    scale: Optional[float] = None,
+    backend: Optional[Union[str, AttentionBackendName]] = None,
+    context_parallel_config: Optional["ContextParallelConfig"] = None,
+) -> torch.Tensor:
+    r"""
+    Computes attention with the selected backend. Inputs and output follow the layout of
+    `torch.nn.functional.scaled_dot_product_attention`, i.e. `(batch_size, num_heads, sequence_length, head_dim)`.
+
+    Args:
+        query (`torch.Tensor`):
+            The query tensor.
+        key (`torch.Tensor`):
+            The key tensor.
+        value (`torch.Tensor`):
+            The value tensor.
+        attn_mask (`torch.Tensor`, *optional*):
+            A boolean or additive mask broadcastable to `(batch_size, num_heads, query_length, key_length)`.
+        dropout_p (`float`, defaults to `0.0`):
+            The dropout probability.
+        is_causal (`bool`, defaults to `False`):
+            Whether to apply a causal mask.
+        scale (`float`, *optional*):
+            The scale applied to the attention scores. Defaults to `1 / sqrt(head_dim)`.
+        backend (`str` or [`AttentionBackendName`], *optional*):
+            Overrides the globally active backend for this call.
+        context_parallel_config ([`~hooks.ContextParallelConfig`], *optional*):
+            When passed, the inputs only hold the local shard of the sequence of this rank and attention is computed
+            over the sequences of all ranks of the config's process group, with all-to-all (Ulysses) or ring
+            communication. Only masks over the keys, of shape `(batch_size, 1, 1, key_length)`, are supported.
+    """
+    backend = AttentionBackendName(backend) if backend is not None else _AttentionBackendRegistry._active_backend
+    kwargs = {
+        "query": query,
+        "key": key,
+        "value": value,
+        "attn_mask": attn_mask,
+        "dropout_p": dropout_p,
+        "is_causal": is_causal,
+        "scale": scale,
+    }
+
+    if context_parallel_config is not None and context_parallel_config.world_size > 1:
+        if context_parallel_config.mode == "ring":
+            return _ring_attention(backend, context_parallel_config, **kwargs)
+        return _ulysses_attention(backend, context_parallel_config, **kwargs)
+
+    return _run_attention_backend(backend, **kwargs)
+
+
+def _run_attention_backend(backend: AttentionBackendName, **kwargs) -> torch.Tensor:
+    if backend == AttentionBackendName.AUTO:
+        backend = _select_attention_backend(**kwargs)
+    return _AttentionBackendRegistry._backends[backend](**kwargs)
+
+
+def _select_attention_backend(**kwargs) -> AttentionBackendName:
+    candidates = [
+        backend
+        for backend in _AUTO_BACKEND_PRIORITY.get(kwargs["query"].device.type, _AUTO_BACKEND_PRIORITY["default"])
+        if _AttentionBackendRegistry.is_supported(backend, **kwargs)
+    ]
+    if len(candidates) == 0:
+        return AttentionBackendName.NATIVE
+
+    if not _AttentionBackendRegistry._autotune or len(candidates) == 1 or torch.compiler.is_compiling():
+        return candidates[0]
+
+    signature = _get_input_signature(**kwargs)
+    backend = _AttentionBackendRegistry._autotune_cache.get(signature, None)
+    if backend is None:
+        backend = _autotune_attention_backend(candidates, **kwargs)
+        _AttentionBackendRegistry._autotune_cache[signature] = backend
+        logger.debug(f"Selected attention backend `{backend.value}` for {signature}.")
+    return backend
+
+
+def _get_input_signature(query, key, value, attn_mask, dropout_p, is_causal, scale) -> Tuple:
+    mask_signature = None if attn_mask is None else (tuple(attn_mask.shape), attn_mask.dtype)
+    return (
+        query.device.type,
+        query.dtype,
+        tuple(query.shape),
+        tuple(key.shape),
+        tuple(value.shape),
+        mask_signature,
+        dropout_p > 0.0,
+        is_causal,
+    )
+
+
+@torch.no_grad()
+def _autotune_attention_backend(
+    candidates: List[AttentionBackendName], num_warmup: int = 1, num_iterations: int = 3, **kwargs
+) -> AttentionBackendName:
+    device = kwargs["query"].device
+    device_module = getattr(torch, device.type, None)
+
+    def synchronize():
+        if device.type != "cpu" and hasattr(device_module, "synchronize"):
+            device_module.synchronize()
+
+    timings = {}
+    for backend in candidates:
+        fn = _AttentionBackendRegistry._backends[backend]
+        try:
+            for _ in range(num_warmup):
+                fn(**kwargs)
+            synchronize()
+            start = time.perf_counter()
+            for _ in range(num_iterations):
+                fn(**kwargs)
+            synchronize()
+            timings[backend] = (time.perf_counter() - start) / num_iterations
+        except RuntimeError as e:
+            # A kernel may refuse inputs that passed our checks (e.g. unsupported GPU architecture).
+            logger.debug(f"Attention backend `{backend.value}` failed during autotuning: {e}")
+
+    if len(timings) == 0:
+        return AttentionBackendName.NATIVE
+    return min(timings, key=timings.get)
+
+
+# ===== Constraints =====
+
+
+def _check_no_mask(attn_mask, **kwargs) -> bool:
+    return attn_mask is None
+
+
+def _check_no_dropout(dropout_p, **kwargs) -> bool:
+    return dropout_p == 0.0
+
+
+def _check_half_precision(query, **kwargs) -> bool:
+    return query.dtype in (torch.float16, torch.bfloat16)
+
+
+def _check_flash_head_dim(query, **kwargs) -> bool:
+    head_dim = query.shape[-1]
+    return head_dim <= 256 and head_dim % 8 == 0
+
+
+def _check_cuda(query, **kwargs) -> bool:
+    return query.device.type == "cuda"
+
+
+def _check_sdpa_kernel_available(**kwargs) -> bool:
+    return sdpa_kernel is not None
+
+
+def _check_xformers_available(**kwargs) -> bool:
+    return is_xformers_available()
+
+
+def _check_same_num_heads(query, key, value, **kwargs) -> bool:
+    return query.shape[1] == key.shape[1] == value.shape[1]
+
+
+def _check_exceeds_chunked_budget(query, key, **kwargs) -> bool:
+    batch_size, num_heads, query_length, _ = query.shape
+    key_length = key.shape[-2]
+    score_bytes = batch_size * num_heads * query_length * key_length * query.element_size()
+    return score_bytes > _get_memory_budget()
+
+
+# Backends tried by `auto`, in order of preference, for each device type. The first backend whose constraints are
+# satisfied is used, unless autotuning is enabled.
+_AUTO_BACKEND_PRIORITY = {
+    "cuda": [
+        AttentionBackendName.NATIVE_FLASH,
+        AttentionBackendName.XFORMERS,
+        AttentionBackendName.NATIVE_EFFICIENT,
+        AttentionBackendName.NATIVE,
+    ],
+    "cpu": [
+        AttentionBackendName.NATIVE_CHUNKED,
+        AttentionBackendName.NATIVE,
+    ],
+    "default": [AttentionBackendName.NATIVE],
+}
+
+
+# ===== Backends =====
+
+
+def _sdpa(query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None) -> torch.Tensor:
+    # `scale` is only accepted from PyTorch 2.1 onwards, so only forward it when it is set.
+    scale_kwargs = {"scale": scale} if scale is not None else {}
+    return F.scaled_dot_product_attention(
+        query, key, value, attn_mask=attn_mask, dropout_p=dropout_p, is_causal=is_causal, **scale_kwargs
+    )
+
+
+@_AttentionBackendRegistry.register(AttentionBackendName.NATIVE)
+def _native_attention(query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None) -> torch.Tensor:
+    return _sdpa(query, key, value, attn_mask, dropout_p, is_causal, scale)
+
+
+def _sdpa_with_kernel(backend, query, key, value, attn_mask, dropout_p, is_causal, scale) -> torch.Tensor:
+    with sdpa_kernel(backend):
+        return _sdpa(query, key, value, attn_mask, dropout_p, is_causal, scale)
+
+
+@_AttentionBackendRegistry.register(AttentionBackendName.NATIVE_MATH, constraints=[_check_sdpa_kernel_available])
+def _native_math_attention(
+    query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None
+) -> torch.Tensor:
+    return _sdpa_with_kernel(SDPBackend.MATH, query, key, value, attn_mask, dropout_p, is_causal, scale)
+
+
+@_AttentionBackendRegistry.register(
+    AttentionBackendName.NATIVE_EFFICIENT, constraints=[_check_sdpa_kernel_available, _check_cuda]
+)
+def _native_efficient_attention(
+    query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None
+) -> torch.Tensor:
+    return _sdpa_with_kernel(SDPBackend.EFFICIENT_ATTENTION, query, key, value, attn_mask, dropout_p, is_causal, scale)
+
+
+@_AttentionBackendRegistry.register(
+    AttentionBackendName.NATIVE_FLASH,
+    constraints=[
+        _check_sdpa_kernel_available,
+        _check_cuda,
+        _check_no_mask,
+        _check_half_precision,
+        _check_flash_head_dim,
+        _check_same_num_heads,
+    ],
+)
+def _native_flash_attention(
+    query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None
+) -> torch.Tensor:
+    return _sdpa_with_kernel(SDPBackend.FLASH_ATTENTION, query, key, value, attn_mask, dropout_p, is_causal, scale)
+
+
+@_AttentionBackendRegistry.register(
+    AttentionBackendName.XFORMERS,
+    constraints=[_check_xformers_available, _check_cuda, _check_no_mask, _check_same_num_heads],
+)
+def _xformers_attention(query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None) -> torch.Tensor:
+    # xFormers expects (batch_size, sequence_length, num_heads, head_dim)
+    query, key, value = (x.transpose(1, 2) for x in (query, key, value))
+
+    attn_bias = None
+    if is_causal:
+        attn_bias = xformers.ops.LowerTriangularMask()
+    elif attn_mask is not None:
+        if attn_mask.dtype == torch.bool:
+            attn_mask = torch.zeros_like(attn_mask, dtype=query.dtype).masked_fill(~attn_mask, float("-inf"))
+        batch_size, query_length, num_heads, _ = query.shape
+        attn_bias = attn_mask.to(query.dtype).expand(batch_size, num_heads, query_length, key.shape[1])
+
+    out = xformers.ops.memory_efficient_attention(query, key, value, attn_bias=attn_bias, p=dropout_p, scale=scale)
+    return out.transpose(1, 2)
+
+
+def _get_chunk_sizes(
+    batch_heads: int, query_length: int, key_length: int, value_dim: int, memory_budget: int
+) -> Tuple[int, int]:
+    r"""
+    Returns the `(query_chunk_size, key_chunk_size)` whose float32 working set fits in `memory_budget` bytes. The
+    working set of a tile is its score and probability matrices plus the running output and softmax statistics of
+    the query chunk. Keys are only split when not even a single query row fits with all keys at once.
+    """
+    bytes_per_query_row = batch_heads * 4 * (2 * key_length + value_dim + 2)
+    query_chunk_size = memory_budget // bytes_per_query_row
+    if query_chunk_size >= 1:
+        return min(query_length, query_chunk_size), key_length
+
+    # Use roughly square tiles (2 * t * t score entries per head), while keeping the per-query accumulators of
+    # `value_dim + 2` entries within half of the budget.
+    elements = memory_budget / (batch_heads * 4)
+    tile = int(math.sqrt(max(elements, 1) / 2))
+    max_accumulator_rows = int(elements // (2 * (value_dim + 2)))
+    query_chunk_size = max(1, min(query_length, tile, max_accumulator_rows))
+    key_chunk_size = int((elements - query_chunk_size * (value_dim + 2)) // (2 * query_chunk_size))
+    return query_chunk_size, max(1, min(key_length, key_chunk_size))
+
+
+def _slice_mask(attn_mask: Optional[torch.Tensor], dim: int, start: int, end: int) -> Optional[torch.Tensor]:
+    if attn_mask is None or attn_mask.ndim < -dim or attn_mask.shape[dim] == 1:
+        return attn_mask
+    return attn_mask.narrow(dim, start, end - start)
+
+
+def _causal_mask(
+    query_start: int, query_length: int, key_start: int, key_end: int, device: torch.device
+) -> torch.Tensor:
+    # The tile `[query_start:query_start + query_length, key_start:key_end]` of a lower triangular causal mask.
+    query_index = torch.arange(query_start, query_start + query_length, device=device)
+    key_index = torch.arange(key_start, key_end, device=device)
+    return key_index[None, :] <= query_index[:, None]
+
+
+def _online_softmax_attention(
+    query: torch.Tensor,
+    key: torch.Tensor,
+    value: torch.Tensor,
+    attn_mask: Optional[torch.Tensor],
+    scale: float,
+    key_chunk_size: int,
+    causal_query_offset: Optional[int] = None,
+    return_lse: bool = False,
+) -> Union[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
+    # Flash-attention style accumulation over key chunks: keep a running max and normalizer per query so that the
+    # full (query_length, key_length) score matrix is never materialized. With `causal_query_offset`, the queries are
+    # rows `causal_query_offset:` of a causal attention, whose mask is built per tile and whose fully masked key
+    # chunks are skipped. With `return_lse`, the float32 output is returned with the log-sum-exp of the scores of every
+    # query, which is `-inf` for queries whose keys are all masked.
+    query_length = query.shape[-2]
+    key_length = key.shape[-2]
+    if causal_query_offset is not None:
+        key_length = min(key_length, causal_query_offset + query_length)
+
+    query = query.float() * scale
+    running_max = query.new_full((*query.shape[:-1], 1), float("-inf"))
+    running_sum = query.new_zeros((*query.shape[:-1], 1))
+    output = query.new_zeros((*query.shape[:-1], value.shape[-1]))
+
+    for start in range(0, key_length, key_chunk_size):
+        end = min(start + key_chunk_size, key_length)
+        scores = query @ key[:, :, start:end].float().transpose(-1, -2)
+
+        if causal_query_offset is not None:
+            mask_chunk = _causal_mask(causal_query_offset, query_length, start, end, query.device)
+        else:
+            mask_chunk = _slice_mask(attn_mask, -1, start, end)
+        if mask_chunk is not None:
+            if mask_chunk.dtype == torch.bool:
+                scores = scores.masked_fill(~mask_chunk, float("-inf"))
+            else:
+                scores = scores + mask_chunk.float()
+
+        new_max = torch.maximum(running_max, scores.amax(dim=-1, keepdim=True))
+        # Rows that are fully masked so far have a max of -inf; shift them by zero instead to avoid NaNs.
+        safe_max = torch.where(torch.isinf(new_max), torch.zeros_like(new_max), new_max)
+        probs = torch.exp(scores - safe_max)
+        correction = torch.exp(running_max - safe_max)
+
+        running_sum = running_sum * correction + probs.sum(dim=-1, keepdim=True)
+        output = output * correction + probs @ value[:, :, start:end].float()
+        running_max = new_max
+
+    output = output / running_sum.clamp_min(torch.finfo(output.dtype).tiny)
+    if return_lse:
+        return output, running_max + running_sum.log()
+    return output
+
+
+@_AttentionBackendRegistry.register(
+    AttentionBackendName.NATIVE_CHUNKED, constraints=[_check_no_dropout, _check_exceeds_chunked_budget]
+)
+def _native_chunked_attention(
+    query, key, value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None
+) -> torch.Tensor:
+    batch_size, num_heads, query_length, head_dim = query.shape
+    key_length = key.shape[-2]
+    scale = scale if scale is not None else 1 / math.sqrt(head_dim)
+    query_chunk_size, key_chunk_size = _get_chunk_sizes(
+        batch_size * num_heads, query_length, key_length, value.shape[-1], _get_memory_budget()
+    )
+
+    output = torch.empty((*query.shape[:-1], value.shape[-1]), dtype=query.dtype, device=query.device)
+    for start in range(0, query_length, query_chunk_size):
+        end = min(start + query_chunk_size, query_length)
+        query_chunk = query[:, :, start:end]
+        if key_chunk_size == key_length:
+            # The whole key sequence fits, so let SDPA compute the exact attention for this query chunk. A causal
+            # mask is only built for the tile, without the keys after the last query that are masked for all rows.
+            if is_causal:
+                causal_end = min(key_length, end)
+                mask_chunk = _causal_mask(start, end - start, 0, causal_end, query.device)
+                output[:, :, start:end] = _sdpa(
+                    query_chunk, key[:, :, :causal_end], value[:, :, :causal_end], mask_chunk, dropout_p, scale=scale
+                )
+            else:
+                mask_chunk = _slice_mask(attn_mask, -2, start, end)
+                output[:, :, start:end] = _sdpa(query_chunk, key, value, mask_chunk, dropout_p, scale=scale)
+        else:
+            output[:, :, start:end] = _online_softmax_attention(
+                query_chunk,
+                key,
+                value,
+                None if is_causal else _slice_mask(attn_mask, -2, start, end),
+                scale,
+                key_chunk_size,
+                causal_query_offset=start if is_causal else None,
+            ).to(query.dtype)
+    return output
+
+
+# ===== Context parallelism =====
+
+
+def _all_gather(tensor: torch.Tensor, dim: int, group: Optional["dist.ProcessGroup"], world_size: int) -> torch.Tensor:
+    dtype = tensor.dtype
+    if dtype == torch.bool:
+        # Gloo can't communicate boolean tensors.
+        tensor = tensor.to(torch.uint8)
+    tensor = tensor.contiguous()
+    gathered = [torch.empty_like(tensor) for _ in range(world_size)]
+    dist.all_gather(gathered, tensor, group=group)
+    return torch.cat(gathered, dim=dim).to(dtype)
+
+
+def _all_to_all(tensor: torch.Tensor, group: Optional["dist.ProcessGroup"]) -> torch.Tensor:
+    # Chunk `i` of the first dimension is sent to rank `i`, and chunk `i` of the output is received from rank `i`.
+    tensor = tensor.contiguous()
+    output = torch.empty_like(tensor)
+    dist.all_to_all_single(output, tensor, group=group)
+    return output
+
+
+def _gather_key_mask(attn_mask: Optional[torch.Tensor], config: "ContextParallelConfig") -> Optional[torch.Tensor]:
+    if attn_mask is None:
+        return None
+    if attn_mask.ndim != 4 or attn_mask.shape[1] != 1 or attn_mask.shape[2] != 1:
+        raise ValueError(
+            "Context parallel attention only supports masks over the keys, of shape `(batch_size, 1, 1, key_length)`,"
+            f" but got a mask of shape {tuple(attn_mask.shape)}."
+        )
+    return _all_gather(attn_mask, -1, config.process_group, config.world_size)
+
+
+def _check_context_parallel_inputs(dropout_p: float, is_causal: bool) -> None:
+    if is_causal:
+        raise ValueError("Causal attention is not supported with context parallelism.")
+    if dropout_p > 0.0:
+        raise ValueError("Attention dropout is not supported with context parallelism.")
+
+
+def _ulysses_attention(
+    backend: AttentionBackendName,
+    config: "ContextParallelConfig",
+    query,
+    key,
+    value,
+    attn_mask=None,
+    dropout_p=0.0,
+    is_causal=False,
+    scale=None,
+) -> torch.Tensor:
+    # Every rank exchanges heads for sequence shards, computes attention over the full sequence for
+    # `num_heads / world_size` heads, and the inverse exchange restores the local sequence shard with all heads.
+    _check_context_parallel_inputs(dropout_p, is_causal)
+    world_size, group = config.world_size, config.process_group
+    num_heads = query.shape[1]
+    if num_heads % world_size != 0 or key.shape[1] % world_size != 0:
+        raise ValueError(
+            f"Ulysses attention requires the number of heads ({num_heads}) to be divisible by the number of context"
+            f" parallel ranks ({world_size}). Please use `mode='ring'` instead."
+        )
+
+    def heads_to_sequence(x: torch.Tensor) -> torch.Tensor:
+        batch_size, heads, seq_len, head_dim = x.shape
+        x = x.reshape(batch_size, world_size, heads // world_size, seq_len, head_dim).transpose(0, 1)
+        x = _all_to_all(x, group)
+        # [world_size, B, H / world_size, S, D] -> [B, H / world_size, world_size * S, D]
+        return x.permute(1, 2, 0, 3, 4).reshape(batch_size, heads // world_size, world_size * seq_len, head_dim)
+
+    def sequence_to_heads(x: torch.Tensor) -> torch.Tensor:
+        batch_size, heads, seq_len, head_dim = x.shape
+        x = x.reshape(batch_size, heads, world_size, seq_len // world_size, head_dim).permute(2, 0, 1, 3, 4)
+        x = _all_to_all(x, group)
+        # [world_size, B, H / world_size, S / world_size, D] -> [B, H, S / world_size, D]
+        return x.transpose(0, 1).reshape(batch_size, heads * world_size, seq_len // world_size, head_dim)
+
+    output = _run_attention_backend(
+        backend,
+        query=heads_to_sequence(query),
+        key=heads_to_sequence(key),
+        value=heads_to_sequence(value),
+        attn_mask=_gather_key_mask(attn_mask, config),
+        dropout_p=dropout_p,
+        is_causal=is_causal,
+        scale=scale,
+    )
+    return sequence_to_heads(output)
+
+
+def _attention_with_lse(
+    backend: AttentionBackendName,
+    query: torch.Tensor,
+    key: torch.Tensor,
+    value: torch.Tensor,
+    attn_mask: Optional[torch.Tensor],
+    scale: float,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    # Returns the float32 attention output and the log-sum-exp of the scores of every query, without materializing the
+    # score matrix. The memory-efficient SDPA kernel returns both, but doesn't handle fully masked queries the same way
+    # on all versions, so masked attention and the chunked and math backends use the chunked online softmax.
+    if (
+        backend not in (AttentionBackendName.NATIVE_CHUNKED, AttentionBackendName.NATIVE_MATH)
+        and attn_mask is None
+        and query.is_cuda
+        and query.shape[-1] % 8 == 0
+        and hasattr(torch.ops.aten, "_scaled_dot_product_efficient_attention")
+    ):
+        output, lse = torch.ops.aten._scaled_dot_product_efficient_attention(
+            query, key, value, None, True, scale=scale
+        )[:2]
+        # The log-sum-exp may be padded along the query dimension.
+        return output.float(), lse[..., : query.shape[-2]].unsqueeze(-1).float()
+
+    batch_size, num_heads, query_length, _ = query.shape
+    query_chunk_size, key_chunk_size = _get_chunk_sizes(
+        batch_size * num_heads, query_length, key.shape[-2], value.shape[-1], _get_memory_budget()
+    )
+    outputs, lses = [], []
+    for start in range(0, query_length, query_chunk_size):
+        end = min(start + query_chunk_size, query_length)
+        output, lse = _online_softmax_attention(
+            query[:, :, start:end],
+            key,
+            value,
+            _slice_mask(attn_mask, -2, start, end),
+            scale,
+            key_chunk_size,
+            return_lse=True,
+        )
+        outputs.append(output)
+        lses.append(lse)
+    return torch.cat(outputs, dim=-2), torch.cat(lses, dim=-2)
+
+
+def _ring_attention(
+    backend: AttentionBackendName,
+    config: "ContextParallelConfig",
+    query,
+    key,
+    value,
+    attn_mask=None,
+    dropout_p=0.0,
+    is_causal=False,
+    scale=None,
+) -> torch.Tensor:
+    # The key and value shards travel around the ring of ranks, while every rank keeps its query shard and merges the
+    # attention over each incoming shard with the running output through their log-sum-exp. The next shard is being
+    # exchanged while the current one is processed.
+    _check_context_parallel_inputs(dropout_p, is_causal)
+    world_size, rank, group = config.world_size, config.rank, config.process_group
+    scale = scale if scale is not None else 1 / math.sqrt(query.shape[-1])
+    key_length = key.shape[-2]
+    attn_mask = _gather_key_mask(attn_mask, config)
+
+    ranks = dist.get_process_group_ranks(group) if group is not None else list(range(world_size))
+    send_to, receive_from = ranks[(rank + 1) % world_size], ranks[(rank - 1) % world_size]
+    key, value = key.contiguous(), value.contiguous()
+
+    output, lse = None, None
+    for step in range(world_size):
+        if step < world_size - 1:
+            next_key, next_value = torch.empty_like(key), torch.empty_like(value)
+            requests = dist.batch_isend_irecv(
+                [
+                    dist.P2POp(dist.isend, key, send_to, group),
+                    dist.P2POp(dist.isend, value, send_to, group),
+                    dist.P2POp(dist.irecv, next_key, receive_from, group),
+                    dist.P2POp(dist.irecv, next_value, receive_from, group),
+                ]
+            )
+
+        # At step `i`, the shard of rank `rank - i` is processed.
+        source = (rank - step) % world_size
+        mask = _slice_mask(attn_mask, -1, source * key_length, (source + 1) * key_length)
+        block_output, block_lse = _attention_with_lse(backend, query, key, value, mask, scale)
+        if output is None:
+            output, lse = block_output, block_lse
+        else:
+            new_lse = torch.logaddexp(lse, block_lse)
+            safe_lse = torch.where(torch.isinf(new_lse), torch.zeros_like(new_lse), new_lse)
+            output = output * torch.exp(lse - safe_lse) + block_output * torch.exp(block_lse - safe_lse)
+            lse = new_lse
+
+        if step < world_size - 1:
+            for request in requests:
+                request.wait()
+            key, value = next_key, next_value
+
+    return output.to(query.dtype)
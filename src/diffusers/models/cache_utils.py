@@ -24,6 +24,8 @@ class CacheMixin:
 
     Supported caching techniques:
         - [Pyramid Attention Broadcast](https://huggingface.co/papers/2408.12588)
+        - [DeepCache](https://huggingface.co/papers/2312.00858)
+        - ControlNet residual caching
     """
 
     _cache_config = None
@@ -37,9 +39,11 @@ class CacheMixin:
         Enable caching techniques on the model.
 
         Args:
-            config (`Union[PyramidAttentionBroadcastConfig]`):
+            config (`Union[PyramidAttentionBroadcastConfig, DeepCacheConfig, ControlNetCacheConfig]`):
                 The configuration for applying the caching technique. Currently supported caching techniques are:
                     - [`~hooks.PyramidAttentionBroadcastConfig`]
+                    - [`~hooks.DeepCacheConfig`] (UNet models only)
+                    - [`~hooks.ControlNetCacheConfig`] (ControlNet models only)
 
         Example:
 
@@ -59,17 +63,28 @@ class CacheMixin:
         ```
         """
 
-        from ..hooks import PyramidAttentionBroadcastConfig, apply_pyramid_attention_broadcast
+        from ..hooks import (
+            ControlNetCacheConfig,
+            DeepCacheConfig,
+            PyramidAttentionBroadcastConfig,
+            apply_controlnet_cache,
+            apply_deep_cache,
+            apply_pyramid_attention_broadcast,
+        )
 
         if isinstance(config, PyramidAttentionBroadcastConfig):
             apply_pyramid_attention_broadcast(self, config)
+        elif isinstance(config, DeepCacheConfig):
+            apply_deep_cache(self, config)
+        elif isinstance(config, ControlNetCacheConfig):
+            apply_controlnet_cache(self, config)
         else:
             raise ValueError(f"Cache config {type(config)} is not supported.")
 
         self._cache_config = config
 
     def disable_cache(self) -> None:
-        from ..hooks import HookRegistry, PyramidAttentionBroadcastConfig
+        from ..hooks import ControlNetCacheConfig, DeepCacheConfig, HookRegistry, PyramidAttentionBroadcastConfig
 
         if self._cache_config is None:
             logger.warning("Caching techniques have not been enabled, so there's nothing to disable.")
@@ -78,6 +93,12 @@ class CacheMixin:
         if isinstance(self._cache_config, PyramidAttentionBroadcastConfig):
             registry = HookRegistry.check_if_exists_or_initialize(self)
             registry.remove_hook("pyramid_attention_broadcast", recurse=True)
+        elif isinstance(self._cache_config, DeepCacheConfig):
+            registry = HookRegistry.check_if_exists_or_initialize(self)
+            registry.remove_hook("deep_cache", recurse=True)
+        elif isinstance(self._cache_config, ControlNetCacheConfig):
+            registry = HookRegistry.check_if_exists_or_initialize(self)
+            registry.remove_hook("controlnet_cache", recurse=True)
         else:
             raise ValueError(f"Cache config {type(self._cache_config)} is not supported.")
 
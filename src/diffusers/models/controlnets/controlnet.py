@@ -28,6 +28,7 @@ from ..attention_processor import (
     AttnAddedKVProcessor,
     AttnProcessor,
 )
+from ..cache_utils import CacheMixin
 from ..embeddings import TextImageProjection, TextImageTimeEmbedding, TextTimeEmbedding, TimestepEmbedding, Timesteps
 from ..modeling_utils import ModelMixin
 from ..unets.unet_2d_blocks import (
@@ -106,7 +107,7 @@ class ControlNetConditioningEmbedding(nn.Module):
         return embedding
 
 
-class ControlNetModel(ModelMixin, ConfigMixin, FromOriginalModelMixin):
+class ControlNetModel(ModelMixin, ConfigMixin, FromOriginalModelMixin, CacheMixin):
     """
     A ControlNet model.
 
@@ -7,18 +7,23 @@ from torch import nn
 from ...models.controlnets.controlnet import ControlNetModel, ControlNetOutput
 from ...models.modeling_utils import ModelMixin
 from ...utils import logging
+from ...utils.torch_utils import is_torch_version
+from ..cache_utils import CacheMixin
 
 
 logger = logging.get_logger(__name__)
 
 
-class MultiControlNetModel(ModelMixin):
+class MultiControlNetModel(ModelMixin, CacheMixin):
     r"""
     Multiple `ControlNetModel` wrapper class for Multi-ControlNet
 
     This module is a wrapper for multiple instances of the `ControlNetModel`. The `forward()` API is designed to be
     compatible with `ControlNetModel`.
 
+    ControlNets whose `conditioning_scale` is `0` are skipped. With [`~MultiControlNetModel.enable_batched_forward`],
+    ControlNets that share the same architecture are evaluated in a single vectorized forward pass.
+
     Args:
         controlnets (`List[ControlNetModel]`):
             Provides additional conditioning to the unet during the denoising process. You must set multiple
@@ -28,6 +33,24 @@ class MultiControlNetModel(ModelMixin):
     def __init__(self, controlnets: Union[List[ControlNetModel], Tuple[ControlNetModel]]):
         super().__init__()
         self.nets = nn.ModuleList(controlnets)
+        self._batched_forward = False
+        self._stacked_state = {}
+
+    def enable_batched_forward(self) -> None:
+        r"""
+        Evaluate ControlNets with identical configurations in a single forward pass, by vectorizing over a stacked copy
+        of their weights with `torch.func.vmap`. This trades the memory of one extra copy of the grouped weights for
+        fewer, larger kernel launches. ControlNets with hooks attached, for example by
+        [`~ModelMixin.enable_cache`] or group offloading, are still evaluated one after another.
+        """
+        if not is_torch_version(">=", "2.0.0"):
+            raise RuntimeError("Batched MultiControlNet forward requires PyTorch 2.0 or higher.")
+        self._batched_forward = True
+
+    def disable_batched_forward(self) -> None:
+        r"""Evaluate the ControlNets one after another, and free the stacked weights."""
+        self._batched_forward = False
+        self._stacked_state = {}
 
     def forward(
         self,
@@ -44,24 +67,45 @@ class MultiControlNetModel(ModelMixin):
         guess_mode: bool = False,
         return_dict: bool = True,
     ) -> Union[ControlNetOutput, Tuple]:
-        for i, (image, scale, controlnet) in enumerate(zip(controlnet_cond, conditioning_scale, self.nets)):
-            down_samples, mid_sample = controlnet(
-                sample=sample,
-                timestep=timestep,
-                encoder_hidden_states=encoder_hidden_states,
-                controlnet_cond=image,
-                conditioning_scale=scale,
-                class_labels=class_labels,
-                timestep_cond=timestep_cond,
-                attention_mask=attention_mask,
-                added_cond_kwargs=added_cond_kwargs,
-                cross_attention_kwargs=cross_attention_kwargs,
-                guess_mode=guess_mode,
-                return_dict=return_dict,
-            )
+        controlnet_kwargs = {
+            "class_labels": class_labels,
+            "timestep_cond": timestep_cond,
+            "attention_mask": attention_mask,
+            "added_cond_kwargs": added_cond_kwargs,
+            "cross_attention_kwargs": cross_attention_kwargs,
+            "guess_mode": guess_mode,
+        }
+
+        # ControlNets with a scale of 0 don't contribute to the residuals, so they don't need to be evaluated.
+        indices = [i for i, scale in enumerate(conditioning_scale[: len(self.nets)]) if not _is_zero(scale)]
+        indices = indices or [0]
+
+        down_block_res_samples, mid_block_res_sample = None, None
+        for group in self._group_controlnets(indices, controlnet_cond):
+            if len(group) == 1:
+                i = group[0]
+                down_samples, mid_sample = self.nets[i](
+                    sample=sample,
+                    timestep=timestep,
+                    encoder_hidden_states=encoder_hidden_states,
+                    controlnet_cond=controlnet_cond[i],
+                    conditioning_scale=conditioning_scale[i],
+                    return_dict=False,
+                    **controlnet_kwargs,
+                )
+            else:
+                down_samples, mid_sample = self._batched_controlnet_forward(
+                    group,
+                    sample,
+                    timestep,
+                    encoder_hidden_states,
+                    controlnet_cond,
+                    conditioning_scale,
+                    controlnet_kwargs,
+                )
 
             # merge samples
-            if i == 0:
+            if down_block_res_samples is None:
                 down_block_res_samples, mid_block_res_sample = down_samples, mid_sample
             else:
                 down_block_res_samples = [
@@ -72,6 +116,72 @@ class MultiControlNetModel(ModelMixin):
 
         return down_block_res_samples, mid_block_res_sample
 
+    def _group_controlnets(self, indices: List[int], controlnet_cond: List[torch.Tensor]) -> List[List[int]]:
+        if not self._batched_forward:
+            return [[i] for i in indices]
+
+        groups = {}
+        for i in indices:
+            controlnet = self.nets[i]
+            if _has_hooks(controlnet):
+                groups[("sequential", i)] = [i]
+                continue
+            parameter = next(controlnet.parameters())
+            config = {k: v for k, v in controlnet.config.items() if not k.startswith("_")}
+            key = (
+                type(controlnet),
+                repr(config),
+                parameter.device,
+                parameter.dtype,
+                tuple(controlnet_cond[i].shape),
+            )
+            groups.setdefault(key, []).append(i)
+        return list(groups.values())
+
+    def _get_stacked_state(self, group: List[int]) -> Tuple[Dict[str, torch.Tensor], Dict[str, torch.Tensor]]:
+        nets = [self.nets[i] for i in group]
+        tensors = [[*net.parameters(), *net.buffers()] for net in nets]
+        # The stacked copy is re-created whenever a weight is moved or modified in-place.
+        signature = tuple((t.data_ptr(), t._version) for net_tensors in tensors for t in net_tensors)
+
+        key = tuple(group)
+        if key not in self._stacked_state or self._stacked_state[key][0] != signature:
+            with torch.no_grad():
+                params, buffers = torch.func.stack_module_state(nets)
+            self._stacked_state[key] = (signature, params, buffers)
+        return self._stacked_state[key][1:]
+
+    def _batched_controlnet_forward(
+        self,
+        group: List[int],
+        sample: torch.Tensor,
+        timestep: Union[torch.Tensor, float, int],
+        encoder_hidden_states: torch.Tensor,
+        controlnet_cond: List[torch.Tensor],
+        conditioning_scale: List[float],
+        controlnet_kwargs: Dict[str, Any],
+    ) -> Tuple[List[torch.Tensor], torch.Tensor]:
+        params, buffers = self._get_stacked_state(group)
+        base = self.nets[group[0]]
+
+        def controlnet_forward(params, buffers, controlnet_cond):
+            return torch.func.functional_call(
+                base,
+                (params, buffers),
+                (sample, timestep, encoder_hidden_states, controlnet_cond),
+                {"return_dict": False, **controlnet_kwargs},
+            )
+
+        images = torch.stack([controlnet_cond[i] for i in group])
+        down_samples, mid_sample = torch.func.vmap(controlnet_forward)(params, buffers, images)
+
+        scales = torch.tensor(
+            [float(conditioning_scale[i]) for i in group], device=mid_sample.device, dtype=mid_sample.dtype
+        )
+        down_samples = [(s * scales.view(-1, *[1] * (s.ndim - 1))).sum(0) for s in down_samples]
+        mid_sample = (mid_sample * scales.view(-1, *[1] * (mid_sample.ndim - 1))).sum(0)
+        return down_samples, mid_sample
+
     def save_pretrained(
         self,
         save_directory: Union[str, os.PathLike],
@@ -181,3 +291,17 @@ class MultiControlNetModel(ModelMixin):
             )
 
         return cls(controlnets)
+
+
+def _is_zero(scale) -> bool:
+    return isinstance(scale, (int, float)) and scale == 0
+
+
+def _has_hooks(module: nn.Module) -> bool:
+    for submodule in module.modules():
+        if hasattr(submodule, "_hf_hook"):
+            return True
+        registry = getattr(submodule, "_diffusers_hook", None)
+        if registry is not None and len(registry.hooks) > 0:
+            return True
+    return False
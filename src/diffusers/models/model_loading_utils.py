@@ -16,11 +16,14 @@
 
 import importlib
 import inspect
+import json
+import mmap
 import os
+import struct
 from array import array
 from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 from zipfile import is_zipfile
 
 import safetensors
@@ -151,6 +154,58 @@ def _determine_param_device(param_name: str, device_map: Optional[Dict[str, Unio
         return device_map[module_name]
 
 
+_SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+if hasattr(torch, "float8_e4m3fn"):
+    _SAFETENSORS_DTYPES.update({"F8_E4M3": torch.float8_e4m3fn, "F8_E5M2": torch.float8_e5m2})
+
+
+def _read_dduf_safetensors_header(mm: mmap.mmap, entry: DDUFEntry) -> Tuple[Dict, int]:
+    # Returns the header of a safetensors file in a DDUF archive and the offset of its tensor data in the archive.
+    header_size = struct.unpack_from("<Q", mm, entry.offset)[0]
+    data_offset = entry.offset + 8 + header_size
+    return json.loads(mm[entry.offset + 8 : data_offset]), data_offset
+
+
+def load_dduf_state_dict(entry: DDUFEntry) -> Dict[str, torch.Tensor]:
+    """
+    Loads a safetensors file stored in a DDUF archive without copying its tensors. The tensors are views into a
+    copy-on-write memory map of the archive, so they are writable but modifying them never modifies the archive.
+    """
+    # Every file gets its own private mapping, so that modifying the tensors of a model never leaks into another model
+    # loaded from the same archive. The pages read from the archive are still shared through the page cache.
+    with open(entry.dduf_path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), length=0, access=mmap.ACCESS_COPY)
+    header, data_offset = _read_dduf_safetensors_header(mm, entry)
+    header.pop("__metadata__", None)
+
+    state_dict = {}
+    for name, info in header.items():
+        dtype = _SAFETENSORS_DTYPES[info["dtype"]]
+        begin, end = info["data_offsets"]
+        if begin == end:
+            state_dict[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+
+        offset = data_offset + begin
+        tensor = torch.frombuffer(mm, dtype=torch.uint8, count=end - begin, offset=offset)
+        if offset % torch.empty(0, dtype=dtype).element_size() != 0:
+            # DDUF doesn't align the files of the archive, and misaligned tensors can't be viewed in their dtype.
+            tensor = tensor.clone()
+        state_dict[name] = tensor.view(dtype).view(info["shape"])
+    return state_dict
+
+
 def load_state_dict(
     checkpoint_file: Union[str, os.PathLike],
     dduf_entries: Optional[Dict[str, DDUFEntry]] = None,
@@ -168,8 +223,10 @@ def load_state_dict(
         if file_extension == SAFETENSORS_FILE_EXTENSION:
             if dduf_entries:
                 # tensors are loaded on cpu
-                with dduf_entries[checkpoint_file].as_mmap() as mm:
-                    return safetensors.torch.load(mm)
+                if disable_mmap:
+                    with dduf_entries[checkpoint_file].as_mmap() as mm:
+                        return safetensors.torch.load(mm)
+                return load_dduf_state_dict(dduf_entries[checkpoint_file])
             if disable_mmap:
                 return safetensors.torch.load(open(checkpoint_file, "rb").read())
             else:
@@ -209,6 +266,27 @@ def load_state_dict(
             )
 
 
+def load_state_dict_metadata(
+    checkpoint_file: Union[str, os.PathLike, Dict], dduf_entries: Optional[Dict[str, DDUFEntry]] = None
+) -> Dict[str, str]:
+    """
+    Reads the metadata stored in the header of a safetensors checkpoint file, without loading its tensors.
+    """
+    if isinstance(checkpoint_file, dict):
+        return {}
+    if os.path.basename(checkpoint_file).split(".")[-1] != SAFETENSORS_FILE_EXTENSION:
+        return {}
+
+    if dduf_entries:
+        entry = dduf_entries[checkpoint_file]
+        with open(entry.dduf_path, "rb") as f, mmap.mmap(f.fileno(), length=0, access=mmap.ACCESS_READ) as mm:
+            header, _ = _read_dduf_safetensors_header(mm, entry)
+        return header.get("__metadata__", None) or {}
+
+    with safetensors.safe_open(checkpoint_file, framework="pt") as f:
+        return f.metadata() or {}
+
+
 def load_model_dict_into_meta(
     model,
     state_dict: OrderedDict,
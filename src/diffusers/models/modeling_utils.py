@@ -37,7 +37,8 @@ from torch import Tensor, nn
 from typing_extensions import Self
 
 from .. import __version__
-from ..hooks import apply_group_offloading, apply_layerwise_casting
+from ..hooks import ContextParallelConfig, apply_context_parallel, apply_group_offloading, apply_layerwise_casting
+from ..hooks.layerwise_casting import ScaledLayerwiseCastingHook
 from ..quantizers import DiffusersAutoQuantizer, DiffusersQuantizer
 from ..quantizers.quantization_config import QuantizationMethod
 from ..utils import (
@@ -63,6 +64,7 @@ from ..utils.hub_utils import (
     load_or_create_model_card,
     populate_model_card,
 )
+from ..utils.torch_utils import get_placement_fingerprint, get_placement_generation, invalidate_placement_cache
 from .model_loading_utils import (
     _determine_device_map,
     _fetch_index_file,
@@ -70,6 +72,7 @@ from .model_loading_utils import (
     _load_state_dict_into_model,
     load_model_dict_into_meta,
     load_state_dict,
+    load_state_dict_metadata,
 )
 
 
@@ -267,6 +270,7 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
     _keep_in_fp32_modules = None
     _skip_layerwise_casting_patterns = None
     _supports_group_offloading = True
+    _cp_plan = None
 
     def __init__(self):
         super().__init__()
@@ -461,6 +465,9 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
         skip_modules_pattern: Optional[Tuple[str, ...]] = None,
         skip_modules_classes: Optional[Tuple[Type[torch.nn.Module], ...]] = None,
         non_blocking: bool = False,
+        scaling: Optional[str] = None,
+        block_size: int = 64,
+        max_relative_error: Optional[float] = None,
     ) -> None:
         r"""
         Activates layerwise casting for the current model.
@@ -488,6 +495,11 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
 
             >>> # Enable layerwise casting via the model, which ignores certain modules by default
             >>> transformer.enable_layerwise_casting(storage_dtype=torch.float8_e4m3fn, compute_dtype=torch.bfloat16)
+
+            >>> # Or store int8 weights with a scale per block of 64 values
+            >>> transformer.enable_layerwise_casting(
+            ...     storage_dtype=torch.int8, compute_dtype=torch.bfloat16, scaling="per_block", block_size=64
+            ... )
             ```
 
         Args:
@@ -503,6 +515,15 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
                 A list of module classes to skip during the layerwise casting process.
             non_blocking (`bool`, *optional*, defaults to `False`):
                 If `True`, the weight casting operations are non-blocking.
+            scaling (`str`, *optional*):
+                If set to `"per_channel"` or `"per_block"`, the weights are scaled to the range of `storage_dtype`
+                before they are cast, which makes integer storage dtypes such as `torch.int8` usable and loses less
+                precision than a plain fp8 cast. The scales are kept in `float32` and applied in the forward pass.
+            block_size (`int`, *optional*, defaults to `64`):
+                The number of values that share a scale with `scaling="per_block"`.
+            max_relative_error (`float`, *optional*):
+                If set together with `scaling`, layers whose weights would have a larger relative quantization error
+                are skipped.
         """
 
         user_provided_patterns = True
@@ -535,7 +556,15 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
             compute_dtype = self.dtype
 
         apply_layerwise_casting(
-            self, storage_dtype, compute_dtype, skip_modules_pattern, skip_modules_classes, non_blocking
+            self,
+            storage_dtype,
+            compute_dtype,
+            skip_modules_pattern,
+            skip_modules_classes,
+            non_blocking,
+            scaling=scaling,
+            block_size=block_size,
+            max_relative_error=max_relative_error,
         )
 
     def enable_group_offload(
@@ -587,6 +616,35 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
             self, onload_device, offload_device, offload_type, num_blocks_per_group, non_blocking, use_stream
         )
 
+    def enable_context_parallel(self, config: ContextParallelConfig) -> None:
+        r"""
+        Activates context parallelism for the current model, which splits the token sequence across the ranks of a
+        `torch.distributed` process group.
+
+        See [`~hooks.context_parallel.apply_context_parallel`] for more information.
+
+        Example:
+
+            ```python
+            >>> # torchrun --nproc_per_node=2 generate.py
+            >>> import torch
+            >>> import torch.distributed as dist
+            >>> from diffusers import ContextParallelConfig, FluxTransformer2DModel
+
+            >>> dist.init_process_group("nccl")
+            >>> transformer = FluxTransformer2DModel.from_pretrained(
+            ...     "black-forest-labs/FLUX.1-dev", subfolder="transformer", torch_dtype=torch.bfloat16
+            ... ).to(f"cuda:{dist.get_rank()}")
+            >>> transformer.enable_context_parallel(ContextParallelConfig(mode="ring"))
+            ```
+        """
+        if self._cp_plan is None:
+            raise ValueError(
+                f"{self.__class__.__name__} does not support context parallelism. Please make sure to define a "
+                f"`_cp_plan` in the class definition."
+            )
+        apply_context_parallel(self, config)
+
     def save_pretrained(
         self,
         save_directory: Union[str, os.PathLike],
@@ -648,6 +706,16 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
                     " the logger on the traceback to understand the reason why the quantized model is not serializable."
                 )
 
+        # Scaled layerwise casting stores the weights in a low precision dtype, and their scales aren't part of the
+        # state dict, so the saved weights couldn't be loaded back.
+        for name, submodule in self.named_modules():
+            registry = getattr(submodule, "_diffusers_hook", None)
+            if registry is not None and isinstance(registry.get_hook("layerwise_casting"), ScaledLayerwiseCastingHook):
+                raise ValueError(
+                    f"The model can't be saved, because layerwise casting with `scaling` is applied to {name!r}."
+                    " Please save the model before enabling layerwise casting."
+                )
+
         weights_name = SAFETENSORS_WEIGHTS_NAME if safe_serialization else WEIGHTS_NAME
         weights_name = _add_variant(weights_name, variant)
         weights_name_pattern = weights_name.replace(".bin", "{suffix}.bin").replace(
@@ -673,7 +741,14 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
             model_to_save.save_config(save_directory)
 
         # Save the model
-        state_dict = model_to_save.state_dict()
+        metadata = {"format": "pt"}
+        if hf_quantizer is not None:
+            state_dict, quantization_metadata = hf_quantizer.get_state_dict_and_metadata(
+                model_to_save, safe_serialization=safe_serialization
+            )
+            metadata.update(quantization_metadata)
+        else:
+            state_dict = model_to_save.state_dict()
 
         # Save the model
         state_dict_split = split_torch_state_dict_into_shards(
@@ -704,7 +779,7 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
             if safe_serialization:
                 # At some point we will need to deal better with save_function (used for TPU and other distributed
                 # joyfulness), but for now this enough.
-                safetensors.torch.save_file(shard, filepath, metadata={"format": "pt"})
+                safetensors.torch.save_file(shard, filepath, metadata=metadata)
             else:
                 torch.save(shard, filepath)
 
@@ -752,7 +827,9 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
         if hf_quantizer is None:
             raise ValueError("You need to first quantize your model in order to dequantize it")
 
-        return hf_quantizer.dequantize(self)
+        model = hf_quantizer.dequantize(self)
+        invalidate_placement_cache()
+        return model
 
     @classmethod
     @validate_hf_hub_args
@@ -1176,6 +1253,9 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
         if not is_sharded:
             # Time to load the checkpoint
             state_dict = load_state_dict(resolved_model_file[0], disable_mmap=disable_mmap, dduf_entries=dduf_entries)
+            if hf_quantizer is not None:
+                metadata = load_state_dict_metadata(resolved_model_file[0], dduf_entries=dduf_entries)
+                state_dict = hf_quantizer.update_state_dict_with_metadata(state_dict, metadata)
             # We only fix it for non sharded checkpoints as we don't need it yet for sharded one.
             model._fix_state_dict_keys_on_load(state_dict)
 
@@ -1183,6 +1263,8 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
             loaded_keys = sharded_metadata["all_checkpoint_keys"]
         else:
             loaded_keys = list(state_dict.keys())
+        if hf_quantizer is not None:
+            loaded_keys = hf_quantizer.update_loaded_keys(loaded_keys)
 
         if hf_quantizer is not None:
             hf_quantizer.preprocess_model(
@@ -1256,6 +1338,8 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
 
         # Set model in evaluation mode to deactivate DropOut modules by default
         model.eval()
+        # Weights loaded into the model directly don't go through `.to()`.
+        invalidate_placement_cache()
 
         if output_loading_info:
             return model, loading_info
@@ -1429,6 +1513,9 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
 
         for shard_file in resolved_model_file:
             state_dict = load_state_dict(shard_file, dduf_entries=dduf_entries)
+            if hf_quantizer is not None and not isinstance(shard_file, dict):
+                metadata = load_state_dict_metadata(shard_file, dduf_entries=dduf_entries)
+                state_dict = hf_quantizer.update_state_dict_with_metadata(state_dict, metadata)
 
             def _find_mismatched_keys(
                 state_dict,
@@ -1605,14 +1692,37 @@ class ModelMixin(torch.nn.Module, PushToHubMixin):
         `torch.device`: The device on which the module is (assuming that all the module parameters are on the same
         device).
         """
-        return get_parameter_device(self)
+        return self._get_cached_placement("device", get_parameter_device)
 
     @property
     def dtype(self) -> torch.dtype:
         """
         `torch.dtype`: The dtype of the module (assuming that all the module parameters have the same dtype).
         """
-        return get_parameter_dtype(self)
+        return self._get_cached_placement("dtype", get_parameter_dtype)
+
+    def _get_cached_placement(self, name: str, fn: Callable[[torch.nn.Module], Any]) -> Any:
+        # Looking up the device and dtype walks all submodules and their hooks, so the result is cached until
+        # `invalidate_placement_cache` is called by `.to()`, `.cuda()`, `from_pretrained` or when hooks are added or
+        # removed, or until the first parameter is replaced or moved. Accelerate offloading hooks move parameters
+        # without notice, so they are never cached.
+        if torch.compiler.is_compiling() or "_hf_hook" in self.__dict__:
+            return fn(self)
+
+        key = (get_placement_generation(), get_placement_fingerprint(self))
+        cache = self.__dict__.get("_placement_cache")
+        if cache is None or cache[0] != key:
+            cache = (key, {})
+            self.__dict__["_placement_cache"] = cache
+        if name not in cache[1]:
+            cache[1][name] = fn(self)
+        return cache[1][name]
+
+    def _apply(self, *args, **kwargs):
+        try:
+            return super()._apply(*args, **kwargs)
+        finally:
+            invalidate_placement_cache()
 
     def num_parameters(self, only_trainable: bool = False, exclude_embeddings: bool = False) -> int:
         """
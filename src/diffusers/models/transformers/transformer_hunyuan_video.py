@@ -21,9 +21,11 @@ import torch.nn.functional as F
 from diffusers.loaders import FromOriginalModelMixin
 
 from ...configuration_utils import ConfigMixin, register_to_config
+from ...hooks.context_parallel import ContextParallelInput, ContextParallelOutput
 from ...loaders import PeftAdapterMixin
 from ...utils import USE_PEFT_BACKEND, logging, scale_lora_layers, unscale_lora_layers
 from ..attention import FeedForward
+from ..attention_dispatch import dispatch_attention_fn
 from ..attention_processor import Attention, AttentionProcessor
 from ..cache_utils import CacheMixin
 from ..embeddings import (
@@ -40,6 +42,9 @@ logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
 
 
 class HunyuanVideoAttnProcessor2_0:
+    # The token sequence can be split across ranks with [`~hooks.apply_context_parallel`].
+    _supports_context_parallel = True
+
     def __init__(self):
         if not hasattr(F, "scaled_dot_product_attention"):
             raise ImportError(
@@ -115,8 +120,20 @@ class HunyuanVideoAttnProcessor2_0:
             value = torch.cat([value, encoder_value], dim=2)
 
         # 5. Attention
-        hidden_states = F.scaled_dot_product_attention(
-            query, key, value, attn_mask=attention_mask, dropout_p=0.0, is_causal=False
+        if attention_mask is not None and encoder_hidden_states is not None:
+            # `attention_mask` masks the condition tokens, while the latent tokens are always attended to.
+            latent_sequence_length = query.shape[2] - encoder_hidden_states.shape[1]
+            latent_attention_mask = attention_mask.new_ones((*attention_mask.shape[:-1], latent_sequence_length))
+            attention_mask = torch.cat([latent_attention_mask, attention_mask], dim=-1)
+
+        hidden_states = dispatch_attention_fn(
+            query,
+            key,
+            value,
+            attn_mask=attention_mask,
+            dropout_p=0.0,
+            is_causal=False,
+            context_parallel_config=attn._context_parallel_config,
         )
         hidden_states = hidden_states.transpose(1, 2).flatten(2, 3)
         hidden_states = hidden_states.to(query.dtype)
@@ -550,6 +567,17 @@ class HunyuanVideoTransformer3DModel(ModelMixin, ConfigMixin, PeftAdapterMixin,
         "HunyuanVideoPatchEmbed",
         "HunyuanVideoTokenRefiner",
     ]
+    _cp_plan = {
+        "x_embedder": {0: ContextParallelInput(split_dim=1, expected_dims=3, split_output=True)},
+        "context_embedder": {0: ContextParallelInput(split_dim=1, expected_dims=3, split_output=True)},
+        "rope": {
+            0: ContextParallelInput(split_dim=0, expected_dims=2, split_output=True),
+            1: ContextParallelInput(split_dim=0, expected_dims=2, split_output=True),
+        },
+        "transformer_blocks.*": {"attention_mask": ContextParallelInput(split_dim=-1, expected_dims=4)},
+        "single_transformer_blocks.*": {"attention_mask": ContextParallelInput(split_dim=-1, expected_dims=4)},
+        "proj_out": ContextParallelOutput(gather_dim=1, expected_dims=3),
+    }
 
     @register_to_config
     def __init__(
@@ -713,18 +741,9 @@ class HunyuanVideoTransformer3DModel(ModelMixin, ConfigMixin, PeftAdapterMixin,
         encoder_hidden_states = self.context_embedder(encoder_hidden_states, timestep, encoder_attention_mask)
 
         # 3. Attention mask preparation
-        latent_sequence_length = hidden_states.shape[1]
-        condition_sequence_length = encoder_hidden_states.shape[1]
-        sequence_length = latent_sequence_length + condition_sequence_length
-        attention_mask = torch.zeros(
-            batch_size, sequence_length, device=hidden_states.device, dtype=torch.bool
-        )  # [B, N]
-
-        effective_condition_sequence_length = encoder_attention_mask.sum(dim=1, dtype=torch.int)  # [B,]
-        effective_sequence_length = latent_sequence_length + effective_condition_sequence_length
-
-        for i in range(batch_size):
-            attention_mask[i, : effective_sequence_length[i]] = True
+        # Only the padding tokens of the condition are masked. The attention processors prepend the latent tokens,
+        # which are always attended to, so that the mask can be split like the condition tokens.
+        attention_mask = encoder_attention_mask.to(device=hidden_states.device, dtype=torch.bool)
         # [B, 1, 1, N], for broadcasting across attention heads
         attention_mask = attention_mask.unsqueeze(1).unsqueeze(1)
 
@@ -32,6 +32,7 @@ from ..attention_processor import (
     AttnProcessor,
     FusedAttnProcessor2_0,
 )
+from ..cache_utils import CacheMixin
 from ..embeddings import (
     GaussianFourierProjection,
     GLIGENTextBoundingboxProjection,
@@ -69,7 +70,7 @@ class UNet2DConditionOutput(BaseOutput):
 
 
 class UNet2DConditionModel(
-    ModelMixin, ConfigMixin, FromOriginalModelMixin, UNet2DConditionLoadersMixin, PeftAdapterMixin
+    ModelMixin, ConfigMixin, FromOriginalModelMixin, UNet2DConditionLoadersMixin, PeftAdapterMixin, CacheMixin
 ):
     r"""
     A conditional 2D UNet model that takes a noisy sample, conditional state, and a timestep and returns a sample
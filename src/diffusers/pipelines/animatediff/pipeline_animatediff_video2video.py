@@ -477,14 +477,13 @@ class AnimateDiffVideoToVideoPipeline(
                     f"`ip_adapter_image` must have same length as the number of IP Adapters. Got {len(ip_adapter_image)} images and {len(self.unet.encoder_hid_proj.image_projection_layers)} IP Adapters."
                 )
 
-            for single_ip_adapter_image, image_proj_layer in zip(
-                ip_adapter_image, self.unet.encoder_hid_proj.image_projection_layers
+            output_hidden_states = [
+                not isinstance(image_proj_layer, ImageProjection)
+                for image_proj_layer in self.unet.encoder_hid_proj.image_projection_layers
+            ]
+            for single_image_embeds, single_negative_image_embeds in self.encode_ip_adapter_images(
+                ip_adapter_image, device, output_hidden_states
             ):
-                output_hidden_state = not isinstance(image_proj_layer, ImageProjection)
-                single_image_embeds, single_negative_image_embeds = self.encode_image(
-                    single_ip_adapter_image, device, 1, output_hidden_state
-                )
-
                 image_embeds.append(single_image_embeds[None, :])
                 if do_classifier_free_guidance:
                     negative_image_embeds.append(single_negative_image_embeds[None, :])
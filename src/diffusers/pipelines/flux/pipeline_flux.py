@@ -410,8 +410,10 @@ class FluxPipeline(
                     f"`ip_adapter_image` must have same length as the number of IP Adapters. Got {len(ip_adapter_image)} images and {self.transformer.encoder_hid_proj.num_ip_adapters} IP Adapters."
                 )
 
-            for single_ip_adapter_image in ip_adapter_image:
-                single_image_embeds = self.encode_image(single_ip_adapter_image, device, 1)
+            output_hidden_states = [False] * len(ip_adapter_image)
+            for single_image_embeds, _ in self.encode_ip_adapter_images(
+                ip_adapter_image, device, output_hidden_states
+            ):
                 image_embeds.append(single_image_embeds[None, :])
         else:
             if not isinstance(ip_adapter_image_embeds, list):
@@ -0,0 +1,374 @@
+# Copyright 2025 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import inspect
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+import torch.nn.functional as F
+from torch.utils._python_dispatch import TorchDispatchMode
+from torch.utils._pytree import tree_leaves
+
+from ..hooks.model_residency import _get_module_size
+from ..schedulers.scheduling_utils import SchedulerOutput
+from ..utils import logging
+
+
+logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
+
+
+# Candidate settings, from the cheapest to the most expensive in terms of inference speed.
+_CANDIDATE_SETTINGS = (
+    (),
+    ("vae_tiling",),
+    ("model_cpu_offload",),
+    ("model_cpu_offload", "vae_tiling"),
+    ("model_cpu_offload", "vae_tiling", "attention_slicing"),
+    ("model_cpu_offload", "vae_tiling", "attention_slicing", "forward_chunking"),
+    ("group_offload", "vae_tiling"),
+    ("group_offload", "vae_tiling", "attention_slicing", "forward_chunking"),
+)
+_ACTIVATION_SETTINGS = ("vae_tiling", "attention_slicing", "forward_chunking")
+
+
+@dataclass
+class StageMemoryEstimate:
+    r"""
+    The estimated memory of one stage of a pipeline, in bytes.
+
+    Args:
+        name (`str`):
+            The name of the pipeline component that runs in this stage, for example `"text_encoder"`, `"unet"` or
+            `"vae"`.
+        weights (`int`):
+            The memory of the model weights on the accelerator while the stage runs.
+        peak_activations (`int`):
+            The peak memory of all other tensors while the stage runs, including the inputs and outputs of the stage.
+    """
+
+    name: str
+    weights: int
+    peak_activations: int
+
+    @property
+    def peak_memory(self) -> int:
+        return self.weights + self.peak_activations
+
+
+@dataclass
+class PipelineMemoryEstimate:
+    r"""
+    The estimated memory of a pipeline call, returned by [`~DiffusionPipeline.estimate_memory`].
+
+    Args:
+        stages (`List[StageMemoryEstimate]`):
+            The estimates of the stages, in the order in which they first run.
+        settings (`Tuple[str]`):
+            The memory-saving settings the estimate was made for.
+        recommended_settings (`Tuple[str]`, *optional*):
+            The cheapest settings that fit `max_memory`, if `max_memory` was given and any settings fit. The possible
+            settings are `"vae_tiling"`, `"attention_slicing"`, `"forward_chunking"`, `"model_cpu_offload"` and
+            `"group_offload"`, which correspond to [`~StableDiffusionMixin.enable_vae_tiling`],
+            [`~DiffusionPipeline.enable_attention_slicing`], `enable_forward_chunking`,
+            [`~DiffusionPipeline.enable_model_cpu_offload`] and block-level [`~ModelMixin.enable_group_offload`].
+        recommended_estimate (`PipelineMemoryEstimate`, *optional*):
+            The estimate for `recommended_settings`.
+    """
+
+    stages: List[StageMemoryEstimate]
+    settings: Tuple[str, ...] = ()
+    recommended_settings: Optional[Tuple[str, ...]] = None
+    recommended_estimate: Optional["PipelineMemoryEstimate"] = field(default=None, repr=False)
+
+    @property
+    def peak_memory(self) -> int:
+        r"""The estimated peak memory of the whole call, in bytes."""
+        return max((stage.peak_memory for stage in self.stages), default=0)
+
+    def __getitem__(self, name: str) -> StageMemoryEstimate:
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(name)
+
+
+class _MemoryTracker(TorchDispatchMode):
+    r"""Tracks the memory of all tensors allocated on the meta device, per pipeline stage."""
+
+    def __init__(self):
+        super().__init__()
+        self.live_memory = 0
+        self.peak_memory: Dict[str, int] = {}
+        self.stage = None
+        self._depth = 0
+        self._tracked = set()
+
+    def enter_stage(self, name: str) -> None:
+        if self._depth == 0:
+            self.stage = name
+            self.peak_memory[name] = max(self.peak_memory.get(name, 0), self.live_memory)
+        self._depth += 1
+
+    def exit_stage(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            self.stage = None
+
+    def _free(self, key: int, nbytes: int) -> None:
+        self._tracked.discard(key)
+        self.live_memory -= nbytes
+
+    def __torch_dispatch__(self, func, types, args=(), kwargs=None):
+        kwargs = kwargs or {}
+        output = func(*args, **kwargs)
+
+        inputs = {id(t) for t in tree_leaves((args, kwargs)) if isinstance(t, torch.Tensor)}
+        for tensor in tree_leaves(output):
+            if not isinstance(tensor, torch.Tensor) or tensor.device.type != "meta":
+                continue
+            # Views and in-place results share the memory of tensors that are already counted.
+            if id(tensor) in inputs or id(tensor) in self._tracked or tensor._is_view():
+                continue
+            nbytes = tensor.untyped_storage().nbytes()
+            self._tracked.add(id(tensor))
+            self.live_memory += nbytes
+            weakref.finalize(tensor, self._free, id(tensor), nbytes)
+
+        if self.stage is not None:
+            self.peak_memory[self.stage] = max(self.peak_memory[self.stage], self.live_memory)
+        return output
+
+
+class _MemoryEfficientAttentionMode(torch.overrides.TorchFunctionMode):
+    r"""
+    Replaces `scaled_dot_product_attention` by an allocation of its output. On the meta device it would otherwise be
+    decomposed into the math implementation, which materializes the full attention matrix, while flash or
+    memory-efficient kernels are used on accelerators.
+    """
+
+    def __torch_function__(self, func, types, args=(), kwargs=None):
+        kwargs = kwargs or {}
+        if func is F.scaled_dot_product_attention:
+            query = args[0] if len(args) > 0 else kwargs["query"]
+            value = args[2] if len(args) > 2 else kwargs["value"]
+            return query.new_empty(*query.shape[:-1], value.shape[-1])
+        return func(*args, **kwargs)
+
+
+class _DryRunScheduler:
+    r"""Wraps a scheduler so that denoising steps only keep the shape of the latents, and work on the meta device."""
+
+    def __init__(self, scheduler):
+        self._scheduler = copy.deepcopy(scheduler)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._scheduler, name)
+
+    def scale_model_input(self, sample: torch.Tensor, *args, **kwargs) -> torch.Tensor:
+        return sample
+
+    def add_noise(self, original_samples: torch.Tensor, *args, **kwargs) -> torch.Tensor:
+        return original_samples
+
+    def scale_noise(self, sample: torch.Tensor, *args, **kwargs) -> torch.Tensor:
+        return sample
+
+    def step(
+        self, model_output: torch.Tensor, timestep, sample: torch.Tensor, *args, return_dict: bool = True, **kwargs
+    ):
+        prev_sample = sample.new_empty(sample.shape)
+        if not return_dict:
+            return (prev_sample,)
+        return SchedulerOutput(prev_sample=prev_sample)
+
+
+def _get_layerwise_compute_dtype(module: torch.nn.Module) -> Optional[torch.dtype]:
+    registry = getattr(module, "_diffusers_hook", None)
+    hook = registry.get_hook("layerwise_casting") if registry is not None else None
+    return hook.compute_dtype if hook is not None else None
+
+
+def _meta_copy(module: torch.nn.Module) -> torch.nn.Module:
+    r"""Returns a copy of `module` without hooks, whose parameters and buffers are on the meta device."""
+    memo = {}
+    hooked_modules = []
+    for submodule in module.modules():
+        compute_dtype = _get_layerwise_compute_dtype(submodule)
+        for name, tensor in [*submodule._parameters.items(), *submodule._buffers.items()]:
+            if tensor is None or id(tensor) in memo:
+                continue
+            dtype = tensor.dtype
+            if compute_dtype is not None and name in submodule._parameters:
+                dtype = compute_dtype
+            meta_tensor = torch.empty(tensor.shape, dtype=dtype, device="meta")
+            if isinstance(tensor, torch.nn.Parameter):
+                meta_tensor = torch.nn.Parameter(meta_tensor, requires_grad=False)
+            memo[id(tensor)] = meta_tensor
+
+        # Hooks may hold references to offloaded copies of the weights, so they are not copied.
+        for attribute in ("_diffusers_hook", "_hf_hook", "_old_forward", "forward"):
+            if attribute in submodule.__dict__:
+                memo[id(submodule.__dict__[attribute])] = None
+                hooked_modules.append((submodule, attribute))
+
+    module_copy = copy.deepcopy(module, memo)
+    copies = dict(zip(module.modules(), module_copy.modules()))
+    for submodule, attribute in hooked_modules:
+        copies[submodule].__dict__.pop(attribute, None)
+    return module_copy
+
+
+def _get_group_offload_size(module: torch.nn.Module) -> int:
+    r"""Estimates the weights on the accelerator with block-level group offloading and prefetching of one block."""
+    block_sizes = [
+        _get_module_size(block)
+        for child in module.modules()
+        if isinstance(child, (torch.nn.ModuleList, torch.nn.Sequential))
+        for block in child
+    ]
+    total = _get_module_size(module)
+    if len(block_sizes) == 0:
+        return total
+    largest_block = max(block_sizes)
+    return min(total, total - sum(block_sizes) + 2 * largest_block)
+
+
+def _is_applicable(pipeline, setting: str) -> bool:
+    modules = [c for c in pipeline.components.values() if isinstance(c, torch.nn.Module)]
+    if setting == "vae_tiling":
+        return hasattr(getattr(pipeline, "vae", None), "enable_tiling")
+    if setting == "attention_slicing":
+        return any(hasattr(m, "set_attention_slice") for m in modules)
+    if setting == "forward_chunking":
+        return any(hasattr(m, "enable_forward_chunking") for m in modules)
+    if setting == "model_cpu_offload":
+        return pipeline.model_cpu_offload_seq is not None
+    return True
+
+
+def _trace_activations(
+    pipeline, settings: Tuple[str, ...], memory_efficient_attention: bool, call_kwargs: Dict[str, Any]
+) -> Dict[str, int]:
+    dry_run = copy.copy(pipeline)
+    # Caches hash their inputs on the CPU, and the safety checker converts the images to PIL.
+    dry_run.__dict__.update(_vae_latent_cache=None, _ip_adapter_embedding_cache=None)
+    dry_run.__dict__.pop("_all_hooks", None)
+    dry_run.set_progress_bar_config(disable=True)
+
+    stage_hooks = []
+    tracker = _MemoryTracker()
+    for name, component in pipeline.components.items():
+        if name == "safety_checker":
+            dry_run.__dict__[name] = None
+        elif isinstance(component, torch.nn.Module):
+            component = _meta_copy(component)
+            for submodule in component.modules():
+                stage_hooks.append(submodule.register_forward_pre_hook(lambda *_, n=name: tracker.enter_stage(n)))
+                stage_hooks.append(submodule.register_forward_hook(lambda *_: tracker.exit_stage()))
+            dry_run.__dict__[name] = component
+        elif name == "scheduler" or name.endswith("scheduler"):
+            dry_run.__dict__[name] = _DryRunScheduler(component)
+
+    if "vae_tiling" in settings:
+        dry_run.vae.enable_tiling()
+    if "attention_slicing" in settings:
+        dry_run.enable_attention_slicing()
+    if "forward_chunking" in settings:
+        for component in dry_run.components.values():
+            if hasattr(component, "enable_forward_chunking"):
+                component.enable_forward_chunking()
+
+    call_kwargs = {**call_kwargs, "num_inference_steps": 1, "output_type": "pt"}
+    parameters = inspect.signature(pipeline.__call__).parameters
+    if "strength" in parameters:
+        # With a single step, a strength below 1 would skip denoising. It doesn't change the memory of a step.
+        call_kwargs["strength"] = 1.0
+    call_kwargs = {k: v for k, v in call_kwargs.items() if k in parameters}
+
+    attention_mode = _MemoryEfficientAttentionMode() if memory_efficient_attention else None
+    try:
+        with torch.no_grad(), tracker:
+            if attention_mode is not None:
+                with attention_mode:
+                    dry_run(**call_kwargs)
+            else:
+                dry_run(**call_kwargs)
+    finally:
+        for hook in stage_hooks:
+            hook.remove()
+    return tracker.peak_memory
+
+
+def _get_stage_weights(pipeline, stage: str, settings: Tuple[str, ...]) -> int:
+    components = {n: c for n, c in pipeline.components.items() if isinstance(c, torch.nn.Module)}
+    if "model_cpu_offload" in settings:
+        resident = [n for n in components if n in pipeline._exclude_from_cpu_offload and n != stage]
+        return _get_module_size(components[stage]) + sum(_get_module_size(components[n]) for n in resident)
+    if "group_offload" in settings:
+        return _get_group_offload_size(components[stage])
+    return sum(_get_module_size(component) for component in components.values())
+
+
+def estimate_pipeline_memory(
+    pipeline,
+    max_memory: Optional[int] = None,
+    memory_efficient_attention: bool = True,
+    **kwargs,
+) -> PipelineMemoryEstimate:
+    r"""
+    Estimates the peak memory of calling `pipeline(**kwargs)` without running it. See
+    [`~DiffusionPipeline.estimate_memory`].
+    """
+    traces = {}
+
+    def estimate(settings: Tuple[str, ...]) -> PipelineMemoryEstimate:
+        activation_settings = tuple(s for s in settings if s in _ACTIVATION_SETTINGS)
+        if activation_settings not in traces:
+            traces[activation_settings] = _trace_activations(
+                pipeline, activation_settings, memory_efficient_attention, kwargs
+            )
+        stages = [
+            StageMemoryEstimate(
+                name=name,
+                weights=_get_stage_weights(pipeline, name, settings),
+                peak_activations=peak_activations,
+            )
+            for name, peak_activations in traces[activation_settings].items()
+        ]
+        return PipelineMemoryEstimate(stages=stages, settings=settings)
+
+    current_settings = ()
+    vae = getattr(pipeline, "vae", None)
+    if getattr(vae, "use_tiling", False):
+        current_settings = ("vae_tiling",)
+    result = estimate(current_settings)
+
+    if max_memory is not None:
+        candidates = [s for s in _CANDIDATE_SETTINGS if all(_is_applicable(pipeline, setting) for setting in s)]
+        for settings in candidates:
+            candidate = estimate(settings)
+            if candidate.peak_memory <= max_memory:
+                result.recommended_settings = settings
+                result.recommended_estimate = candidate
+                break
+        else:
+            lowest = min(estimate(settings).peak_memory for settings in candidates)
+            logger.warning(
+                f"No combination of memory-saving settings is estimated to fit in {max_memory} bytes. The lowest "
+                f"estimate is {lowest} bytes."
+            )
+    return result
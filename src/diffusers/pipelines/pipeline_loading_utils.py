@@ -12,9 +12,11 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import collections
 import importlib
 import os
 import re
+import threading
 import warnings
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Union
@@ -41,6 +43,7 @@ from ..utils import (
     is_transformers_version,
     logging,
 )
+from ..utils.constants import DDUF_PREFETCH_WORKERS
 from ..utils.torch_utils import is_compiled_module
 from .transformers_loading_utils import _load_tokenizer_from_dduf, _load_transformers_model_from_dduf
 
@@ -631,6 +634,7 @@ def load_sub_model(
     use_safetensors: bool,
     dduf_entries: Optional[Dict[str, DDUFEntry]],
     provider_options: Any,
+    disable_mmap: bool = False,
 ):
     """Helper method to load the module `name` from `library_name` and `class_name`"""
 
@@ -719,6 +723,9 @@ def load_sub_model(
         elif is_transformers_model and loading_kwargs["variant"] is None:
             loading_kwargs.pop("variant")
 
+        if is_diffusers_model and disable_mmap:
+            loading_kwargs["disable_mmap"] = True
+
         # if `from_flax` and model is transformer model, can currently not load with `low_cpu_mem_usage`
         if not (from_flax and is_transformers_model):
             loading_kwargs["low_cpu_mem_usage"] = low_cpu_mem_usage
@@ -1059,3 +1066,45 @@ def _maybe_raise_error_for_incorrect_transformers(config_dict):
                 break
     if has_transformers_component and not is_transformers_version(">", "4.47.1"):
         raise ValueError("Please upgrade your `transformers` installation to the latest version to use DDUF.")
+
+
+def _prefetch_dduf_entries(
+    dduf_entries: Dict[str, DDUFEntry], num_workers: int = DDUF_PREFETCH_WORKERS, chunk_size: int = 8 * 1024**2
+) -> threading.Event:
+    """
+    Reads the weight files of a DDUF archive in the background with `num_workers` threads, so that they are in the
+    page cache by the time the memory-mapped tensors of the components are accessed. Parallel reads keep network and
+    NVMe storage busy, unlike the page faults of a single loading thread. Set the returned event to stop prefetching.
+    """
+    stop = threading.Event()
+    entries = sorted(
+        (entry for name, entry in dduf_entries.items() if name.endswith(".safetensors")), key=lambda e: e.offset
+    )
+    chunks = collections.deque(
+        (offset, min(chunk_size, entry.offset + entry.length - offset))
+        for entry in entries
+        for offset in range(entry.offset, entry.offset + entry.length, chunk_size)
+    )
+    if num_workers <= 0 or not chunks:
+        return stop
+
+    def prefetch(dduf_path):
+        buffer = memoryview(bytearray(chunk_size))
+        try:
+            with open(dduf_path, "rb", buffering=0) as f:
+                while not stop.is_set():
+                    try:
+                        offset, length = chunks.popleft()
+                    except IndexError:
+                        return
+                    f.seek(offset)
+                    f.readinto(buffer[:length])
+        except OSError as e:
+            logger.debug(f"Stopped prefetching {dduf_path}: {e}")
+
+    for _ in range(min(num_workers, len(chunks))):
+        # Daemon threads, so that an unfinished prefetch never delays the exit of the interpreter.
+        threading.Thread(
+            target=prefetch, args=(entries[0].dduf_path,), name="diffusers-dduf-prefetch", daemon=True
+        ).start()
+    return stop
@@ -44,6 +44,7 @@ from typing_extensions import Self
 
 from .. import __version__
 from ..configuration_utils import ConfigMixin
+from ..hooks.model_residency import ModelResidencyManager, _get_model_residency_hook
 from ..models import AutoencoderKL
 from ..models.attention_processor import FusedAttnProcessor2_0
 from ..models.modeling_utils import _LOW_CPU_MEM_USAGE_DEFAULT, ModelMixin
@@ -65,12 +66,18 @@ from ..utils import (
     numpy_to_pil,
 )
 from ..utils.hub_utils import _check_legacy_sharding_variant_format, load_or_create_model_card, populate_model_card
-from ..utils.torch_utils import is_compiled_module
+from ..utils.torch_utils import (
+    get_placement_fingerprint,
+    get_placement_generation,
+    invalidate_placement_cache,
+    is_compiled_module,
+)
 
 
 if is_torch_npu_available():
     import torch_npu  # noqa: F401
 
+from .memory_estimation_utils import PipelineMemoryEstimate, estimate_pipeline_memory
 from .pipeline_loading_utils import (
     ALL_IMPORTABLE_CLASSES,
     CONNECTED_PIPES_KEYS,
@@ -86,6 +93,7 @@ from .pipeline_loading_utils import (
     _identify_model_variants,
     _maybe_raise_error_for_incorrect_transformers,
     _maybe_raise_warning_for_inpainting,
+    _prefetch_dduf_entries,
     _resolve_custom_pipeline_and_cls,
     _unwrap_model,
     _update_init_kwargs_with_connected_pipeline,
@@ -94,6 +102,8 @@ from .pipeline_loading_utils import (
     variant_compatible_siblings,
     warn_deprecated_model_variant,
 )
+from .telemetry_utils import PipelineTelemetry, TelemetrySink
+from .vae_cache_utils import VaeLatentCache
 
 
 if is_accelerate_available():
@@ -161,6 +171,7 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
     _exclude_from_cpu_offload = []
     _load_connected_pipes = False
     _is_onnx = False
+    _vae_latent_cache = None
 
     def register_modules(self, **kwargs):
         for name, module in kwargs.items():
@@ -190,6 +201,8 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
             else:
                 self.register_to_config(**{name: value})
 
+        if isinstance(value, torch.nn.Module):
+            invalidate_placement_cache()
         super().__setattr__(name, value)
 
     def save_pretrained(
@@ -493,6 +506,9 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
                     " support for`float16` operations on this device in PyTorch. Please, remove the"
                     " `torch_dtype=torch.float16` argument, or use another device for inference."
                 )
+
+        # Components from outside diffusers don't invalidate the cached placement when they are moved.
+        invalidate_placement_cache()
         return self
 
     @property
@@ -647,6 +663,9 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
                 loading `from_flax`.
             dduf_file(`str`, *optional*):
                 Load weights from the specified dduf file.
+            disable_mmap ('bool', *optional*, defaults to 'False'):
+                Whether to disable mmap when loading the weights of the diffusers models of the pipeline. This option
+                can perform better when the model is on a network mount or hard drive.
 
         <Tip>
 
@@ -685,6 +704,7 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
         token = kwargs.pop("token", None)
         revision = kwargs.pop("revision", None)
         from_flax = kwargs.pop("from_flax", False)
+        torch_dtype_passed = "torch_dtype" in kwargs
         torch_dtype = kwargs.pop("torch_dtype", torch.float32)
         custom_pipeline = kwargs.pop("custom_pipeline", None)
         custom_revision = kwargs.pop("custom_revision", None)
@@ -696,6 +716,7 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
         offload_folder = kwargs.pop("offload_folder", None)
         offload_state_dict = kwargs.pop("offload_state_dict", None)
         low_cpu_mem_usage = kwargs.pop("low_cpu_mem_usage", _LOW_CPU_MEM_USAGE_DEFAULT)
+        disable_mmap = kwargs.pop("disable_mmap", False)
         variant = kwargs.pop("variant", None)
         dduf_file = kwargs.pop("dduf_file", None)
         use_safetensors = kwargs.pop("use_safetensors", None)
@@ -817,6 +838,11 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
         # pop out "_ignore_files" as it is only needed for download
         config_dict.pop("_ignore_files", None)
 
+        # Pipelines saved by `diffusers-cli optimize` are loaded in the dtype they were converted to by default.
+        optimized_torch_dtype = (config_dict.get("_optimization") or {}).get("torch_dtype")
+        if not torch_dtype_passed and optimized_torch_dtype is not None:
+            torch_dtype = getattr(torch, optimized_torch_dtype)
+
         # 2. Define which model components should load variants
         # We retrieve the information by matching whether variant model checkpoints exist in the subfolders.
         # Example: `diffusion_pytorch_model.safetensors` -> `diffusion_pytorch_model.fp16.safetensors`
@@ -920,64 +946,82 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
             )
 
         # 7. Load each module in the pipeline
-        current_device_map = None
-        for name, (library_name, class_name) in logging.tqdm(init_dict.items(), desc="Loading pipeline components..."):
-            # 7.1 device_map shenanigans
-            if final_device_map is not None and len(final_device_map) > 0:
-                component_device = final_device_map.get(name, None)
-                if component_device is not None:
-                    current_device_map = {"": component_device}
-                else:
-                    current_device_map = None
-
-            # 7.2 - now that JAX/Flax is an official framework of the library, we might load from Flax names
-            class_name = class_name[4:] if class_name.startswith("Flax") else class_name
-
-            # 7.3 Define all importable classes
-            is_pipeline_module = hasattr(pipelines, library_name)
-            importable_classes = ALL_IMPORTABLE_CLASSES
-            loaded_sub_model = None
-
-            # 7.4 Use passed sub model or load class_name from library_name
-            if name in passed_class_obj:
-                # if the model is in a pipeline module, then we load it from the pipeline
-                # check that passed_class_obj has correct parent class
-                maybe_raise_or_warn(
-                    library_name, library, class_name, importable_classes, passed_class_obj, name, is_pipeline_module
-                )
+        # DDUF weights are memory-mapped, and read in parallel in the background while the components are created.
+        # Without memory-mapping, the weights are read by the components themselves and prefetching is pointless.
+        stop_prefetch = None
+        if dduf_entries and not disable_mmap:
+            stop_prefetch = _prefetch_dduf_entries(dduf_entries)
+        try:
+            current_device_map = None
+            for name, (library_name, class_name) in logging.tqdm(
+                init_dict.items(), desc="Loading pipeline components..."
+            ):
+                # 7.1 device_map shenanigans
+                if final_device_map is not None and len(final_device_map) > 0:
+                    component_device = final_device_map.get(name, None)
+                    if component_device is not None:
+                        current_device_map = {"": component_device}
+                    else:
+                        current_device_map = None
+
+                # 7.2 - now that JAX/Flax is an official framework of the library, we might load from Flax names
+                class_name = class_name[4:] if class_name.startswith("Flax") else class_name
+
+                # 7.3 Define all importable classes
+                is_pipeline_module = hasattr(pipelines, library_name)
+                importable_classes = ALL_IMPORTABLE_CLASSES
+                loaded_sub_model = None
+
+                # 7.4 Use passed sub model or load class_name from library_name
+                if name in passed_class_obj:
+                    # if the model is in a pipeline module, then we load it from the pipeline
+                    # check that passed_class_obj has correct parent class
+                    maybe_raise_or_warn(
+                        library_name,
+                        library,
+                        class_name,
+                        importable_classes,
+                        passed_class_obj,
+                        name,
+                        is_pipeline_module,
+                    )
 
-                loaded_sub_model = passed_class_obj[name]
-            else:
-                # load sub model
-                loaded_sub_model = load_sub_model(
-                    library_name=library_name,
-                    class_name=class_name,
-                    importable_classes=importable_classes,
-                    pipelines=pipelines,
-                    is_pipeline_module=is_pipeline_module,
-                    pipeline_class=pipeline_class,
-                    torch_dtype=torch_dtype,
-                    provider=provider,
-                    sess_options=sess_options,
-                    device_map=current_device_map,
-                    max_memory=max_memory,
-                    offload_folder=offload_folder,
-                    offload_state_dict=offload_state_dict,
-                    model_variants=model_variants,
-                    name=name,
-                    from_flax=from_flax,
-                    variant=variant,
-                    low_cpu_mem_usage=low_cpu_mem_usage,
-                    cached_folder=cached_folder,
-                    use_safetensors=use_safetensors,
-                    dduf_entries=dduf_entries,
-                    provider_options=provider_options,
-                )
-                logger.info(
-                    f"Loaded {name} as {class_name} from `{name}` subfolder of {pretrained_model_name_or_path}."
-                )
+                    loaded_sub_model = passed_class_obj[name]
+                else:
+                    # load sub model
+                    loaded_sub_model = load_sub_model(
+                        library_name=library_name,
+                        class_name=class_name,
+                        importable_classes=importable_classes,
+                        pipelines=pipelines,
+                        is_pipeline_module=is_pipeline_module,
+                        pipeline_class=pipeline_class,
+                        torch_dtype=torch_dtype,
+                        provider=provider,
+                        sess_options=sess_options,
+                        device_map=current_device_map,
+                        max_memory=max_memory,
+                        offload_folder=offload_folder,
+                        offload_state_dict=offload_state_dict,
+                        model_variants=model_variants,
+                        name=name,
+                        from_flax=from_flax,
+                        variant=variant,
+                        low_cpu_mem_usage=low_cpu_mem_usage,
+                        cached_folder=cached_folder,
+                        use_safetensors=use_safetensors,
+                        dduf_entries=dduf_entries,
+                        provider_options=provider_options,
+                        disable_mmap=disable_mmap,
+                    )
+                    logger.info(
+                        f"Loaded {name} as {class_name} from `{name}` subfolder of {pretrained_model_name_or_path}."
+                    )
 
-            init_kwargs[name] = loaded_sub_model  # UNet(...), # DiffusionSchedule(...)
+                init_kwargs[name] = loaded_sub_model  # UNet(...), # DiffusionSchedule(...)
+        finally:
+            if stop_prefetch is not None:
+                stop_prefetch.set()
 
         # 8. Handle connected pipelines.
         if pipeline_class._load_connected_pipes and os.path.isfile(os.path.join(cached_folder, "README.md")):
@@ -1025,6 +1069,15 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
         model.register_to_config(_name_or_path=pretrained_model_name_or_path)
         if device_map is not None:
             setattr(model, "hf_device_map", final_device_map)
+
+        # 13. Apply the load-time optimizations recorded by `diffusers-cli optimize`
+        optimization = config_dict.get("_optimization")
+        if optimization is not None:
+            model.register_to_config(_optimization=optimization)
+            for name in optimization.get("fuse_qkv_projections", []):
+                component = getattr(model, name, None)
+                if component is not None and hasattr(component, "fuse_qkv_projections"):
+                    component.fuse_qkv_projections()
         return model
 
     @property
@@ -1037,7 +1090,29 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
         Returns the device on which the pipeline's models will be executed. After calling
         [`~DiffusionPipeline.enable_sequential_cpu_offload`] the execution device can only be inferred from
         Accelerate's module hooks.
+
+        The device is cached until a model is moved, a component is replaced or offloading hooks are added or removed.
         """
+        if torch.compiler.is_compiling():
+            return self._get_execution_device()
+
+        # Components from outside diffusers don't invalidate the cache when they are moved, so it is also keyed by
+        # the placement of the first parameter of every model.
+        key = (
+            get_placement_generation(),
+            tuple(
+                get_placement_fingerprint(model)
+                for model in self.components.values()
+                if isinstance(model, torch.nn.Module)
+            ),
+        )
+        cache = self.__dict__.get("_execution_device_cache")
+        if cache is None or cache[0] != key:
+            cache = (key, self._get_execution_device())
+            self.__dict__["_execution_device_cache"] = cache
+        return cache[1]
+
+    def _get_execution_device(self):
         from ..hooks.group_offloading import _get_group_onload_device
 
         # When apply group offloading at the leaf_level, we're in the same situation as accelerate's sequential
@@ -1051,6 +1126,11 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
             except ValueError:
                 pass
 
+            # Models managed by a `ModelResidencyManager` may be offloaded until they are called.
+            residency_hook = _get_model_residency_hook(model)
+            if residency_hook is not None:
+                return residency_hook.manager.device
+
         for name, model in self.components.items():
             if not isinstance(model, torch.nn.Module) or name in self._exclude_from_cpu_offload:
                 continue
@@ -1074,6 +1154,7 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
             if isinstance(model, torch.nn.Module) and hasattr(model, "_hf_hook"):
                 accelerate.hooks.remove_hook_from_module(model, recurse=True)
         self._all_hooks = []
+        invalidate_placement_cache()
 
     def enable_model_cpu_offload(self, gpu_id: Optional[int] = None, device: Union[torch.device, str] = "cuda"):
         r"""
@@ -1164,6 +1245,8 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
                 _, hook = cpu_offload_with_hook(model, device)
                 self._all_hooks.append(hook)
 
+        invalidate_placement_cache()
+
     def maybe_free_model_hooks(self):
         r"""
         Method that performs the following:
@@ -1250,6 +1333,93 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
                 offload_buffers = len(model._parameters) > 0
                 cpu_offload(model, device, offload_buffers=offload_buffers)
 
+        invalidate_placement_cache()
+
+    def enable_model_residency(self, manager: ModelResidencyManager):
+        r"""
+        Registers all `torch.nn.Module` components (except those in `self._exclude_from_cpu_offload`, which are moved to
+        the manager's device) with a [`ModelResidencyManager`]. The manager keeps the most recently used models of all
+        pipelines registered with it on the accelerator within a memory budget, and moves the others to CPU.
+
+        Components shared with other pipelines, for example through [`~DiffusionPipeline.from_pipe`], are only
+        registered once.
+
+        Args:
+            manager ([`ModelResidencyManager`]):
+                The manager to register the components with.
+        """
+        self._maybe_raise_error_if_group_offload_active(raise_error=True)
+        self.remove_all_hooks()
+
+        for name, model in self.components.items():
+            if not isinstance(model, torch.nn.Module):
+                continue
+            if name in self._exclude_from_cpu_offload:
+                model.to(manager.device)
+            else:
+                manager.register(model, name=f"{self.__class__.__name__}.{name}")
+
+    def disable_model_residency(self):
+        r"""
+        Removes the components of the pipeline from the [`ModelResidencyManager`] they were registered with, leaving
+        them on the device they are currently on.
+        """
+        for model in self.components.values():
+            if not isinstance(model, torch.nn.Module):
+                continue
+            hook = _get_model_residency_hook(model)
+            if hook is not None:
+                hook.manager.unregister(model)
+
+    def estimate_memory(
+        self, max_memory: Optional[int] = None, memory_efficient_attention: bool = True, **kwargs
+    ) -> PipelineMemoryEstimate:
+        r"""
+        Estimates the peak accelerator memory of calling the pipeline with `kwargs`, without running it.
+
+        The pipeline is called once on copies of its models on the meta device, with a single denoising step, and the
+        memory of every tensor allocated by each component is tracked. The weights on the accelerator are computed
+        from the models and the offloading settings. The estimate does not include the memory reserved by the CUDA
+        context and the caching allocator.
+
+        Args:
+            max_memory (`int`, *optional*):
+                A memory budget in bytes. If given, the cheapest combination of VAE tiling, attention slicing,
+                feed-forward chunking, model CPU offloading and group offloading that is estimated to fit is returned
+                in `recommended_settings`.
+            memory_efficient_attention (`bool`, defaults to `True`):
+                Whether `scaled_dot_product_attention` is assumed to use flash or memory-efficient kernels, which don't
+                materialize the attention matrix.
+            kwargs:
+                The arguments the pipeline would be called with, such as `prompt`, `height`, `width`,
+                `num_images_per_prompt` or `num_frames`.
+
+        Returns:
+            [`~pipelines.memory_estimation_utils.PipelineMemoryEstimate`]:
+                The estimated weight and peak activation memory of each stage, in bytes.
+
+        Examples:
+
+        ```py
+        >>> import torch
+        >>> from diffusers import StableDiffusionXLPipeline
+
+        >>> pipe = StableDiffusionXLPipeline.from_pretrained(
+        ...     "stabilityai/stable-diffusion-xl-base-1.0", torch_dtype=torch.float16
+        ... )
+        >>> estimate = pipe.estimate_memory(
+        ...     max_memory=8 * 1024**3, prompt="an astronaut", height=1536, width=1536, num_images_per_prompt=2
+        ... )
+        >>> for stage in estimate.stages:
+        ...     print(stage.name, stage.weights / 1024**3, stage.peak_activations / 1024**3)
+        >>> estimate.recommended_settings
+        ('model_cpu_offload', 'vae_tiling')
+        ```
+        """
+        return estimate_pipeline_memory(
+            self, max_memory=max_memory, memory_efficient_attention=memory_efficient_attention, **kwargs
+        )
+
     def reset_device_map(self):
         r"""
         Resets the device maps (if any) to None.
@@ -1690,6 +1860,84 @@ class DiffusionPipeline(ConfigMixin, PushToHubMixin):
     def set_progress_bar_config(self, **kwargs):
         self._progress_bar_config = kwargs
 
+    def telemetry(
+        self,
+        sinks: Optional[List[TelemetrySink]] = None,
+        synchronize: bool = True,
+        count_host_syncs: bool = True,
+        track_memory: bool = True,
+    ) -> PipelineTelemetry:
+        r"""
+        Returns a context manager that records per-stage durations, per-step latency, host-sync counts and peak memory
+        of the pipeline calls made inside it. The finished [`~pipelines.telemetry_utils.PipelineTelemetryReport`] is
+        available as `.report` and is emitted to every sink when the context exits.
+
+        Args:
+            sinks (`List[TelemetrySink]`, *optional*):
+                Destinations for the report, such as [`~pipelines.telemetry_utils.LoggingTelemetrySink`],
+                [`~pipelines.telemetry_utils.CallbackTelemetrySink`] or
+                [`~pipelines.telemetry_utils.PrometheusTextFileTelemetrySink`].
+            synchronize (`bool`, defaults to `True`):
+                Whether to synchronize the execution device at stage boundaries for accurate durations.
+            count_host_syncs (`bool`, defaults to `True`):
+                Whether to count device-to-host synchronizations (CUDA only).
+            track_memory (`bool`, defaults to `True`):
+                Whether to record the peak memory allocated on the execution device (CUDA and XPU only).
+
+        Examples:
+
+        ```py
+        >>> with pipe.telemetry() as telemetry:
+        ...     image = pipe(prompt).images[0]
+        >>> print(telemetry.report.stage_durations, telemetry.report.mean_step_duration)
+        ```
+        """
+        return PipelineTelemetry(
+            self,
+            sinks=sinks,
+            synchronize=synchronize,
+            count_host_syncs=count_host_syncs,
+            track_memory=track_memory,
+        )
+
+    def enable_vae_latent_cache(self, max_entries: int = 16) -> VaeLatentCache:
+        r"""
+        Enables caching of the VAE encoder outputs of init images, masked images and other image conditions. Encoding
+        an image that was already encoded, for example when the same source image is edited with different prompts,
+        masks or seeds, re-uses the cached latent distribution instead of running the VAE encoder again. Latents are
+        still sampled with the generator of each call, so seeded results don't change.
+
+        Args:
+            max_entries (`int`, defaults to `16`):
+                The maximum number of images whose encoder outputs are kept. The least recently used are evicted first.
+
+        Returns:
+            [`~pipelines.vae_cache_utils.VaeLatentCache`]: The cache, which exposes `hits`, `misses` and `clear()`.
+
+        Examples:
+
+        ```py
+        >>> cache = pipe.enable_vae_latent_cache(max_entries=8)
+        >>> for prompt in prompts:
+        ...     image = pipe(prompt, image=init_image, strength=0.6).images[0]
+        >>> print(cache.hits, cache.misses)
+        ```
+        """
+        self._vae_latent_cache = VaeLatentCache(max_entries=max_entries)
+        return self._vae_latent_cache
+
+    def disable_vae_latent_cache(self):
+        r"""
+        Disables the VAE latent cache enabled with [`~DiffusionPipeline.enable_vae_latent_cache`] and frees its
+        entries.
+        """
+        self._vae_latent_cache = None
+
+    def _vae_encode(self, image: torch.Tensor):
+        if self._vae_latent_cache is None:
+            return self.vae.encode(image)
+        return self._vae_latent_cache.encode(self.vae, image)
+
     def enable_xformers_memory_efficient_attention(self, attention_op: Optional[Callable] = None):
         r"""
         Enable memory efficient attention from [xFormers](https://facebookresearch.github.io/xformers/). When this
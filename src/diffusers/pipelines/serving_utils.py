@@ -0,0 +1,363 @@
+# Copyright 2025 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import collections
+import inspect
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import torch
+
+from ..utils import logging
+
+
+logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
+
+
+# Pipeline arguments that are managed by the server and can't be passed with a request.
+_SERVER_ARGUMENTS = ("generator", "callback_on_step_end", "callback_on_step_end_tensor_inputs")
+
+
+@dataclass
+class _PendingRequest:
+    prompt: str
+    kwargs: Dict[str, Any]
+    seed: Optional[int]
+    future: asyncio.Future
+    batch_key: Any
+    enqueue_time: float = field(default_factory=time.perf_counter)
+    deadline: Optional[float] = None
+    # Only written from the event loop and read from the worker thread to stop generating for this request.
+    cancelled: bool = False
+
+    @property
+    def expired(self) -> bool:
+        return self.cancelled or (self.deadline is not None and time.perf_counter() > self.deadline)
+
+
+class PipelineServer:
+    r"""
+    Serves a [`DiffusionPipeline`] to concurrent asyncio clients.
+
+    Requests are put into a bounded queue and grouped into micro-batches of compatible requests, i.e. requests that
+    only differ in their prompt and seed. Batches are run one at a time on a single dedicated worker thread, so the
+    pipeline and its scheduler are never used concurrently. When the queue is full, new requests are rejected with
+    `asyncio.QueueFull` instead of piling up. A batch is interrupted through `callback_on_step_end` as soon as all of
+    its requests have been cancelled or have timed out.
+
+    ```py
+    >>> server = PipelineServer(pipe, max_batch_size=4)
+    >>> await server.start()
+    >>> images = await server.submit("a kitten in front of a fireplace", num_inference_steps=30, timeout=60)
+    >>> await server.stop()
+    ```
+
+    Args:
+        pipeline ([`DiffusionPipeline`]):
+            The pipeline to serve. It must accept a list of prompts through its `prompt` argument.
+        max_queue_size (`int`, defaults to `64`):
+            The maximum number of requests waiting to be run. Requests submitted while the queue is full are rejected.
+        max_batch_size (`int`, defaults to `4`):
+            The maximum number of requests run together in a single pipeline call.
+        batch_timeout (`float`, defaults to `0.01`):
+            The time, in seconds, to wait for compatible requests to fill a batch after its first request arrived.
+        request_timeout (`float`, *optional*):
+            The default time, in seconds, after which a request is abandoned. Can be overridden per request.
+        generator_device (`str`, defaults to `"cpu"`):
+            The device on which the per-request generators are created.
+    """
+
+    def __init__(
+        self,
+        pipeline,
+        max_queue_size: int = 64,
+        max_batch_size: int = 4,
+        batch_timeout: float = 0.01,
+        request_timeout: Optional[float] = None,
+        generator_device: str = "cpu",
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError(f"`max_batch_size` must be at least 1, but got {max_batch_size}.")
+
+        self.pipeline = pipeline
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max_batch_size
+        self.batch_timeout = batch_timeout
+        self.request_timeout = request_timeout
+        self.generator_device = generator_device
+
+        parameters = inspect.signature(pipeline.__call__).parameters
+        self._supports_step_callback = "callback_on_step_end" in parameters
+        self._supports_generator = "generator" in parameters
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._deferred: Deque[_PendingRequest] = collections.deque()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        self._running_batch: Optional[asyncio.Future] = None
+        self._stopping = False
+        self._metrics = collections.Counter()
+        self._queue_wait_time = 0.0
+        self._batch_run_time = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._batch_task is not None and not self._batch_task.done() and not self._stopping
+
+    async def start(self) -> None:
+        r"""Starts the batching loop and the worker thread. Must be called from a running event loop."""
+        if self.is_running:
+            return
+        self._stopping = False
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="diffusers-pipeline-worker")
+        self._batch_task = asyncio.get_running_loop().create_task(self._batch_loop())
+
+    async def stop(self) -> None:
+        r"""
+        Stops the server. New requests are rejected right away, the running batch is finished and its requests get
+        their results, and all requests that are still queued fail.
+        """
+        if self._batch_task is None or self._stopping:
+            return
+
+        self._stopping = True
+        if self._running_batch is None:
+            # The batching loop is waiting for requests, which it puts back into the queue when cancelled.
+            self._batch_task.cancel()
+        try:
+            # Otherwise, the loop returns after delivering the results of the running batch.
+            await self._batch_task
+        except asyncio.CancelledError:
+            pass
+        self._batch_task = None
+
+        while not self._queue.empty():
+            self._deferred.append(self._queue.get_nowait())
+        while self._deferred:
+            request = self._deferred.popleft()
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("The server was stopped before the request was run."))
+
+        # The worker thread is idle by now, but shutting it down must not block the event loop.
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown, True)
+        self._executor = None
+
+    async def submit(self, prompt: str, seed: Optional[int] = None, timeout: Optional[float] = None, **kwargs) -> Any:
+        r"""
+        Submits a generation request and waits for its result.
+
+        Args:
+            prompt (`str`):
+                The prompt to generate from.
+            seed (`int`, *optional*):
+                The seed of the request. A random seed is used if not provided.
+            timeout (`float`, *optional*):
+                The time, in seconds, after which the request is abandoned. Defaults to `request_timeout`.
+            kwargs:
+                Additional arguments passed to the pipeline. Only requests with equal arguments are batched together.
+
+        Returns:
+            The first field of the pipeline output (for example `images` or `frames`) for this request.
+
+        Raises:
+            `asyncio.QueueFull`: If the request queue is full.
+            `asyncio.TimeoutError`: If the request didn't finish within `timeout` seconds.
+        """
+        if not self.is_running:
+            raise RuntimeError("The server is not running. Please call `start()` first.")
+        for name in _SERVER_ARGUMENTS:
+            if name in kwargs:
+                raise ValueError(f"`{name}` is managed by the server and can't be passed with a request.")
+
+        try:
+            batch_key = tuple(sorted(kwargs.items()))
+            hash(batch_key)
+        except TypeError:
+            # Requests with unhashable arguments are never batched with other requests.
+            batch_key = object()
+
+        timeout = timeout if timeout is not None else self.request_timeout
+        request = _PendingRequest(
+            prompt=prompt,
+            kwargs=kwargs,
+            seed=seed,
+            future=asyncio.get_running_loop().create_future(),
+            batch_key=batch_key,
+        )
+        if timeout is not None:
+            request.deadline = request.enqueue_time + timeout
+
+        # Deferred requests were taken from the queue by the batching loop but still count towards its size.
+        if self._queue.qsize() + len(self._deferred) >= self.max_queue_size:
+            self._metrics["requests_rejected"] += 1
+            raise asyncio.QueueFull(f"The request queue is full ({self.max_queue_size} requests).")
+        self._queue.put_nowait(request)
+        self._metrics["requests_submitted"] += 1
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(request.future), timeout)
+        except asyncio.TimeoutError:
+            request.cancelled = True
+            self._metrics["requests_timed_out"] += 1
+            raise
+        except asyncio.CancelledError:
+            # The client went away, e.g. because the HTTP connection was closed.
+            request.cancelled = True
+            self._metrics["requests_cancelled"] += 1
+            raise
+
+    def get_metrics(self) -> Dict[str, float]:
+        r"""Returns request, batch and timing counters of the server."""
+        metrics = {
+            name: self._metrics[name]
+            for name in (
+                "requests_submitted",
+                "requests_completed",
+                "requests_failed",
+                "requests_rejected",
+                "requests_cancelled",
+                "requests_timed_out",
+                "batches",
+                "batched_requests",
+                "interrupted_batches",
+            )
+        }
+        metrics["queue_size"] = (self._queue.qsize() if self._queue is not None else 0) + len(self._deferred)
+        metrics["max_queue_size"] = self.max_queue_size
+        num_batches = max(metrics["batches"], 1)
+        metrics["average_batch_size"] = metrics["batched_requests"] / num_batches
+        metrics["average_batch_time"] = self._batch_run_time / num_batches
+        metrics["average_queue_wait_time"] = self._queue_wait_time / max(metrics["batched_requests"], 1)
+        return metrics
+
+    async def _next_request(self, timeout: Optional[float] = None) -> Optional[_PendingRequest]:
+        while True:
+            if self._deferred:
+                request = self._deferred.popleft()
+            elif timeout is None:
+                request = await self._queue.get()
+            else:
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), max(timeout, 0.0))
+                except asyncio.TimeoutError:
+                    return None
+            if not request.expired:
+                return request
+            if not request.future.done():
+                request.future.cancel()
+
+    async def _collect_batch(self) -> List[_PendingRequest]:
+        first = await self._next_request()
+        batch = [first]
+        incompatible = []
+        deadline = time.perf_counter() + self.batch_timeout
+        try:
+            while len(batch) < self.max_batch_size:
+                # Incompatible requests are deferred to a later batch without losing their place in line.
+                request = None
+                if self._deferred:
+                    request = self._deferred.popleft()
+                elif not self._queue.empty():
+                    request = self._queue.get_nowait()
+                elif deadline > time.perf_counter():
+                    request = await self._next_request(deadline - time.perf_counter())
+                if request is None:
+                    break
+                if request.expired:
+                    if not request.future.done():
+                        request.future.cancel()
+                elif request.batch_key == first.batch_key:
+                    batch.append(request)
+                else:
+                    incompatible.append(request)
+        except asyncio.CancelledError:
+            # The server is stopping. The collected requests are put back so that they don't remain pending.
+            self._deferred.extendleft(reversed(batch + incompatible))
+            raise
+        self._deferred.extendleft(reversed(incompatible))
+        return batch
+
+    async def _batch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._stopping:
+            batch = await self._collect_batch()
+            start = time.perf_counter()
+            for request in batch:
+                self._queue_wait_time += start - request.enqueue_time
+
+            self._running_batch = loop.run_in_executor(self._executor, self._run_batch, batch)
+            try:
+                output, interrupted = await self._running_batch
+            except asyncio.CancelledError:
+                # Only happens if the loop is cancelled from outside of `stop()`.
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(RuntimeError("The server was stopped while the request was run."))
+                raise
+            except Exception as e:
+                logger.error(f"Batch of {len(batch)} requests failed: {e}")
+                self._metrics["requests_failed"] += len(batch)
+                for request in batch:
+                    if not request.future.done() and not request.expired:
+                        request.future.set_exception(e)
+                continue
+            finally:
+                self._running_batch = None
+                self._metrics["batches"] += 1
+                self._metrics["batched_requests"] += len(batch)
+                self._batch_run_time += time.perf_counter() - start
+
+            self._metrics["interrupted_batches"] += int(interrupted)
+            results = output[0]
+            num_outputs_per_request = len(results) // len(batch)
+            for i, request in enumerate(batch):
+                if request.future.done() or request.expired:
+                    continue
+                request.future.set_result(results[i * num_outputs_per_request : (i + 1) * num_outputs_per_request])
+                self._metrics["requests_completed"] += 1
+
+    def _run_batch(self, batch: List[_PendingRequest]) -> Tuple[Any, bool]:
+        kwargs = dict(batch[0].kwargs)
+        kwargs["prompt"] = [request.prompt for request in batch]
+
+        if self._supports_generator:
+            num_images_per_prompt = kwargs.get("num_images_per_prompt") or 1
+            generators = []
+            for request in batch:
+                seed = request.seed if request.seed is not None else random.randint(0, 2**31 - 1)
+                generators.append(torch.Generator(device=self.generator_device).manual_seed(seed))
+                # Following images of the same request continue from the state of the first generator.
+                generators.extend(generators[-1] for _ in range(num_images_per_prompt - 1))
+            kwargs["generator"] = generators
+
+        interrupted = False
+        if self._supports_step_callback:
+
+            def callback_on_step_end(pipeline, step, timestep, callback_kwargs):
+                nonlocal interrupted
+                if all(request.expired for request in batch):
+                    pipeline._interrupt = True
+                    interrupted = True
+                return {}
+
+            kwargs["callback_on_step_end"] = callback_on_step_end
+
+        with torch.inference_mode():
+            output = self.pipeline(**kwargs)
+        return output, interrupted
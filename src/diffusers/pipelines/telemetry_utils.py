@@ -0,0 +1,431 @@
+# Copyright 2025 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import os
+import time
+import warnings
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import torch
+
+from ..utils import logging
+
+
+logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
+
+
+# Pipeline methods that are timed as a stage when they exist on the pipeline being observed.
+_PIPELINE_METHOD_STAGES = {
+    "encode_prompt": "encode_prompt",
+    "encode_image": "encode_image",
+    "prepare_ip_adapter_image_embeds": "encode_image",
+    "prepare_latents": "prepare_latents",
+    "prepare_mask_latents": "prepare_latents",
+}
+# Components whose forward calls make up the denoising loop.
+_DENOISER_COMPONENTS = ("unet", "transformer", "prior", "controlnet", "decoder")
+_VAE_COMPONENTS = ("vae", "movq", "vqvae")
+_PROCESSOR_COMPONENTS = ("image_processor", "video_processor", "vae_image_processor")
+_PROCESSOR_METHOD_STAGES = {
+    "postprocess": "postprocess",
+    "postprocess_video": "postprocess",
+    "preprocess": "preprocess",
+    "preprocess_video": "preprocess",
+}
+
+
+@dataclass
+class PipelineTelemetryReport:
+    r"""
+    Structured timing and memory information collected for a single pipeline invocation.
+
+    Args:
+        pipeline (`str`):
+            The class name of the observed pipeline.
+        total_duration (`float`):
+            Wall-clock duration, in seconds, of the observed region.
+        stage_durations (`Dict[str, float]`):
+            Accumulated duration, in seconds, of each stage (`encode_prompt`, `prepare_latents`, `denoise`,
+            `vae_encode`, `vae_decode`, `postprocess`, ...). Stages are measured inclusively, so a stage that calls
+            into another one (for example `prepare_latents` calling `vae_encode` in image-to-image pipelines) also
+            contains the nested duration.
+        stage_calls (`Dict[str, int]`):
+            The number of times each stage was entered.
+        step_durations (`List[float]`):
+            Latency, in seconds, of each denoising step, measured from the first denoiser call of a step until the
+            scheduler step returns.
+        host_syncs (`int`, *optional*):
+            The number of device-to-host synchronizations observed. Only available on CUDA devices.
+        peak_memory_bytes (`int`, *optional*):
+            Peak memory allocated on the execution device. Only available on CUDA and XPU devices.
+    """
+
+    pipeline: str
+    total_duration: float = 0.0
+    stage_durations: Dict[str, float] = field(default_factory=dict)
+    stage_calls: Dict[str, int] = field(default_factory=dict)
+    step_durations: List[float] = field(default_factory=list)
+    host_syncs: Optional[int] = None
+    peak_memory_bytes: Optional[int] = None
+
+    @property
+    def num_steps(self) -> int:
+        return len(self.step_durations)
+
+    @property
+    def mean_step_duration(self) -> Optional[float]:
+        if len(self.step_durations) == 0:
+            return None
+        return sum(self.step_durations) / len(self.step_durations)
+
+    def to_dict(self) -> Dict[str, Any]:
+        output = asdict(self)
+        output["num_steps"] = self.num_steps
+        output["mean_step_duration"] = self.mean_step_duration
+        return output
+
+
+class TelemetrySink:
+    r"""Base class for destinations of [`PipelineTelemetryReport`] objects."""
+
+    def emit(self, report: PipelineTelemetryReport) -> None:
+        raise NotImplementedError
+
+
+class LoggingTelemetrySink(TelemetrySink):
+    r"""
+    Writes a one-line summary of each report to the diffusers logger.
+
+    Args:
+        level (`int`, defaults to `logging.INFO`):
+            The logging level to emit the summary with.
+    """
+
+    def __init__(self, level: int = logging.INFO) -> None:
+        self.level = level
+
+    def emit(self, report: PipelineTelemetryReport) -> None:
+        stages = ", ".join(f"{name}={duration:.4f}s" for name, duration in report.stage_durations.items())
+        mean_step = report.mean_step_duration
+        mean_step = f"{mean_step:.4f}s" if mean_step is not None else "n/a"
+        logger.log(
+            self.level,
+            f"{report.pipeline}: total={report.total_duration:.4f}s, steps={report.num_steps}, "
+            f"mean_step={mean_step}, host_syncs={report.host_syncs}, peak_memory={report.peak_memory_bytes}, "
+            f"stages=[{stages}]",
+        )
+
+
+class CallbackTelemetrySink(TelemetrySink):
+    r"""
+    Forwards each report to a user-provided callable.
+
+    Args:
+        callback (`Callable[[PipelineTelemetryReport], None]`):
+            The function called with every finished report.
+    """
+
+    def __init__(self, callback: Callable[[PipelineTelemetryReport], None]) -> None:
+        self.callback = callback
+
+    def emit(self, report: PipelineTelemetryReport) -> None:
+        self.callback(report)
+
+
+class PrometheusTextFileTelemetrySink(TelemetrySink):
+    r"""
+    Writes reports in the Prometheus text exposition format so that they can be picked up by the node exporter
+    textfile collector. Counters and sums are accumulated across reports emitted through the same sink, and the file
+    is replaced atomically on every emit.
+
+    Args:
+        path (`str` or `os.PathLike`):
+            The path of the `.prom` file to write.
+        prefix (`str`, defaults to `"diffusers_pipeline"`):
+            The prefix prepended to every metric name.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike], prefix: str = "diffusers_pipeline") -> None:
+        self.path = os.fspath(path)
+        self.prefix = prefix
+        self._calls: Dict[str, int] = {}
+        self._total_seconds: Dict[str, float] = {}
+        self._stage_seconds: Dict[tuple, float] = {}
+        self._steps: Dict[str, int] = {}
+        self._step_seconds: Dict[str, float] = {}
+        self._host_syncs: Dict[str, int] = {}
+        self._peak_memory: Dict[str, int] = {}
+
+    def emit(self, report: PipelineTelemetryReport) -> None:
+        name = report.pipeline
+        self._calls[name] = self._calls.get(name, 0) + 1
+        self._total_seconds[name] = self._total_seconds.get(name, 0.0) + report.total_duration
+        for stage, duration in report.stage_durations.items():
+            self._stage_seconds[(name, stage)] = self._stage_seconds.get((name, stage), 0.0) + duration
+        self._steps[name] = self._steps.get(name, 0) + report.num_steps
+        self._step_seconds[name] = self._step_seconds.get(name, 0.0) + sum(report.step_durations)
+        if report.host_syncs is not None:
+            self._host_syncs[name] = self._host_syncs.get(name, 0) + report.host_syncs
+        if report.peak_memory_bytes is not None:
+            self._peak_memory[name] = report.peak_memory_bytes
+        self._write()
+
+    def _write(self) -> None:
+        p = self.prefix
+        lines = [
+            f"# TYPE {p}_calls_total counter",
+            *(f'{p}_calls_total{{pipeline="{n}"}} {v}' for n, v in self._calls.items()),
+            f"# TYPE {p}_duration_seconds_total counter",
+            *(f'{p}_duration_seconds_total{{pipeline="{n}"}} {v}' for n, v in self._total_seconds.items()),
+            f"# TYPE {p}_stage_duration_seconds_total counter",
+            *(
+                f'{p}_stage_duration_seconds_total{{pipeline="{n}",stage="{s}"}} {v}'
+                for (n, s), v in self._stage_seconds.items()
+            ),
+            f"# TYPE {p}_steps_total counter",
+            *(f'{p}_steps_total{{pipeline="{n}"}} {v}' for n, v in self._steps.items()),
+            f"# TYPE {p}_step_duration_seconds_total counter",
+            *(f'{p}_step_duration_seconds_total{{pipeline="{n}"}} {v}' for n, v in self._step_seconds.items()),
+            f"# TYPE {p}_host_syncs_total counter",
+            *(f'{p}_host_syncs_total{{pipeline="{n}"}} {v}' for n, v in self._host_syncs.items()),
+            f"# TYPE {p}_peak_memory_bytes gauge",
+            *(f'{p}_peak_memory_bytes{{pipeline="{n}"}} {v}' for n, v in self._peak_memory.items()),
+        ]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+
+
+class PipelineTelemetry:
+    r"""
+    Context manager that collects per-stage durations, per-step latency, host-sync counts and peak memory of a
+    [`DiffusionPipeline`] without modifying its `__call__` implementation.
+
+    Stages are observed by temporarily wrapping well-known pipeline methods (`encode_prompt`, `prepare_latents`, ...),
+    the forward of the denoising components (`unet`, `transformer`, `controlnet`, ...), `vae.encode`/`vae.decode`,
+    the image/video processors and `scheduler.step`. All wrappers are removed when the context exits, after which the
+    report is emitted to every sink.
+
+    Args:
+        pipeline ([`DiffusionPipeline`]):
+            The pipeline to observe.
+        sinks (`List[TelemetrySink]`, *optional*):
+            Destinations for the finished report.
+        synchronize (`bool`, defaults to `True`):
+            Whether to synchronize the execution device at stage boundaries. Without synchronization, the durations of
+            asynchronous accelerator work are attributed to whichever stage next waits on the device.
+        count_host_syncs (`bool`, defaults to `True`):
+            Whether to count device-to-host synchronizations. Uses `torch.cuda.set_sync_debug_mode` and is a no-op on
+            other devices.
+        track_memory (`bool`, defaults to `True`):
+            Whether to record peak memory allocated on the execution device.
+
+    Example:
+
+    ```python
+    >>> from diffusers.pipelines.telemetry_utils import LoggingTelemetrySink
+
+    >>> with pipe.telemetry(sinks=[LoggingTelemetrySink()]) as telemetry:
+    ...     image = pipe("an astronaut riding a horse").images[0]
+    >>> telemetry.report.stage_durations
+    {'encode_prompt': 0.011, 'prepare_latents': 0.001, 'denoise': 1.562, 'vae_decode': 0.086, 'postprocess': 0.012}
+    ```
+    """
+
+    def __init__(
+        self,
+        pipeline,
+        sinks: Optional[List[TelemetrySink]] = None,
+        synchronize: bool = True,
+        count_host_syncs: bool = True,
+        track_memory: bool = True,
+    ) -> None:
+        self.pipeline = pipeline
+        self.sinks = list(sinks) if sinks is not None else []
+        self.synchronize = synchronize
+        self.count_host_syncs = count_host_syncs
+        self.track_memory = track_memory
+
+        self.report: Optional[PipelineTelemetryReport] = None
+
+        self._device: Optional[torch.device] = None
+        self._patches: List[tuple] = []
+        self._active_stages: Dict[str, int] = {}
+        self._step_start: Optional[float] = None
+        self._start: Optional[float] = None
+        self._previous_sync_debug_mode: Optional[int] = None
+        self._warnings_context = None
+        self._caught_warnings: Optional[list] = None
+
+    def __enter__(self) -> "PipelineTelemetry":
+        self.report = PipelineTelemetryReport(pipeline=self.pipeline.__class__.__name__)
+        self._device = self.pipeline._execution_device
+        self._install_patches()
+
+        if self.track_memory:
+            _reset_peak_memory_stats(self._device)
+        if self.count_host_syncs and self._device.type == "cuda":
+            self._warnings_context = warnings.catch_warnings(record=True)
+            self._caught_warnings = self._warnings_context.__enter__()
+            warnings.simplefilter("always")
+            self._previous_sync_debug_mode = torch.cuda.get_sync_debug_mode()
+            torch.cuda.set_sync_debug_mode("warn")
+
+        self._synchronize()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._synchronize()
+        self.report.total_duration = time.perf_counter() - self._start
+
+        if self._warnings_context is not None:
+            torch.cuda.set_sync_debug_mode(self._previous_sync_debug_mode)
+            self._warnings_context.__exit__(None, None, None)
+            self.report.host_syncs = sum("synchroniz" in str(w.message).lower() for w in self._caught_warnings)
+            self._warnings_context = None
+            self._caught_warnings = None
+        if self.track_memory:
+            self.report.peak_memory_bytes = _max_memory_allocated(self._device)
+
+        self._remove_patches()
+
+        if exc_type is None:
+            for sink in self.sinks:
+                sink.emit(self.report)
+
+    def _synchronize(self) -> None:
+        if not self.synchronize or self._device is None:
+            return
+        device_module = getattr(torch, self._device.type, None)
+        if self._device.type == "cpu" or device_module is None or not hasattr(device_module, "synchronize"):
+            return
+        if self._device.type == "cuda" and self._previous_sync_debug_mode is not None:
+            # Our own synchronizations should not be reported as host syncs of the pipeline.
+            mode = torch.cuda.get_sync_debug_mode()
+            torch.cuda.set_sync_debug_mode(0)
+            device_module.synchronize()
+            torch.cuda.set_sync_debug_mode(mode)
+        else:
+            device_module.synchronize()
+
+    def _record_stage(self, stage: str, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            depth = self._active_stages.get(stage, 0)
+            self.report.stage_calls[stage] = self.report.stage_calls.get(stage, 0) + 1
+            if depth > 0:
+                # Re-entrant calls of the same stage (e.g. SDXL encoding both text encoders) are already timed by the
+                # outermost call.
+                return fn(*args, **kwargs)
+
+            self._active_stages[stage] = depth + 1
+            self._synchronize()
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._synchronize()
+                duration = time.perf_counter() - start
+                self._active_stages[stage] = depth
+                self.report.stage_durations[stage] = self.report.stage_durations.get(stage, 0.0) + duration
+
+        return wrapper
+
+    def _record_denoiser(self, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if self._step_start is None:
+                self._synchronize()
+                self._step_start = time.perf_counter()
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    def _record_scheduler_step(self, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            output = fn(*args, **kwargs)
+            if self._step_start is not None:
+                self._synchronize()
+                duration = time.perf_counter() - self._step_start
+                self._step_start = None
+                self.report.step_durations.append(duration)
+                self.report.stage_durations["denoise"] = self.report.stage_durations.get("denoise", 0.0) + duration
+                self.report.stage_calls["denoise"] = self.report.stage_calls.get("denoise", 0) + 1
+            return output
+
+        return wrapper
+
+    def _patch(self, obj: Any, name: str, wrapper_factory: Callable[[Callable], Callable]) -> None:
+        original = getattr(obj, name, None)
+        if original is None or not callable(original):
+            return
+        had_instance_attr = name in getattr(obj, "__dict__", {})
+        setattr(obj, name, wrapper_factory(original))
+        self._patches.append((obj, name, original, had_instance_attr))
+
+    def _install_patches(self) -> None:
+        pipe = self.pipeline
+
+        for method_name, stage in _PIPELINE_METHOD_STAGES.items():
+            self._patch(pipe, method_name, functools.partial(self._record_stage, stage))
+        self._patch(pipe, "numpy_to_pil", functools.partial(self._record_stage, "postprocess"))
+
+        components = pipe.components
+        for name, component in components.items():
+            if component is None:
+                continue
+            if name in _DENOISER_COMPONENTS and isinstance(component, torch.nn.Module):
+                self._patch(component, "forward", self._record_denoiser)
+            elif name in _VAE_COMPONENTS and isinstance(component, torch.nn.Module):
+                self._patch(component, "encode", functools.partial(self._record_stage, "vae_encode"))
+                self._patch(component, "decode", functools.partial(self._record_stage, "vae_decode"))
+            elif name == "scheduler":
+                self._patch(component, "step", self._record_scheduler_step)
+
+        for name in _PROCESSOR_COMPONENTS:
+            processor = getattr(pipe, name, None)
+            if processor is None:
+                continue
+            for method_name, stage in _PROCESSOR_METHOD_STAGES.items():
+                self._patch(processor, method_name, functools.partial(self._record_stage, stage))
+
+    def _remove_patches(self) -> None:
+        for obj, name, original, had_instance_attr in reversed(self._patches):
+            if had_instance_attr:
+                setattr(obj, name, original)
+            else:
+                delattr(obj, name)
+        self._patches = []
+        self._active_stages = {}
+        self._step_start = None
+
+
+def _reset_peak_memory_stats(device: torch.device) -> None:
+    if device.type == "cuda":
+        torch.cuda.reset_peak_memory_stats(device)
+    elif device.type == "xpu" and hasattr(torch, "xpu"):
+        torch.xpu.reset_peak_memory_stats(device)
+
+
+def _max_memory_allocated(device: torch.device) -> Optional[int]:
+    if device.type == "cuda":
+        return torch.cuda.max_memory_allocated(device)
+    elif device.type == "xpu" and hasattr(torch, "xpu"):
+        return torch.xpu.max_memory_allocated(device)
+    return None
@@ -12,15 +12,15 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import contextlib
+import json
 import os
 import tempfile
 from typing import TYPE_CHECKING, Dict
 
 from huggingface_hub import DDUFEntry
-from tqdm import tqdm
 
-from ..utils import is_safetensors_available, is_transformers_available, is_transformers_version
+from ..models.model_loading_utils import load_dduf_state_dict
+from ..utils import is_transformers_available, is_transformers_version
 
 
 if TYPE_CHECKING:
@@ -29,9 +29,6 @@ if TYPE_CHECKING:
 if is_transformers_available():
     from transformers import PreTrainedModel, PreTrainedTokenizer
 
-if is_safetensors_available():
-    import safetensors.torch
-
 
 def _load_tokenizer_from_dduf(
     cls: "PreTrainedTokenizer", name: str, dduf_entries: Dict[str, DDUFEntry], **kwargs
@@ -63,7 +60,8 @@ def _load_transformers_model_from_dduf(
     Load a transformers model from a DDUF archive.
 
     In practice, `transformers` do not provide a way to load a model from a DDUF archive. This function is a workaround
-    by instantiating a model from the config file and loading the weights from the DDUF archive directly.
+    by instantiating a model from the config file and loading the weights from the DDUF archive directly, without
+    copying them out of the archive first.
     """
     config_file = dduf_entries.get(f"{name}/config.json")
     if config_file is None:
@@ -81,41 +79,26 @@ def _load_transformers_model_from_dduf(
         raise EnvironmentError(
             f"Could not find any weight file for component {name} in DDUF file (contains {dduf_entries.keys()})."
         )
-    if not is_safetensors_available():
-        raise EnvironmentError(
-            "Safetensors is not available, cannot load model from DDUF. Please `pip install safetensors`."
-        )
     if is_transformers_version("<", "4.47.0"):
         raise ImportError(
             "You need to install `transformers>4.47.0` in order to load a transformers model from a DDUF file. "
             "You can install it with: `pip install --upgrade transformers`"
         )
 
-    with tempfile.TemporaryDirectory() as tmp_dir:
-        from transformers import AutoConfig, GenerationConfig
+    from transformers import GenerationConfig
 
-        tmp_config_file = os.path.join(tmp_dir, "config.json")
-        with open(tmp_config_file, "w") as f:
-            f.write(config_file.read_text())
-        config = AutoConfig.from_pretrained(tmp_config_file)
-        if generation_config is not None:
-            tmp_generation_config_file = os.path.join(tmp_dir, "generation_config.json")
-            with open(tmp_generation_config_file, "w") as f:
-                f.write(generation_config.read_text())
-            generation_config = GenerationConfig.from_pretrained(tmp_generation_config_file)
-        state_dict = {}
-        with contextlib.ExitStack() as stack:
-            for entry in tqdm(weight_files, desc="Loading state_dict"):  # Loop over safetensors files
-                # Memory-map the safetensors file
-                mmap = stack.enter_context(entry.as_mmap())
-                # Load tensors from the memory-mapped file
-                tensors = safetensors.torch.load(mmap)
-                # Update the state dictionary with tensors
-                state_dict.update(tensors)
-            return cls.from_pretrained(
-                pretrained_model_name_or_path=None,
-                config=config,
-                generation_config=generation_config,
-                state_dict=state_dict,
-                **kwargs,
-            )
+    # The configs are created from their JSON content, and the weights are views into the memory-mapped archive, so
+    # nothing is extracted or copied before `transformers` loads the weights into the model.
+    config = cls.config_class.from_dict(json.loads(config_file.read_text()))
+    if generation_config is not None:
+        generation_config = GenerationConfig.from_dict(json.loads(generation_config.read_text()))
+    state_dict = {}
+    for entry in weight_files:
+        state_dict.update(load_dduf_state_dict(entry))
+    return cls.from_pretrained(
+        pretrained_model_name_or_path=None,
+        config=config,
+        generation_config=generation_config,
+        state_dict=state_dict,
+        **kwargs,
+    )
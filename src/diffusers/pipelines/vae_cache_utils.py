@@ -0,0 +1,139 @@
+# Copyright 2025 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import weakref
+from collections import OrderedDict
+from typing import Any, List, Tuple
+
+import torch
+
+from ..models.autoencoders.autoencoder_tiny import AutoencoderTinyOutput
+from ..models.autoencoders.vae import DiagonalGaussianDistribution
+from ..models.modeling_outputs import AutoencoderKLOutput
+from ..utils import logging
+
+
+logger = logging.get_logger(__name__)  # pylint: disable=invalid-name
+
+
+def _tensor_digest(tensor: torch.Tensor) -> bytes:
+    tensor = tensor.detach().cpu().contiguous().reshape(-1)
+    return hashlib.sha256(tensor.view(torch.uint8).numpy().tobytes()).digest()
+
+
+class VaeLatentCache:
+    r"""
+    A least-recently-used cache of VAE encoder outputs, used by the img2img and inpainting pipelines to skip
+    `vae.encode` for images they have already encoded.
+
+    Each image of a batch is cached separately, keyed by a hash of its preprocessed pixel values and of the identity and
+    dtype of the VAE. For VAEs that return a latent distribution, the distribution parameters are cached rather than a
+    sample, so that latents are still sampled with the generator of each request.
+
+    Args:
+        max_entries (`int`, defaults to `16`):
+            The maximum number of images whose encoder outputs are kept.
+    """
+
+    def __init__(self, max_entries: int = 16):
+        if max_entries < 1:
+            raise ValueError(f"`max_entries` must be a positive integer, but is {max_entries}.")
+
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[str, torch.Tensor]]" = OrderedDict()
+        self._fingerprints = weakref.WeakKeyDictionary()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        r"""Removes all entries, for example after the weights of the VAE were modified in-place."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _fingerprint(self, vae: torch.nn.Module) -> str:
+        parameter = next(vae.parameters())
+        if vae not in self._fingerprints:
+            sha = hashlib.sha256()
+            sha.update(vae.__class__.__name__.encode())
+            sha.update(str(getattr(vae.config, "_name_or_path", "")).encode())
+            if parameter.device.type != "meta":
+                sha.update(_tensor_digest(parameter))
+            self._fingerprints[vae] = sha.hexdigest()
+        # The dtype is part of the key because pipelines may upcast the VAE for encoding.
+        return f"{self._fingerprints[vae]}-{parameter.dtype}"
+
+    def encode(self, vae: torch.nn.Module, image: torch.Tensor) -> Any:
+        r"""
+        Returns the output of `vae.encode(image)`, only encoding the images of the batch that are not cached.
+
+        Args:
+            vae (`torch.nn.Module`):
+                The VAE to encode the images with.
+            image (`torch.Tensor`):
+                The preprocessed images, of shape `(batch_size, channels, height, width)`.
+        """
+        prefix = self._fingerprint(vae)
+        keys = []
+        for sample in image:
+            sha = hashlib.sha256(prefix.encode())
+            sha.update(f"{sample.dtype}-{tuple(sample.shape)}".encode())
+            sha.update(_tensor_digest(sample))
+            keys.append(sha.hexdigest())
+
+        found = {}
+        for key in keys:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                found[key] = self._entries[key]
+
+        num_hits = sum(key in found for key in keys)
+        self.hits += num_hits
+        self.misses += len(keys) - num_hits
+
+        # Encode each missing image once, even if it appears several times in the batch.
+        first_index = {}
+        for i, key in enumerate(keys):
+            if key not in found:
+                first_index.setdefault(key, i)
+        missing = list(first_index.values())
+
+        if len(missing) > 0:
+            output = vae.encode(image[missing] if len(missing) < len(keys) else image)
+            if hasattr(output, "latent_dist"):
+                kind, values = "latent_dist", output.latent_dist.parameters
+            elif hasattr(output, "latents"):
+                kind, values = "latents", output.latents
+            else:
+                raise AttributeError("Could not access latents of provided encoder_output")
+            for i, value in zip(missing, values):
+                found[keys[i]] = (kind, value)
+                self._insert(keys[i], (kind, value))
+
+        entries: List[Tuple[str, torch.Tensor]] = [found[key] for key in keys]
+        kind = entries[0][0]
+        values = torch.stack([value for _, value in entries])
+        if kind == "latent_dist":
+            return AutoencoderKLOutput(latent_dist=DiagonalGaussianDistribution(values))
+        return AutoencoderTinyOutput(latents=values)
+
+    def _insert(self, key: str, entry: Tuple[str, torch.Tensor]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -18,7 +18,7 @@ https://github.com/huggingface/transformers/blob/52cb4034ada381fe1ffe8d428a1076e
 """
 
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
 from ..utils import is_torch_available
 from .quantization_config import QuantizationConfigMixin
@@ -110,6 +110,47 @@ class DiffusersQuantizer(ABC):
         """
         return missing_keys
 
+    def update_loaded_keys(self, loaded_keys: List[str]) -> List[str]:
+        """
+        Override this method if the keys of a serialized checkpoint differ from the keys of the state dict of the
+        model, for example because quantized tensors are serialized as several tensors.
+
+        Args:
+            loaded_keys (`List[str]`):
+                The list of keys in the checkpoint.
+        """
+        return loaded_keys
+
+    def get_state_dict_and_metadata(
+        self, model: "ModelMixin", safe_serialization: bool = False
+    ) -> Tuple[Dict[str, "torch.Tensor"], Dict[str, str]]:
+        """
+        Returns the state dict of the quantized model to serialize, and metadata to store alongside it in the header of
+        every safetensors file. Override this method if quantized tensors can't be serialized as they are.
+
+        Args:
+            model (`~diffusers.models.modeling_utils.ModelMixin`):
+                The quantized model to serialize.
+            safe_serialization (`bool`, defaults to `False`):
+                Whether the state dict is serialized with safetensors.
+        """
+        return model.state_dict(), {}
+
+    def update_state_dict_with_metadata(
+        self, state_dict: Dict[str, "torch.Tensor"], metadata: Dict[str, str]
+    ) -> Dict[str, "torch.Tensor"]:
+        """
+        Restores the quantized tensors of a state dict, or of one shard of it, serialized with
+        [`~DiffusersQuantizer.get_state_dict_and_metadata`].
+
+        Args:
+            state_dict (`Dict[str, torch.Tensor]`):
+                The loaded state dict.
+            metadata (`Dict[str, str]`):
+                The metadata of the safetensors file the state dict was loaded from.
+        """
+        return state_dict
+
     def get_special_dtypes_update(self, model, torch_dtype: "torch.dtype") -> Dict[str, "torch.dtype"]:
         """
         returns dtypes for modules that are not quantized - used for the computation of the device_map in case one
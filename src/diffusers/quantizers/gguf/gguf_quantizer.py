@@ -24,8 +24,11 @@ if is_torch_available() and is_gguf_available():
     from .utils import (
         GGML_QUANT_SIZES,
         GGUFParameter,
+        _apply_gguf_grouped_dequantization,
         _dequantize_gguf_and_restore_linear,
+        _enable_gguf_dequantization_cache,
         _quant_shape_from_byte_shape,
+        _remove_gguf_dequantization_optimizations,
         _replace_with_gguf_linear,
     )
 
@@ -41,6 +44,8 @@ class GGUFQuantizer(DiffusersQuantizer):
 
         self.compute_dtype = quantization_config.compute_dtype
         self.pre_quantized = quantization_config.pre_quantized
+        self.dequantization_cache_size = quantization_config.dequantization_cache_size
+        self.grouped_dequantization = quantization_config.grouped_dequantization
         self.modules_to_not_convert = quantization_config.modules_to_not_convert
 
         if not isinstance(self.modules_to_not_convert, list):
@@ -135,6 +140,10 @@ class GGUFQuantizer(DiffusersQuantizer):
         )
 
     def _process_model_after_weight_loading(self, model: "ModelMixin", **kwargs):
+        if self.dequantization_cache_size is not None:
+            _enable_gguf_dequantization_cache(model, self.dequantization_cache_size)
+        if self.grouped_dequantization:
+            _apply_gguf_grouped_dequantization(model)
         return model
 
     @property
@@ -153,6 +162,7 @@ class GGUFQuantizer(DiffusersQuantizer):
             )
             model.to(torch.cuda.current_device())
 
+        _remove_gguf_dequantization_optimizations(model)
         model = _dequantize_gguf_and_restore_linear(model, self.modules_to_not_convert)
         if is_model_on_cpu:
             model.to("cpu")
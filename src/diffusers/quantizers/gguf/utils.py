@@ -14,13 +14,16 @@
 
 
 import inspect
+from collections import OrderedDict
 from contextlib import nullcontext
+from typing import List, Optional
 
 import gguf
 import torch
 import torch.nn as nn
 
-from ...utils import is_accelerate_available
+from ...hooks import HookRegistry, ModelHook
+from ...utils import is_accelerate_available, logging
 
 
 if is_accelerate_available():
@@ -29,6 +32,11 @@ if is_accelerate_available():
     from accelerate.hooks import add_hook_to_module, remove_hook_from_module
 
 
+logger = logging.get_logger(__name__)
+
+_GGUF_GROUPED_DEQUANTIZATION_HOOK = "gguf_grouped_dequantization"
+
+
 # Copied from diffusers.quantizers.bitsandbytes.utils._create_accelerate_new_hook
 def _create_accelerate_new_hook(old_hook):
     r"""
@@ -395,6 +403,93 @@ def dequantize_gguf_tensor(tensor):
     return dequant.as_tensor()
 
 
+def _dequantize_gguf_tensors(tensors: List[torch.Tensor]) -> List[torch.Tensor]:
+    r"""
+    Dequantizes several tensors at once. The blocks of all tensors with the same quantization type and device are
+    concatenated and dequantized with a single call of the dequantization function, which replaces the many small
+    operations of dequantizing every tensor separately with a few large ones.
+    """
+    outputs = [None] * len(tensors)
+    groups = {}
+    for index, tensor in enumerate(tensors):
+        quant_type = getattr(tensor, "quant_type", None)
+        if quant_type not in dequantize_functions:
+            outputs[index] = dequantize_gguf_tensor(tensor)
+            continue
+        groups.setdefault((quant_type, tensor.device), []).append(index)
+
+    for (quant_type, _), indices in groups.items():
+        block_size, type_size = GGML_QUANT_SIZES[quant_type]
+        blocks = [tensors[index].as_tensor().view(torch.uint8).reshape(-1, type_size) for index in indices]
+        dequant = dequantize_functions[quant_type](
+            torch.cat(blocks) if len(blocks) > 1 else blocks[0], block_size, type_size
+        )
+        for index, values in zip(indices, dequant.split([block.shape[0] for block in blocks])):
+            outputs[index] = values.reshape(_quant_shape_from_byte_shape(tensors[index].shape, type_size, block_size))
+
+    return outputs
+
+
+class GGUFDequantizationCache:
+    r"""
+    A least-recently-used cache of the dequantized weights of [`GGUFLinear`] layers, bounded by the number of bytes of
+    the cached weights. A cached weight is re-used as long as the quantized weight of the layer is neither modified
+    nor moved to another device.
+
+    Args:
+        max_bytes (`int`):
+            The maximum number of bytes of dequantized weights kept in the cache.
+    """
+
+    def __init__(self, max_bytes: int):
+        if max_bytes < 1:
+            raise ValueError(f"`max_bytes` must be a positive integer, but is {max_bytes}.")
+
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _signature(weight: torch.Tensor):
+        return (weight.data_ptr(), weight._version, weight.device)
+
+    def get(self, module: nn.Module, weight: torch.Tensor) -> Optional[torch.Tensor]:
+        entry = self._entries.get(module)
+        if entry is not None and entry[0] == self._signature(weight):
+            self._entries.move_to_end(module)
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            self._remove(module)
+        self.misses += 1
+        return None
+
+    def put(self, module: nn.Module, weight: torch.Tensor, dequantized: torch.Tensor) -> None:
+        size = dequantized.numel() * dequantized.element_size()
+        if size > self.max_bytes:
+            return
+        if module in self._entries:
+            self._remove(module)
+        self._entries[module] = (self._signature(weight), dequantized)
+        self.num_bytes += size
+        while self.num_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        r"""Removes all cached weights."""
+        self._entries.clear()
+        self.num_bytes = 0
+
+    def _remove(self, module: nn.Module) -> None:
+        _, dequantized = self._entries.pop(module)
+        self.num_bytes -= dequantized.numel() * dequantized.element_size()
+
+
 class GGUFParameter(torch.nn.Parameter):
     def __new__(cls, data, requires_grad=False, quant_type=None):
         data = data if data is not None else torch.empty(0)
@@ -436,6 +531,9 @@ class GGUFParameter(torch.nn.Parameter):
 
 
 class GGUFLinear(nn.Linear):
+    _dequantization_cache = None
+    _dequantized_weight = None
+
     def __init__(
         self,
         in_features,
@@ -448,9 +546,99 @@ class GGUFLinear(nn.Linear):
         self.compute_dtype = compute_dtype
 
     def forward(self, inputs):
-        weight = dequantize_gguf_tensor(self.weight)
-        weight = weight.to(self.compute_dtype)
+        weight = self._dequantized_weight
+        if weight is None:
+            weight = self.dequantize_weight()
         bias = self.bias.to(self.compute_dtype) if self.bias is not None else None
 
         output = torch.nn.functional.linear(inputs, weight, bias)
         return output
+
+    def dequantize_weight(self) -> torch.Tensor:
+        cache = self._dequantization_cache
+        weight = cache.get(self, self.weight) if cache is not None else None
+        if weight is None:
+            weight = dequantize_gguf_tensor(self.weight).to(self.compute_dtype)
+            if cache is not None:
+                cache.put(self, self.weight, weight)
+        return weight
+
+
+class GGUFGroupedDequantizationHook(ModelHook):
+    r"""
+    A hook on a block of a model, such as a transformer block, that dequantizes the weights of all [`GGUFLinear`]
+    layers of the block in one pass before the block runs, and releases them afterwards.
+    """
+
+    _is_stateful = False
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.layers = []
+
+    def initialize_hook(self, module: nn.Module) -> nn.Module:
+        self.layers = [submodule for submodule in module.modules() if isinstance(submodule, GGUFLinear)]
+        return module
+
+    def new_forward(self, module: nn.Module, *args, **kwargs):
+        self._dequantize_weights()
+        try:
+            return self.fn_ref.original_forward(*args, **kwargs)
+        finally:
+            # Released even if the block raises, so that no memory is pinned and later calls don't use stale weights.
+            for layer in self.layers:
+                layer._dequantized_weight = None
+
+    def _dequantize_weights(self) -> None:
+        pending = []
+        for layer in self.layers:
+            cache = layer._dequantization_cache
+            weight = cache.get(layer, layer.weight) if cache is not None else None
+            if weight is None:
+                pending.append(layer)
+            layer._dequantized_weight = weight
+
+        weights = _dequantize_gguf_tensors([layer.weight for layer in pending])
+        for layer, weight in zip(pending, weights):
+            weight = weight.to(layer.compute_dtype)
+            if layer._dequantization_cache is not None:
+                layer._dequantization_cache.put(layer, layer.weight, weight)
+            layer._dequantized_weight = weight
+
+
+def _enable_gguf_dequantization_cache(model: nn.Module, max_bytes: int) -> GGUFDequantizationCache:
+    cache = GGUFDequantizationCache(max_bytes)
+    for module in model.modules():
+        if isinstance(module, GGUFLinear):
+            module._dequantization_cache = cache
+    return cache
+
+
+def _apply_gguf_grouped_dequantization(model: nn.Module) -> None:
+    # Blocks are the children of the outermost `nn.ModuleList`s of the model, such as `transformer_blocks`. Lists nested
+    # within a block, such as `Attention.to_out`, are covered by the hook of the block and must not be hooked again.
+    num_blocks = 0
+    modules = [model]
+    while len(modules) > 0:
+        module = modules.pop()
+        if not isinstance(module, nn.ModuleList):
+            modules.extend(module.children())
+            continue
+        for block in module:
+            if not any(isinstance(layer, GGUFLinear) for layer in block.modules()):
+                continue
+            if hasattr(block, "_diffusers_hook") and block._diffusers_hook.get_hook(_GGUF_GROUPED_DEQUANTIZATION_HOOK):
+                continue
+            registry = HookRegistry.check_if_exists_or_initialize(block)
+            registry.register_hook(GGUFGroupedDequantizationHook(), _GGUF_GROUPED_DEQUANTIZATION_HOOK)
+            num_blocks += 1
+    logger.debug(f"Enabled grouped GGUF dequantization on {num_blocks} blocks.")
+
+
+def _remove_gguf_dequantization_optimizations(model: nn.Module) -> None:
+    for module in model.modules():
+        if isinstance(module, GGUFLinear):
+            module._dequantization_cache = None
+            module._dequantized_weight = None
+        if hasattr(module, "_diffusers_hook"):
+            module._diffusers_hook.remove_hook(_GGUF_GROUPED_DEQUANTIZATION_HOOK, recurse=False)
@@ -403,12 +403,28 @@ class GGUFQuantizationConfig(QuantizationConfigMixin):
         compute_dtype: (`torch.dtype`, defaults to `torch.float32`):
             This sets the computational type which might be different than the input type. For example, inputs might be
             fp32, but computation can be set to bf16 for speedups.
+        dequantization_cache_size (`int`, *optional*):
+            If set, the dequantized weights of the quantized linear layers are kept in a least-recently-used cache of
+            at most this many bytes and re-used in later forward passes instead of being dequantized again. Useful when
+            there is memory to spare, for example to keep the weights of the most expensive to dequantize layers.
+        grouped_dequantization (`bool`, defaults to `False`):
+            If `True`, the weights of all quantized linear layers of a block of the model, such as a transformer block,
+            are dequantized together in one pass before the block runs, rather than layer by layer. This reduces the
+            overhead of the many small operations of dequantization, at the cost of keeping the dequantized weights of
+            a whole block in memory while it runs.
 
     """
 
-    def __init__(self, compute_dtype: Optional["torch.dtype"] = None):
+    def __init__(
+        self,
+        compute_dtype: Optional["torch.dtype"] = None,
+        dequantization_cache_size: Optional[int] = None,
+        grouped_dequantization: bool = False,
+    ):
         self.quant_method = QuantizationMethod.GGUF
         self.compute_dtype = compute_dtype
+        self.dequantization_cache_size = dequantization_cache_size
+        self.grouped_dequantization = grouped_dequantization
         self.pre_quantized = True
 
         # TODO: (Dhruv) Add this as an init argument when we can support loading unquantized checkpoints.
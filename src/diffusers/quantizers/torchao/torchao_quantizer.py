@@ -17,9 +17,12 @@ Adapted from
 https://github.com/huggingface/transformers/blob/3a8eb74668e9c2cc563b2f5c62fac174797063e0/src/transformers/quantizers/quantizer_torchao.py
 """
 
+import dataclasses
+import enum
 import importlib
+import json
 import types
-from typing import TYPE_CHECKING, Any, Dict, List, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
 from packaging import version
 
@@ -84,6 +87,114 @@ def _linear_extra_repr(self):
         return f"in_features={self.weight.shape[1]}, out_features={self.weight.shape[0]}, weight={weight}"
 
 
+# Quantized tensors are serialized to safetensors as their plain inner tensors, such as the integer data, the scales
+# and the zero-points, under the keys `"{name}:{path}"`. The metadata of the safetensors files maps each quantized
+# tensor to the classes and attributes needed to rebuild it from its inner tensors.
+_TORCHAO_METADATA_KEY = "torchao_tensors"
+_TORCHAO_KEY_SEPARATOR = ":"
+
+
+def _qualified_name(cls) -> str:
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def _import_qualified_name(name: str):
+    module_name, qualname = name.split(":")
+    # Only torchao classes can be re-created from a checkpoint.
+    if module_name.split(".")[0] != "torchao":
+        raise ValueError(f"Cannot load `{name}` from the metadata of a torchao checkpoint.")
+    obj = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _encode_tensor_context(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, torch.dtype):
+        return {"dtype": str(value).split(".")[-1]}
+    if isinstance(value, torch.Size):
+        return {"size": list(value)}
+    if isinstance(value, enum.Enum):
+        return {"enum": _qualified_name(type(value)), "name": value.name}
+    if dataclasses.is_dataclass(value):
+        fields = {field.name: getattr(value, field.name) for field in dataclasses.fields(value) if field.init}
+        return {"class": _qualified_name(type(value)), "fields": _encode_tensor_context(fields)}
+    if isinstance(value, tuple) and hasattr(value, "_fields"):
+        fields = {field: getattr(value, field) for field in value._fields}
+        return {"class": _qualified_name(type(value)), "fields": _encode_tensor_context(fields)}
+    if isinstance(value, (list, tuple)):
+        return {type(value).__name__: [_encode_tensor_context(v) for v in value]}
+    if isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        return {"dict": {key: _encode_tensor_context(v) for key, v in value.items()}}
+    raise ValueError(
+        f"{value!r} of type {type(value).__name__} can't be serialized with safetensors. Please save the model with "
+        f"`safe_serialization=False` instead."
+    )
+
+
+def _decode_tensor_context(value):
+    if not isinstance(value, dict):
+        return value
+    if "dtype" in value:
+        return getattr(torch, value["dtype"])
+    if "size" in value:
+        return torch.Size(value["size"])
+    if "enum" in value:
+        return _import_qualified_name(value["enum"])[value["name"]]
+    if "class" in value:
+        return _import_qualified_name(value["class"])(**_decode_tensor_context(value["fields"]))
+    if "list" in value:
+        return [_decode_tensor_context(v) for v in value["list"]]
+    if "tuple" in value:
+        return tuple(_decode_tensor_context(v) for v in value["tuple"])
+    return {key: _decode_tensor_context(v) for key, v in value["dict"].items()}
+
+
+def _inner_tensor_key(key: str, name: str) -> str:
+    separator = "." if _TORCHAO_KEY_SEPARATOR in key else _TORCHAO_KEY_SEPARATOR
+    return f"{key}{separator}{name}"
+
+
+def _flatten_quantized_tensor(tensor: "torch.Tensor", key: str, tensors: Dict[str, "torch.Tensor"]) -> Optional[Dict]:
+    if not hasattr(tensor, "__tensor_flatten__"):
+        tensors[key] = tensor
+        return None
+
+    inner_names, context = tensor.__tensor_flatten__()
+    inner = {}
+    for name in inner_names:
+        inner[name] = _flatten_quantized_tensor(getattr(tensor, name), _inner_tensor_key(key, name), tensors)
+    return {
+        "class": _qualified_name(type(tensor)),
+        "context": _encode_tensor_context(context),
+        "size": list(tensor.size()),
+        "stride": list(tensor.stride()),
+        "inner": inner,
+    }
+
+
+def _inner_tensor_keys(spec: Dict, key: str) -> List[str]:
+    keys = []
+    for name, inner_spec in spec["inner"].items():
+        inner_key = _inner_tensor_key(key, name)
+        keys.extend([inner_key] if inner_spec is None else _inner_tensor_keys(inner_spec, inner_key))
+    return keys
+
+
+def _unflatten_quantized_tensor(spec: Optional[Dict], key: str, tensors: Dict[str, "torch.Tensor"]) -> "torch.Tensor":
+    if spec is None:
+        return tensors.pop(key)
+
+    inner = {}
+    for name, inner_spec in spec["inner"].items():
+        inner[name] = _unflatten_quantized_tensor(inner_spec, _inner_tensor_key(key, name), tensors)
+    cls = _import_qualified_name(spec["class"])
+    context = _decode_tensor_context(spec["context"])
+    return cls.__tensor_unflatten__(inner, context, torch.Size(spec["size"]), tuple(spec["stride"]))
+
+
 class TorchAoHfQuantizer(DiffusersQuantizer):
     r"""
     Diffusers Quantizer for TorchAO: https://github.com/pytorch/ao/.
@@ -94,6 +205,8 @@ class TorchAoHfQuantizer(DiffusersQuantizer):
 
     def __init__(self, quantization_config, **kwargs):
         super().__init__(quantization_config, **kwargs)
+        # Inner tensors of quantized tensors whose other inner tensors are in a shard that is not loaded yet.
+        self._pending_inner_tensors = {}
 
     def validate_environment(self, *args, **kwargs):
         if not is_torchao_available():
@@ -263,14 +376,44 @@ class TorchAoHfQuantizer(DiffusersQuantizer):
     def _process_model_after_weight_loading(self, model: "ModelMixin"):
         return model
 
-    def is_serializable(self, safe_serialization=None):
-        # TODO(aryan): needs to be tested
-        if safe_serialization:
-            logger.warning(
-                "torchao quantized model does not support safe serialization, please set `safe_serialization` to False."
-            )
-            return False
+    def update_loaded_keys(self, loaded_keys: List[str]) -> List[str]:
+        return list(dict.fromkeys(key.split(_TORCHAO_KEY_SEPARATOR)[0] for key in loaded_keys))
+
+    def get_state_dict_and_metadata(
+        self, model: "ModelMixin", safe_serialization: bool = False
+    ) -> Tuple[Dict[str, "torch.Tensor"], Dict[str, str]]:
+        state_dict = model.state_dict()
+        if not safe_serialization:
+            return state_dict, {}
+
+        tensors, specs = {}, {}
+        for name, tensor in state_dict.items():
+            spec = _flatten_quantized_tensor(tensor, name, tensors)
+            if spec is not None:
+                specs[name] = spec
+        return tensors, {_TORCHAO_METADATA_KEY: json.dumps(specs)}
+
+    def update_state_dict_with_metadata(
+        self, state_dict: Dict[str, "torch.Tensor"], metadata: Dict[str, str]
+    ) -> Dict[str, "torch.Tensor"]:
+        if _TORCHAO_METADATA_KEY not in metadata:
+            return state_dict
+
+        specs = json.loads(metadata[_TORCHAO_METADATA_KEY])
+        pending = self._pending_inner_tensors
+        for name, spec in specs.items():
+            keys = _inner_tensor_keys(spec, name)
+            if not any(key in state_dict for key in keys):
+                continue
+            for key in keys:
+                if key in state_dict:
+                    pending[key] = state_dict.pop(key)
+            # With sharded checkpoints, the inner tensors may be spread over several shards.
+            if all(key in pending for key in keys):
+                state_dict[name] = _unflatten_quantized_tensor(spec, name, pending)
+        return state_dict
 
+    def is_serializable(self, safe_serialization=None):
         _is_torchao_serializable = version.parse(importlib.metadata.version("huggingface_hub")) >= version.parse(
             "0.25.0"
         )
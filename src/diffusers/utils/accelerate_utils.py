@@ -30,7 +30,8 @@ def apply_forward_hook(method):
     for cases where a PyTorch module provides functions other than `forward` that should trigger a move to the
     appropriate acceleration device. This is the case for `encode` and `decode` in [`AutoencoderKL`].
 
-    This decorator looks inside the internal `_hf_hook` property to find a registered offload hook.
+    This decorator looks inside the internal `_hf_hook` property to find a registered offload hook, and keeps models
+    managed by a [`ModelResidencyManager`] on its device while the method runs.
 
     :param method: The method to decorate. This method should be a method of a PyTorch module.
     """
@@ -43,6 +44,13 @@ def apply_forward_hook(method):
     def wrapper(self, *args, **kwargs):
         if hasattr(self, "_hf_hook") and hasattr(self._hf_hook, "pre_forward"):
             self._hf_hook.pre_forward(self)
+        if hasattr(self, "_diffusers_hook"):
+            from ..hooks.model_residency import _get_model_residency_hook
+
+            residency_hook = _get_model_residency_hook(self)
+            if residency_hook is not None:
+                with residency_hook.manager.use(self):
+                    return method(self, *args, **kwargs)
         return method(self, *args, **kwargs)
 
     return wrapper
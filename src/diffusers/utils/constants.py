@@ -40,6 +40,13 @@ HUGGINGFACE_CO_RESOLVE_ENDPOINT = os.environ.get("HF_ENDPOINT", "https://hugging
 DIFFUSERS_DYNAMIC_MODULE_NAME = "diffusers_modules"
 HF_MODULES_CACHE = os.getenv("HF_MODULES_CACHE", os.path.join(HF_HOME, "modules"))
 DEPRECATED_REVISION_ARGS = ["fp16", "non-ema"]
+DIFFUSERS_SINGLE_FILE_CONVERSION_CACHE = os.getenv(
+    "DIFFUSERS_SINGLE_FILE_CONVERSION_CACHE", os.path.join(HF_HOME, "diffusers", "single_file_conversions")
+)
+DDUF_PREFETCH_WORKERS = int(os.getenv("DIFFUSERS_DDUF_PREFETCH_WORKERS", "8"))
+USE_SINGLE_FILE_CONVERSION_CACHE = (
+    os.getenv("DIFFUSERS_USE_SINGLE_FILE_CONVERSION_CACHE", "0").upper() in ENV_VARS_TRUE_VALUES
+)
 
 # Below should be `True` if the current version of `peft` and `transformers` are compatible with
 # PEFT backend. Will automatically fall back to PEFT backend if the correct versions of the libraries are
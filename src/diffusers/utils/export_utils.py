@@ -1,15 +1,17 @@
 import io
 import random
+import shutil
 import struct
+import subprocess
 import tempfile
 from contextlib import contextmanager
-from typing import List, Union
+from typing import Any, Iterable, List, Optional, Union
 
 import numpy as np
 import PIL.Image
 import PIL.ImageOps
 
-from .import_utils import BACKENDS_MAPPING, is_imageio_available, is_opencv_available
+from .import_utils import BACKENDS_MAPPING, is_imageio_available, is_opencv_available, is_torch_available
 from .logging import get_logger
 
 
@@ -138,8 +140,197 @@ def _legacy_export_to_video(
     return output_video_path
 
 
+def _frame_to_uint8(frame: Any) -> np.ndarray:
+    # Converts a single frame to a `H x W x C` uint8 array. Tensors are expected channels-first in `[0, 1]`, like the
+    # `output_type="pt"` output of video pipelines, and are quantized on their device before being copied to the host.
+    if isinstance(frame, PIL.Image.Image):
+        return np.asarray(frame)
+    if is_torch_available():
+        import torch
+
+        if isinstance(frame, torch.Tensor):
+            frame = (frame.float() * 255).round_().clamp_(0, 255).to(torch.uint8)
+            return frame.permute(1, 2, 0).cpu().numpy()
+    if frame.dtype != np.uint8:
+        frame = (frame * 255).astype(np.uint8)
+    return frame
+
+
+def _iterate_frames(frames: Any) -> Iterable[Any]:
+    # Yields single frames from a frame, a batch of frames (`ndim == 4`) or an iterable of frames.
+    if isinstance(frames, PIL.Image.Image) or (hasattr(frames, "ndim") and frames.ndim in (2, 3)):
+        yield frames
+    else:
+        for frame in frames:
+            yield from _iterate_frames(frame)
+
+
+def _get_ffmpeg_exe() -> str:
+    if is_imageio_available():
+        import imageio
+
+        try:
+            return imageio.plugins.ffmpeg.get_exe()
+        except (AttributeError, RuntimeError):
+            pass
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError(
+            "Unable to find an ffmpeg installation in your environment. Please install it via `pip install imageio imageio-ffmpeg`."
+        )
+    return ffmpeg
+
+
+class VideoWriter:
+    r"""
+    Writes frames to a video file as they are produced by piping them to an `ffmpeg` subprocess, so that the whole clip
+    never has to be held in memory.
+
+    ```py
+    >>> with VideoWriter("output.mp4", fps=24, codec="libx264", bitrate="8M") as writer:
+    ...     for frames in frame_chunks:
+    ...         writer.write(frames)
+    ```
+
+    Args:
+        output_video_path (`str`, *optional*):
+            The path of the video. A temporary `.mp4` file is used if not provided.
+        fps (`int`, defaults to `10`):
+            The frame rate of the video.
+        codec (`str`, defaults to `"libx264"`):
+            The `ffmpeg` video codec.
+        bitrate (`str`, *optional*):
+            The target bitrate, for example `"8M"`. Mutually exclusive with `crf`.
+        crf (`int`, *optional*):
+            The constant rate factor of codecs that support it, for example `18` for `libx264`.
+        pix_fmt (`str`, defaults to `"yuv420p"`):
+            The pixel format of the encoded video.
+        ffmpeg_params (`List[str]`, *optional*):
+            Additional output arguments passed to `ffmpeg`.
+    """
+
+    def __init__(
+        self,
+        output_video_path: Optional[str] = None,
+        fps: int = 10,
+        codec: str = "libx264",
+        bitrate: Optional[str] = None,
+        crf: Optional[int] = None,
+        pix_fmt: str = "yuv420p",
+        ffmpeg_params: Optional[List[str]] = None,
+    ):
+        if bitrate is not None and crf is not None:
+            raise ValueError("Only one of `bitrate` and `crf` can be passed.")
+        if output_video_path is None:
+            output_video_path = tempfile.NamedTemporaryFile(suffix=".mp4").name
+
+        self.output_video_path = output_video_path
+        self.fps = fps
+        self.codec = codec
+        self.bitrate = bitrate
+        self.crf = crf
+        self.pix_fmt = pix_fmt
+        self.ffmpeg_params = ffmpeg_params or []
+        self.num_frames = 0
+        self._process: Optional[subprocess.Popen] = None
+        self._frame_shape = None
+
+    def _start(self, height: int, width: int, channels: int) -> None:
+        input_pix_fmt = {1: "gray", 3: "rgb24", 4: "rgba"}[channels]
+        command = [
+            _get_ffmpeg_exe(),
+            "-y",
+            "-loglevel",
+            "error",
+            "-f",
+            "rawvideo",
+            "-vcodec",
+            "rawvideo",
+            "-pix_fmt",
+            input_pix_fmt,
+            "-s",
+            f"{width}x{height}",
+            "-r",
+            str(self.fps),
+            "-i",
+            "-",
+            "-an",
+            "-vcodec",
+            self.codec,
+            "-pix_fmt",
+            self.pix_fmt,
+        ]
+        if (height % 2 or width % 2) and self.pix_fmt in ("yuv420p", "yuv422p"):
+            # Chroma subsampled formats require even dimensions.
+            command += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]
+        if self.bitrate is not None:
+            command += ["-b:v", str(self.bitrate)]
+        if self.crf is not None:
+            command += ["-crf", str(self.crf)]
+        command += [*self.ffmpeg_params, self.output_video_path]
+
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._frame_shape = (height, width, channels)
+
+    def write(self, frames: Any) -> None:
+        r"""
+        Writes a frame or a batch of frames.
+
+        Args:
+            frames:
+                A frame, a batch of frames or an iterable of frames. Frames can be `PIL.Image.Image`s, `np.ndarray`s of
+                shape `H x W x C` (either `uint8` or in `[0, 1]`) or `torch.Tensor`s of shape `C x H x W` in `[0, 1]`.
+        """
+        for frame in _iterate_frames(frames):
+            frame = _frame_to_uint8(frame)
+            if frame.ndim == 2:
+                frame = frame[..., None]
+            if self._process is None:
+                self._start(*frame.shape)
+            elif frame.shape != self._frame_shape:
+                raise ValueError(f"Expected frames of shape {self._frame_shape}, but got {frame.shape}.")
+
+            try:
+                self._process.stdin.write(np.ascontiguousarray(frame).data)
+            except BrokenPipeError:
+                self._raise_ffmpeg_error()
+            self.num_frames += 1
+
+    def close(self) -> str:
+        r"""Finishes encoding and returns the path of the video."""
+        if self._process is None:
+            raise ValueError("Cannot write a video without frames.")
+        if self._process.stdin.closed:
+            return self.output_video_path
+
+        self._process.stdin.close()
+        if self._process.wait() != 0:
+            self._raise_ffmpeg_error()
+        return self.output_video_path
+
+    def _raise_ffmpeg_error(self) -> None:
+        self._process.kill()
+        self._process.wait()
+        error = self._process.stderr.read().decode(errors="replace")
+        raise RuntimeError(f"ffmpeg failed to write {self.output_video_path}: {error}")
+
+    def __enter__(self) -> "VideoWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        elif self._process is not None:
+            self._process.kill()
+            self._process.wait()
+
+
 def export_to_video(
-    video_frames: Union[List[np.ndarray], List[PIL.Image.Image]], output_video_path: str = None, fps: int = 10
+    video_frames: Union[List[np.ndarray], List[PIL.Image.Image], Iterable[Any]],
+    output_video_path: str = None,
+    fps: int = 10,
+    codec: Optional[str] = None,
+    bitrate: Optional[str] = None,
 ) -> str:
     # TODO: Dhruv. Remove by Diffusers release 0.33.0
     # Added to prevent breaking existing code
@@ -151,7 +342,7 @@ def export_to_video(
                 "Support for the OpenCV backend will be deprecated in a future Diffusers version"
             )
         )
-        return _legacy_export_to_video(video_frames, output_video_path, fps)
+        return _legacy_export_to_video(list(_iterate_frames(video_frames)), output_video_path, fps)
 
     if is_imageio_available():
         import imageio
@@ -171,14 +362,16 @@ def export_to_video(
     if output_video_path is None:
         output_video_path = tempfile.NamedTemporaryFile(suffix=".mp4").name
 
-    if isinstance(video_frames[0], np.ndarray):
-        video_frames = [(frame * 255).astype(np.uint8) for frame in video_frames]
-
-    elif isinstance(video_frames[0], PIL.Image.Image):
-        video_frames = [np.array(frame) for frame in video_frames]
-
-    with imageio.get_writer(output_video_path, fps=fps) as writer:
-        for frame in video_frames:
-            writer.append_data(frame)
+    writer_kwargs = {}
+    if codec is not None:
+        writer_kwargs["codec"] = codec
+    if bitrate is not None:
+        writer_kwargs["bitrate"] = bitrate
+
+    # Frames are converted one at a time so that `video_frames` can be a generator and no second copy of the whole
+    # clip is created.
+    with imageio.get_writer(output_video_path, fps=fps, **writer_kwargs) as writer:
+        for frame in _iterate_frames(video_frames):
+            writer.append_data(_frame_to_uint8(frame))
 
     return output_video_path
@@ -13,14 +13,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import functools
+import gzip
 import io
 import json
-from typing import List, Literal, Optional, Union, cast
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union, cast
+from urllib.parse import parse_qs, urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from .deprecation_utils import deprecate
 from .import_utils import is_safetensors_available, is_torch_available
+from .logging import get_logger
 
 
 if is_torch_available():
@@ -43,6 +54,12 @@ if is_torch_available():
 from PIL import Image
 
 
+logger = get_logger(__name__)
+
+_DEFAULT_SESSION: Optional[requests.Session] = None
+_DEFAULT_SESSION_LOCK = threading.Lock()
+
+
 def detect_image_type(data: bytes) -> str:
     if data.startswith(b"\xff\xd8"):
         return "jpeg"
@@ -55,6 +72,34 @@ def detect_image_type(data: bytes) -> str:
     return "unknown"
 
 
+def create_session(pool_maxsize: int = 8, max_retries: int = 3, backoff_factor: float = 0.5) -> requests.Session:
+    """
+    Creates a `requests.Session` that keeps up to `pool_maxsize` connections per host alive and retries requests that
+    failed to connect or were rejected because the endpoint is overloaded or scaling up.
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 502, 503, 504),
+        # Decoding is idempotent, so POST requests can be retried.
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _get_default_session() -> requests.Session:
+    global _DEFAULT_SESSION
+    with _DEFAULT_SESSION_LOCK:
+        if _DEFAULT_SESSION is None:
+            _DEFAULT_SESSION = create_session()
+        return _DEFAULT_SESSION
+
+
 def check_inputs(
     endpoint: str,
     tensor: "torch.Tensor",
@@ -103,6 +148,23 @@ def postprocess(
         dtype = parameters["dtype"]
         torch_dtype = DTYPE_MAP[dtype]
         output_tensor = torch.frombuffer(bytearray(output_tensor), dtype=torch_dtype).reshape(shape)
+        return postprocess_tensor(output_tensor, processor, output_type, return_type, partial_postprocess)
+    elif output_type == "pil" and return_type == "pil" and processor is None:
+        output = Image.open(io.BytesIO(response.content)).convert("RGB")
+        detected_format = detect_image_type(response.content)
+        output.format = detected_format
+    elif output_type == "mp4" and return_type == "mp4":
+        output = response.content
+    return output
+
+
+def postprocess_tensor(
+    output_tensor: "torch.Tensor",
+    processor: Optional[Union["VaeImageProcessor", "VideoProcessor"]] = None,
+    output_type: Literal["mp4", "pil", "pt"] = "pil",
+    return_type: Literal["mp4", "pil", "pt"] = "pil",
+    partial_postprocess: bool = False,
+):
     if output_type == "pt":
         if partial_postprocess:
             if return_type == "pil":
@@ -125,10 +187,6 @@ def postprocess(
                         Image.Image,
                         processor.postprocess(output_tensor, output_type="pil")[0],
                     )
-    elif output_type == "pil" and return_type == "pil" and processor is None:
-        output = Image.open(io.BytesIO(response.content)).convert("RGB")
-        detected_format = detect_image_type(response.content)
-        output.format = detected_format
     elif output_type == "pil" and processor is not None:
         if return_type == "pil":
             output = [
@@ -137,8 +195,6 @@ def postprocess(
             ]
         elif return_type == "pt":
             output = output_tensor
-    elif output_type == "mp4" and return_type == "mp4":
-        output = response.content
     return output
 
 
@@ -153,6 +209,7 @@ def prepare(
     partial_postprocess: bool = False,
     height: Optional[int] = None,
     width: Optional[int] = None,
+    compression: Optional[Literal["gzip"]] = None,
 ):
     headers = {}
     parameters = {
@@ -182,6 +239,12 @@ def prepare(
     elif output_type == "mp4":
         headers["Accept"] = "text/plain"
     tensor_data = safetensors.torch._tobytes(tensor, "tensor")
+    if compression == "gzip":
+        # Latents are small, so the fastest compression level is enough to save most of the transfer.
+        tensor_data = gzip.compress(tensor_data, compresslevel=1)
+        headers["Content-Encoding"] = "gzip"
+    elif compression is not None:
+        raise ValueError(f"Unsupported compression {compression}. Please use `gzip` or `None`.")
     return {"data": tensor_data, "params": parameters, "headers": headers}
 
 
@@ -200,6 +263,8 @@ def remote_decode(
     output_tensor_type: Literal["binary"] = "binary",
     height: Optional[int] = None,
     width: Optional[int] = None,
+    session: Optional[requests.Session] = None,
+    compression: Optional[Literal["gzip"]] = None,
 ) -> Union[Image.Image, List[Image.Image], bytes, "torch.Tensor"]:
     """
     Hugging Face Hybrid Inference that allow running VAE decode remotely.
@@ -274,6 +339,14 @@ def remote_decode(
         width (`int`, **optional**):
             Required for `"packed"` latents.
 
+        session (`requests.Session`, **optional**):
+            Session used to send the request. Defaults to a shared session that keeps connections to the endpoint
+            alive and retries requests rejected by an overloaded endpoint, see [`~utils.remote_utils.create_session`].
+
+        compression (`"gzip"`, **optional**):
+            Compresses the tensor before sending it. Useful on slow connections, the endpoint must support
+            `Content-Encoding: gzip`.
+
     Returns:
         output (`Image.Image` or `List[Image.Image]` or `bytes` or `torch.Tensor`).
     """
@@ -320,8 +393,10 @@ def remote_decode(
         partial_postprocess=partial_postprocess,
         height=height,
         width=width,
+        compression=compression,
     )
-    response = requests.post(endpoint, **kwargs)
+    session = session if session is not None else _get_default_session()
+    response = session.post(endpoint, **kwargs)
     if not response.ok:
         raise RuntimeError(response.json())
     output = postprocess(
@@ -332,3 +407,356 @@ def remote_decode(
         partial_postprocess=partial_postprocess,
     )
     return output
+
+
+@dataclass
+class _DecodeRequest:
+    tensor: "torch.Tensor"
+    processor: Optional[Union["VaeImageProcessor", "VideoProcessor"]]
+    return_type: str
+    future: asyncio.Future
+
+
+class RemoteDecodeClient:
+    r"""
+    Asynchronous client for [`remote_decode`] that amortizes the transport overhead of many decode requests.
+
+    Requests are sent concurrently over a shared pool of keep-alive connections, so new latents can be submitted while
+    previous ones are still being decoded. Requests with `output_type="pt"` that only differ in their latents are
+    coalesced into a single batched call to the endpoint and the decoded batch is split again for each caller. Other
+    requests are sent individually.
+
+    ```py
+    >>> async with RemoteDecodeClient(endpoint, max_batch_size=4) as client:
+    ...     images = await asyncio.gather(
+    ...         *[client.decode(latents, scaling_factor=0.18215, output_type="pt", processor=processor) for latents in ...]
+    ...     )
+    ```
+
+    Args:
+        endpoint (`str`):
+            Endpoint for Remote Decode.
+        max_batch_size (`int`, defaults to `8`):
+            The maximum number of latents decoded in a single call to the endpoint.
+        batch_timeout (`float`, defaults to `0.005`):
+            The time, in seconds, to wait for compatible requests to fill a batch after its first request arrived.
+        max_concurrency (`int`, defaults to `4`):
+            The maximum number of concurrent calls to the endpoint.
+        session (`requests.Session`, *optional*):
+            Session used to send the requests. Defaults to a [`~utils.remote_utils.create_session`] session with one
+            connection per concurrent call.
+        compression (`"gzip"`, *optional*):
+            Compresses the latents before sending them.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        max_batch_size: int = 8,
+        batch_timeout: float = 0.005,
+        max_concurrency: int = 4,
+        session: Optional[requests.Session] = None,
+        compression: Optional[Literal["gzip"]] = None,
+    ):
+        if max_batch_size < 1:
+            raise ValueError(f"`max_batch_size` must be at least 1, but got {max_batch_size}.")
+
+        self.endpoint = endpoint
+        self.max_batch_size = max_batch_size
+        self.batch_timeout = batch_timeout
+        self.compression = compression
+        self._owns_session = session is None
+        self.session = session if session is not None else create_session(pool_maxsize=max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="diffusers-remote-decode")
+        self._pending: Dict[str, Tuple[Dict[str, Any], List[_DecodeRequest]]] = {}
+        self._tasks = set()
+
+    async def decode(
+        self,
+        tensor: "torch.Tensor",
+        processor: Optional[Union["VaeImageProcessor", "VideoProcessor"]] = None,
+        return_type: Literal["mp4", "pil", "pt"] = "pil",
+        **kwargs,
+    ) -> Union[Image.Image, List[Image.Image], bytes, "torch.Tensor"]:
+        r"""
+        Decodes `tensor` remotely. Takes the same arguments as [`remote_decode`], except for `endpoint`, `session` and
+        `compression`.
+        """
+        check_inputs(self.endpoint, tensor, processor=processor, return_type=return_type, **kwargs)
+        loop = asyncio.get_running_loop()
+
+        if kwargs.get("output_type", "pil") != "pt":
+            # Images and videos encoded by the endpoint can't be split, so these requests are never batched.
+            return await loop.run_in_executor(
+                self._executor,
+                functools.partial(
+                    remote_decode,
+                    self.endpoint,
+                    tensor,
+                    processor=processor,
+                    return_type=return_type,
+                    session=self.session,
+                    compression=self.compression,
+                    **kwargs,
+                ),
+            )
+
+        key = json.dumps(
+            {
+                "kwargs": kwargs,
+                "shape": list(tensor.shape[1:]),
+                "dtype": str(tensor.dtype),
+                "device": str(tensor.device),
+            },
+            sort_keys=True,
+            default=str,
+        )
+        request = _DecodeRequest(tensor, processor, return_type, loop.create_future())
+        if key not in self._pending:
+            self._pending[key] = (kwargs, [])
+            loop.call_later(self.batch_timeout, self._flush, key, self._pending[key][1])
+        batch = self._pending[key][1]
+        batch.append(request)
+        if sum(r.tensor.shape[0] for r in batch) >= self.max_batch_size:
+            self._flush(key, batch)
+        return await request.future
+
+    async def close(self) -> None:
+        r"""Sends the pending requests, waits for all the requests in flight and releases the connections."""
+        for key, (_, batch) in list(self._pending.items()):
+            self._flush(key, batch)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=True)
+        if self._owns_session:
+            self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def _flush(self, key: str, batch: List[_DecodeRequest]) -> None:
+        # The batch may have been sent already, because it was full before its timeout.
+        if key not in self._pending or self._pending[key][1] is not batch:
+            return
+        kwargs, batch = self._pending.pop(key)
+        task = asyncio.ensure_future(self._send_batch(kwargs, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self, kwargs: Dict[str, Any], batch: List[_DecodeRequest]) -> None:
+        tensors = [request.tensor for request in batch]
+        tensor = torch.cat(tensors) if len(tensors) > 1 else tensors[0]
+        try:
+            output = await asyncio.get_running_loop().run_in_executor(
+                self._executor,
+                functools.partial(
+                    remote_decode,
+                    self.endpoint,
+                    tensor,
+                    return_type="pt",
+                    session=self.session,
+                    compression=self.compression,
+                    **kwargs,
+                ),
+            )
+        except Exception as e:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        # Each request gets the outputs of its own latents, converted to its own return type.
+        outputs = output.split([t.shape[0] for t in tensors]) if len(tensors) > 1 else [output]
+        for request, request_output in zip(batch, outputs):
+            if request.future.done():
+                continue
+            try:
+                request.future.set_result(
+                    postprocess_tensor(
+                        request_output,
+                        processor=request.processor,
+                        output_type="pt",
+                        return_type=request.return_type,
+                        partial_postprocess=kwargs.get("partial_postprocess", False),
+                    )
+                )
+            except Exception as e:
+                request.future.set_exception(e)
+
+
+class RemoteDecodeServer:
+    r"""
+    Local reference server for the Remote Decode endpoint protocol of [`remote_decode`], backed by a local VAE. Useful
+    to test remote decoding offline, or to run a self-hosted decode tier.
+
+    Latents are decoded one request at a time, so batched requests sent by [`RemoteDecodeClient`] are decoded in a
+    single VAE call.
+
+    ```py
+    >>> vae = AutoencoderKL.from_pretrained("stabilityai/sd-vae-ft-mse", torch_dtype=torch.float16).to("cuda")
+    >>> with RemoteDecodeServer(vae) as server:
+    ...     image = remote_decode(server.url, latents, scaling_factor=0.18215)
+    ```
+
+    Args:
+        vae (`ModelMixin`):
+            The VAE used for decoding, for example an [`AutoencoderKL`].
+        host (`str`, defaults to `"127.0.0.1"`):
+            The host to listen on.
+        port (`int`, defaults to `0`):
+            The port to listen on. A free port is picked if `0`.
+    """
+
+    def __init__(self, vae, host: str = "127.0.0.1", port: int = 0):
+        self.vae = vae
+        self.host = host
+        self.port = port
+        block_out_channels = getattr(vae.config, "block_out_channels", None)
+        self.vae_scale_factor = 2 ** (len(block_out_channels) - 1) if block_out_channels else 8
+        self.image_processor = VaeImageProcessor(vae_scale_factor=self.vae_scale_factor)
+        self.video_processor = VideoProcessor(vae_scale_factor=self.vae_scale_factor)
+        self._decode_lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("The server is not running. Please call `start()` first.")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "RemoteDecodeServer":
+        r"""Starts serving in a background thread."""
+        if self._server is not None:
+            return self
+
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                try:
+                    if self.headers.get("Content-Encoding") == "gzip":
+                        body = gzip.decompress(body)
+                    parameters = {
+                        k: v if k == "shape" else v[0] for k, v in parse_qs(urlparse(self.path).query).items()
+                    }
+                    content, headers = server.decode(body, parameters, accept=self.headers.get("Accept"))
+                    status = 200
+                except Exception as e:
+                    logger.error(f"Remote decode request failed: {e}")
+                    content, headers, status = json.dumps({"error": str(e)}).encode(), {}, 400
+                    headers["Content-Type"] = "application/json"
+
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        # HTTP/1.1, so that clients keep their connections alive between requests.
+        _Handler.protocol_version = "HTTP/1.1"
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="diffusers-remote-decode-server")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        r"""Stops serving and closes the socket."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def decode(
+        self, data: bytes, parameters: Dict[str, Any], accept: Optional[str] = None
+    ) -> Tuple[bytes, Dict[str, str]]:
+        r"""
+        Decodes a request of the endpoint protocol and returns the content and headers of its response.
+
+        Args:
+            data (`bytes`):
+                The raw bytes of the latents.
+            parameters (`Dict[str, Any]`):
+                The request parameters sent by [`remote_decode`], as strings.
+            accept (`str`, *optional*):
+                The `Accept` header of the request.
+        """
+        shape = [int(dim) for dim in parameters["shape"]]
+        tensor = torch.frombuffer(bytearray(data), dtype=DTYPE_MAP[parameters["dtype"]]).reshape(shape)
+        tensor = tensor.to(device=self.vae.device, dtype=self.vae.dtype)
+
+        if tensor.ndim == 3:
+            from ..pipelines.flux.pipeline_flux import FluxPipeline
+
+            tensor = FluxPipeline._unpack_latents(
+                tensor, int(parameters["height"]), int(parameters["width"]), self.vae_scale_factor
+            )
+        if "scaling_factor" in parameters:
+            tensor = tensor / float(parameters["scaling_factor"])
+        elif parameters.get("do_scaling") == "True":
+            tensor = tensor / self.vae.config.scaling_factor
+        if "shift_factor" in parameters:
+            tensor = tensor + float(parameters["shift_factor"])
+
+        with self._decode_lock, torch.no_grad():
+            decoded = self.vae.decode(tensor, return_dict=False)[0]
+
+        output_type = parameters.get("output_type", "pil")
+        partial_postprocess = parameters.get("partial_postprocess") == "True"
+        is_video = decoded.ndim == 5
+
+        if output_type == "mp4":
+            import tempfile
+
+            from .export_utils import export_to_video
+
+            frames = self.video_processor.postprocess_video(decoded, output_type="np")[0]
+            with tempfile.NamedTemporaryFile(suffix=".mp4") as f:
+                export_to_video(frames, f.name)
+                return f.read(), {"Content-Type": "video/mp4"}
+
+        if output_type == "pil" and accept in ("image/jpeg", "image/png"):
+            image = self.image_processor.postprocess(decoded, output_type="pil")[0]
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG" if accept == "image/jpeg" else "PNG")
+            return buffer.getvalue(), {"Content-Type": accept}
+
+        if output_type == "pil" or (output_type == "pt" and partial_postprocess):
+            if is_video:
+                # (num_frames, channels, height, width) in [0, 1]
+                output = self.video_processor.postprocess_video(decoded, output_type="pt")[0]
+            else:
+                output = self.image_processor.postprocess(decoded, output_type="pt")
+            if output_type == "pt":
+                # Denormalized uint8 images, channels last.
+                output = (output * 255).round().to(torch.uint8).permute(0, 2, 3, 1)
+        else:
+            output = decoded
+
+        output = output.contiguous().cpu()
+        headers = {
+            "Content-Type": "tensor/binary",
+            "shape": json.dumps(list(output.shape)),
+            "dtype": str(output.dtype).split(".")[-1],
+        }
+        return safetensors.torch._tobytes(output, "tensor"), headers
@@ -15,6 +15,7 @@
 PyTorch utilities: Utilities related to PyTorch
 """
 
+import itertools
 from typing import List, Optional, Tuple, Union
 
 from . import logging
@@ -90,6 +91,33 @@ def is_compiled_module(module) -> bool:
     return isinstance(module, torch._dynamo.eval_frame.OptimizedModule)
 
 
+# Incremented whenever the device or dtype of a model may have changed, for example by `.to()` or by adding or removing
+# hooks. Cached device and dtype lookups of models and pipelines are only valid for the generation they were made in.
+_placement_generation = 0
+
+
+def invalidate_placement_cache() -> None:
+    """Invalidates the cached devices and dtypes of all models and pipelines."""
+    global _placement_generation
+    _placement_generation += 1
+
+
+def get_placement_generation() -> int:
+    """Returns the current generation of cached devices and dtypes, see `invalidate_placement_cache`."""
+    return _placement_generation
+
+
+def get_placement_fingerprint(module: "torch.nn.Module") -> Optional[Tuple[int, "torch.device", "torch.dtype"]]:
+    """
+    Returns the identity, device and dtype of the first parameter or buffer of `module`. Cached devices and dtypes are
+    also validated against it, since modules can be moved or have their weights replaced without going through
+    diffusers, e.g. `pipe.text_encoder.to("cuda")` on a transformers model or `load_state_dict(..., assign=True)`.
+    """
+    for tensor in itertools.chain(module.parameters(), module.buffers()):
+        return id(tensor), tensor.device, tensor.dtype
+    return None
+
+
 def fourier_filter(x_in: "torch.Tensor", threshold: int, scale: int) -> "torch.Tensor":
     """Fourier filter as introduced in FreeU (https://arxiv.org/abs/2309.11497).
 
@@ -0,0 +1,208 @@
+# Copyright 2025 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import socket
+import unittest
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+
+from diffusers import (
+    CogVideoXTransformer3DModel,
+    ContextParallelConfig,
+    FluxTransformer2DModel,
+    HunyuanVideoTransformer3DModel,
+    WanTransformer3DModel,
+)
+from diffusers.models.attention_processor import AttnProcessor2_0
+
+
+WORLD_SIZE = 2
+
+
+def get_flux():
+    model = FluxTransformer2DModel(
+        patch_size=1,
+        in_channels=4,
+        num_layers=1,
+        num_single_layers=1,
+        attention_head_dim=16,
+        num_attention_heads=2,
+        joint_attention_dim=32,
+        pooled_projection_dim=32,
+        axes_dims_rope=[4, 4, 8],
+    )
+    generator = torch.Generator().manual_seed(0)
+    inputs = {
+        "hidden_states": torch.randn(1, 16, 4, generator=generator),
+        "encoder_hidden_states": torch.randn(1, 8, 32, generator=generator),
+        "pooled_projections": torch.randn(1, 32, generator=generator),
+        "img_ids": torch.randn(16, 3, generator=generator),
+        "txt_ids": torch.randn(8, 3, generator=generator),
+        "timestep": torch.tensor([1.0]),
+    }
+    return model, inputs
+
+
+def get_hunyuan_video():
+    model = HunyuanVideoTransformer3DModel(
+        in_channels=4,
+        out_channels=4,
+        num_attention_heads=2,
+        attention_head_dim=10,
+        num_layers=1,
+        num_single_layers=1,
+        num_refiner_layers=1,
+        patch_size=1,
+        patch_size_t=1,
+        text_embed_dim=16,
+        pooled_projection_dim=8,
+        rope_axes_dim=(2, 4, 4),
+    )
+    generator = torch.Generator().manual_seed(0)
+    # The last condition tokens are padding, so that the attention mask is split across ranks as well.
+    encoder_attention_mask = torch.ones(1, 12)
+    encoder_attention_mask[:, 9:] = 0
+    inputs = {
+        "hidden_states": torch.randn(1, 4, 1, 8, 8, generator=generator),
+        "timestep": torch.tensor([500]),
+        "encoder_hidden_states": torch.randn(1, 12, 16, generator=generator),
+        "encoder_attention_mask": encoder_attention_mask,
+        "pooled_projections": torch.randn(1, 8, generator=generator),
+        "guidance": torch.tensor([3500.0]),
+    }
+    return model, inputs
+
+
+def get_wan():
+    model = WanTransformer3DModel(
+        patch_size=(1, 2, 2),
+        num_attention_heads=2,
+        attention_head_dim=12,
+        in_channels=4,
+        out_channels=4,
+        text_dim=16,
+        freq_dim=256,
+        ffn_dim=32,
+        num_layers=2,
+        cross_attn_norm=True,
+        rope_max_seq_len=32,
+    )
+    generator = torch.Generator().manual_seed(0)
+    inputs = {
+        "hidden_states": torch.randn(1, 4, 2, 8, 8, generator=generator),
+        "timestep": torch.tensor([500]),
+        "encoder_hidden_states": torch.randn(1, 6, 16, generator=generator),
+    }
+    return model, inputs
+
+
+def get_cogvideox():
+    model = CogVideoXTransformer3DModel(
+        num_attention_heads=2,
+        attention_head_dim=8,
+        in_channels=4,
+        out_channels=4,
+        time_embed_dim=2,
+        text_embed_dim=8,
+        num_layers=2,
+        sample_width=8,
+        sample_height=8,
+        sample_frames=8,
+        patch_size=2,
+        temporal_compression_ratio=4,
+        max_text_seq_length=8,
+    )
+    generator = torch.Generator().manual_seed(0)
+    inputs = {
+        "hidden_states": torch.randn(2, 1, 4, 8, 8, generator=generator),
+        "encoder_hidden_states": torch.randn(2, 8, 8, generator=generator),
+        "timestep": torch.tensor([500, 500]),
+    }
+    return model, inputs
+
+
+MODELS = {
+    "flux": get_flux,
+    "hunyuan_video": get_hunyuan_video,
+    "wan": get_wan,
+    "cogvideox": get_cogvideox,
+}
+
+
+def run_context_parallel(rank: int, port: int, model_name: str):
+    dist.init_process_group("gloo", init_method=f"tcp://127.0.0.1:{port}", rank=rank, world_size=WORLD_SIZE)
+    try:
+        for mode in ("ulysses", "ring"):
+            # Every rank creates the same weights and inputs.
+            torch.manual_seed(0)
+            model, inputs = MODELS[model_name]()
+            model.eval()
+
+            with torch.no_grad():
+                expected = model(**inputs, return_dict=False)[0]
+                model.enable_context_parallel(ContextParallelConfig(mode=mode))
+                output = model(**inputs, return_dict=False)[0]
+
+            assert output.shape == expected.shape, f"{mode}: {output.shape} != {expected.shape}"
+            torch.testing.assert_close(output, expected, atol=1e-5, rtol=1e-4, msg=lambda msg: f"{mode}: {msg}")
+
+            if hasattr(model, "fuse_qkv_projections"):
+                # The fused processors keep splitting the sequence across ranks.
+                with torch.no_grad():
+                    model.fuse_qkv_projections()
+                    output = model(**inputs, return_dict=False)[0]
+                torch.testing.assert_close(output, expected, atol=1e-5, rtol=1e-4, msg=lambda msg: f"{mode}: {msg}")
+
+            # A processor that would only attend over the local shard is rejected.
+            attention = next(
+                module for module in model.modules() if getattr(module, "_context_parallel_config", None) is not None
+            )
+            try:
+                attention.set_processor(AttnProcessor2_0())
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"{mode}: setting a processor without context parallel support didn't raise.")
+    finally:
+        dist.destroy_process_group()
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@unittest.skipIf(not dist.is_available(), "torch.distributed is not available.")
+class ContextParallelTests(unittest.TestCase):
+    def check_model(self, model_name: str):
+        mp.spawn(run_context_parallel, args=(get_free_port(), model_name), nprocs=WORLD_SIZE, join=True)
+
+    def test_flux(self):
+        self.check_model("flux")
+
+    def test_hunyuan_video(self):
+        self.check_model("hunyuan_video")
+
+    def test_wan(self):
+        self.check_model("wan")
+
+    def test_cogvideox(self):
+        self.check_model("cogvideox")
+
+    def test_config_requires_process_group(self):
+        with self.assertRaises(ValueError):
+            ContextParallelConfig()
@@ -0,0 +1,187 @@
+# Copyright 2025 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import torch
+
+from diffusers import ControlNetCacheConfig, ControlNetModel
+from diffusers.models.controlnets.multicontrolnet import MultiControlNetModel
+from diffusers.utils.testing_utils import torch_device
+
+
+def get_controlnet(seed=0):
+    torch.manual_seed(seed)
+    controlnet = ControlNetModel(
+        block_out_channels=(4, 8),
+        layers_per_block=1,
+        in_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        cross_attention_dim=8,
+        conditioning_embedding_out_channels=(4, 8),
+        norm_num_groups=1,
+    )
+    for module in controlnet.controlnet_down_blocks.modules():
+        if isinstance(module, torch.nn.Conv2d):
+            torch.nn.init.normal_(module.weight)
+    torch.nn.init.normal_(controlnet.controlnet_mid_block.weight)
+    return controlnet.to(torch_device).eval()
+
+
+def get_inputs(seed=0):
+    generator = torch.Generator("cpu").manual_seed(seed)
+    sample = torch.randn(1, 4, 8, 8, generator=generator).to(torch_device)
+    encoder_hidden_states = torch.randn(1, 4, 8, generator=generator).to(torch_device)
+    controlnet_cond = torch.randn(1, 3, 16, 16, generator=generator).to(torch_device)
+    return sample, encoder_hidden_states, controlnet_cond
+
+
+def count_forward_calls(controlnet):
+    calls = []
+    controlnet.controlnet_mid_block.register_forward_hook(lambda *args: calls.append(1))
+    return calls
+
+
+class ControlNetCacheTests(unittest.TestCase):
+    @torch.no_grad()
+    def test_residuals_reused_between_computed_steps(self):
+        controlnet = get_controlnet()
+        sample, encoder_hidden_states, controlnet_cond = get_inputs()
+        expected = controlnet(sample, 900, encoder_hidden_states, controlnet_cond, conditioning_scale=0.5)
+
+        controlnet.enable_cache(ControlNetCacheConfig(cache_interval=2))
+        calls = count_forward_calls(controlnet)
+        outputs = [
+            controlnet(sample, t, encoder_hidden_states, controlnet_cond, conditioning_scale=0.5)
+            for t in (900, 700, 500, 300, 100)
+        ]
+        self.assertEqual(len(calls), 3)
+
+        # The second step re-uses the residuals of the first one.
+        for output in outputs[:2]:
+            self.assertTrue(torch.allclose(output.mid_block_res_sample, expected.mid_block_res_sample, atol=1e-6))
+            for actual, reference in zip(output.down_block_res_samples, expected.down_block_res_samples):
+                self.assertTrue(torch.allclose(actual, reference, atol=1e-6))
+
+        # Cached residuals are re-scaled with the scale of the current step.
+        _, mid_block_res_sample = controlnet(
+            sample, 50, encoder_hidden_states, controlnet_cond, conditioning_scale=1.0, return_dict=False
+        )
+        self.assertTrue(torch.allclose(mid_block_res_sample, 2 * outputs[-1].mid_block_res_sample, atol=1e-6))
+
+    @torch.no_grad()
+    def test_residual_change_threshold(self):
+        controlnet = get_controlnet()
+        sample, encoder_hidden_states, controlnet_cond = get_inputs()
+        controlnet.enable_cache(ControlNetCacheConfig(cache_interval=1, residual_change_threshold=0.5))
+        calls = count_forward_calls(controlnet)
+
+        # The inputs don't change, so the residuals converge after the second step.
+        for t in (900, 800, 700, 600, 500):
+            controlnet(sample, t, encoder_hidden_states, controlnet_cond)
+        self.assertEqual(len(calls), 2)
+
+    @torch.no_grad()
+    def test_new_generation_and_shape_change_recompute(self):
+        controlnet = get_controlnet()
+        sample, encoder_hidden_states, controlnet_cond = get_inputs()
+        controlnet.enable_cache(ControlNetCacheConfig(cache_interval=10))
+        calls = count_forward_calls(controlnet)
+
+        controlnet(sample, 900, encoder_hidden_states, controlnet_cond)
+        controlnet(sample, 800, encoder_hidden_states, controlnet_cond)
+        controlnet(sample, 900, encoder_hidden_states, controlnet_cond)
+        self.assertEqual(len(calls), 2)
+
+        controlnet(
+            sample.repeat(2, 1, 1, 1), 800, encoder_hidden_states.repeat(2, 1, 1), controlnet_cond.repeat(2, 1, 1, 1)
+        )
+        self.assertEqual(len(calls), 3)
+
+        controlnet._reset_stateful_cache()
+        controlnet(sample, 700, encoder_hidden_states, controlnet_cond)
+        self.assertEqual(len(calls), 4)
+
+    @torch.no_grad()
+    def test_disable_cache(self):
+        controlnet = get_controlnet()
+        sample, encoder_hidden_states, controlnet_cond = get_inputs()
+        controlnet.enable_cache(ControlNetCacheConfig(cache_interval=4))
+        controlnet.disable_cache()
+        calls = count_forward_calls(controlnet)
+
+        for t in (900, 700, 500):
+            controlnet(sample, t, encoder_hidden_states, controlnet_cond)
+        self.assertEqual(len(calls), 3)
+
+    def test_invalid_cache_interval(self):
+        with self.assertRaises(ValueError):
+            get_controlnet().enable_cache(ControlNetCacheConfig(cache_interval=0))
+
+
+class MultiControlNetForwardTests(unittest.TestCase):
+    def get_multi_controlnet(self):
+        return MultiControlNetModel([get_controlnet(0), get_controlnet(1), get_controlnet(2)])
+
+    def get_inputs(self):
+        sample, encoder_hidden_states, _ = get_inputs()
+        images = [get_inputs(seed)[2] for seed in range(3)]
+        return sample, encoder_hidden_states, images
+
+    @torch.no_grad()
+    def test_batched_forward_matches_sequential(self):
+        multi_controlnet = self.get_multi_controlnet()
+        sample, encoder_hidden_states, images = self.get_inputs()
+        scales = [0.5, 1.0, 0.7]
+
+        expected_down, expected_mid = multi_controlnet(sample, 900, encoder_hidden_states, images, scales)
+        multi_controlnet.enable_batched_forward()
+        output_down, output_mid = multi_controlnet(sample, 900, encoder_hidden_states, images, scales)
+
+        self.assertTrue(torch.allclose(output_mid, expected_mid, atol=1e-4))
+        for actual, reference in zip(output_down, expected_down):
+            self.assertTrue(torch.allclose(actual, reference, atol=1e-4))
+
+        # The stacked weights follow in-place updates of the ControlNets.
+        multi_controlnet.nets[1].controlnet_mid_block.weight.mul_(2)
+        output_down, output_mid = multi_controlnet(sample, 900, encoder_hidden_states, images, scales)
+        multi_controlnet.disable_batched_forward()
+        expected_down, expected_mid = multi_controlnet(sample, 900, encoder_hidden_states, images, scales)
+        self.assertTrue(torch.allclose(output_mid, expected_mid, atol=1e-4))
+
+    @torch.no_grad()
+    def test_zero_scale_controlnets_are_skipped(self):
+        multi_controlnet = self.get_multi_controlnet()
+        sample, encoder_hidden_states, images = self.get_inputs()
+        calls = count_forward_calls(multi_controlnet.nets[1])
+
+        expected_down, expected_mid = multi_controlnet.nets[0](
+            sample, 900, encoder_hidden_states, images[0], conditioning_scale=0.5, return_dict=False
+        )
+        output_down, output_mid = multi_controlnet(sample, 900, encoder_hidden_states, images, [0.5, 0.0, 0.0])
+
+        self.assertEqual(len(calls), 0)
+        self.assertTrue(torch.allclose(output_mid, expected_mid, atol=1e-6))
+
+    @torch.no_grad()
+    def test_cache_on_multi_controlnet(self):
+        multi_controlnet = self.get_multi_controlnet()
+        sample, encoder_hidden_states, images = self.get_inputs()
+        multi_controlnet.enable_batched_forward()
+        multi_controlnet.enable_cache(ControlNetCacheConfig(cache_interval=2))
+        calls = [count_forward_calls(controlnet) for controlnet in multi_controlnet.nets]
+
+        for t in (900, 700, 500):
+            multi_controlnet(sample, t, encoder_hidden_states, images, [1.0, 1.0, 1.0])
+        self.assertEqual([len(c) for c in calls], [2, 2, 2])
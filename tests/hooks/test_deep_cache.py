@@ -0,0 +1,138 @@
+# Copyright 2025 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import torch
+
+from diffusers import DeepCacheConfig, UNet2DConditionModel
+from diffusers.hooks.deep_cache import DeepCacheBlockHook, get_deep_cache_non_uniform_full_steps
+from diffusers.utils.testing_utils import torch_device
+
+
+class DeepCacheTests(unittest.TestCase):
+    def get_unet(self):
+        torch.manual_seed(0)
+        unet = UNet2DConditionModel(
+            block_out_channels=(4, 8, 8),
+            layers_per_block=1,
+            sample_size=16,
+            in_channels=4,
+            out_channels=4,
+            down_block_types=("DownBlock2D", "CrossAttnDownBlock2D", "CrossAttnDownBlock2D"),
+            up_block_types=("CrossAttnUpBlock2D", "CrossAttnUpBlock2D", "UpBlock2D"),
+            cross_attention_dim=8,
+            norm_num_groups=2,
+        )
+        return unet.to(torch_device).eval()
+
+    def get_inputs(self):
+        generator = torch.Generator("cpu").manual_seed(0)
+        sample = torch.randn(1, 4, 16, 16, generator=generator).to(torch_device)
+        encoder_hidden_states = torch.randn(1, 4, 8, generator=generator).to(torch_device)
+        return sample, encoder_hidden_states
+
+    def count_mid_block_calls(self, unet):
+        calls = []
+        unet.mid_block.resnets[0].register_forward_hook(lambda *args: calls.append(1))
+        return calls
+
+    @torch.no_grad()
+    def test_deep_blocks_skipped_between_full_steps(self):
+        unet = self.get_unet()
+        unet.enable_cache(DeepCacheConfig(cache_interval=2, cache_block_id=0))
+        calls = self.count_mid_block_calls(unet)
+        sample, encoder_hidden_states = self.get_inputs()
+
+        for t in (900, 700, 500, 300, 100):
+            unet(sample, t, encoder_hidden_states)
+        self.assertEqual(len(calls), 3)
+
+        # Two calls with the same timestep (unbatched classifier-free guidance) belong to the same step.
+        unet._reset_stateful_cache()
+        calls.clear()
+        for t in (900, 900, 700, 700):
+            unet(sample, t, encoder_hidden_states)
+        self.assertEqual(len(calls), 2)
+
+        # A larger timestep starts a new generation, whose first step is always a full step.
+        calls.clear()
+        unet(sample, 900, encoder_hidden_states)
+        self.assertEqual(len(calls), 1)
+
+    @torch.no_grad()
+    def test_outputs(self):
+        unet = self.get_unet()
+        sample, encoder_hidden_states = self.get_inputs()
+        timesteps = (900, 600, 300)
+        expected = [unet(sample + t / 1000, t, encoder_hidden_states).sample for t in timesteps]
+
+        unet.enable_cache(DeepCacheConfig(cache_interval=3, cache_block_id=1))
+        outputs = [unet(sample + t / 1000, t, encoder_hidden_states).sample for t in timesteps]
+        self.assertTrue(torch.allclose(outputs[0], expected[0], atol=1e-6))
+        self.assertFalse(torch.allclose(outputs[1], expected[1], atol=1e-6))
+        self.assertTrue(torch.allclose(outputs[1], expected[1], atol=0.5))
+
+        unet.disable_cache()
+        for module in unet.modules():
+            if hasattr(module, "_diffusers_hook"):
+                self.assertIsNone(module._diffusers_hook.get_hook("deep_cache"))
+        outputs = [unet(sample + t / 1000, t, encoder_hidden_states).sample for t in timesteps]
+        for output, expected_output in zip(outputs, expected):
+            self.assertTrue(torch.allclose(output, expected_output, atol=1e-6))
+
+    @torch.no_grad()
+    def test_unbatched_classifier_free_guidance(self):
+        unet = self.get_unet()
+        unet.enable_cache(DeepCacheConfig(cache_interval=3))
+        sample, encoder_hidden_states = self.get_inputs()
+        timesteps = (900, 600, 300)
+
+        outputs = []
+        for t in timesteps:
+            cond = unet(sample + t / 1000, t, encoder_hidden_states).sample
+            uncond = unet(sample + t / 1000, t, torch.zeros_like(encoder_hidden_states)).sample
+            outputs.append((cond, uncond))
+
+        # On cached steps, the conditional and unconditional calls each re-use their own deep features.
+        unet._reset_stateful_cache()
+        expected = [unet(sample + t / 1000, t, encoder_hidden_states).sample for t in timesteps]
+        for (cond, uncond), expected_cond in zip(outputs, expected):
+            self.assertFalse(torch.allclose(cond, uncond, atol=1e-3))
+            self.assertTrue(torch.allclose(cond, expected_cond, atol=1e-6))
+
+    def test_hooked_blocks(self):
+        unet = self.get_unet()
+        unet.enable_cache(DeepCacheConfig(cache_block_id=1))
+        hooked = [
+            name
+            for name, module in unet.named_modules()
+            if hasattr(module, "_diffusers_hook")
+            and isinstance(module._diffusers_hook.get_hook("deep_cache"), DeepCacheBlockHook)
+        ]
+        self.assertEqual(hooked, ["down_blocks.2", "up_blocks.0", "mid_block"])
+
+    def test_invalid_config(self):
+        unet = self.get_unet()
+        with self.assertRaises(ValueError):
+            unet.enable_cache(DeepCacheConfig(cache_block_id=3))
+
+    def test_non_uniform_schedule(self):
+        full_steps = get_deep_cache_non_uniform_full_steps(50, cache_interval=5)
+        self.assertEqual(full_steps[0], 0)
+        self.assertEqual(full_steps[-1], 49)
+        self.assertLessEqual(len(full_steps), 11)
+        gaps = [b - a for a, b in zip(full_steps, full_steps[1:])]
+        # Full steps are denser in the middle of sampling than at the ends.
+        self.assertLess(min(gaps[len(gaps) // 2 - 1 : len(gaps) // 2 + 1]), gaps[0])
@@ -20,7 +20,7 @@ import torch
 from diffusers.hooks import HookRegistry, ModelHook
 from diffusers.training_utils import free_memory
 from diffusers.utils.logging import get_logger
-from diffusers.utils.testing_utils import CaptureLogger, torch_device
+from diffusers.utils.testing_utils import CaptureLogger, require_accelerate, torch_device
 
 
 logger = get_logger(__name__)  # pylint: disable=invalid-name
@@ -133,6 +133,10 @@ class SkipLayerHook(ModelHook):
         return output
 
 
+class NoOpHook(ModelHook):
+    pass
+
+
 class HookTests(unittest.TestCase):
     in_features = 4
     hidden_features = 8
@@ -181,6 +185,57 @@ class HookTests(unittest.TestCase):
         self.assertEqual(len(registry.hooks), 1)
         self.assertEqual(registry._hook_order, ["multiply_hook"])
 
+    def test_hook_dispatch_is_flattened(self):
+        original_forward = self.model.forward
+        input = torch.randn(1, 4, device=torch_device, generator=self.get_generator())
+        expected = self.model(input * 2 + 1)
+
+        registry = HookRegistry.check_if_exists_or_initialize(self.model)
+        registry.register_hook(NoOpHook(), "noop_hook")
+        registry.register_hook(AddHook(1), "add_hook")
+        registry.register_hook(NoOpHook(), "noop_hook_2")
+        registry.register_hook(MultiplyHook(2), "multiply_hook")
+
+        # No-op hooks don't contribute to the dispatch and all hooks share a single forward.
+        self.assertEqual(len(registry._segments), 1)
+        segment = registry._segments[0]
+        self.assertIs(self.model.forward, segment.dispatch_forward)
+        self.assertEqual(len(segment.pre_forwards), 2)
+        self.assertEqual(len(segment.post_forwards), 2)
+        self.assertEqual(segment.forward, original_forward)
+        self.assertTrue(torch.allclose(self.model(input), expected))
+
+        for name in ["multiply_hook", "noop_hook", "add_hook", "noop_hook_2"]:
+            registry.remove_hook(name)
+        self.assertEqual(self.model.forward, original_forward)
+
+    @require_accelerate
+    def test_hooks_interleaved_with_accelerate(self):
+        from accelerate.hooks import ModelHook as AccelerateModelHook
+        from accelerate.hooks import add_hook_to_module, remove_hook_from_module
+
+        class AccelerateAddHook(AccelerateModelHook):
+            def pre_forward(self, module, *args, **kwargs):
+                return tuple(x + 1 for x in args), kwargs
+
+        original_forward = self.model.forward
+        input = torch.randn(1, 4, device=torch_device, generator=self.get_generator())
+
+        registry = HookRegistry.check_if_exists_or_initialize(self.model)
+        registry.register_hook(MultiplyHook(2), "multiply_hook")
+        add_hook_to_module(self.model, AccelerateAddHook())
+        registry.register_hook(AddHook(3), "add_hook")
+        self.assertTrue(torch.allclose(self.model(input), original_forward((input + 4) * 2)))
+
+        # Removing a hook that runs within the accelerate hook keeps the accelerate hook.
+        registry.remove_hook("multiply_hook")
+        self.assertTrue(torch.allclose(self.model(input), original_forward(input + 4)))
+
+        remove_hook_from_module(self.model)
+        registry.remove_hook("add_hook")
+        self.assertEqual(self.model.forward, original_forward)
+        self.assertTrue(torch.allclose(self.model(input), original_forward(input)))
+
     def test_stateful_hook(self):
         registry = HookRegistry.check_if_exists_or_initialize(self.model)
         registry.register_hook(StatefulAddHook(1), "stateful_add_hook")
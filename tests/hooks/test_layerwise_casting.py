@@ -0,0 +1,153 @@
+# Copyright 2025 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import tempfile
+import unittest
+
+import torch
+
+from diffusers import UNet2DModel
+from diffusers.hooks import apply_layerwise_casting
+from diffusers.hooks.layerwise_casting import _LAYERWISE_CASTING_HOOK, ScaledLayerwiseCastingHook
+from diffusers.utils.testing_utils import torch_device
+
+
+class DummyModel(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.proj = torch.nn.Linear(64, 128)
+        self.conv = torch.nn.Conv2d(8, 8, 3, padding=1)
+        self.out = torch.nn.Linear(128, 32)
+
+    def forward(self, x, image):
+        return self.out(torch.nn.functional.gelu(self.proj(x))), self.conv(image)
+
+
+def get_model_and_inputs():
+    torch.manual_seed(0)
+    model = DummyModel().to(torch_device).eval()
+    # Channels with very different ranges, which a single unscaled cast handles poorly.
+    with torch.no_grad():
+        model.proj.weight.mul_(torch.logspace(-3, 1, 128, device=torch_device)[:, None])
+    generator = torch.Generator("cpu").manual_seed(0)
+    x = torch.randn(2, 64, generator=generator).to(torch_device)
+    image = torch.randn(1, 8, 6, 6, generator=generator).to(torch_device)
+    return model, (x, image)
+
+
+def relative_error(output, expected):
+    return ((output - expected).norm() / expected.norm()).item()
+
+
+class ScaledLayerwiseCastingTests(unittest.TestCase):
+    @torch.no_grad()
+    def test_int8_storage(self):
+        for scaling in ("per_channel", "per_block"):
+            model, inputs = get_model_and_inputs()
+            expected = model(*inputs)
+
+            apply_layerwise_casting(
+                model, torch.int8, torch.float32, skip_modules_pattern=None, scaling=scaling, block_size=32
+            )
+            self.assertEqual(model.proj.weight.dtype, torch.int8)
+            self.assertEqual(model.proj.bias.dtype, torch.float32)
+            self.assertIsInstance(
+                model.proj._diffusers_hook.get_hook(_LAYERWISE_CASTING_HOOK), ScaledLayerwiseCastingHook
+            )
+            expected_scale_shape = (128, 2, 1) if scaling == "per_block" else (128, 1, 1)
+            self.assertEqual(tuple(model.proj.weight_scale.shape), expected_scale_shape)
+            # 72 values per output channel of the convolution are not divisible by the block size.
+            self.assertEqual(tuple(model.conv.weight_scale.shape), (8, 1, 1))
+
+            outputs = model(*inputs)
+            for output, reference in zip(outputs, expected):
+                self.assertLess(relative_error(output, reference), 0.02)
+            # The weights are stored again after the forward pass.
+            self.assertEqual(model.out.weight.dtype, torch.int8)
+
+    @torch.no_grad()
+    def test_scaled_fp8_is_more_accurate_than_plain_fp8(self):
+        errors = []
+        for scaling in (None, "per_channel"):
+            model, inputs = get_model_and_inputs()
+            # Values this small are flushed to zero or subnormals by a plain cast to float8_e4m3fn.
+            model.proj.weight.mul_(1e-3)
+            model.out.weight.mul_(1e-3)
+            expected = model(*inputs)[0]
+            apply_layerwise_casting(
+                model, torch.float8_e4m3fn, torch.float32, skip_modules_pattern=None, scaling=scaling
+            )
+            self.assertEqual(model.proj.weight.dtype, torch.float8_e4m3fn)
+            errors.append(relative_error(model(*inputs)[0], expected))
+
+        plain_error, scaled_error = errors
+        self.assertLess(scaled_error, 0.05)
+        self.assertLess(scaled_error, plain_error)
+
+    @torch.no_grad()
+    def test_max_relative_error_skips_layers(self):
+        model, _ = get_model_and_inputs()
+        # An outlier per channel makes the scale so large that all other values are rounded to zero.
+        model.out.weight.fill_(3.9)
+        model.out.weight[:, 0] = 1000.0
+        apply_layerwise_casting(
+            model, torch.int8, torch.float32, skip_modules_pattern=None, scaling="per_channel", max_relative_error=0.01
+        )
+        self.assertEqual(model.proj.weight.dtype, torch.int8)
+        self.assertEqual(model.out.weight.dtype, torch.float32)
+        self.assertFalse(hasattr(model.out, "_diffusers_hook"))
+
+    @torch.no_grad()
+    def test_model_to_device_moves_scales(self):
+        model, inputs = get_model_and_inputs()
+        apply_layerwise_casting(model, torch.int8, torch.float32, skip_modules_pattern=None, scaling="per_block")
+        model.to("cpu")
+        self.assertEqual(model.proj.weight_scale.device.type, "cpu")
+        self.assertNotIn("proj.weight_scale", model.state_dict())
+        model(*(t.cpu() for t in inputs))
+
+    @torch.no_grad()
+    def test_failed_forward_restores_weights(self):
+        model, inputs = get_model_and_inputs()
+        apply_layerwise_casting(model, torch.int8, torch.float32, skip_modules_pattern=None, scaling="per_channel")
+        weight = model.proj.weight.data.clone()
+        expected = model(*inputs)
+
+        with self.assertRaises(RuntimeError):
+            model.proj(torch.randn(2, 3, device=torch_device))
+        self.assertEqual(model.proj.weight.dtype, torch.int8)
+        self.assertTrue(torch.equal(model.proj.weight.data, weight))
+        for output, reference in zip(model(*inputs), expected):
+            self.assertTrue(torch.equal(output, reference))
+
+    def test_save_pretrained_raises(self):
+        model = UNet2DModel(
+            block_out_channels=(4, 8),
+            layers_per_block=1,
+            norm_num_groups=4,
+            sample_size=8,
+            down_block_types=("DownBlock2D", "DownBlock2D"),
+            up_block_types=("UpBlock2D", "UpBlock2D"),
+        )
+        apply_layerwise_casting(model, torch.int8, torch.float32, scaling="per_channel")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with self.assertRaises(ValueError):
+                model.save_pretrained(tmpdir)
+
+    def test_invalid_arguments(self):
+        model, _ = get_model_and_inputs()
+        with self.assertRaises(ValueError):
+            apply_layerwise_casting(model, torch.int8, torch.float32)
+        with self.assertRaises(ValueError):
+            apply_layerwise_casting(model, torch.int8, torch.float32, scaling="per_tensor")
@@ -0,0 +1,138 @@
+# Copyright 2025 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from unittest import mock
+
+import torch
+
+from diffusers import DDPMPipeline, DDPMScheduler, ModelResidencyManager, UNet2DModel
+from diffusers.utils.accelerate_utils import apply_forward_hook
+from diffusers.utils.testing_utils import require_accelerate, torch_device
+
+
+class DummyModel(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(4, 4)
+
+    def forward(self, x):
+        return self.linear(x)
+
+    @apply_forward_hook
+    def decode(self, x):
+        return self.linear(x)
+
+
+# 4 * 4 + 4 float32 values
+MODEL_SIZE = 80
+
+
+@require_accelerate
+class ModelResidencyManagerTests(unittest.TestCase):
+    def get_models(self, manager, num_models=3):
+        models = [DummyModel() for _ in range(num_models)]
+        for i, model in enumerate(models):
+            manager.register(model, name=str(i))
+        return models
+
+    def test_least_recently_used_models_are_evicted(self):
+        manager = ModelResidencyManager(torch_device, max_memory=2 * MODEL_SIZE, prefetch=False)
+        a, b, c = self.get_models(manager)
+        x = torch.randn(1, 4)
+
+        for model in (a, b, c):
+            model(x)
+        self.assertEqual(manager.get_resident_models(), ["1", "2"])
+        self.assertEqual(manager.evictions, 1)
+
+        b(x)
+        a(x)
+        self.assertEqual(manager.get_resident_models(), ["1", "0"])
+        self.assertEqual((manager.hits, manager.misses, manager.evictions), (1, 4, 2))
+        self.assertLessEqual(manager.resident_memory, manager.max_memory)
+
+        manager.offload_all()
+        self.assertEqual(manager.get_resident_models(), [])
+
+    def test_predicted_model_is_prefetched(self):
+        manager = ModelResidencyManager(torch_device, max_memory=2 * MODEL_SIZE)
+        a, b, c = self.get_models(manager)
+        x = torch.randn(1, 4)
+
+        # Learn that `b` runs after `a`. Running `a` again evicts `b`, which is then prefetched in place of `c`.
+        a(x)
+        b(x)
+        c(x)
+        a(x)
+        self.assertEqual(manager.get_resident_models(), ["1", "0"])
+        misses = manager.misses
+        b(x)
+        self.assertEqual(manager.misses, misses)
+
+    def test_decorated_methods_onload(self):
+        manager = ModelResidencyManager(torch_device, max_memory=MODEL_SIZE, prefetch=False)
+        (model,) = self.get_models(manager, num_models=1)
+        model.decode(torch.randn(1, 4))
+        self.assertEqual(manager.get_resident_models(), ["0"])
+
+    def test_registration(self):
+        manager = ModelResidencyManager(torch_device, max_memory=MODEL_SIZE)
+        (model,) = self.get_models(manager, num_models=1)
+
+        # Registering a shared model again is a no-op.
+        manager.register(model)
+        self.assertEqual(len(model._diffusers_hook.hooks), 1)
+
+        with self.assertRaises(ValueError):
+            ModelResidencyManager(torch_device, max_memory=MODEL_SIZE).register(model)
+        with self.assertRaises(ValueError):
+            manager.register(torch.nn.Linear(8, 8))
+
+        manager.unregister(model)
+        self.assertEqual(len(model._diffusers_hook.hooks), 0)
+        self.assertEqual(manager.get_resident_models(), [])
+
+    def test_pipelines_share_manager(self):
+        torch.manual_seed(0)
+        unet = UNet2DModel(
+            block_out_channels=(4, 8),
+            layers_per_block=1,
+            norm_num_groups=4,
+            sample_size=8,
+            in_channels=3,
+            out_channels=3,
+            down_block_types=("DownBlock2D", "DownBlock2D"),
+            up_block_types=("UpBlock2D", "UpBlock2D"),
+        )
+        pipe = DDPMPipeline(unet=unet, scheduler=DDPMScheduler(num_train_timesteps=10))
+        expected = pipe(num_inference_steps=2, generator=torch.manual_seed(0), output_type="np").images
+
+        manager = ModelResidencyManager(torch_device, max_memory=10 * 1024**2)
+        pipe.enable_model_residency(manager)
+        other_pipe = DDPMPipeline.from_pipe(pipe)
+        other_pipe.enable_model_residency(manager)
+        self.assertEqual(pipe._execution_device, manager.device)
+
+        output = other_pipe(num_inference_steps=2, generator=torch.manual_seed(0), output_type="np").images
+        self.assertTrue((output == expected).all())
+        self.assertEqual(manager.get_resident_models(), ["DDPMPipeline.unet"])
+
+        pipe.disable_model_residency()
+        self.assertEqual(manager.get_resident_models(), [])
+
+    def test_requires_accelerate(self):
+        with mock.patch("diffusers.hooks.model_residency.is_accelerate_available", return_value=False):
+            with self.assertRaises(ImportError):
+                ModelResidencyManager(torch_device, max_memory=MODEL_SIZE)
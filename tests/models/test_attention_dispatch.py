@@ -0,0 +1,213 @@
+import unittest
+from unittest import mock
+
+import torch
+import torch.nn.functional as F
+
+from diffusers.models import attention_dispatch
+from diffusers.models.attention_dispatch import (
+    AttentionBackendName,
+    _attention_with_lse,
+    _AttentionBackendRegistry,
+    _get_chunk_sizes,
+    attention_backend,
+    dispatch_attention_fn,
+    get_attention_backend,
+    set_attention_backend,
+)
+from diffusers.models.attention_processor import (
+    Attention,
+    AttnProcessor2_0,
+    FluxAttnProcessor2_0,
+    JointAttnProcessor2_0,
+)
+
+
+class AttentionDispatchTests(unittest.TestCase):
+    def tearDown(self):
+        set_attention_backend(AttentionBackendName.NATIVE)
+
+    def get_inputs(self, query_length=16, key_length=24):
+        torch.manual_seed(0)
+        query = torch.randn(2, 4, query_length, 8)
+        key = torch.randn(2, 4, key_length, 8)
+        value = torch.randn(2, 4, key_length, 8)
+        return query, key, value
+
+    def test_cpu_backends_match_native(self):
+        query, key, value = self.get_inputs()
+        attn_mask = torch.rand(2, 1, 16, 24) > 0.2
+        expected = F.scaled_dot_product_attention(query, key, value, attn_mask=attn_mask)
+
+        for backend in (AttentionBackendName.NATIVE, AttentionBackendName.NATIVE_MATH):
+            output = dispatch_attention_fn(query, key, value, attn_mask=attn_mask, backend=backend)
+            self.assertTrue(torch.allclose(output, expected, atol=1e-5), backend)
+
+        with mock.patch.object(attention_dispatch, "_CHUNKED_ATTENTION_MEMORY_BUDGET", 2 * 4 * 24 * 4 * 3):
+            output = dispatch_attention_fn(
+                query, key, value, attn_mask=attn_mask, backend=AttentionBackendName.NATIVE_CHUNKED
+            )
+        self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+
+    def test_chunked_causal(self):
+        query, key, value = self.get_inputs(query_length=24)
+        expected = F.scaled_dot_product_attention(query, key, value, is_causal=True)
+
+        with mock.patch.object(attention_dispatch, "_CHUNKED_ATTENTION_MEMORY_BUDGET", 2 * 4 * 24 * 4 * 5):
+            output = dispatch_attention_fn(query, key, value, is_causal=True, backend="_native_chunked")
+        self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+
+    def test_auto_selection_on_cpu(self):
+        query, key, value = self.get_inputs()
+
+        set_attention_backend("auto")
+        with mock.patch.object(attention_dispatch, "_CHUNKED_ATTENTION_MEMORY_BUDGET", 1024**3):
+            self.assertEqual(
+                attention_dispatch._select_attention_backend(
+                    query=query, key=key, value=value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None
+                ),
+                AttentionBackendName.NATIVE,
+            )
+        with mock.patch.object(attention_dispatch, "_CHUNKED_ATTENTION_MEMORY_BUDGET", 1024):
+            self.assertEqual(
+                attention_dispatch._select_attention_backend(
+                    query=query, key=key, value=value, attn_mask=None, dropout_p=0.0, is_causal=False, scale=None
+                ),
+                AttentionBackendName.NATIVE_CHUNKED,
+            )
+
+    def test_autotune_caches_per_shape(self):
+        query, key, value = self.get_inputs()
+
+        with mock.patch.object(attention_dispatch, "_CHUNKED_ATTENTION_MEMORY_BUDGET", 1024):
+            with attention_backend("auto", autotune=True):
+                _ = dispatch_attention_fn(query, key, value)
+                _ = dispatch_attention_fn(query, key, value)
+                _ = dispatch_attention_fn(*self.get_inputs(query_length=8))
+                self.assertEqual(len(_AttentionBackendRegistry._autotune_cache), 2)
+
+        self.assertEqual(get_attention_backend(), AttentionBackendName.NATIVE)
+        self.assertEqual(len(_AttentionBackendRegistry._autotune_cache), 0)
+
+    def test_attention_processor_uses_active_backend(self):
+        torch.manual_seed(0)
+        attn = Attention(query_dim=16, heads=2, dim_head=8, processor=AttnProcessor2_0())
+        hidden_states = torch.randn(1, 32, 16)
+
+        expected = attn(hidden_states)
+        with mock.patch.object(attention_dispatch, "_CHUNKED_ATTENTION_MEMORY_BUDGET", 1024):
+            with attention_backend("_native_chunked"):
+                with mock.patch.object(
+                    attention_dispatch.F, "scaled_dot_product_attention", wraps=F.scaled_dot_product_attention
+                ) as sdpa:
+                    output = attn(hidden_states)
+
+        self.assertGreater(sdpa.call_count, 1)
+        self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            set_attention_backend("not_a_backend")
+
+
+class ChunkedAttentionTests(unittest.TestCase):
+    def tearDown(self):
+        set_attention_backend(AttentionBackendName.NATIVE)
+
+    def get_inputs(self, query_length=33, key_length=47):
+        torch.manual_seed(0)
+        query = torch.randn(2, 3, query_length, 8)
+        key = torch.randn(2, 3, key_length, 8)
+        value = torch.randn(2, 3, key_length, 16)
+        return query, key, value
+
+    def test_chunk_sizes_respect_budget(self):
+        batch_heads, query_length, key_length, value_dim = 6, 100_000, 100_000, 64
+        for memory_budget in (1024**2, 64 * 1024, 4096):
+            query_chunk_size, key_chunk_size = _get_chunk_sizes(
+                batch_heads, query_length, key_length, value_dim, memory_budget
+            )
+            working_set = batch_heads * 4 * query_chunk_size * (2 * key_chunk_size + value_dim + 2)
+            self.assertLessEqual(working_set, memory_budget)
+            self.assertLess(key_chunk_size, key_length)
+
+        # Enough memory for full key rows only splits the query sequence.
+        self.assertEqual(_get_chunk_sizes(1, 128, 64, 8, 1024**2), (128, 64))
+
+    def test_key_chunked_matches_sdpa(self):
+        query, key, value = self.get_inputs()
+        bool_mask = torch.rand(2, 1, 33, 47) > 0.3
+        additive_mask = torch.randn(2, 3, 1, 47)
+
+        for kwargs in ({}, {"attn_mask": bool_mask}, {"attn_mask": additive_mask}, {"scale": 0.5}):
+            expected = F.scaled_dot_product_attention(query, key, value, **kwargs)
+            # A budget this small forces both query and key chunking.
+            with attention_backend("_native_chunked", memory_budget=4096):
+                output = dispatch_attention_fn(query, key, value, **kwargs)
+            self.assertTrue(torch.allclose(output, expected, atol=1e-5), kwargs.keys())
+
+    def test_key_chunked_causal(self):
+        query, key, value = self.get_inputs(key_length=33)
+        expected = F.scaled_dot_product_attention(query, key, value, is_causal=True)
+        with attention_backend("_native_chunked", memory_budget=4096):
+            output = dispatch_attention_fn(query, key, value, is_causal=True)
+        self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+
+    def test_attention_with_lse(self):
+        query, key, value = self.get_inputs()
+        # The last keys are masked for every query, like a shard of padding tokens in ring attention.
+        mask = torch.rand(2, 1, 1, 47) > 0.3
+        mask[..., 40:] = False
+        scores = (query @ key.transpose(-1, -2) / 8**0.5).masked_fill(~mask, float("-inf"))
+
+        with attention_backend("_native_chunked", memory_budget=4096):
+            output, lse = _attention_with_lse(
+                AttentionBackendName.NATIVE_CHUNKED, query, key, value, mask, scale=1 / 8**0.5
+            )
+        self.assertTrue(torch.allclose(output, scores.softmax(dim=-1) @ value, atol=1e-5))
+        self.assertTrue(torch.allclose(lse, scores.logsumexp(dim=-1, keepdim=True), atol=1e-5))
+
+        # Fully masked queries have a zero output and a log-sum-exp of -inf.
+        output, lse = _attention_with_lse(
+            AttentionBackendName.NATIVE_CHUNKED, query, key[:, :, 40:], value[:, :, 40:], mask[..., 40:], scale=1.0
+        )
+        self.assertTrue(torch.equal(output, torch.zeros_like(output)))
+        self.assertTrue(torch.isneginf(lse).all())
+
+    def test_half_precision(self):
+        query, key, value = (x.to(torch.bfloat16) for x in self.get_inputs())
+        expected = F.scaled_dot_product_attention(query.float(), key.float(), value.float())
+        with attention_backend("_native_chunked", memory_budget=4096):
+            output = dispatch_attention_fn(query, key, value)
+        self.assertEqual(output.dtype, torch.bfloat16)
+        self.assertTrue(torch.allclose(output.float(), expected, atol=2e-2))
+
+    def test_invalid_memory_budget(self):
+        with self.assertRaises(ValueError):
+            set_attention_backend("_native_chunked", memory_budget=0)
+
+    def test_joint_attention_processors(self):
+        torch.manual_seed(0)
+        hidden_states = torch.randn(1, 24, 16)
+        encoder_hidden_states = torch.randn(1, 8, 16)
+
+        for processor in (JointAttnProcessor2_0(), FluxAttnProcessor2_0()):
+            torch.manual_seed(0)
+            attn = Attention(
+                query_dim=16,
+                added_kv_proj_dim=16,
+                dim_head=8,
+                heads=2,
+                out_dim=16,
+                context_pre_only=False,
+                bias=True,
+                qk_norm="rms_norm",
+                eps=1e-6,
+                processor=processor,
+            )
+            expected = attn(hidden_states, encoder_hidden_states=encoder_hidden_states)
+            with attention_backend("_native_chunked", memory_budget=2048):
+                output = attn(hidden_states, encoder_hidden_states=encoder_hidden_states)
+
+            for o, e in zip(output, expected):
+                self.assertTrue(torch.allclose(o, e, atol=1e-5), processor.__class__.__name__)
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+import safetensors.torch
+import torch
+from huggingface_hub import export_entries_as_dduf, read_dduf_file
+
+from diffusers.models.model_loading_utils import load_dduf_state_dict, load_state_dict, load_state_dict_metadata
+from diffusers.pipelines.pipeline_loading_utils import _prefetch_dduf_entries
+
+
+class DDUFLoadingTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.state_dict = {
+            "weight": torch.randn(4, 3, dtype=torch.bfloat16),
+            "bias": torch.randn(4, dtype=torch.float32),
+            "steps": torch.arange(5, dtype=torch.int64),
+            "mask": torch.tensor([True, False]),
+            "empty": torch.zeros(0, 3),
+        }
+        self.dduf_path = os.path.join(self.tmpdir.name, "pipeline.dduf")
+        export_entries_as_dduf(
+            self.dduf_path,
+            [
+                (
+                    "model_index.json",
+                    b'{"_class_name": "DiffusionPipeline", "scheduler": ["diffusers", "DDPMScheduler"],'
+                    b' "transformer": ["diffusers", "DiTTransformer2DModel"]}',
+                ),
+                ("scheduler/scheduler_config.json", b'{"a": 1}'),
+                # An odd-sized file, so that the tensors of the next file aren't aligned in the archive.
+                ("transformer/config.json", b'{"b": 10}'),
+                (
+                    "transformer/diffusion_pytorch_model.safetensors",
+                    safetensors.torch.save(self.state_dict, metadata={"format": "pt"}),
+                ),
+            ],
+        )
+        self.entries = read_dduf_file(self.dduf_path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_load_dduf_state_dict(self):
+        state_dict = load_dduf_state_dict(self.entries["transformer/diffusion_pytorch_model.safetensors"])
+        self.assertEqual(set(state_dict), set(self.state_dict))
+        for key, value in self.state_dict.items():
+            self.assertEqual(state_dict[key].dtype, value.dtype)
+            self.assertTrue(torch.equal(state_dict[key], value))
+
+        # Tensors are writable, but the archive itself is never modified.
+        state_dict["bias"].zero_()
+        state_dict = load_state_dict("transformer/diffusion_pytorch_model.safetensors", dduf_entries=self.entries)
+        self.assertTrue(torch.equal(state_dict["bias"], self.state_dict["bias"]))
+
+        metadata = load_state_dict_metadata(
+            "transformer/diffusion_pytorch_model.safetensors", dduf_entries=self.entries
+        )
+        self.assertEqual(metadata, {"format": "pt"})
+
+    def test_prefetch_dduf_entries(self):
+        stop = _prefetch_dduf_entries(self.entries, num_workers=2, chunk_size=16)
+        self.assertFalse(stop.is_set())
+        stop.set()
+
+        # Nothing to prefetch without weight files.
+        entries = {name: entry for name, entry in self.entries.items() if not name.endswith(".safetensors")}
+        self.assertFalse(_prefetch_dduf_entries(entries).is_set())
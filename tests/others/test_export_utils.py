@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+
+from diffusers.utils import VideoWriter, export_to_video
+from diffusers.utils.import_utils import is_imageio_available
+
+
+def _has_ffmpeg():
+    if is_imageio_available():
+        import imageio
+
+        try:
+            imageio.plugins.ffmpeg.get_exe()
+            return True
+        except (AttributeError, RuntimeError):
+            pass
+    return shutil.which("ffmpeg") is not None
+
+
+@unittest.skipUnless(_has_ffmpeg(), "test requires ffmpeg")
+class VideoWriterTests(unittest.TestCase):
+    def test_write_frames_incrementally(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "video.mp4")
+            with VideoWriter(path, fps=8, crf=23) as writer:
+                # A uint8 frame, a float frame and a batch of channels-first tensors.
+                writer.write(np.zeros((16, 16, 3), dtype=np.uint8))
+                writer.write(np.ones((16, 16, 3), dtype=np.float32))
+                writer.write(torch.rand(3, 3, 16, 16))
+
+            self.assertEqual(writer.num_frames, 5)
+            self.assertTrue(os.path.getsize(path) > 0)
+
+    def test_mismatched_frame_shape_raises(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer = VideoWriter(os.path.join(tmpdir, "video.mp4"))
+            writer.write(np.zeros((16, 16, 3), dtype=np.uint8))
+            with self.assertRaises(ValueError):
+                writer.write(np.zeros((8, 8, 3), dtype=np.uint8))
+            writer.close()
+
+    @unittest.skipUnless(is_imageio_available(), "test requires imageio")
+    def test_export_to_video_from_generator(self):
+        frames = (np.random.rand(16, 16, 3).astype(np.float32) for _ in range(4))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = export_to_video(frames, os.path.join(tmpdir, "video.mp4"), fps=4)
+            self.assertTrue(os.path.getsize(path) > 0)
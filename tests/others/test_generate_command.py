@@ -0,0 +1,36 @@
+import json
+import os
+import tempfile
+import unittest
+
+from diffusers.commands.generate import batch_requests, load_completed_ids, load_requests
+
+
+class GenerateCommandTests(unittest.TestCase):
+    def test_load_and_batch_requests(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "requests.jsonl")
+            with open(path, "w") as f:
+                f.write(json.dumps({"prompt": "a"}) + "\n")
+                f.write(json.dumps({"id": "b", "prompt": "b", "seed": 3}) + "\n")
+                f.write("\n")
+                f.write(json.dumps({"prompt": "c", "num_inference_steps": 2}) + "\n")
+                f.write(json.dumps("d") + "\n")
+
+            requests = load_requests(path)
+
+        self.assertEqual([r["id"] for r in requests], ["0", "b", "3", "4"])
+        batches = [[r["prompt"] for r in batch] for batch in batch_requests(requests, batch_size=2)]
+        # Requests with different pipeline arguments are never batched together.
+        self.assertEqual(batches, [["a", "b"], ["c"], ["d"]])
+
+    def test_completed_ids_from_manifests(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, "manifest-00000-of-00002.jsonl"), "w") as f:
+                f.write(json.dumps({"id": "a", "outputs": ["a.png"]}) + "\n")
+            with open(os.path.join(tmpdir, "manifest-00001-of-00002.jsonl"), "w") as f:
+                f.write(json.dumps({"id": "b", "outputs": ["b.png"]}) + "\n")
+                # Truncated line of an interrupted run.
+                f.write('{"id": "c", "outp')
+
+            self.assertEqual(load_completed_ids(tmpdir), {"a", "b"})
@@ -13,13 +13,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
 import unittest
 
 import numpy as np
 import PIL.Image
 import torch
 
-from diffusers.image_processor import VaeImageProcessor
+from diffusers.image_processor import ImageOutputStage, VaeImageProcessor
 
 
 class ImageProcessorTest(unittest.TestCase):
@@ -308,3 +309,33 @@ class ImageProcessorTest(unittest.TestCase):
         assert (
             out_np.shape == exp_np_shape
         ), f"resized image output shape '{out_np.shape}' didn't match expected shape '{exp_np_shape}'."
+
+    def test_pt_to_numpy_uint8(self):
+        input_pt = torch.rand((2, 3, 8, 8))
+        out_np = VaeImageProcessor.pt_to_numpy_uint8(input_pt)
+        expected = (VaeImageProcessor.pt_to_numpy(input_pt) * 255).round().astype("uint8")
+
+        self.assertEqual(out_np.dtype, np.uint8)
+        self.assertTrue(np.array_equal(out_np, expected))
+        # Converting uint8 images to PIL doesn't scale them again.
+        out_pil = VaeImageProcessor.numpy_to_pil(out_np)
+        self.assertTrue(np.array_equal(np.stack([np.asarray(image) for image in out_pil]), expected))
+
+    def test_image_output_stage(self):
+        image_processor = VaeImageProcessor(do_normalize=False)
+        input_pt = torch.rand((2, 3, 8, 8))
+        expected = image_processor.postprocess(input_pt, output_type="pil")
+
+        with ImageOutputStage(format="png") as stage:
+            encoded = [future.result() for future in stage.submit(input_pt)]
+            encoded_np = [future.result() for future in stage.submit(input_pt.permute(0, 2, 3, 1).numpy())]
+            encoded_pil = [future.result() for future in stage.submit(expected)]
+
+        for image, png, png_np, png_pil in zip(expected, encoded, encoded_np, encoded_pil):
+            for data in (png, png_np, png_pil):
+                decoded = PIL.Image.open(io.BytesIO(data))
+                self.assertTrue(np.array_equal(np.asarray(decoded), np.asarray(image)))
+
+        with ImageOutputStage(format=None) as stage:
+            images = [future.result() for future in stage.submit(input_pt)]
+        self.assertTrue(all(isinstance(image, PIL.Image.Image) for image in images))
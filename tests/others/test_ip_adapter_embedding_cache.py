@@ -0,0 +1,124 @@
+import tempfile
+import unittest
+
+import numpy as np
+import PIL.Image
+import torch
+from transformers import CLIPImageProcessor, CLIPVisionConfig, CLIPVisionModelWithProjection
+
+from diffusers.loaders.ip_adapter import IPAdapterImageEncoderMixin
+from diffusers.utils.testing_utils import torch_device
+
+
+class DummyImageEncoderPipeline(IPAdapterImageEncoderMixin):
+    def __init__(self):
+        torch.manual_seed(0)
+        config = CLIPVisionConfig(
+            hidden_size=16,
+            projection_dim=8,
+            num_hidden_layers=2,
+            num_attention_heads=2,
+            intermediate_size=32,
+            image_size=32,
+            patch_size=8,
+        )
+        self.image_encoder = CLIPVisionModelWithProjection(config).to(torch_device).eval()
+        self.feature_extractor = CLIPImageProcessor(crop_size=32, size=32)
+        self.calls = []
+        self.image_encoder.register_forward_hook(lambda module, args, output: self.calls.append(args[0].shape[0]))
+
+
+def get_images(num_images, seed=0):
+    rng = np.random.RandomState(seed)
+    return [PIL.Image.fromarray(rng.randint(0, 255, (40, 40, 3), dtype=np.uint8)) for _ in range(num_images)]
+
+
+class IPAdapterEmbeddingCacheTests(unittest.TestCase):
+    @torch.no_grad()
+    def get_expected(self, pipe, images, output_hidden_states):
+        pixel_values = pipe.feature_extractor(images, return_tensors="pt").pixel_values.to(torch_device)
+        if output_hidden_states:
+            image_embeds = pipe.image_encoder(pixel_values, output_hidden_states=True).hidden_states[-2]
+            negative_image_embeds = pipe.image_encoder(
+                torch.zeros_like(pixel_values), output_hidden_states=True
+            ).hidden_states[-2]
+        else:
+            image_embeds = pipe.image_encoder(pixel_values).image_embeds
+            negative_image_embeds = torch.zeros_like(image_embeds)
+        return image_embeds, negative_image_embeds
+
+    def test_all_adapters_encoded_in_one_forward(self):
+        pipe = DummyImageEncoderPipeline()
+        images = get_images(3)
+        ip_adapter_image = [images[0], images[1:]]
+
+        outputs = pipe.encode_ip_adapter_images(ip_adapter_image, torch_device, [False, True])
+        # Three reference images and the zero image for the negative hidden states.
+        self.assertEqual(pipe.calls, [4])
+
+        for output, adapter_images, hidden_states in zip(outputs, [[images[0]], images[1:]], [False, True]):
+            expected = self.get_expected(pipe, adapter_images, hidden_states)
+            for actual, reference in zip(output, expected):
+                self.assertEqual(actual.shape, reference.shape)
+                self.assertTrue(torch.allclose(actual, reference, atol=1e-5))
+
+    def test_cache_hits_skip_the_image_encoder(self):
+        pipe = DummyImageEncoderPipeline()
+        cache = pipe.enable_ip_adapter_embedding_cache(max_entries=8)
+        images = get_images(2)
+
+        first = pipe.encode_ip_adapter_images([images[0], images[1]], torch_device, [False, False])
+        # Same content, different objects.
+        second = pipe.encode_ip_adapter_images([images[0].copy(), images[1].copy()], torch_device, [False, False])
+
+        self.assertEqual(pipe.calls, [2])
+        self.assertEqual(cache.hits, 2)
+        for a, b in zip(first, second):
+            self.assertTrue(torch.equal(a[0], b[0]))
+            self.assertTrue(torch.equal(a[1], b[1]))
+
+        # Hidden states are computed together with the zero image and added to the entry.
+        pipe.encode_ip_adapter_images([images[1]], torch_device, [True])
+        pipe.encode_ip_adapter_images([images[1]], torch_device, [True])
+        self.assertEqual(pipe.calls, [2, 2])
+
+        pipe.disable_ip_adapter_embedding_cache()
+        pipe.encode_ip_adapter_images([images[0]], torch_device, [False])
+        self.assertEqual(pipe.calls, [2, 2, 1])
+
+    def test_lru_eviction(self):
+        pipe = DummyImageEncoderPipeline()
+        cache = pipe.enable_ip_adapter_embedding_cache(max_entries=2)
+        images = get_images(3)
+
+        for image in images:
+            pipe.encode_ip_adapter_images([image], torch_device, [False])
+        self.assertEqual(len(cache), 2)
+
+        pipe.encode_ip_adapter_images([images[2]], torch_device, [False])
+        pipe.encode_ip_adapter_images([images[0]], torch_device, [False])
+        self.assertEqual(pipe.calls, [1, 1, 1, 1])
+
+    def test_disk_cache(self):
+        images = get_images(2)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pipe = DummyImageEncoderPipeline()
+            pipe.enable_ip_adapter_embedding_cache(cache_dir=tmpdir)
+            expected = pipe.encode_ip_adapter_images([images], torch_device, [True])
+
+            pipe = DummyImageEncoderPipeline()
+            pipe.enable_ip_adapter_embedding_cache(cache_dir=tmpdir)
+            output = pipe.encode_ip_adapter_images([images], torch_device, [True])
+
+        self.assertEqual(pipe.calls, [])
+        self.assertTrue(torch.allclose(output[0][0], expected[0][0]))
+        self.assertTrue(torch.allclose(output[0][1], expected[0][1]))
+
+    def test_tensor_inputs(self):
+        pipe = DummyImageEncoderPipeline()
+        pipe.enable_ip_adapter_embedding_cache()
+        pixel_values = pipe.feature_extractor(get_images(2), return_tensors="pt").pixel_values
+
+        output = pipe.encode_ip_adapter_images([pixel_values], torch_device, [False])
+        expected = self.get_expected(pipe, get_images(2), False)
+        self.assertTrue(torch.allclose(output[0][0], expected[0], atol=1e-5))
@@ -0,0 +1,43 @@
+import unittest
+
+import torch
+
+from diffusers.callbacks import LatentPreviewCallback, LatentRGBProjection
+
+
+class DummyPipeline:
+    num_timesteps = 4
+
+
+class LatentPreviewCallbackTests(unittest.TestCase):
+    def test_fit_linear_projection(self):
+        weight = torch.randn(3, 4)
+        bias = torch.randn(3)
+        latents = torch.randn(2, 4, 8, 8)
+        images = LatentRGBProjection(weight, bias)(latents)
+
+        projection = LatentRGBProjection.fit(latents, images)
+        self.assertTrue(torch.allclose(projection.weight, weight, atol=1e-4))
+        self.assertTrue(torch.allclose(projection.bias, bias, atol=1e-4))
+
+    def test_previews_are_delivered(self):
+        received = []
+        callback = LatentPreviewCallback(
+            LatentRGBProjection(torch.randn(3, 4)),
+            every_n_steps=2,
+            on_preview=lambda step, images: received.append(step),
+            output_type="pt",
+        )
+        pipe = DummyPipeline()
+        latents = torch.randn(1, 4, 8, 8)
+        for step in range(pipe.num_timesteps):
+            callback_kwargs = callback(pipe, step, step, {"latents": latents})
+            self.assertIs(callback_kwargs["latents"], latents)
+            # Wait for each preview so that none are skipped.
+            callback._pending.result()
+
+        previews = list(callback.previews(timeout=5))
+        self.assertEqual([step for step, _ in previews], [0, 2])
+        self.assertEqual(received, [0, 2])
+        self.assertEqual(previews[0][1].shape, (1, 3, 8, 8))
+        self.assertTrue(previews[0][1].min() >= 0 and previews[0][1].max() <= 1)
@@ -0,0 +1,115 @@
+import unittest
+
+import torch
+from transformers import CLIPTextConfig, CLIPTextModel, CLIPTokenizer
+
+from diffusers import (
+    AutoencoderKL,
+    DDIMScheduler,
+    StableDiffusionImg2ImgPipeline,
+    StableDiffusionPipeline,
+    UNet2DConditionModel,
+)
+
+
+def get_dummy_components():
+    torch.manual_seed(0)
+    unet = UNet2DConditionModel(
+        block_out_channels=(4, 8),
+        layers_per_block=1,
+        sample_size=32,
+        in_channels=4,
+        out_channels=4,
+        down_block_types=("DownBlock2D", "CrossAttnDownBlock2D"),
+        up_block_types=("CrossAttnUpBlock2D", "UpBlock2D"),
+        cross_attention_dim=8,
+        norm_num_groups=2,
+    )
+    vae = AutoencoderKL(
+        block_out_channels=[4, 8],
+        in_channels=3,
+        out_channels=3,
+        down_block_types=["DownEncoderBlock2D", "DownEncoderBlock2D"],
+        up_block_types=["UpDecoderBlock2D", "UpDecoderBlock2D"],
+        latent_channels=4,
+        norm_num_groups=2,
+        sample_size=32,
+    )
+    text_encoder_config = CLIPTextConfig(
+        bos_token_id=0,
+        eos_token_id=2,
+        hidden_size=8,
+        intermediate_size=16,
+        layer_norm_eps=1e-05,
+        num_attention_heads=2,
+        num_hidden_layers=2,
+        pad_token_id=1,
+        vocab_size=1000,
+    )
+    return {
+        "unet": unet,
+        "scheduler": DDIMScheduler(),
+        "vae": vae,
+        "text_encoder": CLIPTextModel(text_encoder_config),
+        "tokenizer": CLIPTokenizer.from_pretrained("hf-internal-testing/tiny-random-clip"),
+        "safety_checker": None,
+        "feature_extractor": None,
+        "image_encoder": None,
+    }
+
+
+class PipelineMemoryEstimationTests(unittest.TestCase):
+    def test_estimate_scales_with_resolution(self):
+        pipe = StableDiffusionPipeline(**get_dummy_components())
+        small = pipe.estimate_memory(prompt="a cat", height=32, width=32)
+        large = pipe.estimate_memory(prompt="a cat", height=64, width=64, num_images_per_prompt=2)
+
+        self.assertEqual([stage.name for stage in small.stages], ["text_encoder", "unet", "vae"])
+        weights = sum(p.numel() * p.element_size() for p in pipe.unet.parameters())
+        self.assertGreater(small["unet"].weights, weights)
+        self.assertEqual(small["unet"].weights, large["unet"].weights)
+
+        # The activations of the denoiser and the VAE grow with the number of pixels.
+        for name in ("unet", "vae"):
+            ratio = large[name].peak_activations / small[name].peak_activations
+            self.assertTrue(6 < ratio < 9, f"{name}: {ratio}")
+
+        # The pipeline itself is left untouched.
+        self.assertEqual(pipe.unet.device.type, "cpu")
+        self.assertEqual(pipe.scheduler.num_inference_steps, None)
+
+    def test_math_attention(self):
+        pipe = StableDiffusionPipeline(**get_dummy_components())
+        efficient = pipe.estimate_memory(prompt="a cat", height=64, width=64)
+        math = pipe.estimate_memory(prompt="a cat", height=64, width=64, memory_efficient_attention=False)
+        self.assertGreater(math["unet"].peak_activations, efficient["unet"].peak_activations)
+
+    def test_recommended_settings(self):
+        pipe = StableDiffusionPipeline(**get_dummy_components())
+        inputs = {"prompt": "a cat", "height": 128, "width": 128}
+        estimate = pipe.estimate_memory(**inputs)
+        budget = estimate.peak_memory - 1
+        recommended = pipe.estimate_memory(max_memory=budget, **inputs)
+
+        self.assertEqual(recommended.recommended_settings, ("model_cpu_offload",))
+        self.assertLessEqual(recommended.recommended_estimate.peak_memory, budget)
+        self.assertLess(recommended.recommended_estimate["unet"].weights, estimate["unet"].weights)
+
+        self.assertEqual(pipe.estimate_memory(max_memory=estimate.peak_memory, **inputs).recommended_settings, ())
+        self.assertIsNone(pipe.estimate_memory(max_memory=1, **inputs).recommended_settings)
+
+    def test_vae_tiling(self):
+        pipe = StableDiffusionPipeline(**get_dummy_components())
+        inputs = {"prompt": "a cat", "height": 128, "width": 128}
+        estimate = pipe.estimate_memory(**inputs)
+        pipe.enable_vae_tiling()
+        tiled = pipe.estimate_memory(**inputs)
+
+        self.assertEqual(tiled.settings, ("vae_tiling",))
+        self.assertLess(tiled["vae"].peak_activations, estimate["vae"].peak_activations / 2)
+        self.assertEqual(tiled["unet"].peak_activations, estimate["unet"].peak_activations)
+
+    def test_img2img(self):
+        pipe = StableDiffusionImg2ImgPipeline(**get_dummy_components())
+        estimate = pipe.estimate_memory(prompt="a cat", image=torch.rand(1, 3, 32, 32), strength=0.5)
+        self.assertEqual([stage.name for stage in estimate.stages], ["text_encoder", "vae", "unet"])
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import torch
+
+from diffusers import DDPMPipeline, DDPMScheduler, UNet2DModel
+from diffusers.commands.optimize import OptimizeCommand, get_quantization_config
+from diffusers.quantizers.quantization_config import BitsAndBytesConfig
+
+
+def get_dummy_pipeline():
+    torch.manual_seed(0)
+    unet = UNet2DModel(
+        block_out_channels=(4, 8),
+        layers_per_block=1,
+        norm_num_groups=4,
+        sample_size=8,
+        in_channels=3,
+        out_channels=3,
+        down_block_types=("DownBlock2D", "DownBlock2D"),
+        up_block_types=("UpBlock2D", "UpBlock2D"),
+    )
+    return DDPMPipeline(unet=unet, scheduler=DDPMScheduler(num_train_timesteps=10))
+
+
+class OptimizeCommandTests(unittest.TestCase):
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            OptimizeCommand(None, None, "DiffusionPipeline", "output")
+        with self.assertRaises(ValueError):
+            OptimizeCommand(None, "model.safetensors", "DiffusionPipeline", "output")
+        with self.assertRaises(ValueError):
+            OptimizeCommand("model", None, "DiffusionPipeline", "output", quantization="int3")
+
+        self.assertIsInstance(get_quantization_config("bnb_8bit"), BitsAndBytesConfig)
+
+    def test_optimized_pipeline_records_metadata(self):
+        with tempfile.TemporaryDirectory() as source_dir, tempfile.TemporaryDirectory() as output_dir:
+            get_dummy_pipeline().save_pretrained(source_dir)
+            OptimizeCommand(source_dir, None, "DDPMPipeline", output_dir, torch_dtype="float16").run()
+
+            pipe = DDPMPipeline.from_pretrained(output_dir)
+            self.assertEqual(pipe.unet.dtype, torch.float16)
+            self.assertEqual(pipe.config._optimization["source"], source_dir)
+            self.assertEqual(pipe.config._optimization["torch_dtype"], "float16")
+            self.assertEqual(pipe.config._optimization["fuse_qkv_projections"], [])
+
+            # The recorded dtype is only a default.
+            pipe = DDPMPipeline.from_pretrained(output_dir, torch_dtype=torch.float32)
+            self.assertEqual(pipe.unet.dtype, torch.float32)
+
+    def test_failed_quantization_keeps_weights(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            get_dummy_pipeline().save_pretrained(output_dir)
+            command = OptimizeCommand(output_dir, None, "DDPMPipeline", output_dir)
+
+            with mock.patch.object(UNet2DModel, "save_pretrained", side_effect=RuntimeError("Disk full")):
+                with self.assertRaises(RuntimeError):
+                    command._quantize_component("unet", None, {})
+
+            self.assertEqual(sorted(os.listdir(output_dir)), ["model_index.json", "scheduler", "unet"])
+            UNet2DModel.from_pretrained(os.path.join(output_dir, "unet"))
+
+            command._quantize_component("unet", None, {})
+            self.assertEqual(sorted(os.listdir(output_dir)), ["model_index.json", "scheduler", "unet"])
+            UNet2DModel.from_pretrained(os.path.join(output_dir, "unet"))
@@ -0,0 +1,103 @@
+import unittest
+from unittest import mock
+
+import torch
+from transformers import CLIPTextConfig, CLIPTextModel
+
+from diffusers import DDPMPipeline, DDPMScheduler, DiffusionPipeline, UNet2DModel
+from diffusers.models import modeling_utils
+
+
+def get_unet():
+    torch.manual_seed(0)
+    return UNet2DModel(
+        block_out_channels=(4, 8),
+        layers_per_block=1,
+        norm_num_groups=4,
+        sample_size=8,
+        in_channels=3,
+        out_channels=3,
+        down_block_types=("DownBlock2D", "DownBlock2D"),
+        up_block_types=("UpBlock2D", "UpBlock2D"),
+    )
+
+
+class TextEncoderPipeline(DiffusionPipeline):
+    # The text encoder is the only model, so it always determines the device of the pipeline.
+    def __init__(self, text_encoder, scheduler):
+        super().__init__()
+        self.register_modules(text_encoder=text_encoder, scheduler=scheduler)
+
+
+class PlacementCacheTests(unittest.TestCase):
+    def test_model_device_and_dtype_are_cached(self):
+        model = get_unet()
+        with mock.patch.object(
+            modeling_utils, "get_parameter_device", wraps=modeling_utils.get_parameter_device
+        ) as get_device, mock.patch.object(
+            modeling_utils, "get_parameter_dtype", wraps=modeling_utils.get_parameter_dtype
+        ) as get_dtype:
+            for _ in range(3):
+                self.assertEqual(model.device, torch.device("cpu"))
+                self.assertEqual(model.dtype, torch.float32)
+        self.assertEqual(get_device.call_count, 1)
+        self.assertEqual(get_dtype.call_count, 1)
+
+    def test_to_invalidates_cache(self):
+        model = get_unet()
+        self.assertEqual(model.dtype, torch.float32)
+        model.to(torch.float16)
+        self.assertEqual(model.dtype, torch.float16)
+        model.float()
+        self.assertEqual(model.dtype, torch.float32)
+        model.to("meta")
+        self.assertEqual(model.device, torch.device("meta"))
+
+    def test_hooks_invalidate_cache(self):
+        model = get_unet()
+        self.assertEqual(model.dtype, torch.float32)
+        model.enable_layerwise_casting(storage_dtype=torch.float8_e4m3fn, compute_dtype=torch.bfloat16)
+        self.assertEqual(model.dtype, torch.bfloat16)
+
+    def test_pipeline_execution_device_is_cached(self):
+        pipe = DDPMPipeline(unet=get_unet(), scheduler=DDPMScheduler(num_train_timesteps=10))
+        with mock.patch.object(
+            DDPMPipeline, "_get_execution_device", autospec=True, side_effect=lambda p: p.device
+        ) as get_execution_device:
+            for _ in range(3):
+                self.assertEqual(pipe._execution_device, torch.device("cpu"))
+            self.assertEqual(get_execution_device.call_count, 1)
+
+            pipe.to("meta")
+            self.assertEqual(pipe._execution_device, torch.device("meta"))
+            pipe.unet = get_unet()
+            self.assertEqual(pipe._execution_device, torch.device("cpu"))
+            self.assertEqual(get_execution_device.call_count, 3)
+
+    def test_moving_parameters_invalidates_cache(self):
+        model = get_unet()
+        self.assertEqual((model.device, model.dtype), (torch.device("cpu"), torch.float32))
+        for param in model.parameters():
+            param.data = param.data.half()
+        self.assertEqual(model.dtype, torch.float16)
+
+        model.load_state_dict(
+            {name: torch.empty_like(p, device="meta") for name, p in model.state_dict().items()}, assign=True
+        )
+        self.assertEqual(model.device, torch.device("meta"))
+
+        model.load_state_dict(
+            {name: torch.zeros_like(p, device="cpu") for name, p in model.state_dict().items()}, assign=True
+        )
+        self.assertEqual(model.device, torch.device("cpu"))
+
+    def test_moving_external_component_invalidates_cache(self):
+        text_encoder = CLIPTextModel(
+            CLIPTextConfig(hidden_size=8, intermediate_size=16, num_attention_heads=2, num_hidden_layers=1)
+        )
+        pipe = TextEncoderPipeline(text_encoder=text_encoder, scheduler=DDPMScheduler(num_train_timesteps=10))
+        self.assertEqual(pipe._execution_device, torch.device("cpu"))
+
+        # Moving a transformers model doesn't go through diffusers.
+        pipe.text_encoder.to("meta")
+        self.assertEqual(pipe._execution_device, torch.device("meta"))
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+import unittest
+
+import torch
+
+from diffusers.pipelines.serving_utils import PipelineServer
+
+
+class DummyPipeline:
+    def __init__(self, step_time: float = 0.0):
+        self.step_time = step_time
+        self.calls = []
+        self.thread_ids = set()
+        self._interrupt = False
+
+    def __call__(
+        self, prompt, num_inference_steps: int = 2, generator=None, callback_on_step_end=None, num_images_per_prompt=1
+    ):
+        self._interrupt = False
+        self.calls.append(list(prompt))
+        self.thread_ids.add(threading.get_ident())
+        for step in range(num_inference_steps):
+            if self._interrupt:
+                break
+            time.sleep(self.step_time)
+            if callback_on_step_end is not None:
+                callback_on_step_end(self, step, step, {})
+        images = [torch.randn(1, generator=g).item() for g in generator]
+        return (images,)
+
+
+class PipelineServerTests(unittest.TestCase):
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_compatible_requests_are_batched(self):
+        pipe = DummyPipeline()
+
+        async def run():
+            server = PipelineServer(pipe, max_batch_size=4, batch_timeout=0.1)
+            await server.start()
+            results = await asyncio.gather(
+                server.submit("a", seed=0),
+                server.submit("b", seed=1),
+                server.submit("c", seed=0, num_inference_steps=3),
+            )
+            metrics = server.get_metrics()
+            await server.stop()
+            return results, metrics
+
+        results, metrics = self.run_async(run())
+        self.assertEqual(pipe.calls, [["a", "b"], ["c"]])
+        self.assertEqual(len(pipe.thread_ids), 1)
+        # Requests with the same seed get the same result, independently of their batch.
+        self.assertEqual(results[0], results[2])
+        self.assertNotEqual(results[0], results[1])
+        self.assertEqual(metrics["batches"], 2)
+        self.assertEqual(metrics["requests_completed"], 3)
+
+    def test_full_queue_rejects_requests(self):
+        pipe = DummyPipeline(step_time=0.05)
+
+        async def run():
+            server = PipelineServer(pipe, max_queue_size=1, max_batch_size=1, batch_timeout=0.0)
+            await server.start()
+            running = asyncio.ensure_future(server.submit("a"))
+            await asyncio.sleep(0.02)
+            queued = asyncio.ensure_future(server.submit("b"))
+            await asyncio.sleep(0)
+            with self.assertRaises(asyncio.QueueFull):
+                await server.submit("c")
+            await asyncio.gather(running, queued)
+            metrics = server.get_metrics()
+            await server.stop()
+            return metrics
+
+        metrics = self.run_async(run())
+        self.assertEqual(metrics["requests_rejected"], 1)
+        self.assertEqual(metrics["requests_completed"], 2)
+
+    def test_timeout_interrupts_batch(self):
+        pipe = DummyPipeline(step_time=0.05)
+
+        async def run():
+            server = PipelineServer(pipe, batch_timeout=0.0)
+            await server.start()
+            with self.assertRaises(asyncio.TimeoutError):
+                await server.submit("a", num_inference_steps=100, timeout=0.1)
+            # The next request can only run once the interrupted batch is done.
+            await server.submit("b", timeout=5)
+            metrics = server.get_metrics()
+            await server.stop()
+            return metrics
+
+        metrics = self.run_async(run())
+        self.assertEqual(metrics["requests_timed_out"], 1)
+        self.assertEqual(metrics["interrupted_batches"], 1)
+
+    def test_stop_finishes_running_batch(self):
+        pipe = DummyPipeline(step_time=0.05)
+
+        async def run():
+            server = PipelineServer(pipe, max_batch_size=1, batch_timeout=0.0)
+            await server.start()
+            running = asyncio.ensure_future(server.submit("a", num_inference_steps=4))
+            await asyncio.sleep(0.05)
+            queued = asyncio.ensure_future(server.submit("b"))
+            await asyncio.sleep(0)
+            await server.stop()
+            with self.assertRaises(RuntimeError):
+                await server.submit("c")
+            return await asyncio.gather(running, queued, return_exceptions=True)
+
+        running, queued = self.run_async(run())
+        self.assertEqual(len(running), 1)
+        self.assertIsInstance(queued, RuntimeError)
+        self.assertEqual(pipe.calls, [["a"]])
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+import torch
+
+from diffusers.loaders.single_file_utils import (
+    convert_ldm_vae_checkpoint,
+    get_single_file_checkpoint_hash,
+    get_single_file_conversion_cache_path,
+    load_converted_checkpoint_from_cache,
+    save_converted_checkpoint_to_cache,
+)
+
+
+class SingleFileConversionCacheTests(unittest.TestCase):
+    def test_checkpoint_hash(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            checkpoint_path = os.path.join(tmpdir, "model.safetensors")
+            with open(checkpoint_path, "wb") as f:
+                f.write(b"weights")
+
+            cache_dir = os.path.join(tmpdir, "cache")
+            expected_hash = hashlib.sha256(b"weights").hexdigest()
+            self.assertEqual(get_single_file_checkpoint_hash(checkpoint_path, cache_dir=cache_dir), expected_hash)
+            # The hash is memoized, so it is only computed once.
+            self.assertEqual(len(os.listdir(os.path.join(cache_dir, "file_hashes"))), 1)
+            self.assertEqual(get_single_file_checkpoint_hash(checkpoint_path, cache_dir=cache_dir), expected_hash)
+
+            # Files from the Hugging Face cache are named after their hash and aren't read.
+            blob_path = os.path.join(tmpdir, "a" * 64)
+            os.rename(checkpoint_path, blob_path)
+            self.assertEqual(get_single_file_checkpoint_hash(blob_path, cache_dir=cache_dir), "a" * 64)
+
+    def test_cache_path_depends_on_conversion_arguments(self):
+        path = get_single_file_conversion_cache_path(
+            "0" * 64, "AutoencoderKL", convert_ldm_vae_checkpoint, config=None
+        )
+        self.assertEqual(
+            path,
+            get_single_file_conversion_cache_path("0" * 64, "AutoencoderKL", convert_ldm_vae_checkpoint, config=None),
+        )
+        self.assertNotEqual(
+            path,
+            get_single_file_conversion_cache_path("0" * 64, "AutoencoderKL", convert_ldm_vae_checkpoint, config="vae"),
+        )
+        self.assertNotEqual(
+            path,
+            get_single_file_conversion_cache_path("1" * 64, "AutoencoderKL", convert_ldm_vae_checkpoint, config=None),
+        )
+
+    def test_save_and_load_converted_checkpoint(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_path = get_single_file_conversion_cache_path(
+                "0" * 64, "AutoencoderKL", convert_ldm_vae_checkpoint, cache_dir=tmpdir
+            )
+            self.assertIsNone(load_converted_checkpoint_from_cache(cache_path))
+
+            config = {"_class_name": "AutoencoderKL", "latent_channels": 4}
+            checkpoint = {"encoder.conv_in.weight": torch.randn(4, 3).t(), "encoder.conv_in.bias": torch.randn(4)}
+            save_converted_checkpoint_to_cache(cache_path, config, checkpoint)
+            # No temporary directories are left behind.
+            self.assertEqual(os.listdir(os.path.dirname(cache_path)), [os.path.basename(cache_path)])
+
+            loaded_config, loaded_checkpoint = load_converted_checkpoint_from_cache(cache_path)
+            self.assertEqual(loaded_config, config)
+            self.assertEqual(set(loaded_checkpoint), set(checkpoint))
+            for key, value in checkpoint.items():
+                self.assertTrue(torch.equal(loaded_checkpoint[key], value))
@@ -0,0 +1,103 @@
+import unittest
+
+import torch
+
+from diffusers import AutoencoderKL, AutoencoderTiny
+from diffusers.pipelines.stable_diffusion.pipeline_stable_diffusion_img2img import retrieve_latents
+from diffusers.pipelines.vae_cache_utils import VaeLatentCache
+from diffusers.utils.testing_utils import torch_device
+
+
+def get_vae(cls=AutoencoderKL, seed=0):
+    torch.manual_seed(seed)
+    if cls is AutoencoderTiny:
+        vae = AutoencoderTiny(
+            encoder_block_out_channels=(8, 8),
+            decoder_block_out_channels=(8, 8),
+            num_encoder_blocks=(1, 1),
+            num_decoder_blocks=(1, 1),
+        )
+    else:
+        vae = AutoencoderKL(
+            block_out_channels=(4, 8),
+            down_block_types=("DownEncoderBlock2D", "DownEncoderBlock2D"),
+            up_block_types=("UpDecoderBlock2D", "UpDecoderBlock2D"),
+            latent_channels=4,
+            norm_num_groups=2,
+        )
+    vae = vae.to(torch_device).eval()
+    calls = []
+    vae.encoder.register_forward_hook(lambda module, args, output: calls.append(args[0].shape[0]))
+    return vae, calls
+
+
+def get_images(num_images, seed=0):
+    generator = torch.Generator("cpu").manual_seed(seed)
+    return torch.rand(num_images, 3, 16, 16, generator=generator).to(torch_device) * 2 - 1
+
+
+class VaeLatentCacheTests(unittest.TestCase):
+    @torch.no_grad()
+    def test_only_missing_images_are_encoded(self):
+        vae, calls = get_vae()
+        cache = VaeLatentCache()
+        images = get_images(3)
+        expected = vae.encode(images).latent_dist
+        calls.clear()
+
+        cache.encode(vae, images[:1])
+        # The first image is cached and the third one appears twice.
+        output = cache.encode(vae, images[[0, 1, 2, 2]]).latent_dist
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+
+        self.assertTrue(torch.allclose(output.mean[:3], expected.mean, atol=1e-5))
+        self.assertTrue(torch.allclose(output.std[:3], expected.std, atol=1e-5))
+        self.assertTrue(torch.equal(output.mean[2], output.mean[3]))
+
+    @torch.no_grad()
+    def test_sampling_stays_seeded(self):
+        vae, _ = get_vae()
+        cache = VaeLatentCache()
+        image = get_images(1)
+
+        expected = retrieve_latents(vae.encode(image), generator=torch.manual_seed(0))
+        cache.encode(vae, image)
+        first = retrieve_latents(cache.encode(vae, image), generator=torch.manual_seed(0))
+        second = retrieve_latents(cache.encode(vae, image), generator=torch.manual_seed(1))
+
+        self.assertTrue(torch.allclose(first, expected, atol=1e-5))
+        self.assertFalse(torch.allclose(first, second))
+
+    @torch.no_grad()
+    def test_lru_eviction_and_vae_identity(self):
+        vae, calls = get_vae()
+        cache = VaeLatentCache(max_entries=2)
+        images = get_images(3)
+
+        for image in images:
+            cache.encode(vae, image[None])
+        self.assertEqual(len(cache), 2)
+        cache.encode(vae, images[2:])
+        cache.encode(vae, images[:1])
+        self.assertEqual(len(calls), 4)
+
+        # A different VAE, or the same VAE in another dtype, does not share entries.
+        other_vae, other_calls = get_vae(seed=1)
+        cache.encode(other_vae, images[2:])
+        self.assertEqual(len(other_calls), 1)
+        vae.to(torch.float64)
+        cache.encode(vae, images[:1].double())
+        self.assertEqual(len(calls), 5)
+
+    @torch.no_grad()
+    def test_tiny_autoencoder(self):
+        vae, calls = get_vae(AutoencoderTiny)
+        cache = VaeLatentCache()
+        images = get_images(2)
+
+        expected = vae.encode(images).latents
+        cache.encode(vae, images)
+        output = cache.encode(vae, images).latents
+        self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+        self.assertEqual(len(calls), 2)
@@ -24,6 +24,7 @@ from transformers import CLIPTextConfig, CLIPTextModel, CLIPTokenizer
 
 from diffusers import (
     AutoencoderKL,
+    ControlNetCacheConfig,
     ControlNetModel,
     DDIMScheduler,
     EulerDiscreteScheduler,
@@ -288,6 +289,42 @@ class ControlNetPipelineFastTests(
 
         assert np.abs(image_slice.flatten() - expected_slice).max() < 1e-2
 
+    def test_controlnet_skipped_outside_control_guidance(self):
+        components = self.get_dummy_components()
+        sd_pipe = StableDiffusionControlNetPipeline(**components).to(torch_device)
+        sd_pipe.set_progress_bar_config(disable=None)
+
+        calls = []
+        sd_pipe.controlnet.register_forward_hook(lambda *args: calls.append(1))
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["num_inference_steps"] = 4
+        sd_pipe(**inputs, control_guidance_start=0.0, control_guidance_end=0.5)
+        self.assertEqual(len(calls), 2)
+
+    def test_controlnet_cache(self):
+        components = self.get_dummy_components()
+        sd_pipe = StableDiffusionControlNetPipeline(**components).to(torch_device)
+        sd_pipe.set_progress_bar_config(disable=None)
+
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["num_inference_steps"] = 4
+        output = sd_pipe(**inputs)[0]
+
+        calls = []
+        sd_pipe.controlnet.controlnet_mid_block.register_forward_hook(lambda *args: calls.append(1))
+        sd_pipe.controlnet.enable_cache(ControlNetCacheConfig(cache_interval=2))
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["num_inference_steps"] = 4
+        sd_pipe(**inputs)
+        self.assertEqual(len(calls), 2)
+
+        sd_pipe.controlnet.disable_cache()
+        inputs = self.get_dummy_inputs(torch_device)
+        inputs["num_inference_steps"] = 4
+        output_disabled = sd_pipe(**inputs)[0]
+
+        self.assertTrue(np.allclose(output, output_disabled, atol=1e-4))
+
     def test_encode_prompt_works_in_isolation(self):
         extra_required_param_value_dict = {
             "device": torch.device(torch_device).type,
@@ -462,6 +499,17 @@ class StableDiffusionMultiControlNetPipelineFastTests(
         assert np.sum(np.abs(output_1 - output_3)) > 1e-3
         assert np.sum(np.abs(output_1 - output_4)) > 1e-3
 
+    def test_batched_controlnet_forward(self):
+        components = self.get_dummy_components()
+        pipe = self.pipeline_class(**components)
+        pipe.to(torch_device)
+
+        output = pipe(**self.get_dummy_inputs(torch_device))[0]
+        pipe.controlnet.enable_batched_forward()
+        output_batched = pipe(**self.get_dummy_inputs(torch_device))[0]
+
+        self.assertTrue(np.allclose(output, output_batched, atol=1e-3))
+
     def test_attention_slicing_forward_pass(self):
         return self._test_attention_slicing_forward_pass(expected_max_diff=2e-3)
 
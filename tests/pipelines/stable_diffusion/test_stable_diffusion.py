@@ -67,6 +67,7 @@ from ..pipeline_params import (
     TEXT_TO_IMAGE_PARAMS,
 )
 from ..test_pipelines_common import (
+    DeepCacheTesterMixin,
     IPAdapterTesterMixin,
     PipelineKarrasSchedulerTesterMixin,
     PipelineLatentTesterMixin,
@@ -112,6 +113,7 @@ def _test_stable_diffusion_compile(in_queue, out_queue, timeout):
 
 class StableDiffusionPipelineFastTests(
     IPAdapterTesterMixin,
+    DeepCacheTesterMixin,
     PipelineLatentTesterMixin,
     PipelineKarrasSchedulerTesterMixin,
     PipelineTesterMixin,
@@ -259,6 +259,26 @@ class StableDiffusionImg2ImgPipelineFastTests(
             expected_pipe_slice = np.array([0.4932, 0.5092, 0.5135, 0.5517, 0.5626, 0.6621, 0.6490, 0.5021, 0.5441])
         return super().test_ip_adapter(expected_pipe_slice=expected_pipe_slice)
 
+    def test_stable_diffusion_img2img_vae_latent_cache(self):
+        device = "cpu"
+        components = self.get_dummy_components()
+        sd_pipe = StableDiffusionImg2ImgPipeline(**components)
+        sd_pipe = sd_pipe.to(device)
+        sd_pipe.set_progress_bar_config(disable=None)
+
+        output = sd_pipe(**self.get_dummy_inputs(device)).images
+
+        cache = sd_pipe.enable_vae_latent_cache()
+        output_first = sd_pipe(**self.get_dummy_inputs(device)).images
+        output_cached = sd_pipe(**self.get_dummy_inputs(device)).images
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        self.assertLess(np.abs(output - output_first).max(), 1e-4)
+        self.assertLess(np.abs(output - output_cached).max(), 1e-4)
+
+        sd_pipe.disable_vae_latent_cache()
+        self.assertIsNone(sd_pipe._vae_latent_cache)
+
     def test_stable_diffusion_img2img_multiple_init_images(self):
         device = "cpu"  # ensure determinism for the device-dependent torch.Generator
         components = self.get_dummy_components()
@@ -50,6 +50,7 @@ from ..pipeline_params import (
     TEXT_TO_IMAGE_PARAMS,
 )
 from ..test_pipelines_common import (
+    DeepCacheTesterMixin,
     IPAdapterTesterMixin,
     PipelineLatentTesterMixin,
     PipelineTesterMixin,
@@ -62,6 +63,7 @@ enable_full_determinism()
 
 class StableDiffusionXLPipelineFastTests(
     SDFunctionTesterMixin,
+    DeepCacheTesterMixin,
     IPAdapterTesterMixin,
     PipelineLatentTesterMixin,
     PipelineTesterMixin,
@@ -1,6 +1,8 @@
 import contextlib
 import io
+import os
 import re
+import tempfile
 import unittest
 
 import torch
@@ -12,13 +14,17 @@ from diffusers import (
     AnimateDiffVideoToVideoPipeline,
     AutoencoderKL,
     DDIMScheduler,
+    DDPMPipeline,
+    DDPMScheduler,
     MotionAdapter,
     StableDiffusionImg2ImgPipeline,
     StableDiffusionInpaintPipeline,
     StableDiffusionPipeline,
     UNet2DConditionModel,
+    UNet2DModel,
 )
 from diffusers.pipelines.pipeline_loading_utils import is_safetensors_compatible, variant_compatible_siblings
+from diffusers.pipelines.telemetry_utils import CallbackTelemetrySink, PrometheusTextFileTelemetrySink
 from diffusers.utils.testing_utils import torch_device
 
 
@@ -585,3 +591,83 @@ class ProgressBarTests(unittest.TestCase):
         with io.StringIO() as stderr, contextlib.redirect_stderr(stderr):
             _ = pipe(**inputs)
             self.assertTrue(stderr.getvalue() == "", "Progress bar should be disabled")
+
+
+class PipelineTelemetryTests(unittest.TestCase):
+    def get_dummy_pipeline(self):
+        torch.manual_seed(0)
+        unet = UNet2DModel(
+            block_out_channels=(4, 8),
+            layers_per_block=1,
+            norm_num_groups=4,
+            sample_size=8,
+            in_channels=3,
+            out_channels=3,
+            down_block_types=("DownBlock2D", "AttnDownBlock2D"),
+            up_block_types=("AttnUpBlock2D", "UpBlock2D"),
+        )
+        pipe = DDPMPipeline(unet=unet, scheduler=DDPMScheduler())
+        pipe.to(torch_device)
+        pipe.set_progress_bar_config(disable=True)
+        return pipe
+
+    def test_step_and_stage_breakdown(self):
+        pipe = self.get_dummy_pipeline()
+
+        with pipe.telemetry() as telemetry:
+            _ = pipe(num_inference_steps=3, output_type="pil")
+
+        report = telemetry.report
+        self.assertEqual(report.pipeline, "DDPMPipeline")
+        self.assertEqual(report.num_steps, 3)
+        self.assertEqual(report.stage_calls["denoise"], 3)
+        self.assertEqual(report.stage_calls["postprocess"], 1)
+        self.assertAlmostEqual(report.stage_durations["denoise"], sum(report.step_durations))
+        self.assertGreaterEqual(report.total_duration, report.stage_durations["denoise"])
+
+    def test_patches_are_removed(self):
+        pipe = self.get_dummy_pipeline()
+
+        with pipe.telemetry():
+            _ = pipe(num_inference_steps=2, output_type="np")
+
+        self.assertNotIn("forward", pipe.unet.__dict__)
+        self.assertNotIn("step", pipe.scheduler.__dict__)
+        self.assertNotIn("numpy_to_pil", pipe.__dict__)
+
+        # Calls made outside the context are not recorded.
+        with pipe.telemetry() as telemetry:
+            pass
+        _ = pipe(num_inference_steps=2, output_type="np")
+        self.assertEqual(telemetry.report.num_steps, 0)
+
+    def test_sinks(self):
+        pipe = self.get_dummy_pipeline()
+        reports = []
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "diffusers.prom")
+            sinks = [CallbackTelemetrySink(reports.append), PrometheusTextFileTelemetrySink(path)]
+
+            for _ in range(2):
+                with pipe.telemetry(sinks=sinks):
+                    _ = pipe(num_inference_steps=2, output_type="np")
+
+            with open(path) as f:
+                metrics = f.read()
+
+        self.assertEqual(len(reports), 2)
+        self.assertIn('diffusers_pipeline_calls_total{pipeline="DDPMPipeline"} 2', metrics)
+        self.assertIn('diffusers_pipeline_steps_total{pipeline="DDPMPipeline"} 4', metrics)
+        self.assertIn('stage="denoise"', metrics)
+
+    def test_no_emit_on_error(self):
+        pipe = self.get_dummy_pipeline()
+        reports = []
+
+        with self.assertRaises(RuntimeError):
+            with pipe.telemetry(sinks=[CallbackTelemetrySink(reports.append)]):
+                raise RuntimeError("failed generation")
+
+        self.assertEqual(len(reports), 0)
+        self.assertNotIn("step", pipe.scheduler.__dict__)
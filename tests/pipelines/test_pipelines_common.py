@@ -22,6 +22,7 @@ from diffusers import (
     AutoencoderTiny,
     ConsistencyDecoderVAE,
     DDIMScheduler,
+    DeepCacheConfig,
     DiffusionPipeline,
     KolorsPipeline,
     PyramidAttentionBroadcastConfig,
@@ -30,6 +31,7 @@ from diffusers import (
     UNet2DConditionModel,
 )
 from diffusers.hooks import apply_group_offloading
+from diffusers.hooks.deep_cache import DeepCacheBlockHook
 from diffusers.hooks.pyramid_attention_broadcast import PyramidAttentionBroadcastHook
 from diffusers.image_processor import VaeImageProcessor
 from diffusers.loaders import FluxIPAdapterMixin, IPAdapterMixin
@@ -2545,6 +2547,71 @@ class PyramidAttentionBroadcastTesterMixin:
         ), "Outputs from normal inference and after disabling cache should not differ."
 
 
+class DeepCacheTesterMixin:
+    deep_cache_config = DeepCacheConfig(cache_interval=2, cache_block_id=0)
+
+    def test_deep_cache_layers(self):
+        device = "cpu"  # ensure determinism for the device-dependent torch.Generator
+
+        components = self.get_dummy_components()
+        pipe = self.pipeline_class(**components)
+        pipe.set_progress_bar_config(disable=None)
+        pipe.unet.enable_cache(self.deep_cache_config)
+
+        hooks = [
+            module._diffusers_hook.get_hook("deep_cache")
+            for module in pipe.unet.modules()
+            if hasattr(module, "_diffusers_hook")
+            and isinstance(module._diffusers_hook.get_hook("deep_cache"), DeepCacheBlockHook)
+        ]
+        num_blocks = len(pipe.unet.down_blocks)
+        expected_hooks = 2 * (num_blocks - 1 - self.deep_cache_config.cache_block_id) + 1
+        self.assertEqual(len(hooks), expected_hooks, "Number of hooks should match the expected number.")
+        self.assertTrue(all(hook.cache == {} for hook in hooks), "Cache should be empty at initialization.")
+
+        def deep_cache_state_check_callback(pipe, i, t, kwargs):
+            self.assertTrue(all(len(hook.cache) > 0 for hook in hooks), "Cache should have updated.")
+            self.assertEqual(hooks[0].state.step_index, i, "Step index should have updated during inference.")
+            return {}
+
+        inputs = self.get_dummy_inputs(device)
+        inputs["num_inference_steps"] = 3
+        inputs["callback_on_step_end"] = deep_cache_state_check_callback
+        pipe(**inputs)[0]
+
+        # After inference, reset_stateful_hooks is called within the pipeline, which should have reset the states
+        self.assertTrue(all(hook.cache == {} for hook in hooks), "Cache should be reset after inference.")
+        self.assertEqual(hooks[0].state.step_index, -1, "Step index should be reset after inference.")
+
+    def test_deep_cache_inference(self, expected_atol: float = 0.2):
+        device = "cpu"  # ensure determinism for the device-dependent torch.Generator
+        components = self.get_dummy_components()
+        pipe = self.pipeline_class(**components)
+        pipe = pipe.to(device)
+        pipe.set_progress_bar_config(disable=None)
+
+        inputs = self.get_dummy_inputs(device)
+        inputs["num_inference_steps"] = 4
+        original_image_slice = pipe(**inputs)[0].flatten()
+
+        pipe.unet.enable_cache(self.deep_cache_config)
+        inputs = self.get_dummy_inputs(device)
+        inputs["num_inference_steps"] = 4
+        image_slice_deep_cache_enabled = pipe(**inputs)[0].flatten()
+
+        pipe.unet.disable_cache()
+        inputs = self.get_dummy_inputs(device)
+        inputs["num_inference_steps"] = 4
+        image_slice_deep_cache_disabled = pipe(**inputs)[0].flatten()
+
+        assert np.allclose(
+            original_image_slice, image_slice_deep_cache_enabled, atol=expected_atol
+        ), "DeepCache outputs should not differ much."
+        assert np.allclose(
+            original_image_slice, image_slice_deep_cache_disabled, atol=1e-4
+        ), "Outputs from normal inference and after disabling cache should not differ."
+
+
 # Some models (e.g. unCLIP) are extremely likely to significantly deviate depending on which hardware is used.
 # This helper function is used to check that the image doesn't deviate on average more than 10 pixels from a
 # reference image.
@@ -26,7 +26,179 @@ from diffusers.utils.testing_utils import (
 
 
 if is_gguf_available():
-    from diffusers.quantizers.gguf.utils import GGUFLinear, GGUFParameter
+    import gguf
+
+    from diffusers.quantizers.gguf.utils import (
+        GGUFLinear,
+        GGUFParameter,
+        _apply_gguf_grouped_dequantization,
+        _enable_gguf_dequantization_cache,
+        dequantize_gguf_tensor,
+    )
+
+
+@require_gguf_version_greater_or_equal("0.10.0")
+class GGUFDequantizationTests(unittest.TestCase):
+    def get_model(self):
+        quant_types = [gguf.GGMLQuantizationType.Q8_0, gguf.GGMLQuantizationType.Q4_0, gguf.GGMLQuantizationType.Q5_1]
+        rng = np.random.RandomState(0)
+
+        def get_layer(in_features, out_features, quant_type):
+            layer = GGUFLinear(in_features, out_features, bias=True, compute_dtype=torch.float32)
+            weight = rng.randn(out_features, in_features).astype(np.float32)
+            quantized = gguf.quants.quantize(weight, quant_type)
+            layer.weight = GGUFParameter(torch.from_numpy(quantized), quant_type=quant_type)
+            return layer
+
+        blocks = nn.ModuleList(
+            nn.Sequential(get_layer(64, 128, quant_types[i % 3]), nn.GELU(), get_layer(128, 64, quant_types[i % 2]))
+            for i in range(3)
+        )
+        model = nn.Module()
+        model.blocks = blocks
+        model.proj_out = get_layer(64, 32, quant_types[2])
+        return model
+
+    def run_model(self, model, inputs):
+        hidden_states = inputs
+        for block in model.blocks:
+            hidden_states = block(hidden_states)
+        return model.proj_out(hidden_states)
+
+    def count_dequantize_calls(self, model):
+        from diffusers.quantizers.gguf import utils
+
+        calls = []
+        functions = dict(utils.dequantize_functions)
+
+        def wrap(fn):
+            def wrapped(blocks, *args, **kwargs):
+                calls.append(blocks.shape[0])
+                return fn(blocks, *args, **kwargs)
+
+            return wrapped
+
+        for quant_type, fn in functions.items():
+            utils.dequantize_functions[quant_type] = wrap(fn)
+        self.addCleanup(utils.dequantize_functions.update, functions)
+        return calls
+
+    @torch.no_grad()
+    def test_dequantization_cache(self):
+        model = self.get_model()
+        inputs = torch.randn(2, 64)
+        expected = self.run_model(model, inputs)
+
+        # Only the weights of the last layers fit in the cache.
+        cache = _enable_gguf_dequantization_cache(model, max_bytes=2 * 64 * 128 * 4)
+        calls = self.count_dequantize_calls(model)
+        self.assertTrue(torch.equal(self.run_model(model, inputs), expected))
+        self.assertEqual(len(calls), 7)
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.num_bytes, cache.max_bytes)
+
+        self.assertTrue(torch.equal(self.run_model(model, inputs), expected))
+        self.assertEqual(len(calls), 14)
+
+        # Everything fits.
+        cache = _enable_gguf_dequantization_cache(model, max_bytes=2**24)
+        self.run_model(model, inputs)
+        self.assertTrue(torch.equal(self.run_model(model, inputs), expected))
+        self.assertEqual(len(calls), 21)
+        self.assertEqual(cache.hits, 7)
+
+        # Modified weights are dequantized again.
+        model.proj_out.weight.zero_()
+        self.run_model(model, inputs)
+        self.assertEqual(len(calls), 22)
+
+    @torch.no_grad()
+    def test_grouped_dequantization(self):
+        model = self.get_model()
+        inputs = torch.randn(2, 64)
+        expected = self.run_model(model, inputs)
+
+        _apply_gguf_grouped_dequantization(model)
+        calls = self.count_dequantize_calls(model)
+        output = self.run_model(model, inputs)
+        self.assertTrue(torch.allclose(output, expected, atol=1e-6))
+        # One call per quantization type within each block, and one for the layer outside the blocks.
+        self.assertEqual(len(calls), 1 + 1 + 2 + 1)
+        for block in model.blocks:
+            for layer in block.modules():
+                if isinstance(layer, GGUFLinear):
+                    self.assertIsNone(layer._dequantized_weight)
+
+        _enable_gguf_dequantization_cache(model, max_bytes=2**24)
+        self.run_model(model, inputs)
+        self.assertTrue(torch.allclose(self.run_model(model, inputs), expected, atol=1e-6))
+        self.assertEqual(len(calls), 10)
+
+        # The weights are released even if the block raises.
+        with self.assertRaises(RuntimeError):
+            model.blocks[0](torch.randn(2, 3))
+        for layer in model.blocks[0].modules():
+            if isinstance(layer, GGUFLinear):
+                self.assertIsNone(layer._dequantized_weight)
+
+    @torch.no_grad()
+    def test_grouped_dequantization_nested_module_lists(self):
+        from diffusers.models.attention import FeedForward
+        from diffusers.models.attention_processor import Attention
+
+        class Block(nn.Module):
+            def __init__(self):
+                super().__init__()
+                # `Attention.to_out` and `FeedForward.net` are `nn.ModuleList`s within the block.
+                self.attn = Attention(query_dim=64, heads=2, dim_head=32)
+                self.ff = FeedForward(64, mult=2, activation_fn="gelu")
+
+            def forward(self, hidden_states):
+                hidden_states = hidden_states + self.attn(hidden_states)
+                return hidden_states + self.ff(hidden_states)
+
+        torch.manual_seed(0)
+        model = nn.Module()
+        model.blocks = nn.ModuleList(Block() for _ in range(2))
+        rng = np.random.RandomState(0)
+        for name, module in list(model.named_modules()):
+            if type(module) is not nn.Linear:
+                continue
+            layer = GGUFLinear(
+                module.in_features, module.out_features, bias=module.bias is not None, compute_dtype=torch.float32
+            )
+            weight = rng.randn(module.out_features, module.in_features).astype(np.float32)
+            quantized = gguf.quants.quantize(weight, gguf.GGMLQuantizationType.Q8_0)
+            layer.weight = GGUFParameter(torch.from_numpy(quantized), quant_type=gguf.GGMLQuantizationType.Q8_0)
+            if module.bias is not None:
+                layer.bias = module.bias
+            parent_name, _, child_name = name.rpartition(".")
+            setattr(model.get_submodule(parent_name), child_name, layer)
+
+        inputs = torch.randn(1, 4, 64)
+        expected = inputs
+        for block in model.blocks:
+            expected = block(expected)
+
+        _apply_gguf_grouped_dequantization(model)
+        hooked = [name for name, module in model.named_modules() if hasattr(module, "_diffusers_hook")]
+        self.assertEqual(hooked, ["blocks.0", "blocks.1"])
+
+        calls = self.count_dequantize_calls(model)
+        output = inputs
+        for block in model.blocks:
+            output = block(output)
+        self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+        # A single pass over the weights of each block.
+        self.assertEqual(len(calls), 2)
+
+    def test_grouped_dequantization_matches_per_tensor(self):
+        from diffusers.quantizers.gguf.utils import _dequantize_gguf_tensors
+
+        model = self.get_model()
+        weights = [layer.weight for layer in model.modules() if isinstance(layer, GGUFLinear)]
+        for grouped, weight in zip(_dequantize_gguf_tensors(weights), weights):
+            self.assertTrue(torch.equal(grouped, dequantize_gguf_tensor(weight)))
 
 
 @nightly
@@ -563,13 +563,15 @@ class TorchAoSerializationTest(unittest.TestCase):
         self.assertTrue(isinstance(weight, (AffineQuantizedTensor, LinearActivationQuantizedTensor)))
         self.assertTrue(numpy_cosine_similarity_distance(output_slice, expected_slice) < 1e-3)
 
-    def _check_serialization_expected_slice(self, quant_method, quant_method_kwargs, expected_slice, device):
+    def _check_serialization_expected_slice(
+        self, quant_method, quant_method_kwargs, expected_slice, device, safe_serialization=False, **save_kwargs
+    ):
         quantized_model = self.get_dummy_model(quant_method, quant_method_kwargs, device)
 
         with tempfile.TemporaryDirectory() as tmp_dir:
-            quantized_model.save_pretrained(tmp_dir, safe_serialization=False)
+            quantized_model.save_pretrained(tmp_dir, safe_serialization=safe_serialization, **save_kwargs)
             loaded_quantized_model = FluxTransformer2DModel.from_pretrained(
-                tmp_dir, torch_dtype=torch.bfloat16, use_safetensors=False
+                tmp_dir, torch_dtype=torch.bfloat16, use_safetensors=safe_serialization
             ).to(device=torch_device)
 
         inputs = self.get_dummy_tensor_inputs(torch_device)
@@ -611,6 +613,55 @@ class TorchAoSerializationTest(unittest.TestCase):
         self._test_original_model_expected_slice(quant_method, quant_method_kwargs, expected_slice)
         self._check_serialization_expected_slice(quant_method, quant_method_kwargs, expected_slice, device)
 
+    def test_int_a16w8_safetensors(self):
+        quant_method, quant_method_kwargs = "int8_weight_only", {}
+        expected_slice = np.array([0.3613, -0.127, -0.0223, -0.2539, -0.459, 0.4961, -0.1357, -0.6992, 0.4551])
+        self._check_serialization_expected_slice(
+            quant_method, quant_method_kwargs, expected_slice, "cuda", safe_serialization=True
+        )
+
+    def test_int_a16w8_safetensors_sharded(self):
+        quant_method, quant_method_kwargs = "int8_weight_only", {}
+        expected_slice = np.array([0.3613, -0.127, -0.0223, -0.2539, -0.459, 0.4961, -0.1357, -0.6992, 0.4551])
+        self._check_serialization_expected_slice(
+            quant_method, quant_method_kwargs, expected_slice, "cuda", safe_serialization=True, max_shard_size="20KB"
+        )
+
+    def _check_safetensors_round_trip(self, quant_method, quant_method_kwargs):
+        quantized_model = self.get_dummy_model(quant_method, quant_method_kwargs, torch_device)
+        inputs = self.get_dummy_tensor_inputs(torch_device)
+        expected = quantized_model(**inputs)[0].flatten()[-9:].detach().float().cpu().numpy()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            quantized_model.save_pretrained(tmp_dir, safe_serialization=True)
+            loaded_quantized_model = FluxTransformer2DModel.from_pretrained(
+                tmp_dir, torch_dtype=torch.bfloat16, use_safetensors=True
+            ).to(device=torch_device)
+
+        weight = quantized_model.proj_out.weight
+        loaded_weight = loaded_quantized_model.proj_out.weight
+        self.assertIs(type(loaded_weight), type(weight))
+        self.assertIs(type(loaded_weight.tensor_impl), type(weight.tensor_impl))
+        self.assertTrue(torch.equal(loaded_weight.dequantize(), weight.dequantize()))
+
+        output = loaded_quantized_model(**inputs)[0].flatten()[-9:].detach().float().cpu().numpy()
+        self.assertTrue(numpy_cosine_similarity_distance(output, expected) < 1e-3)
+
+    def test_int4wo_safetensors(self):
+        # The tensor core tiled layout packs the weights, and stores the scales and zero-points together.
+        self._check_safetensors_round_trip("int4_weight_only", {"modules_to_not_convert": ["x_embedder"]})
+
+    def test_float8wo_safetensors(self):
+        if not TorchAoConfig._is_cuda_capability_atleast_8_9():
+            self.skipTest("float8 weight-only quantization requires a GPU with compute capability 8.9 or higher.")
+        self._check_safetensors_round_trip("float8wo_e4m3", {"modules_to_not_convert": ["x_embedder"]})
+
+    def test_int_a8w8_safetensors_raises(self):
+        quantized_model = self.get_dummy_model("int8_dynamic_activation_int8_weight", {}, "cuda")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaisesRegex(ValueError, "safe_serialization=False"):
+                quantized_model.save_pretrained(tmp_dir, safe_serialization=True)
+
 
 # Slices for these tests have been obtained on our aws-g6e-xlarge-plus runners
 @require_torch
@@ -0,0 +1,123 @@
+# coding=utf-8
+# Copyright 2025 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import unittest
+
+import PIL.Image
+import torch
+
+from diffusers import AutoencoderKL
+from diffusers.image_processor import VaeImageProcessor
+from diffusers.utils.remote_utils import RemoteDecodeClient, RemoteDecodeServer, remote_decode
+
+
+SCALING_FACTOR = 0.5
+
+
+def get_vae():
+    vae = AutoencoderKL(
+        block_out_channels=(4, 8),
+        down_block_types=("DownEncoderBlock2D", "DownEncoderBlock2D"),
+        up_block_types=("UpDecoderBlock2D", "UpDecoderBlock2D"),
+        latent_channels=4,
+        norm_num_groups=2,
+    ).eval()
+    calls = []
+    vae.decoder.register_forward_hook(lambda module, args, output: calls.append(args[0].shape[0]))
+    return vae, calls
+
+
+def get_latents(batch_size=1, seed=0):
+    return torch.randn(batch_size, 4, 8, 8, generator=torch.Generator().manual_seed(seed))
+
+
+class RemoteDecodeServerTests(unittest.TestCase):
+    def setUp(self):
+        self.vae, self.calls = get_vae()
+        self.server = RemoteDecodeServer(self.vae).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_decode_tensor(self):
+        latents = get_latents(2)
+        output = remote_decode(
+            self.server.url, latents, scaling_factor=SCALING_FACTOR, output_type="pt", return_type="pt"
+        )
+        with torch.no_grad():
+            expected = self.vae.decode(latents / SCALING_FACTOR).sample
+        self.assertEqual(output.shape, expected.shape)
+        self.assertTrue(torch.allclose(output, expected, atol=1e-5))
+
+    def test_decode_image(self):
+        output = remote_decode(
+            self.server.url, get_latents(), scaling_factor=SCALING_FACTOR, image_format="png", compression="gzip"
+        )
+        self.assertIsInstance(output, PIL.Image.Image)
+        self.assertEqual(output.size, (16, 16))
+        self.assertEqual(output.format, "png")
+
+    def test_invalid_request_raises(self):
+        with self.assertRaises(RuntimeError):
+            remote_decode(self.server.url, get_latents()[:, :3], scaling_factor=SCALING_FACTOR, output_type="pt")
+
+    def test_client_batches_requests(self):
+        latents = [get_latents(seed=seed) for seed in range(3)]
+
+        async def run():
+            async with RemoteDecodeClient(self.server.url, max_batch_size=4, batch_timeout=0.1) as client:
+                return await asyncio.gather(
+                    *[
+                        client.decode(
+                            tensor,
+                            scaling_factor=SCALING_FACTOR,
+                            output_type="pt",
+                            partial_postprocess=True,
+                            return_type="pt",
+                        )
+                        for tensor in latents
+                    ]
+                )
+
+        outputs = asyncio.run(run())
+        self.assertEqual(self.calls, [3])
+        for tensor, output in zip(latents, outputs):
+            expected = remote_decode(
+                self.server.url,
+                tensor,
+                scaling_factor=SCALING_FACTOR,
+                output_type="pt",
+                partial_postprocess=True,
+                return_type="pt",
+            )
+            self.assertEqual(output.dtype, torch.uint8)
+            self.assertTrue(torch.equal(output, expected))
+
+    def test_client_converts_outputs_per_request(self):
+        processor = VaeImageProcessor(vae_scale_factor=2)
+
+        async def run():
+            async with RemoteDecodeClient(self.server.url, batch_timeout=0.1) as client:
+                kwargs = {"scaling_factor": SCALING_FACTOR, "output_type": "pt"}
+                return await asyncio.gather(
+                    client.decode(get_latents(), processor=processor, return_type="pil", **kwargs),
+                    client.decode(get_latents(seed=1), return_type="pt", **kwargs),
+                )
+
+        image, tensor = asyncio.run(run())
+        self.assertEqual(self.calls, [2])
+        self.assertIsInstance(image, PIL.Image.Image)
+        self.assertEqual(tensor.shape, (1, 3, 16, 16))